@@ -66,11 +66,22 @@ def http_request(url, method, body=None, headers=None, insecure=False):
             "disable the certificate check.")
 
 
-def fetch_api_description(url, insecure=False):
-    """Obtain the description of remote API given its base URL."""
+def fetch_api_description(url, insecure=False, description=None):
+    """Obtain the description of remote API given its base URL.
+
+    :param description: A previously fetched description of the same API,
+        if there is one. The server is asked to send a new description only
+        when its hash differs; if not, `description` is returned as-is.
+    """
     url_describe = urljoin(url, "describe/")
+    if description is None or description.get("hash") is None:
+        headers = None
+    else:
+        headers = {"If-None-Match": '"%s"' % description["hash"]}
     response, content = http_request(
-        ascii_url(url_describe), "GET", insecure=insecure)
+        ascii_url(url_describe), "GET", headers=headers, insecure=insecure)
+    if response.status == http.client.NOT_MODIFIED and headers is not None:
+        return description
     if response.status != http.client.OK:
         raise CommandError(
             "{0.status} {0.reason}:\n{1}".format(response, content))
@@ -407,18 +418,27 @@ def register_actions(profile, handler, parser):
         action_parser.set_defaults(execute=action_class(action_parser))
 
 
-def register_handler(profile, handler, parser):
-    """Register a resource's handler."""
+def register_handler(profile, handler, parser, actions=True):
+    """Register a resource's handler.
+
+    :param actions: Whether to register the handler's actions too. When
+        false, the handler appears in its profile's help but cannot be used.
+    """
     help_title, help_body = parse_docstring(handler["doc"])
     handler_name = handler_command_name(handler["name"])
     handler_parser = parser.subparsers.add_parser(
         handler_name, help=help_title, description=help_title,
         epilog=help_body)
-    register_actions(profile, handler, handler_parser)
+    if actions:
+        register_actions(profile, handler, handler_parser)
+
 
+def register_resources(profile, parser, handler_name=None):
+    """Register a profile's resources.
 
-def register_resources(profile, parser):
-    """Register a profile's resources."""
+    :param handler_name: The command name of the only handler to register
+        actions for, or `None` to register the actions of every handler.
+    """
     anonymous = profile["credentials"] is None
     description = profile["description"]
     resources = description["resources"]
@@ -451,7 +471,10 @@ def register_resources(profile, parser):
         if len(actions) != 0:
             represent_as["actions"].extend(
                 value[0] for value in actions.values())
-            register_handler(profile, represent_as, parser)
+            register_handler(
+                profile, represent_as, parser, actions=(
+                    handler_name is None or handler_name ==
+                    handler_command_name(resource["name"])))
 
 profile_help_paragraphs = [
     """\
@@ -471,8 +494,29 @@ profile_help = '\n\n'.join(
     fill(dedent(paragraph)) for paragraph in profile_help_paragraphs)
 
 
-def register_api_commands(parser):
-    """Register all profiles as subcommands on `parser`."""
+def get_invoked_commands(argv):
+    """Return the profile and handler names invoked by `argv`.
+
+    These are the first two positional arguments; either can be `None`.
+    """
+    names = [arg for arg in argv[1:] if not arg.startswith("-")]
+    names.extend([None, None])
+    return names[0], names[1]
+
+
+def register_api_commands(parser, argv=None):
+    """Register all profiles as subcommands on `parser`.
+
+    :param argv: The command-line being parsed, if known. Building the
+        parsers for every action of every handler of every profile is slow,
+        so, given `argv`, only the resources of the invoked profile, and only
+        the actions of the invoked handler, are registered.
+    """
+    if argv is None:
+        profile_name_invoked = handler_name_invoked = None
+    else:
+        profile_name_invoked, handler_name_invoked = (
+            get_invoked_commands(argv))
     with ProfileConfig.open() as config:
         for profile_name in config:
             profile = config[profile_name]
@@ -482,4 +526,8 @@ def register_api_commands(parser):
                     "Issue commands to the MAAS region controller at %(url)s."
                     % profile),
                 epilog=profile_help)
-            register_resources(profile, profile_parser)
+            if argv is None:
+                register_resources(profile, profile_parser)
+            elif profile_name == profile_name_invoked:
+                register_resources(
+                    profile, profile_parser, handler_name_invoked)
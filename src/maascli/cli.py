@@ -124,7 +124,8 @@ class cmd_refresh(Command):
             for profile_name in config:
                 profile = config[profile_name]
                 url = profile["url"]
-                profile["description"] = fetch_api_description(url)
+                profile["description"] = fetch_api_description(
+                    url, description=profile["description"])
                 config[profile_name] = profile
 
 
@@ -79,6 +79,29 @@ class TestRegisterAPICommands(MAASTestCase):
                     (profile_name, handler_name, action_name))
                 self.assertIsInstance(options.execute, api.Action)
 
+    def test_registers_only_invoked_handler_actions_given_argv(self):
+        profile = self.make_profile()
+        [profile_name] = profile
+        resources = profile[profile_name]["description"]["resources"]
+        invoked, other = (
+            handler_command_name(resource["name"]) for resource in resources)
+        parser = ArgumentParser()
+        api.register_api_commands(
+            parser, ["maas", "--debug", profile_name, invoked])
+        profile_parser = parser.subparsers.choices[profile_name]
+        self.assertIsNotNone(
+            profile_parser.subparsers.choices[invoked]._subparsers)
+        self.assertIsNone(
+            profile_parser.subparsers.choices[other]._subparsers)
+
+    def test_registers_only_invoked_profile_resources_given_argv(self):
+        profile = self.make_profile()
+        [profile_name] = profile
+        parser = ArgumentParser()
+        api.register_api_commands(parser, ["maas", "login"])
+        profile_parser = parser.subparsers.choices[profile_name]
+        self.assertIsNone(profile_parser._subparsers)
+
 
 class TestFunctions(MAASTestCase):
     """Test for miscellaneous functions in `maascli.api`."""
@@ -96,6 +119,31 @@ class TestFunctions(MAASTestCase):
             "http://example.com/api/2.0/describe/", "GET", body=None,
             headers=None))
 
+    def test_fetch_api_description_not_modified(self):
+        description = {"hash": factory.make_name("hash")}
+        request = self.patch(httplib2.Http, "request")
+        response = httplib2.Response({})
+        response.status = http.client.NOT_MODIFIED
+        request.return_value = response, b""
+        self.assertIs(
+            description, api.fetch_api_description(
+                "http://example.com/api/2.0/", description=description))
+        self.assertThat(request, MockCalledOnceWith(
+            "http://example.com/api/2.0/describe/", "GET", body=None,
+            headers={"If-None-Match": '"%s"' % description["hash"]}))
+
+    def test_fetch_api_description_modified(self):
+        content = {"hash": factory.make_name("hash")}
+        request = self.patch(httplib2.Http, "request")
+        response = httplib2.Response({})
+        response.status = http.client.OK
+        response["content-type"] = "application/json"
+        request.return_value = response, bytes(json.dumps(content), "utf-8")
+        self.assertEqual(
+            content, api.fetch_api_description(
+                "http://example.com/api/2.0/",
+                description={"hash": factory.make_name("hash")}))
+
     def test_fetch_api_description_not_okay(self):
         # If the response is not 200 OK, fetch_api_description throws toys.
         content = factory.make_name("content")
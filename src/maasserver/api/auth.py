@@ -12,7 +12,9 @@ from maasserver.macaroon_auth import (
     MacaroonAPIAuthentication,
     validate_user_external_auth,
 )
+from maasserver.oauth_store import MAASDataStore
 from piston3.authentication import (
+    initialize_server_request,
     OAuthAuthentication,
     send_oauth_error,
 )
@@ -72,6 +74,20 @@ class MAASAPIAuthentication(OAuthAuthentication):
 
         return False
 
+    @staticmethod
+    def validate_token(request, check_timestamp=True, check_nonce=True):
+        # Piston's DataStore queries the database for the consumer, the
+        # token and its user, and records the nonce; MAASDataStore caches
+        # the token and checks the nonce in memory.
+        oauth_server, oauth_request = initialize_server_request(request)
+        oauth_server.set_data_store(MAASDataStore(oauth_request))
+        # Piston accepts these arguments but always checks both.
+        if not check_timestamp:
+            oauth_server._check_timestamp = lambda timestamp: None
+        if not check_nonce:
+            oauth_server._check_nonce = lambda consumer, token, nonce: None
+        return oauth_server.verify_request(oauth_request)
+
     def challenge(self, request):
         # Beware: this returns 401: Unauthorized, not 403: Forbidden
         # as the name implies.
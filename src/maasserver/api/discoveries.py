@@ -8,6 +8,11 @@ __all__ = [
     'DiscoveriesHandler',
     ]
 
+from collections import (
+    namedtuple,
+    OrderedDict,
+)
+from itertools import chain
 from textwrap import dedent
 
 from django.http.response import (
@@ -36,9 +41,15 @@ from maasserver.models import (
     Discovery,
     RackController,
 )
-from netaddr import IPNetwork
+from maasserver.rpc import getClientFor
+from netaddr import (
+    IPNetwork,
+    IPSet,
+)
 from piston3.utils import rc
 from provisioningserver.rpc import cluster
+from provisioningserver.rpc.exceptions import NoConnectionsAvailable
+from provisioningserver.utils.network import split_network
 
 
 DISPLAYED_DISCOVERY_FIELDS = (
@@ -181,14 +192,15 @@ class DiscoveriesHandler(OperationsHandler):
 
         This command causes each connected rack controller to execute the
         'maas-rack scan-network' command, which will scan all CIDRs configured
-        on the rack controller using 'nmap' (if it is installed) or 'ping'.
+        on the rack controller by sending ARP requests (or using 'ping').
+        When CIDRs are specified, each CIDR's addresses are divided between
+        the rack controllers attached to it.
 
         Network discovery must not be set to 'disabled' for this command to be
         useful.
 
         Scanning will be started in the background, and could take a long time
-        on rack controllers that do not have 'nmap' installed and are connected
-        to large networks.
+        if 'ping' is used on large networks.
 
         If the call is a success, this method will return a dictionary of
         results as follows:
@@ -218,14 +230,16 @@ class DiscoveriesHandler(OperationsHandler):
             specified. (This may not be the best idea, depending on acceptable
             use agreements, and the politics of the organization that owns the
             network.) Default: False.
-        :param always_use_ping: If True, will force the scan to use 'ping' even
-            if 'nmap' is installed. Default: False.
-        :param slow: If True, and 'nmap' is being used, will limit the scan
-            to nine packets per second. If the scanner is 'ping', this option
-            has no effect. Default: False.
-        :param threads: The number of threads to use during scanning. If 'nmap'
-            is the scanner, the default is one thread per 'nmap' process. If
-            'ping' is the scanner, the default is four threads per CPU.
+        :param always_use_ping: If True, will force the scan to use 'ping'
+            rather than ARP requests. Default: False.
+        :param slow: If True, will limit the scan to nine packets per second
+            on each interface, unless a rate is specified. If the scanner is
+            'ping', this option has no effect. Default: False.
+        :param rate: The maximum number of packets per second to send on each
+            rack interface during the scan; must be at least 1. If the
+            scanner is 'ping', this option has no effect. Default: 100.
+        :param threads: The number of threads to use during scanning, if
+            'ping' is the scanner. The default is four threads per CPU.
         """
         cidrs = get_optional_list(
             request.POST, 'cidr', default=[], validator=CIDR)
@@ -242,6 +256,10 @@ class DiscoveriesHandler(OperationsHandler):
             request.POST, 'threads', default=None, validator=Number)
         if threads is not None:
             threads = int(threads)  # Could be a floating point.
+        rate = get_optional_param(
+            request.POST, 'rate', default=None, validator=Number(min=1))
+        if rate is not None:
+            rate = int(rate)  # Could be a floating point.
         if len(cidrs) == 0 and force is not True:
             error = (
                 "Bad request: scanning all subnets is not allowed unless "
@@ -255,16 +273,31 @@ class DiscoveriesHandler(OperationsHandler):
             # No CIDRs specified and force==True, so scan all networks.
             results = scan_all_rack_networks(
                 scan_all=True, ping=always_use_ping, slow=slow,
-                threads=threads)
+                threads=threads, rate=rate)
         else:
             results = scan_all_rack_networks(
                 cidrs=ipnetworks, ping=always_use_ping, slow=slow,
-                threads=threads)
+                threads=threads, rate=rate)
         return user_friendly_scan_results(results)
 
 
-def get_scan_result_string_for_humans(rpc_results: RPCResults) -> str:
+# The results of `scan_all_rack_networks`: the `RPCResults` of calling
+# `ScanNetworks`, and the list of requested CIDRs that are not being scanned.
+ScanResults = namedtuple('ScanResults', RPCResults._fields + ('unscanned',))
+
+
+def get_scan_result_string_for_humans(rpc_results: ScanResults) -> str:
     """Return a human-readable string with the results of `ScanNetworks`."""
+    result = _get_scan_result_string_for_humans(rpc_results)
+    if len(rpc_results.unscanned) > 0:
+        result += (
+            " %d network(s) will not be fully scanned, because no rack "
+            "controller attached to them could start scanning them." % (
+                len(rpc_results.unscanned)))
+    return result
+
+
+def _get_scan_result_string_for_humans(rpc_results: RPCResults) -> str:
     if len(rpc_results.available) == 0:
         result = (
             "Unable to initiate network scanning on any rack controller. "
@@ -317,9 +350,44 @@ def get_controller_summary(controllers):
     ]
 
 
+def is_connected(controller) -> bool:
+    """Return whether this region has an RPC connection to `controller`."""
+    try:
+        getClientFor(controller.system_id)
+    except NoConnectionsAvailable:
+        return False
+    else:
+        return True
+
+
+def get_scan_assignments(cidrs) -> OrderedDict:
+    """Divide scanning `cidrs` between the rack controllers attached to them.
+
+    Each CIDR is split into contiguous parts, one for each connected rack
+    controller with an address on that subnet, so that rack controllers
+    sharing a VLAN don't all scan the same addresses. Rack controllers that
+    are not connected are left out, so that their share is scanned by the
+    others; a CIDR without any connected rack controller is not assigned.
+
+    :return: OrderedDict of {<RackController>: <list-of-IPNetwork>}.
+    """
+    assignments = OrderedDict()
+    for cidr in cidrs:
+        controllers = RackController.objects.filter_by_subnet_cidrs(
+            [cidr]).distinct().order_by('id')
+        controllers = [
+            controller for controller in controllers
+            if is_connected(controller)
+        ]
+        parts = split_network(cidr, len(controllers))
+        for controller, part in zip(controllers, parts):
+            assignments.setdefault(controller, []).extend(part)
+    return assignments
+
+
 def scan_all_rack_networks(
         scan_all=None, cidrs=None, ping=None, threads=None,
-        slow=None) -> RPCResults:
+        slow=None, rate=None) -> ScanResults:
     """Call each rack controller and instruct it to scan its attached networks.
 
     Interprets the results and returns a dict with the following keys:
@@ -344,37 +412,58 @@ def scan_all_rack_networks(
     :param scan_all: If True, allows scanning all networks if no `cidrs` were
         passed in.
     :param cidrs: An iterable of netaddr.IPNetwork objects to instruct the
-        rack controllers to scan. If omitted, the rack will scan all of its
-        attached networks.
+        rack controllers to scan. Each is divided between the rack controllers
+        attached to it (see `get_scan_assignments`). If omitted, the rack
+        will scan all of its attached networks.
     :param ping: If True, forces the use of 'ping' rather than 'nmap'.
     :param threads: If specified, overrides the default number of concurrent
         scanning threads.
-    :param slow: If True, forces 'nmap' to scan slower (if it is being used).
-    :return: dict
+    :param slow: If True, forces the rack controllers to scan slower.
+    :param rate: If specified, overrides the default maximum number of packets
+        per second each rack controller sends on each interface.
+    :return: `ScanResults`. Its `unscanned` list holds the parts of `cidrs`
+        not assigned to a rack controller that started scanning them,
+        either because no rack controller could take them or because the
+        one they were assigned to was unavailable, failed, or timed out.
     """
     kwargs = {}
     controllers = None
+    controller_kwargs = None
+    assignments = OrderedDict()
     if scan_all is not None:
         kwargs['scan_all'] = scan_all
     if cidrs is not None:
-        kwargs['cidrs'] = cidrs
-        controllers = list(
-            RackController.objects.filter_by_subnet_cidrs(cidrs))
+        assignments = get_scan_assignments(cidrs)
+        controllers = list(assignments)
+        controller_kwargs = {
+            controller.system_id: {'cidrs': controller_cidrs}
+            for controller, controller_cidrs in assignments.items()
+        }
     if ping is not None:
         kwargs['force_ping'] = ping
     if threads is not None:
         kwargs['threads'] = threads
     if slow is not None:
         kwargs['slow'] = slow
+    if rate is not None:
+        kwargs['rate'] = rate
     rpc_results = call_racks_synchronously(
-        cluster.ScanNetworks, controllers=controllers, kwargs=kwargs)
-    return rpc_results
+        cluster.ScanNetworks, controllers=controllers, kwargs=kwargs,
+        controller_kwargs=controller_kwargs)
+    if cidrs is None:
+        unscanned = []
+    else:
+        scanned = IPSet(chain.from_iterable(
+            assignments.get(controller, [])
+            for controller in rpc_results.success))
+        unscanned = list((IPSet(cidrs) - scanned).iter_cidrs())
+    return ScanResults(*rpc_results, unscanned=unscanned)
 
 
-def user_friendly_scan_results(rpc_results: RPCResults) -> dict:
-    """Given the specified `RPCResults` object, returns a user-friendly dict.
+def user_friendly_scan_results(rpc_results: ScanResults) -> dict:
+    """Given the specified `ScanResults` object, returns a user-friendly dict.
 
-    Interprets the given `RPCResults` and transforms it into a dictionary
+    Interprets the given `ScanResults` and transforms it into a dictionary
     suitable to return from the API, with human-readable strings.
     """
     result = get_scan_result_string_for_humans(rpc_results)
@@ -397,5 +486,6 @@ def user_friendly_scan_results(rpc_results: RPCResults) -> dict:
             get_controller_summary(rpc_results.timeout),
         "failures":
             get_failure_summary(rpc_results.failures),
+        "unscanned_cidrs": [str(cidr) for cidr in rpc_results.unscanned],
     }
     return results
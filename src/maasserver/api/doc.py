@@ -9,6 +9,7 @@ __all__ = [
     "describe_resource",
     "find_api_resources",
     "generate_api_docs",
+    "get_api_description",
     "get_api_description_hash",
     ]
 
@@ -16,6 +17,7 @@ from collections import (
     Mapping,
     Sequence,
 )
+from copy import deepcopy
 from functools import partial
 import hashlib
 from inspect import getdoc
@@ -26,15 +28,15 @@ from threading import RLock
 
 from django.core.urlresolvers import (
     get_resolver,
+    get_script_prefix,
     RegexURLPattern,
     RegexURLResolver,
 )
+from maasserver.processpool import callInProcessPool
 from piston3.authentication import NoAuthentication
 from piston3.doc import generate_doc
 from piston3.handler import BaseHandler
 from piston3.resource import Resource
-from provisioningserver.drivers.pod.registry import PodDriverRegistry
-from provisioningserver.drivers.power.registry import PowerDriverRegistry
 
 
 def accumulate_api_resources(resolver, accumulator):
@@ -80,6 +82,10 @@ def generate_power_types_doc():
 
     The documentation is derived from the `PowerDriverRegistry`.
     """
+    # Importing the registry imports every power and pod driver; only do so
+    # when needed.
+    from provisioningserver.drivers.power.registry import PowerDriverRegistry
+
     output = StringIO()
     line = partial(print, file=output)
 
@@ -122,6 +128,9 @@ def generate_pod_types_doc():
 
     The documentation is derived from the `PodDriverRegistry`.
     """
+    # Importing the registry imports every pod driver; only do so when needed.
+    from provisioningserver.drivers.pod.registry import PodDriverRegistry
+
     output = StringIO()
     line = partial(print, file=output)
 
@@ -471,6 +480,34 @@ def hash_canonical(description):
     return hashlib.sha1(description_as_json)
 
 
+def hash_canonical_hexdigest(description):
+    """Return the hex digest of `hash_canonical` for `description`.
+
+    Unlike the hash object, the digest can be sent back from the process
+    pool.
+    """
+    return hash_canonical(description).hexdigest()
+
+
+api_descriptions = {}
+api_descriptions_lock = RLock()
+
+
+def get_api_description():
+    """Return a description of the whole MAAS API.
+
+    This is the same as `describe_api` but the description is worked out only
+    once for each script prefix in this process; the paths in it depend on
+    the prefix. It's a copy, so callers are free to modify it.
+    """
+    script_prefix = get_script_prefix()
+    with api_descriptions_lock:
+        if script_prefix not in api_descriptions:
+            api_descriptions[script_prefix] = describe_api()
+        api_description = api_descriptions[script_prefix]
+    return deepcopy(api_description)
+
+
 api_description_hash = None
 api_description_hash_lock = RLock()
 
@@ -485,8 +522,11 @@ def get_api_description_hash():
         with api_description_hash_lock:
             if api_description_hash is None:
                 api_description = describe_api()
-                api_description_hasher = hash_canonical(api_description)
-                api_description_hash = api_description_hasher.hexdigest()
+                # Making the description canonical takes a while; do it
+                # outside of this process, leaving it free to serve
+                # requests.
+                api_description_hash = callInProcessPool(
+                    hash_canonical_hexdigest, api_description)
 
     # The hash is an immutable string, so safe to return directly.
     return api_description_hash
@@ -67,13 +67,14 @@ from textwrap import dedent
 
 from django.http import HttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import etag
 from docutils import core
 from maasserver.api.doc import (
-    describe_api,
     find_api_resources,
     generate_api_docs,
     generate_pod_types_doc,
     generate_power_types_doc,
+    get_api_description,
     get_api_description_hash,
 )
 from maasserver.utils import build_absolute_uri
@@ -176,16 +177,20 @@ def api_doc(request):
         {'doc': reST_to_html_fragment(render_api_docs())})
 
 
+@etag(lambda request: get_api_description_hash())
 def describe(request):
     """Render a description of the whole MAAS API.
 
+    The API description hash is used as the response's ETag, so clients that
+    already have the current description get a 304 (Not Modified) back.
+
     :param request: A "related" HTTP request. This is used to derive the URL
         where the client expects to see the MAAS API.
     :return: An `HttpResponse` containing a JSON description of the whole MAAS
         API. Links to the API will use the same scheme and hostname that the
         client used in `request`.
     """
-    description = describe_api()
+    description = get_api_description()
     # Add hash so that client can check if things are up to date.
     description["hash"] = get_api_description_hash()
     # Make all URIs absolute. Clients - and the command-line client in
@@ -8,6 +8,7 @@ __all__ = [
     "get_storage_layout_params",
 ]
 
+import inspect
 import re
 
 from django.conf import settings
@@ -83,6 +84,10 @@ from maasserver.node_constraint_filter_forms import (
     AcquireNodeForm,
     nodes_by_storage,
 )
+from maasserver.node_action import (
+    ACTIONS_DICT,
+    perform_bulk_node_action,
+)
 from maasserver.node_status import NODE_TRANSITIONS
 from maasserver.preseed import get_curtin_merged_config
 from maasserver.storage_layouts import (
@@ -1206,6 +1211,27 @@ class AnonMachinesHandler(AnonNodesHandler):
         return ('machines_handler', [])
 
 
+def get_action_params(action_class, data):
+    """Return the parameters in `data` for `action_class.execute`.
+
+    Parameters are converted like the defaults of `execute`: booleans are
+    parsed, and lists can be given more than once.
+    """
+    params = {}
+    signature = inspect.signature(action_class.execute)
+    for name, parameter in signature.parameters.items():
+        if name == 'self' or name not in data:
+            continue
+        elif isinstance(parameter.default, bool):
+            params[name] = get_optional_param(
+                data, name, parameter.default, StringBool)
+        elif isinstance(parameter.default, list):
+            params[name] = data.getlist(name)
+        else:
+            params[name] = data[name]
+    return params
+
+
 class MachinesHandler(NodesHandler, PowersMixin):
     """Manage the collection of all the machines in the MAAS."""
     api_doc_section_name = "Machines"
@@ -1396,6 +1422,45 @@ class MachinesHandler(NodesHandler, PowersMixin):
                 % ', '.join(failed))
         return released_ids
 
+    @operation(idempotent=False)
+    def bulk_action(self, request):
+        """Perform a node action on multiple machines.
+
+        All the machines are checked and acted upon in one transaction, and
+        power control is sent to each rack controller in batches. A machine
+        that the action cannot be performed on does not stop the action
+        being performed on the others.
+
+        :param machines: system_ids of the machines to act upon.
+        :param action: The name of the action, as offered on the machine
+            listing: for example "deploy", "on", "off", "commission" or
+            "release".
+        :type action: unicode
+
+        Any other parameters are passed on to the action, for example
+        `osystem` and `distro_series` for "deploy", or `erase` for
+        "release".
+
+        :return: A mapping of each machine's system_id to the result of the
+            action on it: "done", "not_actionable", "not_permitted" or
+            "failed", in which case there is also an "error".
+
+        Returns 400 if any of the machines cannot be found, or if the action
+        is unknown.
+        """
+        system_ids = set(request.POST.getlist('machines'))
+        action_name = get_mandatory_param(request.POST, 'action')
+        action_class = ACTIONS_DICT.get(action_name)
+        if action_class is None:
+            raise MAASAPIBadRequest("Unknown action: %s." % action_name)
+        # Check the existence of these machines first.
+        self._check_system_ids_exist(system_ids)
+        machines = self.base_model.objects.get_nodes(
+            request.user, perm=NODE_PERMISSION.VIEW, ids=system_ids)
+        return perform_bulk_node_action(
+            machines, request.user, action_name,
+            get_action_params(action_class, request.POST))
+
     @operation(idempotent=True)
     def list_allocated(self, request):
         """Fetch Machines that were allocated to the User/oauth token."""
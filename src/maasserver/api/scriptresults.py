@@ -330,45 +330,50 @@ class NodeScriptResultHandler(OperationsHandler):
         for script_result in filter_script_results(
                 script_set, filters, hardware_type):
             mtime = time.mktime(script_result.updated.timetuple())
+            # Map each filename to where its content is, rather than to the
+            # content itself, so that it's read only as it's written out.
             if output == 'combined':
-                files[script_result.name] = script_result.output
+                files[script_result.name] = (script_result, 'output')
                 times[script_result.name] = mtime
             elif output == 'stdout':
                 filename = '%s.out' % script_result.name
-                files[filename] = script_result.stdout
+                files[filename] = (script_result, 'stdout')
                 times[filename] = mtime
             elif output == 'stderr':
                 filename = '%s.err' % script_result.name
-                files[filename] = script_result.stderr
+                files[filename] = (script_result, 'stderr')
                 times[filename] = mtime
             elif output == 'result':
                 filename = '%s.yaml' % script_result.name
-                files[filename] = script_result.result
+                files[filename] = (script_result, 'result')
                 times[filename] = mtime
             elif output == 'all':
-                files[script_result.name] = script_result.output
+                files[script_result.name] = (script_result, 'output')
                 times[script_result.name] = mtime
                 filename = '%s.out' % script_result.name
-                files[filename] = script_result.stdout
+                files[filename] = (script_result, 'stdout')
                 times[filename] = mtime
                 filename = '%s.err' % script_result.name
-                files[filename] = script_result.stderr
+                files[filename] = (script_result, 'stderr')
                 times[filename] = mtime
                 filename = '%s.yaml' % script_result.name
-                files[filename] = script_result.result
+                files[filename] = (script_result, 'result')
                 times[filename] = mtime
 
         if filetype == 'txt' and len(files) == 1:
             # Just output the result with no break to allow for piping.
+            script_result, field_name = list(files.values())[0]
             return HttpResponse(
-                list(files.values())[0], content_type='application/binary')
+                script_result.iter_content(field_name),
+                content_type='application/binary')
         elif filetype == 'txt':
             binary = BytesIO()
-            for filename, content in files.items():
+            for filename, (script_result, field_name) in files.items():
                 dashes = '-' * int((80.0 - (2 + len(filename))) / 2)
                 binary.write(
                     ('%s %s %s\n' % (dashes, filename, dashes)).encode())
-                binary.write(content)
+                for chunk in script_result.iter_content(field_name):
+                    binary.write(chunk)
                 binary.write(b'\n')
             return HttpResponse(
                 binary.getvalue(), content_type='application/binary')
@@ -378,7 +383,9 @@ class NodeScriptResultHandler(OperationsHandler):
                 script_set.node.hostname, script_set.result_type_name.lower(),
                 script_set.id)
             with tarfile.open(mode='w:xz', fileobj=binary) as tar:
-                for filename, content in files.items():
+                for filename, (script_result, field_name) in files.items():
+                    content = b''.join(
+                        script_result.iter_content(field_name))
                     tarinfo = tarfile.TarInfo(
                         name=os.path.join(root_dir, filename))
                     tarinfo.size = len(content)
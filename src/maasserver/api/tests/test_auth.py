@@ -6,6 +6,7 @@
 __all__ = []
 
 from datetime import timedelta
+import time
 from unittest import mock
 
 from django.contrib.auth.models import AnonymousUser
@@ -14,10 +15,14 @@ from maasserver.api.auth import (
     OAuthUnauthorized,
 )
 from maasserver.middleware import ExternalAuthInfo
+from maasserver.models.signals.tokens import signals as token_signals
+from maasserver.oauth_store import token_cache
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maastesting.testcase import MAASTestCase
 from oauth import oauth
+from piston3.models import Nonce
+from piston3.oauth import OAuthError
 from testtools.matchers import Contains
 
 
@@ -74,6 +79,90 @@ class TestMAASAPIAuthentication(MAASServerTestCase):
         # check interval not expired, the user isn't checked
         mock_validate.assert_called()
 
+    def make_oauth_request(self, token, nonce=None, timestamp=None):
+        if nonce is None:
+            nonce = factory.make_string()
+        if timestamp is None:
+            timestamp = int(time.time())
+        request = factory.make_fake_request('/')
+        request.META['HTTP_AUTHORIZATION'] = factory.make_oauth_header(
+            oauth_consumer_key=token.consumer.key, oauth_token=token.key,
+            oauth_nonce=nonce, oauth_timestamp=timestamp,
+            oauth_signature="%s%%26%s" % (
+                token.consumer.secret, token.secret))
+        return request
+
+    def test_validate_token(self):
+        user = factory.make_User()
+        token = user.userprofile.get_authorisation_tokens()[0]
+        request = self.make_oauth_request(token)
+        consumer, validated_token, _ = (
+            MAASAPIAuthentication.validate_token(request))
+        self.assertEqual(
+            (token.consumer, token, user),
+            (consumer, validated_token, validated_token.user))
+
+    def test_validate_token_does_not_record_nonces_in_database(self):
+        user = factory.make_User()
+        token = user.userprofile.get_authorisation_tokens()[0]
+        MAASAPIAuthentication.validate_token(self.make_oauth_request(token))
+        self.assertFalse(Nonce.objects.filter(token_key=token.key).exists())
+
+    def test_validate_token_rejects_replayed_request(self):
+        user = factory.make_User()
+        token = user.userprofile.get_authorisation_tokens()[0]
+        nonce = factory.make_string()
+        MAASAPIAuthentication.validate_token(
+            self.make_oauth_request(token, nonce))
+        error = self.assertRaises(
+            OAuthError, MAASAPIAuthentication.validate_token,
+            self.make_oauth_request(token, nonce))
+        self.assertThat(error.message, Contains("Nonce already used"))
+
+    def test_validate_token_accepts_replayed_request_without_check_nonce(
+            self):
+        user = factory.make_User()
+        token = user.userprofile.get_authorisation_tokens()[0]
+        nonce = factory.make_string()
+        MAASAPIAuthentication.validate_token(
+            self.make_oauth_request(token, nonce))
+        consumer, validated_token, _ = MAASAPIAuthentication.validate_token(
+            self.make_oauth_request(token, nonce), check_nonce=False)
+        self.assertEqual(token, validated_token)
+
+    def test_validate_token_rejects_expired_timestamp(self):
+        user = factory.make_User()
+        token = user.userprofile.get_authorisation_tokens()[0]
+        timestamp = int(time.time()) - 3600
+        error = self.assertRaises(
+            OAuthError, MAASAPIAuthentication.validate_token,
+            self.make_oauth_request(token, timestamp=timestamp))
+        self.assertThat(error.message, Contains("Expired timestamp"))
+
+    def test_validate_token_accepts_expired_timestamp_without_check(self):
+        user = factory.make_User()
+        token = user.userprofile.get_authorisation_tokens()[0]
+        timestamp = int(time.time()) - 3600
+        consumer, validated_token, _ = MAASAPIAuthentication.validate_token(
+            self.make_oauth_request(token, timestamp=timestamp),
+            check_timestamp=False)
+        self.assertEqual(token, validated_token)
+
+    def test_validate_token_rejects_token_deleted_elsewhere(self):
+        user = factory.make_User()
+        token = user.userprofile.get_authorisation_tokens()[0]
+        MAASAPIAuthentication.validate_token(self.make_oauth_request(token))
+        # Delete the token as another process would, without this one
+        # being signalled: the token is still cached here.
+        token_signals.disable()
+        self.addCleanup(token_signals.enable)
+        token.delete()
+        self.assertIsNotNone(token_cache.values.get(token.key))
+        error = self.assertRaises(
+            OAuthError, MAASAPIAuthentication.validate_token,
+            self.make_oauth_request(token))
+        self.assertThat(error.message, Contains("Invalid access token"))
+
 
 class TestOAuthUnauthorized(MAASTestCase):
 
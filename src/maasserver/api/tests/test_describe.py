@@ -67,6 +67,18 @@ class TestDescribe(APITestCase.ForAnonymousAndUserAndAdmin):
             description["hash"], Equals(
                 get_api_description_hash()))
 
+    def test_describe_etag_is_the_api_hash(self):
+        response = self.client.get(reverse('describe'))
+        self.assertThat(
+            response["ETag"], Equals('"%s"' % get_api_description_hash()))
+
+    def test_describe_not_modified(self):
+        response = self.client.get(
+            reverse('describe'),
+            HTTP_IF_NONE_MATCH='"%s"' % get_api_description_hash())
+        self.assertThat(
+            response.status_code, Equals(http.client.NOT_MODIFIED))
+
 
 class TestDescribeAbsoluteURIs(MAASTestCase):
     """Tests for the `describe` view's URI manipulation."""
@@ -18,6 +18,7 @@ from maasserver.api.discoveries import (
     get_failure_summary,
     get_scan_result_string_for_humans,
     scan_all_rack_networks,
+    ScanResults,
     user_friendly_scan_results,
 )
 from maasserver.clusterrpc.utils import RPCResults
@@ -30,10 +31,12 @@ from maasserver.utils.django_urls import reverse
 from maastesting.matchers import (
     DocTestMatches,
     MockCalledOnceWith,
+    MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
 from netaddr import IPNetwork
 from provisioningserver.rpc import cluster
+from provisioningserver.rpc.exceptions import NoConnectionsAvailable
 from testtools.matchers import (
     Equals,
     HasLength,
@@ -204,7 +207,7 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
         result = self.post_api_results({'op': 'scan', 'force': 'true'})
         self.assertThat(result, Equals(result))
         self.assertThat(self.scan_all_rack_networks_mock, MockCalledOnceWith(
-            scan_all=True, ping=False, slow=False, threads=None))
+            scan_all=True, ping=False, slow=False, threads=None, rate=None))
 
     def test__scan__passes_ping(self):
         result = self.post_api_results({
@@ -214,7 +217,7 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
         })
         self.assertThat(result, Equals(result))
         self.assertThat(self.scan_all_rack_networks_mock, MockCalledOnceWith(
-            scan_all=True, ping=True, slow=False, threads=None))
+            scan_all=True, ping=True, slow=False, threads=None, rate=None))
 
     def test__scan__passes_slow(self):
         result = self.post_api_results({
@@ -224,7 +227,7 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
         })
         self.assertThat(result, Equals(result))
         self.assertThat(self.scan_all_rack_networks_mock, MockCalledOnceWith(
-            scan_all=True, ping=False, slow=True, threads=None))
+            scan_all=True, ping=False, slow=True, threads=None, rate=None))
 
     def test__scan__passes_threads(self):
         result = self.post_api_results({
@@ -234,7 +237,27 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
         })
         self.assertThat(result, Equals(result))
         self.assertThat(self.scan_all_rack_networks_mock, MockCalledOnceWith(
-            scan_all=True, ping=False, slow=False, threads=3))
+            scan_all=True, ping=False, slow=False, threads=3, rate=None))
+
+    def test__scan__passes_rate(self):
+        result = self.post_api_results({
+            'op': 'scan',
+            'force': 'true',
+            'rate': '250'
+        })
+        self.assertThat(result, Equals(result))
+        self.assertThat(self.scan_all_rack_networks_mock, MockCalledOnceWith(
+            scan_all=True, ping=False, slow=False, threads=None, rate=250))
+
+    def test__scan__rate_must_be_positive(self):
+        response = self.post_api_response({
+            'op': 'scan',
+            'force': 'true',
+            'rate': '0'
+        })
+        self.assertThat(
+            response, HasStatusCode(http.client.BAD_REQUEST))
+        self.assertThat(self.scan_all_rack_networks_mock, MockNotCalled())
 
     def test__scan__calls_scan_all_networks_with_specified_cidrs(self):
         result = self.post_api_results({
@@ -247,7 +270,7 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
             self.scan_all_rack_networks_mock, MockCalledOnceWith(cidrs=[
                 IPNetwork('192.168.0.0/24'),
                 IPNetwork('192.168.1.0/24')],
-                ping=False, slow=False, threads=None
+                ping=False, slow=False, threads=None, rate=None
             ))
 
     def test__scan__with_invalid_cidrs_fails(self):
@@ -408,30 +431,37 @@ def make_RPCResults(
         results, failures, available, unavailable, success, failed, timeout)
 
 
+def make_ScanResults(unscanned=None, **kwargs):
+    """Creates a `ScanResults` namedtuple without requiring all arguments."""
+    return ScanResults(
+        *make_RPCResults(**kwargs),
+        unscanned=[] if unscanned is None else unscanned)
+
+
 class TestInterpretsScanAllRackNetworksRPCResults(MAASTestCase):
 
     def test__no_racks_available(self):
-        results = make_RPCResults(available=[], failed=[])
+        results = make_ScanResults(available=[], failed=[])
         result = get_scan_result_string_for_humans(results)
         self.assertThat(result, DocTestMatches(
             "Unable to initiate network scanning on any rack controller..."))
 
     def test__scan_not_started_on_at_least_one_rack(self):
-        results = make_RPCResults(
+        results = make_ScanResults(
             available=['x'], unavailable=['y', 'z'], failed=[])
         result = get_scan_result_string_for_humans(results)
         self.assertThat(result, DocTestMatches(
             "Scanning could not be started on 2 rack..."))
 
     def test__scan_in_progress(self):
-        results = make_RPCResults(
+        results = make_ScanResults(
             available=['x'], unavailable=[], failed=[])
         result = get_scan_result_string_for_humans(results)
         self.assertThat(result, DocTestMatches(
             "Scanning is in-progress..."))
 
     def test__scan_failed_on_at_least_one_rack(self):
-        results = make_RPCResults(
+        results = make_ScanResults(
             available=['x'], failed=['v', 'w'], unavailable=['y', 'z'])
         result = get_scan_result_string_for_humans(results)
         self.assertThat(result, DocTestMatches(
@@ -439,12 +469,21 @@ class TestInterpretsScanAllRackNetworksRPCResults(MAASTestCase):
             "in-progress on 2..."))
 
     def test__failed_rack(self):
-        results = make_RPCResults(
+        results = make_ScanResults(
             available=['w'], failed=['w'], unavailable=[])
         result = get_scan_result_string_for_humans(results)
         self.assertThat(result, DocTestMatches(
             "A scan was already in-progress on 1 rack..."))
 
+    def test__reports_unscanned_networks(self):
+        results = make_ScanResults(
+            available=['x'], unavailable=[], failed=[],
+            unscanned=[IPNetwork("10.0.0.0/25")])
+        result = get_scan_result_string_for_humans(results)
+        self.assertThat(result, DocTestMatches(
+            "Scanning is in-progress...1 network(s) will not be fully "
+            "scanned..."))
+
 
 class TestScanAllRackNetworksInterpretsRPCResults(MAASServerTestCase):
 
@@ -456,6 +495,8 @@ class TestScanAllRackNetworksInterpretsRPCResults(MAASServerTestCase):
         interpret_result_mock.return_value = self.result
         self.call_racks_sync_mock = self.patch(
             discoveries_module, 'call_racks_synchronously')
+        # Every rack controller is connected unless a test says otherwise.
+        self.getClientFor = self.patch(discoveries_module, 'getClientFor')
         r1 = factory.make_RackController()
         r2 = factory.make_RackController()
         r3 = factory.make_RackController()
@@ -489,6 +530,7 @@ class TestScanAllRackNetworksInterpretsRPCResults(MAASServerTestCase):
                     get_controller_summary(self.timed_out),
                 "failures":
                     get_failure_summary(self.failures),
+                "unscanned_cidrs": [],
             }
         ))
 
@@ -501,14 +543,15 @@ class TestScanAllRackNetworksInterpretsRPCResults(MAASServerTestCase):
         scan_all_rack_networks()
         self.assertThat(
             self.call_racks_sync_mock, MockCalledOnceWith(
-                cluster.ScanNetworks, controllers=None, kwargs={}))
+                cluster.ScanNetworks, controllers=None, kwargs={},
+                controller_kwargs=None))
 
     def test__calls_racks_synchronously_with_scan_all(self):
         scan_all_rack_networks(scan_all=True)
         self.assertThat(
             self.call_racks_sync_mock, MockCalledOnceWith(
                 cluster.ScanNetworks, controllers=None,
-                kwargs={'scan_all': True}))
+                kwargs={'scan_all': True}, controller_kwargs=None))
 
     def test__calls_racks_synchronously_with_cidrs(self):
         subnet_query = Subnet.objects.filter(
@@ -520,18 +563,79 @@ class TestScanAllRackNetworksInterpretsRPCResults(MAASServerTestCase):
         scan_all_rack_networks(cidrs=cidrs)
         self.assertThat(
             self.call_racks_sync_mock, MockCalledOnceWith(
-                cluster.ScanNetworks, controllers=ANY,
-                kwargs={'cidrs': cidrs}))
+                cluster.ScanNetworks, controllers=ANY, kwargs={},
+                controller_kwargs=ANY))
         # Check `controllers` separately because its order may vary.
         controllers = self.call_racks_sync_mock.call_args[1]["controllers"]
         self.assertItemsEqual(self.started, controllers)
+        # Each rack scans the subnets it is attached to.
+        controller_kwargs = self.call_racks_sync_mock.call_args[1][
+            "controller_kwargs"]
+        self.assertItemsEqual(cidrs, [
+            cidr
+            for kwargs in controller_kwargs.values()
+            for cidr in kwargs['cidrs']
+        ])
+
+    def test__divides_cidrs_between_racks(self):
+        subnet = factory.make_Subnet(cidr="10.0.0.0/24")
+        r1, r2 = self.started
+        for rack in (r1, r2):
+            factory.make_StaticIPAddress(
+                subnet=subnet, interface=rack.interface_set.first())
+        scan_all_rack_networks(cidrs=[IPNetwork("10.0.0.0/24")], rate=50)
+        self.assertThat(
+            self.call_racks_sync_mock, MockCalledOnceWith(
+                cluster.ScanNetworks, controllers=[r1, r2],
+                kwargs={'rate': 50}, controller_kwargs={
+                    r1.system_id: {'cidrs': [IPNetwork("10.0.0.0/25")]},
+                    r2.system_id: {'cidrs': [IPNetwork("10.0.0.128/25")]},
+                }))
+
+    def test__divides_cidrs_between_connected_racks_only(self):
+        subnet = factory.make_Subnet(cidr="10.0.0.0/24")
+        r1, r2 = self.started
+        for rack in (r1, r2):
+            factory.make_StaticIPAddress(
+                subnet=subnet, interface=rack.interface_set.first())
+
+        def getClientFor(system_id):
+            if system_id == r2.system_id:
+                raise NoConnectionsAvailable()
+
+        self.getClientFor.side_effect = getClientFor
+        scan_all_rack_networks(cidrs=[IPNetwork("10.0.0.0/24")])
+        self.assertThat(
+            self.call_racks_sync_mock, MockCalledOnceWith(
+                cluster.ScanNetworks, controllers=[r1], kwargs={},
+                controller_kwargs={
+                    r1.system_id: {'cidrs': [IPNetwork("10.0.0.0/24")]},
+                }))
+
+    def test__reports_cidrs_without_connected_racks_as_unscanned(self):
+        self.getClientFor.side_effect = NoConnectionsAvailable()
+        results = scan_all_rack_networks(cidrs=[IPNetwork("10.9.0.0/24")])
+        self.assertThat(results.unscanned, Equals([IPNetwork("10.9.0.0/24")]))
+
+    def test__reports_cidrs_of_racks_not_started_as_unscanned(self):
+        subnet = factory.make_Subnet(cidr="10.0.0.0/24")
+        r1, r2 = self.started
+        for rack in (r1, r2):
+            factory.make_StaticIPAddress(
+                subnet=subnet, interface=rack.interface_set.first())
+        self.call_racks_sync_mock.return_value = make_RPCResults(
+            available=[r1, r2], unavailable=[], success=[r1], failures=[],
+            failed=[r2], timeout=[])
+        results = scan_all_rack_networks(cidrs=[IPNetwork("10.0.0.0/24")])
+        self.assertThat(
+            results.unscanned, Equals([IPNetwork("10.0.0.128/25")]))
 
     def test__calls_racks_synchronously_with_force_ping(self):
         scan_all_rack_networks(ping=True)
         self.assertThat(
             self.call_racks_sync_mock, MockCalledOnceWith(
                 cluster.ScanNetworks, controllers=None,
-                kwargs={'force_ping': True}))
+                kwargs={'force_ping': True}, controller_kwargs=None))
 
     def test__calls_racks_synchronously_with_threads(self):
         threads = random.randint(1, 99)
@@ -539,11 +643,11 @@ class TestScanAllRackNetworksInterpretsRPCResults(MAASServerTestCase):
         self.assertThat(
             self.call_racks_sync_mock, MockCalledOnceWith(
                 cluster.ScanNetworks, controllers=None,
-                kwargs={'threads': threads}))
+                kwargs={'threads': threads}, controller_kwargs=None))
 
     def test__calls_racks_synchronously_with_slow(self):
         scan_all_rack_networks(slow=True)
         self.assertThat(
             self.call_racks_sync_mock, MockCalledOnceWith(
                 cluster.ScanNetworks, controllers=None,
-                kwargs={'slow': True}))
+                kwargs={'slow': True}, controller_kwargs=None))
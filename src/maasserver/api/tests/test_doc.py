@@ -28,6 +28,7 @@ from maasserver.api.doc import (
     generate_api_docs,
     generate_pod_types_doc,
     generate_power_types_doc,
+    get_api_description,
     get_api_description_hash,
     hash_canonical,
 )
@@ -597,6 +598,47 @@ class TestHashCanonical(MAASTestCase):
                 "3bd746ab7fe760d0926546318cbf2b6f0a7a56f8"))
 
 
+class TestGetAPIDescription(MAASTestCase):
+    """Tests for `get_api_description`."""
+
+    def setUp(self):
+        super(TestGetAPIDescription, self).setUp()
+        self.addCleanup(self.clear_description_cache)
+        self.clear_description_cache()
+
+    def clear_description_cache(self):
+        with doc_module.api_descriptions_lock:
+            doc_module.api_descriptions.clear()
+
+    def test__caches_description(self):
+        api_description = {"doc": factory.make_string()}
+        # The description can only be fetched once before crashing.
+        self.patch(doc_module, "describe_api").side_effect = [
+            api_description, factory.make_exception_type(),
+        ]
+        self.assertThat(get_api_description(), Equals(api_description))
+        self.assertThat(get_api_description(), Equals(api_description))
+
+    def test__returns_a_copy(self):
+        api_description = {"resources": [{"name": factory.make_string()}]}
+        self.patch(doc_module, "describe_api").return_value = api_description
+        description = get_api_description()
+        description["resources"][0]["name"] = factory.make_string()
+        self.assertThat(get_api_description(), Equals(api_description))
+
+    def test__caches_description_by_script_prefix(self):
+        api_descriptions = [
+            {"doc": factory.make_string()},
+            {"doc": factory.make_string()},
+        ]
+        self.patch(doc_module, "describe_api").side_effect = api_descriptions
+        get_script_prefix = self.patch(doc_module, "get_script_prefix")
+        get_script_prefix.return_value = "/"
+        self.assertThat(get_api_description(), Equals(api_descriptions[0]))
+        get_script_prefix.return_value = "/MAAS/"
+        self.assertThat(get_api_description(), Equals(api_descriptions[1]))
+
+
 class TestGetAPIDescriptionHash(MAASTestCase):
     """Tests for `get_api_description_hash`."""
 
@@ -620,6 +662,15 @@ class TestGetAPIDescriptionHash(MAASTestCase):
             get_api_description_hash(),
             Equals(api_description_hasher.hexdigest()))
 
+    def test__calculates_hash_in_process_pool(self):
+        api_description = factory.make_string()
+        self.patch(doc_module, "describe_api").return_value = api_description
+        callInProcessPool = self.patch(doc_module, "callInProcessPool")
+        callInProcessPool.return_value = sentinel.hash
+        self.assertThat(get_api_description_hash(), Is(sentinel.hash))
+        self.assertThat(callInProcessPool, MockCalledOnceWith(
+            doc_module.hash_canonical_hexdigest, api_description))
+
     def test__caches_hash(self):
         # Fake the API description.
         api_description = factory.make_string()
@@ -1866,6 +1866,48 @@ class TestMachinesAPI(APITestCase.ForUser):
              for machine in acceptable_machines], accepted_ids)
         self.assertNotIn(accepted_machine.system_id, accepted_ids)
 
+    def test_POST_bulk_action_performs_action(self):
+        machines = [
+            factory.make_Node(status=NODE_STATUS.READY, owner=self.user)
+            for _ in range(3)
+        ]
+        response = self.client.post(reverse('machines_handler'), {
+            'op': 'bulk_action',
+            'action': 'mark-broken',
+            'machines': [machine.system_id for machine in machines],
+        })
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(
+            {machine.system_id: {"result": "done"} for machine in machines},
+            json.loads(response.content.decode(settings.DEFAULT_CHARSET)))
+        self.assertEqual(
+            [NODE_STATUS.BROKEN] * 3,
+            [reload_object(machine).status for machine in machines])
+
+    def test_POST_bulk_action_passes_action_params(self):
+        machine = factory.make_Node(
+            status=NODE_STATUS.ALLOCATED, owner=self.user)
+        release = self.patch(Machine, 'release_or_erase')
+        response = self.client.post(reverse('machines_handler'), {
+            'op': 'bulk_action',
+            'action': 'release',
+            'machines': [machine.system_id],
+            'erase': 'true',
+            'quick_erase': 'false',
+        })
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertThat(release, MockCalledOnceWith(
+            self.user, erase=True, secure_erase=False, quick_erase=False))
+
+    def test_POST_bulk_action_rejects_unknown_action(self):
+        machine = factory.make_Node(owner=self.user)
+        response = self.client.post(reverse('machines_handler'), {
+            'op': 'bulk_action',
+            'action': factory.make_name('action'),
+            'machines': [machine.system_id],
+        })
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+
     def test_POST_quietly_releases_empty_set(self):
         response = self.client.post(
             reverse('machines_handler'), {'op': 'release'})
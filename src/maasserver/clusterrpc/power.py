@@ -4,16 +4,27 @@
 """RPC helpers relating to nodes."""
 
 __all__ = [
+    "batch_power_control",
+    "get_power_control_batch",
     "power_off_node",
     "power_on_node",
+    "PowerControlBatch",
 ]
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import partial
 import logging
+import threading
 
 from maasserver.enum import POWER_STATE
 from maasserver.exceptions import PowerProblem
-from maasserver.rpc import getAllClients
+from maasserver.rpc import (
+    getAllClients,
+    getClientFromIdentifiers,
+)
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
 from provisioningserver.logger import get_maas_logger
 from provisioningserver.rpc.cluster import (
     PowerCycle,
@@ -22,15 +33,25 @@ from provisioningserver.rpc.cluster import (
     PowerOn,
     PowerQuery,
 )
-from provisioningserver.rpc.exceptions import PowerActionAlreadyInProgress
+from provisioningserver.rpc.exceptions import (
+    NoConnectionsAvailable,
+    PowerActionAlreadyInProgress,
+)
 from provisioningserver.utils.twisted import (
     asynchronous,
     callOut,
     FOREVER,
 )
 from twisted.internet import reactor
-from twisted.internet.defer import DeferredList
+from twisted.internet.defer import (
+    Deferred,
+    DeferredList,
+    DeferredSemaphore,
+    inlineCallbacks,
+    succeed,
+)
 from twisted.protocols.amp import UnhandledCommand
+from twisted.python.failure import Failure
 
 
 logger = logging.getLogger(__name__)
@@ -274,3 +295,171 @@ def power_query_all(system_id, hostname, power_info, timeout=30):
     # Cancel the canceller once finished.
     dList.addBoth(callOut, done)
     return dList
+
+
+class PowerControlBatch:
+    """Power control for many nodes, grouped by rack controller.
+
+    Nodes power controlled while a batch is in effect (see
+    `batch_power_control`) are added to the batch instead of each finding
+    their rack controller and checking its power driver after commit. The
+    first node's post-commit hook runs the whole batch: the connection
+    information for every node is read in one transaction, the power
+    driver is checked once per rack controller and power type, and the
+    power RPCs are made to each rack controller, at most `concurrency` at
+    a time.
+    """
+
+    def __init__(self, concurrency=20):
+        super(PowerControlBatch, self).__init__()
+        self.concurrency = concurrency
+        self.operations = []
+        self.running = None
+
+    def add(self, node, defer, power_method, power_info):
+        """Power control `node` with `power_method` once `defer` fires.
+
+        :return: `defer`, which fires with the outcome of power control.
+        """
+        operation = node, power_method, power_info, Deferred()
+        self.operations.append(operation)
+        return defer.addCallbacks(
+            self._get_result, self._discard,
+            callbackArgs=(operation,), errbackArgs=(operation,))
+
+    def _get_result(self, _, operation):
+        if self.running is None:
+            self.running = self._run(list(self.operations))
+        return operation[-1]
+
+    def _discard(self, failure, operation):
+        # The node's hook was cancelled, e.g. because its savepoint was
+        # rolled back, so it must not be power controlled.
+        if self.running is None:
+            self.operations.remove(operation)
+        return failure
+
+    @transactional
+    def _get_connection_info(self, operations):
+        """Return the rack controllers that can reach each node's BMC.
+
+        :return: A list with, for each operation, `None` if the node's BMC
+            is not known to be accessible, the client and fallback
+            identifiers as returned by `_get_bmc_client_connection_info`, or
+            a `Failure`.
+        """
+        infos = []
+        for node, _, _, _ in operations:
+            try:
+                if node.bmc is None:
+                    raise PowerProblem(
+                        "No BMC is defined.  Cannot power control node.")
+                elif node.bmc.is_accessible():
+                    infos.append(node._get_bmc_client_connection_info())
+                else:
+                    infos.append(None)
+            except Exception:
+                infos.append(Failure())
+        return infos
+
+    @inlineCallbacks
+    def _get_client(self, client_idents, fallback_idents):
+        if len(client_idents) == 0:
+            client = yield getClientFromIdentifiers(fallback_idents)
+        else:
+            try:
+                client = yield getClientFromIdentifiers(client_idents)
+            except NoConnectionsAvailable:
+                client = yield getClientFromIdentifiers(fallback_idents)
+        return client
+
+    @inlineCallbacks
+    def _run(self, operations):
+        try:
+            infos = yield deferToDatabase(
+                self._get_connection_info, operations)
+            clients = {}
+            racks = OrderedDict()
+            for operation, info in zip(operations, infos):
+                node, power_method, power_info, result = operation
+                if info is None:
+                    # Let the node find which rack controllers can reach
+                    # its BMC, as it would outside of a batch.
+                    node._power_control_node(
+                        succeed(None), power_method,
+                        power_info).chainDeferred(result)
+                    continue
+                elif isinstance(info, Failure):
+                    result.errback(info)
+                    continue
+                key = tuple(info[0]), tuple(info[1])
+                if key not in clients:
+                    try:
+                        clients[key] = yield self._get_client(*key)
+                    except Exception:
+                        clients[key] = Failure()
+                client = clients[key]
+                if isinstance(client, Failure):
+                    result.errback(client)
+                else:
+                    racks.setdefault(client.ident, (client, []))
+                    racks[client.ident][1].append(operation)
+            yield DeferredList([
+                self._power_control_rack(client, rack_operations)
+                for client, rack_operations in racks.values()],
+                consumeErrors=True)
+        except Exception:
+            failure = Failure()
+            for _, _, _, result in operations:
+                if not result.called:
+                    result.errback(failure)
+
+    @inlineCallbacks
+    def _power_control_rack(self, client, operations):
+        """Power control the nodes in `operations` via `client`."""
+        checked = {}
+        for node, _, power_info, _ in operations:
+            power_type = power_info.power_type
+            if power_type not in checked:
+                try:
+                    yield node.confirm_power_driver_operable(
+                        client, power_type, client.ident)
+                except Exception:
+                    checked[power_type] = Failure()
+                else:
+                    checked[power_type] = None
+        semaphore = DeferredSemaphore(self.concurrency)
+        for node, power_method, power_info, result in operations:
+            failure = checked[power_info.power_type]
+            if failure is None:
+                semaphore.run(
+                    power_method, client, node.system_id, node.hostname,
+                    power_info).chainDeferred(result)
+            else:
+                result.errback(failure)
+
+
+_power_control_batches = threading.local()
+
+
+def get_power_control_batch():
+    """Return the `PowerControlBatch` in effect in this thread, or `None`."""
+    return getattr(_power_control_batches, "current", None)
+
+
+@contextmanager
+def batch_power_control(batch=None):
+    """Context manager that batches power control within it.
+
+    Nodes power controlled within the context, by `Node.start` or
+    `Node.stop` for example, are power controlled together after commit;
+    see `PowerControlBatch`.
+    """
+    if batch is None:
+        batch = PowerControlBatch()
+    previous = get_power_control_batch()
+    _power_control_batches.current = batch
+    try:
+        yield batch
+    finally:
+        _power_control_batches.current = previous
@@ -6,11 +6,17 @@
 __all__ = []
 
 import random
-from unittest.mock import Mock
+from unittest.mock import (
+    ANY,
+    call,
+    Mock,
+)
 
 from crochet import wait_for
 from maasserver.clusterrpc import power as power_module
 from maasserver.clusterrpc.power import (
+    batch_power_control,
+    get_power_control_batch,
     pick_best_power_state,
     power_cycle,
     power_driver_check,
@@ -18,6 +24,7 @@ from maasserver.clusterrpc.power import (
     power_on_node,
     power_query,
     power_query_all,
+    PowerControlBatch,
 )
 from maasserver.enum import POWER_STATE
 from maasserver.exceptions import PowerProblem
@@ -28,7 +35,12 @@ from maasserver.testing.testcase import (
 )
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
+from maastesting.twisted import extract_result
 from provisioningserver.rpc.cluster import (
     PowerCycle,
     PowerDriverCheck,
@@ -36,10 +48,15 @@ from provisioningserver.rpc.cluster import (
     PowerOn,
     PowerQuery,
 )
-from provisioningserver.rpc.exceptions import PowerActionAlreadyInProgress
+from provisioningserver.rpc.exceptions import (
+    PowerActionAlreadyInProgress,
+    PowerActionFail,
+)
 from testtools import ExpectedException
 from twisted.internet import reactor
 from twisted.internet.defer import (
+    CancelledError,
+    Deferred,
     fail,
     inlineCallbacks,
     succeed,
@@ -239,3 +256,98 @@ class TestPowerQueryAll(MAASTransactionServerTestCase):
         self.assertEqual(POWER_STATE.UNKNOWN, power_state)
         self.assertItemsEqual([], success_racks)
         self.assertItemsEqual([rack_id], failed_racks)
+
+
+class TestPowerControlBatch(MAASServerTestCase):
+    """Tests for `PowerControlBatch` and `batch_power_control`."""
+
+    def setUp(self):
+        super(TestPowerControlBatch, self).setUp()
+        self.patch(
+            power_module, "deferToDatabase",
+            lambda func, *args: succeed(func(*args)))
+        self.client = Mock(ident=factory.make_name("rack"))
+        self.getClientFromIdentifiers = self.patch(
+            power_module, "getClientFromIdentifiers")
+        self.getClientFromIdentifiers.side_effect = (
+            lambda idents: succeed(self.client))
+
+    def make_node(self, accessible=True):
+        node = Mock(
+            system_id=factory.make_name("system_id"),
+            hostname=factory.make_name("hostname"))
+        node.bmc.is_accessible.return_value = accessible
+        node._get_bmc_client_connection_info.return_value = (
+            [self.client.ident], [])
+        node.confirm_power_driver_operable.side_effect = (
+            lambda *args: succeed(None))
+        return node
+
+    def test_batch_power_control_installs_batch(self):
+        self.assertIsNone(get_power_control_batch())
+        with batch_power_control() as batch:
+            self.assertIsInstance(batch, PowerControlBatch)
+            self.assertIs(batch, get_power_control_batch())
+        self.assertIsNone(get_power_control_batch())
+
+    def test_powers_nodes_together_via_their_rack_controller(self):
+        batch = PowerControlBatch()
+        nodes = [self.make_node() for _ in range(3)]
+        power_info = Mock(power_type="ipmi")
+        power_method = Mock(side_effect=lambda *args: succeed("done"))
+        hooks = [
+            batch.add(node, Deferred(), power_method, power_info)
+            for node in nodes
+        ]
+        results = []
+        for hook in hooks:
+            hook.addCallback(results.append)
+            hook.callback(None)
+        self.assertEqual(["done"] * 3, results)
+        self.assertThat(
+            self.getClientFromIdentifiers,
+            MockCalledOnceWith((self.client.ident,)))
+        self.assertThat(
+            nodes[0].confirm_power_driver_operable,
+            MockCalledOnceWith(self.client, "ipmi", self.client.ident))
+        self.assertThat(power_method, MockCallsMatch(*(
+            call(self.client, node.system_id, node.hostname, power_info)
+            for node in nodes)))
+
+    def test_fails_nodes_when_power_driver_is_missing(self):
+        batch = PowerControlBatch()
+        node = self.make_node()
+        node.confirm_power_driver_operable.side_effect = (
+            lambda *args: fail(PowerActionFail("Missing")))
+        power_method = Mock()
+        hook = batch.add(node, Deferred(), power_method, Mock())
+        hook.callback(None)
+        self.assertRaises(PowerActionFail, extract_result, hook)
+        self.assertThat(power_method, MockNotCalled())
+
+    def test_defers_to_node_when_bmc_is_not_accessible(self):
+        batch = PowerControlBatch()
+        node = self.make_node(accessible=False)
+        node._power_control_node.return_value = succeed("done")
+        power_method, power_info = Mock(), Mock()
+        hook = batch.add(node, Deferred(), power_method, power_info)
+        hook.callback(None)
+        self.assertEqual("done", extract_result(hook))
+        self.assertThat(
+            node._power_control_node,
+            MockCalledOnceWith(ANY, power_method, power_info))
+
+    def test_discards_cancelled_nodes(self):
+        batch = PowerControlBatch()
+        cancelled, node = self.make_node(), self.make_node()
+        power_method = Mock(side_effect=lambda *args: succeed("done"))
+        cancelled_hook = batch.add(
+            cancelled, Deferred(), power_method, Mock())
+        cancelled_hook.addErrback(lambda failure: failure.trap(
+            CancelledError))
+        cancelled_hook.cancel()
+        hook = batch.add(node, Deferred(), power_method, Mock())
+        hook.callback(None)
+        self.assertEqual("done", extract_result(hook))
+        self.assertThat(power_method, MockCalledOnceWith(
+            self.client, node.system_id, node.hostname, ANY))
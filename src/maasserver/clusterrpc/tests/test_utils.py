@@ -7,6 +7,7 @@ __all__ = []
 
 import random
 from unittest.mock import (
+    call,
     Mock,
     sentinel,
 )
@@ -25,6 +26,7 @@ from maasserver.utils import async
 from maastesting.matchers import (
     DocTestMatches,
     MockCalledOnceWith,
+    MockCallsMatch,
     MockNotCalled,
 )
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
@@ -88,6 +90,23 @@ class TestCallClusters(MAASServerTestCase):
         self.assertThat(failed_callback, MockNotCalled())
         self.assertThat(timeout_callback, MockNotCalled())
 
+    def test__passes_controller_kwargs(self):
+        rack1 = factory.make_RackController()
+        rack2 = factory.make_RackController()
+        getClientFor = self.patch(utils, "getClientFor")
+        getClientFor.return_value = lambda: None
+        client = getClientFor.return_value
+        partial = self.patch(utils, "partial")
+        async_gather = self.patch(async, "gatherCallResults")
+        async_gather.return_value = iter([])
+        list(utils.call_clusters(
+            sentinel.command, kwargs={"a": 1, "b": 2},
+            controllers=[rack1, rack2],
+            controller_kwargs={rack2.system_id: {"b": 3}}))
+        self.assertThat(partial, MockCallsMatch(
+            call(client, sentinel.command, a=1, b=2),
+            call(client, sentinel.command, a=1, b=3)))
+
     def test__with_unavailable_callbacks(self):
         logger = self.useFixture(FakeLogger("maasserver"))
         rack = factory.make_RackController()
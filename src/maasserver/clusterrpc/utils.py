@@ -35,7 +35,8 @@ RPCResults = namedtuple(
 
 
 def call_racks_synchronously(
-        command, *, kwargs=None, timeout=10, controllers=None):
+        command, *, kwargs=None, timeout=10, controllers=None,
+        controller_kwargs=None):
     """Calls the specified RPC command on each rack controller synchronously.
 
     Collects the results into a list, then returns a `RPCResults` namedtuple
@@ -47,7 +48,8 @@ def call_racks_synchronously(
     should only be used when calling RPC methods which return immediately.)
 
     If a dictionary of `kwargs` is specified, those arguments will be passed
-    to the specified command.
+    to the specified command. Arguments for particular controllers can be
+    specified with `controller_kwargs`; see `call_clusters()`.
     """
     available_racks = []
     unavailable_racks = []
@@ -57,6 +59,7 @@ def call_racks_synchronously(
     failures = []
     results = list(call_clusters(
         command, kwargs=kwargs, timeout=timeout, controllers=controllers,
+        controller_kwargs=controller_kwargs,
         available_callback=available_racks.append,
         unavailable_callback=unavailable_racks.append,
         success_callback=successful_racks.append,
@@ -75,7 +78,7 @@ def _none(_):
 
 def call_clusters(
         command, *, kwargs=None, timeout=10, controllers=None,
-        ignore_errors=True, available_callback=_none,
+        controller_kwargs=None, ignore_errors=True, available_callback=_none,
         unavailable_callback=_none, success_callback=_none,
         failed_callback=_none, failure_callback=_none, timeout_callback=_none):
     """Make an RPC call to all rack controllers in parallel.
@@ -109,6 +112,9 @@ def call_clusters(
     :param timeout_callback: Optional callback; called if the RPC call
         fails with a timeout.
     :param kwargs: Optional keyword arguments to pass to the command
+    :param controller_kwargs: Optional dict of {<system_id>: <dict>}, of
+        keyword arguments to pass to the command on particular controllers.
+        These are merged with, and take precedence over, `kwargs`.
     :return: A generator of results, i.e. the dicts returned by the RPC
         call.
     :raises: :py:class:`ClusterUnavailable` when a cluster is not
@@ -120,6 +126,8 @@ def call_clusters(
     # However, we don't want to crash if that isn't the case.
     if kwargs is None:
         kwargs = {}
+    if controller_kwargs is None:
+        controller_kwargs = {}
     command_name = (
         command.commandName.decode("ascii") if hasattr(command, 'commandName')
         else "<unknown>")
@@ -147,7 +155,8 @@ def call_clusters(
                 "call_clusters() must not be called in the reactor thread. "
                 "You probably want to use deferToDatabase().")
             available_callback(controller)
-            call = partial(client, command, **kwargs)
+            call = partial(client, command, **dict(
+                kwargs, **controller_kwargs.get(controller.system_id, {})))
             calls[call] = controller
 
     for call, response in async.gatherCallResults(calls, timeout=timeout):
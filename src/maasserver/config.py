@@ -74,3 +74,8 @@ class RegionConfiguration(Configuration, metaclass=RegionConfigurationMeta):
         "actions performed. Requires debug to also be True. mode for detailed "
         "error and log reporting.",
         StringBool(if_missing=False))
+    debug_transaction_retries = ConfigurationOption(
+        "debug_transaction_retries",
+        "Log each retried transaction with the table and statement that "
+        "conflicted.",
+        StringBool(if_missing=False))
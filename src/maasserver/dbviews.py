@@ -10,6 +10,7 @@ and are recreated during the `dbupgrade` process.
 
 __all__ = [
     "drop_all_views",
+    "refresh_materialized_views",
     "register_all_views",
     "register_view",
     ]
@@ -37,9 +38,11 @@ def _register_view(view_name, view_sql):
         cursor.execute(view_sql)
 
 
-# Note that the `Discovery` model object is backed by this view. Any
-# changes made to this view should be reflected there.
-maasserver_discovery = dedent("""\
+# Note that the `Discovery` model object is backed by the
+# `maasserver_discovery` table, which materializes this view. Any changes made
+# to this view should be reflected there, and in the table's migration: the
+# columns of the view and the table must be in the same order.
+maasserver_discovery_view = dedent("""\
     SELECT
         DISTINCT ON (neigh.mac_address, neigh.ip)
         neigh.id AS id, -- Django needs a primary key for the object.
@@ -154,6 +157,48 @@ maasserver_routable_pairs = dedent("""\
        AND family(sip_left.ip) = family(sip_right.ip)
     """)
 
+# The rack controllers that can reach each BMC directly, i.e. those with an
+# IP address on the subnet that best matches the BMC's IP address. There is a
+# row with a NULL rack controller for BMCs in a subnet no rack controller is
+# on. Note that this view is materialized by the
+# `maasserver_bmc_rack_controllers` table; any changes made to this view
+# should be reflected in the table's migration: the columns of the view and
+# the table must be in the same order.
+maasserver_bmc_rack_controllers_view = dedent("""\
+    SELECT
+        bmc.id AS bmc_id,
+        -- The subnet that the BMC's IP address is in, and the subnet that
+        -- it is recorded against, which can differ when subnets change.
+        best_subnet.id AS subnet_id,
+        bmc_ip.subnet_id AS ip_subnet_id,
+        rack.node_id AS rack_controller_id
+    FROM maasserver_bmc AS bmc
+    JOIN maasserver_staticipaddress AS bmc_ip
+        ON bmc_ip.id = bmc.ip_address_id
+    JOIN LATERAL (
+        -- This picks the subnet as `Subnet.get_best_subnet_for_ip` does.
+        SELECT subnet.id
+        FROM maasserver_subnet AS subnet
+        JOIN maasserver_vlan AS vlan ON vlan.id = subnet.vlan_id
+        WHERE bmc_ip.ip << subnet.cidr
+        ORDER BY vlan.dhcp_on DESC, MASKLEN(subnet.cidr) DESC
+        LIMIT 1
+    ) AS best_subnet ON TRUE
+    LEFT OUTER JOIN (
+        SELECT DISTINCT iface.node_id, rack_ip.subnet_id
+        FROM maasserver_interface AS iface
+        JOIN maasserver_node AS node
+            ON node.id = iface.node_id
+        JOIN maasserver_interface_ip_addresses AS ifia
+            ON ifia.interface_id = iface.id
+        JOIN maasserver_staticipaddress AS rack_ip
+            ON rack_ip.id = ifia.staticipaddress_id
+        WHERE node.node_type IN (2, 4) -- Rack controllers.
+        AND rack_ip.ip IS NOT NULL
+    ) AS rack ON rack.subnet_id = best_subnet.id
+    WHERE bmc_ip.ip IS NOT NULL
+    """)
+
 # Views that are helpful for supporting MAAS.
 # These can be batch-run using the maas-region-support-dump script.
 maas_support__node_overview = dedent("""\
@@ -317,8 +362,10 @@ maas_support__ssh_keys__by_user = dedent("""\
 
 # Dictionary of view_name: view_sql tuples which describe the database views.
 _ALL_VIEWS = {
-    "maasserver_discovery": maasserver_discovery,
+    "maasserver_discovery_view": maasserver_discovery_view,
     "maasserver_routable_pairs": maasserver_routable_pairs,
+    "maasserver_bmc_rack_controllers_view":
+        maasserver_bmc_rack_controllers_view,
     "maas_support__node_overview": maas_support__node_overview,
     "maas_support__device_overview": maas_support__device_overview,
     "maas_support__node_networking": maas_support__node_networking,
@@ -334,11 +381,31 @@ _ALL_VIEWS = {
 }
 
 
+# Dictionary of table_name: view_name for tables which materialize views.
+# These are kept up to date by triggers (see `maasserver.triggers.discovery`
+# and `maasserver.triggers.bmc`) but the triggers are dropped while the
+# database is upgraded, so the tables are refreshed in full whenever the views
+# are registered.
+_MATERIALIZED_VIEWS = {
+    "maasserver_discovery": "maasserver_discovery_view",
+    "maasserver_bmc_rack_controllers": "maasserver_bmc_rack_controllers_view",
+}
+
+
+def _refresh_materialized_view(table_name, view_name):
+    """Replace the contents of the specified table with its view's."""
+    with closing(connection.cursor()) as cursor:
+        cursor.execute("DELETE FROM %s;" % table_name)
+        cursor.execute(
+            "INSERT INTO %s SELECT * FROM %s;" % (table_name, view_name))
+
+
 @transactional
 def register_all_views():
     """Register all views into the database."""
     for view_name, view_sql in _ALL_VIEWS.items():
         _register_view(view_name, view_sql)
+    refresh_materialized_views()
 
 
 @transactional
@@ -357,3 +424,10 @@ def drop_all_views():
 def register_view(view_name):
     """Register a view by name. CAUTION: this is only for use in tests."""
     _register_view(view_name, _ALL_VIEWS[view_name])
+
+
+@transactional
+def refresh_materialized_views():
+    """Refresh all tables which materialize views, in full."""
+    for table_name, view_name in _MATERIALIZED_VIEWS.items():
+        _refresh_materialized_view(table_name, view_name)
@@ -69,6 +69,7 @@ from provisioningserver.rpc.cluster import (
 from provisioningserver.rpc.dhcp import downgrade_shared_networks
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
 from provisioningserver.utils import typed
+from provisioningserver.utils.metrics import METRICS
 from provisioningserver.utils.text import split_string_list
 from provisioningserver.utils.twisted import (
     asynchronous,
@@ -80,6 +81,10 @@ from twisted.protocols import amp
 
 log = LegacyLogger()
 
+DHCP_CONFIGURATION_SECONDS = METRICS.histogram(
+    "maas_dhcp_configuration_seconds",
+    "Time taken to generate the DHCP configuration for a rack controller.")
+
 
 def get_omapi_key():
     """Return the OMAPI key for all DHCP servers that are ran by MAAS."""
@@ -519,6 +524,7 @@ def get_dhcp_configure_for(
         hosts, None if interface is None else interface.name)
 
 
+@DHCP_CONFIGURATION_SECONDS.time()
 @synchronous
 @transactional
 def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
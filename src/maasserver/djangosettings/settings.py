@@ -47,6 +47,7 @@ ENABLE_HA = True if int(os.environ.get('ENABLE_HA', 0)) == 1 else False
 # when enabled.
 DEBUG = False
 DEBUG_QUERIES = False
+DEBUG_TRANSACTION_RETRIES = False
 
 ADMINS = (
     # ('Your Name', 'your_email@example.com'),
@@ -126,6 +127,7 @@ try:
         }
         DEBUG = config.debug
         DEBUG_QUERIES = config.debug_queries
+        DEBUG_TRANSACTION_RETRIES = config.debug_transaction_retries
         if DEBUG_QUERIES and not DEBUG:
             # For debug queries to work debug most also be on, so Django will
             # track the queries made.
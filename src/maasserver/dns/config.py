@@ -15,6 +15,8 @@ from maasserver.models.config import Config
 from maasserver.models.dnspublication import DNSPublication
 from maasserver.models.domain import Domain
 from maasserver.models.subnet import Subnet
+from maasserver.processpool import callInProcessPoolWithDatabase
+from maasserver.utils.orm import transactional
 from provisioningserver.dns.actions import (
     bind_reload,
     bind_reload_with_retries,
@@ -23,10 +25,15 @@ from provisioningserver.dns.actions import (
     bind_write_zones,
 )
 from provisioningserver.logger import get_maas_logger
+from provisioningserver.utils.metrics import METRICS
 
 
 maaslog = get_maas_logger("dns")
 
+DNS_UPDATE_SECONDS = METRICS.histogram(
+    "maas_dns_update_seconds",
+    "Time taken to regenerate and reload all DNS zones.")
+
 
 def current_zone_serial():
     return '%0.10d' % DNSPublication.objects.get_most_recent().serial
@@ -42,6 +49,37 @@ def dns_force_reload():
     DNSPublication(source="Force reload").save()
 
 
+@transactional
+def generate_zones():
+    """Generate the zones for the domains and subnets that MAAS serves.
+
+    The zones and their serial are read in the same transaction, so the
+    serial matches the data in the zones.
+
+    :return: ``(serial, zones, domain_names)``, where `zones` is a list of
+        zone configs; see `ZoneGenerator`.
+    """
+    domains = Domain.objects.filter(authoritative=True)
+    subnets = Subnet.objects.exclude(rdns_mode=RDNS_MODE.DISABLED)
+    default_ttl = Config.objects.get_config('default_dns_ttl')
+    serial = current_zone_serial()
+    zones = ZoneGenerator(domains, subnets, default_ttl, serial).as_list()
+    return serial, zones, [domain.name for domain in domains]
+
+
+def write_zones():
+    """Generate and write the zone files.
+
+    This is called in the process pool, in a transaction of its own.
+
+    :return: ``(serial, zones, domain_names)``; see `generate_zones`.
+    """
+    serial, zones, domain_names = generate_zones()
+    bind_write_zones(zones)
+    return serial, zones, domain_names
+
+
+@DNS_UPDATE_SECONDS.time()
 def dns_update_all_zones(reload_retry=False):
     """Update all zone files for all domains.
 
@@ -55,14 +93,9 @@ def dns_update_all_zones(reload_retry=False):
     if not is_dns_enabled():
         return
 
-    domains = Domain.objects.filter(authoritative=True)
-    subnets = Subnet.objects.exclude(rdns_mode=RDNS_MODE.DISABLED)
-    default_ttl = Config.objects.get_config('default_dns_ttl')
-    serial = current_zone_serial()
-    zones = ZoneGenerator(
-        domains, subnets, default_ttl,
-        serial).as_list()
-    bind_write_zones(zones)
+    # Generating and rendering the zones is CPU-bound, so do it outside of
+    # this process, leaving it free to serve requests.
+    serial, zones, domain_names = callInProcessPoolWithDatabase(write_zones)
 
     # We should not be calling bind_write_options() here; call-sites should be
     # making a separate call. It's a historical legacy, where many sites now
@@ -89,10 +122,7 @@ def dns_update_all_zones(reload_retry=False):
         bind_reload()
 
     # Return the current serial and list of domain names.
-    return serial, [
-        domain.name
-        for domain in domains
-    ]
+    return serial, domain_names
 
 
 def get_upstream_dns():
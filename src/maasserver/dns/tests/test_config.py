@@ -17,8 +17,10 @@ from maasserver.dns.config import (
     current_zone_serial,
     dns_force_reload,
     dns_update_all_zones,
+    generate_zones,
     get_trusted_networks,
     get_upstream_dns,
+    write_zones,
 )
 from maasserver.enum import (
     IPADDRESS_TYPE,
@@ -280,6 +282,25 @@ class TestDNSConfigModifications(TestDNSServer):
             compose_config_path(DNSConfig.target_file_name),
             FileContains(matcher=Contains(trusted_network)))
 
+    def test_dns_update_all_zones_writes_zones_in_process_pool(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        callInProcessPoolWithDatabase = self.patch(
+            dns_config_module, "callInProcessPoolWithDatabase")
+        callInProcessPoolWithDatabase.return_value = "1", [], ["maas"]
+        self.assertThat(dns_update_all_zones(), Equals(("1", ["maas"])))
+        self.assertThat(
+            callInProcessPoolWithDatabase, MockCalledOnceWith(write_zones))
+
+    def test_generate_zones_reads_serial_with_zones(self):
+        domain = factory.make_Domain()
+        self.patch(
+            dns_config_module, "current_zone_serial").return_value = "1"
+        serial, zones, domain_names = generate_zones()
+        self.assertThat(serial, Equals("1"))
+        self.assertIn(domain.name, domain_names)
+        self.assertThat(
+            {zone.serial for zone in zones}, Equals({"1"}))
+
     def test_dns_config_has_NS_record(self):
         self.patch(settings, 'DNS_CONNECT', True)
         ip = factory.make_ipv4_address()
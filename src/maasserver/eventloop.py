@@ -97,6 +97,16 @@ def make_NonceCleanupService():
     return nonces_cleanup.NonceCleanupService()
 
 
+def make_WebSocketChangesCleanupService():
+    from maasserver.websockets import changes
+    return changes.WebSocketChangesCleanupService()
+
+
+def make_BlobCleanupService():
+    from metadataserver import blobs_cleanup
+    return blobs_cleanup.BlobCleanupService()
+
+
 def make_DNSPublicationGarbageService():
     from maasserver.dns import publication
     return publication.DNSPublicationGarbageService()
@@ -193,7 +203,7 @@ def make_WebApplicationService(postgresListener, statusWorker):
 
 def make_WorkersService():
     from maasserver.workers import WorkersService
-    return WorkersService(reactor)
+    return WorkersService(reactor, prefork=True)
 
 
 def make_IPCMasterService(workers=None):
@@ -206,6 +216,11 @@ def make_IPCWorkerService():
     return IPCWorkerService(reactor)
 
 
+def make_ProcessPoolService():
+    from maasserver.processpool import ProcessPoolService
+    return ProcessPoolService()
+
+
 class MAASServices(MultiService):
 
     def __init__(self, eventloop):
@@ -267,6 +282,16 @@ class RegionEventLoop:
             "factory": make_NonceCleanupService,
             "requires": [],
         },
+        "websocket-changes-cleanup": {
+            "only_on_master": True,
+            "factory": make_WebSocketChangesCleanupService,
+            "requires": [],
+        },
+        "script-result-blob-cleanup": {
+            "only_on_master": True,
+            "factory": make_BlobCleanupService,
+            "requires": [],
+        },
         "dns-publication-cleanup": {
             "only_on_master": True,
             "factory": make_DNSPublicationGarbageService,
@@ -359,6 +384,16 @@ class RegionEventLoop:
             "factory": make_IPCWorkerService,
             "requires": [],
         },
+        "process-pool-master": {
+            "only_on_master": True,
+            "factory": make_ProcessPoolService,
+            "requires": [],
+        },
+        "process-pool-worker": {
+            "only_on_master": False,
+            "factory": make_ProcessPoolService,
+            "requires": [],
+        },
     }
 
     def __init__(self):
@@ -0,0 +1,188 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Fork server for region workers.
+
+Starting a region worker from scratch means importing Django, every model,
+every API and websocket handler, and much more besides, which takes a long
+time. Instead, the master starts a single fork server, which does all that
+importing once and then forks a worker whenever the master asks for one.
+Workers share the fork server's memory until they write to it.
+
+The fork server reads commands from stdin, one per line:
+
+  ``spawn``: fork a new worker.
+
+and reports to the master on `STATUS_FD`, one event per line:
+
+  ``started <pid>``: a worker has been forked.
+
+  ``exited <pid> <status>``: a worker has exited, with the given wait status.
+
+The fork server exits when its stdin is closed. Its workers die with it; see
+`RegionWorkerServiceMaker._set_pdeathsig`.
+"""
+
+__all__ = [
+    "prewarm",
+    "serve",
+    "STATUS_FD",
+]
+
+from importlib import import_module
+import os
+import random
+import select
+import signal
+import sys
+import traceback
+
+# The file descriptor on which the fork server reports to the master.
+STATUS_FD = 3
+
+# Modules imported by the fork server before it forks any workers. Nothing
+# here may start threads or connect to the database when imported.
+PREWARM_MODULES = (
+    "maasserver.plugin",
+    "maasserver.eventloop",
+    "maasserver.webapp",
+    "maasserver.urls",
+    "maasserver.urls_api",
+    "maasserver.websockets.handlers",
+    "maasserver.rpc.regionservice",
+    "metadataserver.api_twisted",
+)
+
+
+def prewarm():
+    """Import what every worker will need."""
+    import django
+    django.setup()
+    for name in PREWARM_MODULES:
+        import_module(name)
+    # Forked workers must not share database connections.
+    from django.db import connections
+    connections.close_all()
+
+
+def reinitialise_reactor():
+    """Give this newly forked process a reactor of its own.
+
+    The reactor was installed when the fork server imported Twisted, so its
+    poller and waker are shared with the fork server and every other worker.
+    It has never been run, so it's enough to close those and initialise it
+    again; modules that have already imported it keep the same object.
+
+    Initialising the reactor forgets its system event triggers, so those
+    added when modules were imported, like the one in `maasserver.eventloop`
+    that keeps the reactor thread away from the database, are added again.
+    """
+    from twisted.internet import reactor
+    triggers = [
+        (phase, event, trigger)
+        for event, triggers in reactor._eventTriggers.items()
+        for phase in ("before", "during", "after")
+        for trigger in getattr(triggers, phase)
+    ]
+    waker, reactor.waker = reactor.waker, None
+    if waker is not None:
+        waker.connectionLost(None)
+    poller = getattr(reactor, "_poller", None)
+    if poller is not None:
+        poller.close()
+    reactor.__init__()
+    for phase, event, (func, args, kwargs) in triggers:
+        # The reactor has just added its own triggers again.
+        existing = reactor._eventTriggers.get(event)
+        if existing is None or (func, args, kwargs) not in getattr(
+                existing, phase):
+            reactor.addSystemEventTrigger(phase, event, func, *args, **kwargs)
+
+
+def _run_worker(run_worker, close_fds):
+    """Run a worker in this newly forked process; never returns."""
+    code = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for fd in close_fds:
+            os.close(fd)
+        null = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null, 0)
+        os.close(null)
+        # Every worker would otherwise produce the same "random" numbers.
+        random.seed()
+        reinitialise_reactor()
+        os.environ["MAAS_REGIOND_PROCESS_MODE"] = "worker"
+        run_worker()
+    except SystemExit as error:
+        code = error.code if isinstance(error.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+    else:
+        code = 0
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _report(status, *event):
+    status.write(" ".join(str(part) for part in event).encode("ascii"))
+    status.write(b"\n")
+
+
+def _reap(status):
+    """Report every worker that has exited."""
+    while True:
+        try:
+            pid, code = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        _report(status, "exited", pid, code)
+
+
+def _drain(fd):
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def serve(run_worker):
+    """Run the fork server.
+
+    :param run_worker: Called, with no arguments, in each forked worker to
+        run the worker's services.
+    """
+    prewarm()
+    status = os.fdopen(STATUS_FD, "wb", buffering=0)
+    # SIGCHLD wakes up the loop below so that exited workers are reported
+    # promptly; the handler itself has nothing to do.
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    close_fds = (STATUS_FD, wakeup_r, wakeup_w)
+    commands = b""
+    while True:
+        readable, _, _ = select.select([0, wakeup_r], [], [])
+        if wakeup_r in readable:
+            _drain(wakeup_r)
+        _reap(status)
+        if 0 in readable:
+            data = os.read(0, 4096)
+            if len(data) == 0:
+                # The master has gone away.
+                break
+            *lines, commands = (commands + data).split(b"\n")
+            for line in lines:
+                if line.strip() == b"spawn":
+                    pid = os.fork()
+                    if pid == 0:
+                        _run_worker(run_worker, close_fds)
+                    _report(status, "started", pid)
@@ -538,6 +538,18 @@ CONFIG_ITEMS = {
             'min_value': 1,
         },
     },
+    'script_result_blob_threshold': {
+        'default': 0,
+        'form': forms.IntegerField,
+        'form_kwargs': {
+            'required': False,
+            'label': (
+                "Script results of at least this many bytes are stored once, "
+                "outside the results table, and shared by identical results "
+                "(0 to disable)"),
+            'min_value': 0,
+        },
+    },
     'subnet_ip_exhaustion_threshold_count': {
         'default': 16,
         'form': forms.IntegerField,
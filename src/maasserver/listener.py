@@ -15,6 +15,7 @@ from errno import ENOENT
 from django.db import connections
 from django.db.utils import load_backend
 from provisioningserver.utils.enum import map_enum
+from provisioningserver.utils.metrics import METRICS
 from provisioningserver.utils.twisted import (
     callOut,
     suppress,
@@ -40,6 +41,11 @@ from twisted.python.failure import Failure
 from zope.interface import implementer
 
 
+NOTIFICATIONS_BACKLOG = METRICS.gauge(
+    "maas_listener_notifications_backlog",
+    "Database notifications waiting to be handled.")
+
+
 class ACTIONS:
     """Notify action types."""
 
@@ -183,6 +189,7 @@ class PostgresListenerService(Service, object):
                 # Delete the contents of the connection's notifies list so
                 # that we don't process them a second time.
                 del notifies[:]
+                NOTIFICATIONS_BACKLOG.set(len(self.notifications))
 
     def fileno(self):
         """Return the fileno of the connection."""
@@ -411,7 +418,9 @@ class PostgresListenerService(Service, object):
         """Process all notify message in the notifications set."""
         def gen_notifications(notifications):
             while len(notifications) != 0:
-                yield notifications.pop()
+                notification = notifications.pop()
+                NOTIFICATIONS_BACKLOG.set(len(notifications))
+                yield notification
         return task.coiterate(
             self.handleNotify(notification, clock=clock)
             for notification in gen_notifications(self.notifications))
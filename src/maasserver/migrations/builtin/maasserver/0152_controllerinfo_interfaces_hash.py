@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import (
+    migrations,
+    models,
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0151_userprofile_is_local'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='controllerinfo',
+            name='interfaces_hash',
+            field=models.CharField(max_length=64, null=True, blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0152_controllerinfo_interfaces_hash'),
+    ]
+
+    operations = [
+        # The unique constraint on neighbours doesn't hold for neighbours
+        # without a VID, since NULLs are distinct; index the VID as -1
+        # instead, so neighbours can be upserted with ON CONFLICT.
+        migrations.RunSQL(
+            """\
+            DELETE FROM maasserver_neighbour AS neighbour
+            USING maasserver_neighbour AS duplicate
+            WHERE neighbour.interface_id = duplicate.interface_id
+              AND neighbour.vid IS NOT DISTINCT FROM duplicate.vid
+              AND neighbour.mac_address = duplicate.mac_address
+              AND neighbour.ip = duplicate.ip
+              AND neighbour.id < duplicate.id;
+            CREATE UNIQUE INDEX maasserver_neighbour_upsert_idx
+              ON maasserver_neighbour (
+                interface_id, (COALESCE(vid, -1)), mac_address, ip);
+            """,
+            "DROP INDEX maasserver_neighbour_upsert_idx"),
+        migrations.RunSQL(
+            """\
+            DELETE FROM maasserver_mdns AS mdns
+            USING maasserver_mdns AS duplicate
+            WHERE mdns.interface_id = duplicate.interface_id
+              AND mdns.ip = duplicate.ip
+              AND mdns.hostname = duplicate.hostname
+              AND mdns.id < duplicate.id;
+            CREATE UNIQUE INDEX maasserver_mdns_upsert_idx
+              ON maasserver_mdns (interface_id, ip, hostname);
+            """,
+            "DROP INDEX maasserver_mdns_upsert_idx"),
+    ]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0153_neighbour_mdns_upsert_indexes'),
+    ]
+
+    operations = [
+        # `Discovery` was backed by the `maasserver_discovery` view, which
+        # was recomputed on every query. It is now a table, kept up to date
+        # by triggers (see `maasserver.triggers.discovery`) and populated
+        # from the `maasserver_discovery_view` view by `dbupgrade`.
+        migrations.RunSQL(
+            """\
+            DROP VIEW IF EXISTS maasserver_discovery;
+            CREATE TABLE maasserver_discovery (
+              id integer PRIMARY KEY,
+              discovery_id text,
+              neighbour_id integer NOT NULL,
+              ip inet,
+              mac_address macaddr,
+              vid integer,
+              first_seen timestamp with time zone NOT NULL,
+              last_seen timestamp with time zone NOT NULL,
+              mdns_id integer,
+              hostname text,
+              observer_id integer NOT NULL,
+              observer_system_id text NOT NULL,
+              observer_hostname text,
+              observer_interface_id integer NOT NULL,
+              observer_interface_name text NOT NULL,
+              fabric_id integer NOT NULL,
+              fabric_name text,
+              vlan_id integer NOT NULL,
+              is_external_dhcp boolean,
+              subnet_id integer,
+              subnet_cidr cidr,
+              subnet_prefixlen integer
+            );
+            CREATE UNIQUE INDEX maasserver_discovery_mac_address_ip_idx
+              ON maasserver_discovery (mac_address, ip);
+            CREATE INDEX maasserver_discovery_discovery_id_idx
+              ON maasserver_discovery (discovery_id);
+            CREATE INDEX maasserver_discovery_ip_idx
+              ON maasserver_discovery (ip);
+            CREATE INDEX maasserver_discovery_last_seen_idx
+              ON maasserver_discovery (last_seen);
+            CREATE INDEX maasserver_discovery_subnet_id_idx
+              ON maasserver_discovery (subnet_id);
+            CREATE INDEX maasserver_discovery_observer_interface_id_idx
+              ON maasserver_discovery (observer_interface_id);
+            CREATE INDEX maasserver_discovery_vlan_id_idx
+              ON maasserver_discovery (vlan_id);
+            """,
+            "DROP TABLE maasserver_discovery"),
+        # The triggers refresh discoveries by IP address, and by IP and MAC
+        # address.
+        migrations.RunSQL(
+            """\
+            CREATE INDEX maasserver_neighbour_ip_mac_address_idx
+              ON maasserver_neighbour (ip, mac_address);
+            CREATE INDEX maasserver_mdns_ip_idx
+              ON maasserver_mdns (ip);
+            """,
+            """\
+            DROP INDEX maasserver_neighbour_ip_mac_address_idx;
+            DROP INDEX maasserver_mdns_ip_idx;
+            """),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0154_discovery_table'),
+    ]
+
+    operations = [
+        # The rack controllers that can reach each BMC directly were worked
+        # out on every power operation. They are now kept in this table by
+        # triggers (see `maasserver.triggers.bmc`), and the table is populated
+        # from the `maasserver_bmc_rack_controllers_view` view by `dbupgrade`.
+        migrations.RunSQL(
+            """\
+            CREATE TABLE maasserver_bmc_rack_controllers (
+              bmc_id integer NOT NULL,
+              subnet_id integer NOT NULL,
+              ip_subnet_id integer,
+              rack_controller_id integer
+            );
+            CREATE INDEX maasserver_bmc_rack_controllers_bmc_id_idx
+              ON maasserver_bmc_rack_controllers (bmc_id);
+            CREATE INDEX maasserver_bmc_rack_controllers_subnet_id_idx
+              ON maasserver_bmc_rack_controllers (subnet_id);
+            """,
+            "DROP TABLE maasserver_bmc_rack_controllers"),
+    ]
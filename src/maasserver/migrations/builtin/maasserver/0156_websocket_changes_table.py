@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0155_bmc_rack_controllers_table'),
+    ]
+
+    operations = [
+        # Websocket notifications are recorded here by the `ws_notify`
+        # function (see `maasserver.triggers.websocket`), so that websocket
+        # clients can catch up on what they missed while disconnected.
+        #
+        # `txid` is the transaction that recorded each change. Ids are
+        # assigned when a change is recorded, not when it is committed, so a
+        # client cannot use them to know which changes it has seen; see
+        # `maasserver.websockets.changes`.
+        migrations.RunSQL(
+            """\
+            CREATE TABLE maasserver_websocket_changes (
+              id bigserial PRIMARY KEY,
+              channel text NOT NULL,
+              action text NOT NULL,
+              obj_id text NOT NULL,
+              txid bigint NOT NULL DEFAULT txid_current()
+            );
+            CREATE INDEX maasserver_websocket_changes_channel_id_idx
+              ON maasserver_websocket_changes (channel, id);
+            CREATE INDEX maasserver_websocket_changes_txid_idx
+              ON maasserver_websocket_changes (txid);
+            """,
+            "DROP TABLE maasserver_websocket_changes"),
+    ]
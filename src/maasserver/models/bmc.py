@@ -7,13 +7,17 @@ __all__ = [
     "BMC",
     ]
 
+from contextlib import closing
 from functools import partial
 import re
 
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import transaction
+from django.db import (
+    connection,
+    transaction,
+)
 from django.db.models import (
     BigIntegerField,
     BooleanField,
@@ -70,10 +74,10 @@ from maasserver.rpc import (
 )
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
+from netaddr import IPAddress
 import petname
 from provisioningserver.drivers import SETTING_SCOPE
 from provisioningserver.drivers.pod import BlockDeviceType
-from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.logger import get_maas_logger
 from provisioningserver.utils.twisted import asynchronous
 from twisted.internet.defer import inlineCallbacks
@@ -287,6 +291,11 @@ class BMC(CleanSave, TimestampedModel):
         if not power_type:
             # If there is no power type, treat all params as node params.
             return ({}, power_params)
+        # Importing the registry imports every power driver; only do so when
+        # needed.
+        from provisioningserver.drivers.power.registry import (
+            PowerDriverRegistry,
+        )
         power_driver = PowerDriverRegistry.get_item(power_type)
         if power_driver is None:
             # If there is no power driver, treat all params as node params.
@@ -314,6 +323,9 @@ class BMC(CleanSave, TimestampedModel):
         if not power_type or not power_parameters:
             # Nothing to extract.
             return None
+        from provisioningserver.drivers.power.registry import (
+            PowerDriverRegistry,
+        )
         power_driver = PowerDriverRegistry.get_item(power_type)
         if power_driver is None:
             maaslog.warning(
@@ -348,22 +360,55 @@ class BMC(CleanSave, TimestampedModel):
 
     def get_layer2_usable_rack_controllers(self, with_connection=True):
         """Return a list of `RackController`'s that have the ability to access
-        this `BMC` directly through a layer 2 connection."""
-        ip_address = self.ip_address
-        if ip_address is None or ip_address.ip is None or ip_address.ip == '':
-            return set()
-
-        # The BMC has a valid StaticIPAddress set. Make sure that the subnet
-        # is correct for that BMC.
-        subnet = Subnet.objects.get_best_subnet_for_ip(ip_address.ip)
-        if subnet is not None and self.ip_address.subnet_id != subnet.id:
-            self.ip_address.subnet = subnet
-            self.ip_address.save()
+        this `BMC` directly through a layer 2 connection.
 
+        These are kept in the `maasserver_bmc_rack_controllers` table by
+        triggers (see `maasserver.triggers.bmc`), so they are found with a
+        single lookup instead of being worked out for every power action.
+        """
         # Circular imports.
         from maasserver.models.node import RackController
-        return RackController.objects.filter_by_url_accessible(
-            ip_address.ip, with_connection=with_connection)
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(
+                "SELECT subnet_id, ip_subnet_id, rack_controller_id "
+                "FROM maasserver_bmc_rack_controllers WHERE bmc_id = %s",
+                [self.id])
+            rows = cursor.fetchall()
+
+        if len(rows) == 0:
+            # The BMC has no IP address or the IP address isn't in a known
+            # subnet. There is no MAAS defined subnet for loop back, so if
+            # that's the BMC's IP address use the running rack controller.
+            ip_address = self.ip_address
+            if ip_address is None or not ip_address.ip:
+                return []
+            racks = []
+            if IPAddress(ip_address.ip).is_loopback():
+                running_rack = RackController.objects.get_running_controller()
+                if running_rack is not None:
+                    racks.append(running_rack)
+        else:
+            subnet_id, ip_subnet_id, _ = rows[0]
+            if ip_subnet_id != subnet_id:
+                # Make sure that the subnet is correct for the BMC's IP
+                # address.
+                self.ip_address.subnet_id = subnet_id
+                self.ip_address.save()
+            rack_ids = {rack_id for _, _, rack_id in rows if rack_id}
+            if len(rack_ids) == 0:
+                racks = []
+            else:
+                racks = list(RackController.objects.filter(id__in=rack_ids))
+
+        if with_connection:
+            conn_rack_ids = [client.ident for client in getAllClients()]
+            return [
+                rack
+                for rack in racks
+                if rack.system_id in conn_rack_ids
+            ]
+        else:
+            return racks
 
     def get_routable_usable_rack_controllers(self, with_connection=True):
         """Return a list of `RackController`'s that have the ability to access
@@ -106,6 +106,7 @@ def get_default_config():
         'max_node_commissioning_results': 10,
         'max_node_testing_results': 10,
         'max_node_installation_results': 3,
+        'script_result_blob_threshold': 0,
         # Notifications.
         'subnet_ip_exhaustion_threshold_count': 16,
         # Authentication.
@@ -82,11 +82,22 @@ class ControllerInfoManager(Manager):
     def set_version(self, controller, version):
         self.update_or_create(defaults=dict(version=version), node=controller)
 
-    def set_interface_update_info(self, controller, interfaces, hints):
+    def set_interface_update_info(
+            self, controller, interfaces, hints, interfaces_hash=None):
         self.update_or_create(
-            defaults=dict(interfaces=interfaces, interface_update_hints=hints),
+            defaults=dict(
+                interfaces=interfaces, interface_update_hints=hints,
+                interfaces_hash=interfaces_hash),
             node=controller)
 
+    def clear_interface_update_info(self, controller):
+        """Forget the interfaces last sent by `controller`.
+
+        The next update of its interfaces will then be applied in full.
+        """
+        self.filter(node=controller).update(
+            interfaces='', interface_update_hints='', interfaces_hash=None)
+
     def get_controller_version_info(self):
         versions = list(self.select_related('node').filter(
             node__node_type__in=(
@@ -206,6 +217,8 @@ class ControllerInfo(CleanSave, TimestampedModel):
     :ivar interfaces: Interfaces JSON last sent by the controller.
     :ivar interface_udpate_hints: Topology hints last sent by the controller
         during a call to update_interfaces().
+    :ivar interfaces_hash: The hash of `interfaces` and
+        `interface_update_hints`, as calculated by `get_interfaces_hash`.
     """
 
     class Meta(DefaultMeta):
@@ -223,5 +236,8 @@ class ControllerInfo(CleanSave, TimestampedModel):
     interface_update_hints = JSONObjectField(
         max_length=(2 ** 15), blank=True, default='')
 
+    interfaces_hash = CharField(
+        max_length=64, null=True, blank=True, editable=False)
+
     def __str__(self):
         return "%s (%s)" % (self.__class__.__name__, self.node.hostname)
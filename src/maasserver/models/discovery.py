@@ -144,14 +144,17 @@ class Discovery(CleanSave, ViewModel):
     """A `Discovery` object represents the combined data for a network entity
     that MAAS believes has been discovered.
 
-    Note that this class is backed by the `maasserver_discovery` view. Any
-    updates to this model must be reflected in `maasserver/dbviews.py` under
-    the `maasserver_discovery` view.
+    Note that this class is backed by the `maasserver_discovery` table, which
+    materializes the `maasserver_discovery_view` view and is kept up to date
+    by triggers (see `maasserver/triggers/discovery.py`). Any updates to this
+    model must be reflected in `maasserver/dbviews.py` under the
+    `maasserver_discovery_view` view.
     """
 
     class Meta(DefaultViewMeta):
         # When managed is False, Django will not create a migration for this
-        # model class. This is required for model classes based on views.
+        # model class. This is required for model classes based on views, and
+        # the table materializing the view is created by hand.
         verbose_name = "Discovery"
         verbose_name_plural = "Discoveries"
 
@@ -7,7 +7,6 @@ __all__ = [
     'ISCSIBlockDevice',
     ]
 
-from curtin.block.iscsi import IscsiDisk
 from django.core.exceptions import ValidationError
 from django.db.models import CharField
 from maasserver import DefaultMeta
@@ -29,6 +28,9 @@ def get_iscsi_target(target):
 def validate_iscsi_target(target):
     """Validates that the `target` conforms to curtins requirement of
     RFC4173."""
+    # Curtin's block-device support is slow to import, and this is only used
+    # when an iSCSI block device is created or changed.
+    from curtin.block.iscsi import IscsiDisk
     try:
         # Curtin requires that it start with 'iscsi:'. The user can either
         # provide it or not, MAAS will do the correct thing.
@@ -7,13 +7,16 @@ __all__ = [
     'MDNS',
 ]
 
+from collections import OrderedDict
 
+from django.db import connection
 from django.db.models import (
     CASCADE,
     CharField,
     ForeignKey,
     IntegerField,
     Manager,
+    Q,
 )
 from maasserver import DefaultMeta
 from maasserver.fields import MAASIPAddressField
@@ -84,6 +87,105 @@ class MDNSManager(Manager):
         # a UniqueViolation so this operation can be retried.
         return get_one(query, exception_class=UniqueViolation)
 
+    # The most mDNS entries to insert or update in one statement.
+    upsert_batch_size = 1000
+
+    def update_mdns_entries(self, observations):
+        """Record many mDNS observations at once.
+
+        This has the same effect as calling `Interface.update_mdns_entry` for
+        each observation in turn, but uses a fixed number of queries rather
+        than several per observation.
+
+        :param observations: An iterable of ``(interface, avahi_json)``
+            tuples, where `avahi_json` is mDNS JSON from the controller.
+        """
+        # Coalesce repeated observations. As when observations are applied
+        # one at a time, a later observation replaces an earlier one for the
+        # same IP address, or for the same hostname in the same family.
+        entries = OrderedDict()
+        by_ip, by_hostname = {}, {}
+        interfaces = {}
+        for interface, avahi_json in observations:
+            if interface.mdns_discovery_state is False:
+                continue
+            interfaces[interface.id] = interface
+            ip = IPAddress(avahi_json['address'])
+            hostname = avahi_json['hostname']
+            key = (interface.id, str(ip), hostname)
+            for index, index_key in (
+                    (by_ip, (interface.id, str(ip))),
+                    (by_hostname, (interface.id, hostname, ip.version))):
+                other = index.get(index_key)
+                if other is not None and other != key:
+                    entries.pop(other, None)
+                index[index_key] = key
+            entries[key] = entries.get(key, 0) + 1
+        if len(entries) == 0:
+            return
+
+        # Remove entries that these observations replace.
+        replaced = set()
+        obsolete = []
+        ips = {ip for _, ip, _ in entries}
+        hostnames = {hostname for _, _, hostname in entries}
+        previous_entries = self.filter(interface_id__in=interfaces).filter(
+            Q(ip__in=ips) | Q(hostname__in=hostnames))
+        for entry in previous_entries.order_by('id'):
+            if (entry.interface_id, entry.ip, entry.hostname) in entries:
+                continue
+            log_string = interfaces[entry.interface_id].get_log_string()
+            key = by_hostname.get((
+                entry.interface_id, entry.hostname,
+                IPAddress(entry.ip).version))
+            if key in entries:
+                maaslog.info("%s: Hostname '%s' moved from %s to %s." % (
+                    log_string, entry.hostname, entry.ip, key[1]))
+            else:
+                key = by_ip.get((entry.interface_id, entry.ip))
+                if key in entries:
+                    maaslog.info(
+                        "%s: Hostname for %s updated from '%s' to '%s'." % (
+                            log_string, entry.ip, entry.hostname, key[2]))
+                else:
+                    continue
+            obsolete.append(entry.id)
+            replaced.add(key)
+        if len(obsolete) > 0:
+            self.filter(id__in=obsolete).delete()
+
+        # Insert or update the rest in sorted order, so that concurrent
+        # reports always lock rows in the same order.
+        rows = sorted(
+            (interface_id, ip, hostname, count)
+            for (interface_id, ip, hostname), count in entries.items()
+        )
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.upsert_batch_size):
+                batch = rows[start:start + self.upsert_batch_size]
+                values_clause = ", ".join(
+                    ["(now(), now(), %s, %s, %s, %s)"] * len(batch))
+                cursor.execute("""\
+                    INSERT INTO """ + table + """ AS mdns
+                        (created, updated, interface_id, ip, hostname, count)
+                    VALUES """ + values_clause + """
+                    ON CONFLICT (interface_id, ip, hostname)
+                    DO UPDATE SET
+                        count = mdns.count + EXCLUDED.count,
+                        updated = EXCLUDED.updated
+                    RETURNING interface_id, host(ip), hostname, xmax = 0
+                    """, [value for row in batch for value in row])
+                for interface_id, ip, hostname, inserted in cursor.fetchall():
+                    # If a previous entry was deleted, the change has already
+                    # been logged.
+                    if inserted and (
+                            interface_id, ip, hostname) not in replaced:
+                        maaslog.info(
+                            "%s: New mDNS entry resolved: '%s' on %s." % (
+                                interfaces[interface_id].get_log_string(),
+                                hostname, ip))
+
 
 class MDNS(CleanSave, TimestampedModel):
     """Represents data gathered from mDNS-browse for a particular IP address.
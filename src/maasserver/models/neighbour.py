@@ -7,6 +7,9 @@ __all__ = [
     'Neighbour',
 ]
 
+from collections import OrderedDict
+
+from django.db import connection
 from django.db.models import (
     CASCADE,
     ForeignKey,
@@ -27,6 +30,7 @@ from maasserver.utils.orm import (
     MAASQueriesMixin,
     UniqueViolation,
 )
+from netaddr import IPAddress
 from provisioningserver.logger import get_maas_logger
 from provisioningserver.utils.network import get_mac_organization
 
@@ -132,6 +136,99 @@ class NeighbourManager(Manager, NeighbourQueriesMixin):
         # a UniqueViolation so this operation can be retried.
         return get_one(query, exception_class=UniqueViolation)
 
+    # The most neighbours to insert or update in one statement.
+    upsert_batch_size = 1000
+
+    def update_neighbours(self, observations):
+        """Record many neighbour observations at once.
+
+        This has the same effect as calling `Interface.update_neighbour` for
+        each observation in turn, but uses a fixed number of queries rather
+        than several per observation.
+
+        :param observations: An iterable of ``(interface, neighbour_json)``
+            tuples, where `neighbour_json` is neighbour JSON from the
+            controller.
+        """
+        # Coalesce repeated observations of each (interface, IP, VID). When
+        # the MAC differs, the last observation wins, as it would were the
+        # observations applied one at a time.
+        bindings = OrderedDict()
+        interfaces = {}
+        for interface, neighbour_json in observations:
+            if interface.neighbour_discovery_state is False:
+                continue
+            interfaces[interface.id] = interface
+            key = (
+                interface.id, str(IPAddress(neighbour_json['ip'])),
+                neighbour_json.get('vid', None))
+            mac = neighbour_json['mac'].lower()
+            time = neighbour_json['time']
+            binding = bindings.get(key)
+            if binding is None or binding[0] != mac:
+                bindings[key] = [mac, time, 1]
+            else:
+                binding[1] = max(binding[1], time)
+                binding[2] += 1
+        if len(bindings) == 0:
+            return
+
+        # Remove bindings of those IP addresses to different MACs.
+        moved = set()
+        obsolete = []
+        previous_bindings = self.filter(
+            interface_id__in=interfaces,
+            ip__in={ip for _, ip, _ in bindings})
+        for binding in previous_bindings.order_by('id'):
+            key = (binding.interface_id, binding.ip, binding.vid)
+            if key in bindings:
+                mac = bindings[key][0]
+                if str(binding.mac_address) != mac:
+                    maaslog.info("%s: IP address %s%s moved from %s to %s" % (
+                        interfaces[binding.interface_id].get_log_string(),
+                        binding.ip, self.get_vid_log_snippet(binding.vid),
+                        binding.mac_address, mac))
+                    obsolete.append(binding.id)
+                    moved.add(key)
+        if len(obsolete) > 0:
+            self.filter(id__in=obsolete).delete()
+
+        # Insert or update the rest in sorted order, so that concurrent
+        # reports always lock rows in the same order.
+        rows = sorted(
+            (interface_id, ip, -1 if vid is None else vid, mac, time, count)
+            for (interface_id, ip, vid), (mac, time, count) in bindings.items()
+        )
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.upsert_batch_size):
+                batch = rows[start:start + self.upsert_batch_size]
+                row_clause = (
+                    "(now(), now(), %s, %s, NULLIF(%s, -1), %s, %s, %s)")
+                values_clause = ", ".join([row_clause] * len(batch))
+                cursor.execute("""\
+                    INSERT INTO """ + table + """ AS neighbour
+                        (created, updated, interface_id, ip, vid,
+                         mac_address, "time", count)
+                    VALUES """ + values_clause + """
+                    ON CONFLICT (
+                        interface_id, (COALESCE(vid, -1)), mac_address, ip)
+                    DO UPDATE SET
+                        "time" = EXCLUDED."time",
+                        count = neighbour.count + EXCLUDED.count,
+                        updated = EXCLUDED.updated
+                    RETURNING interface_id, host(ip), vid, mac_address::text,
+                              xmax = 0
+                    """, [value for row in batch for value in row])
+                for interface_id, ip, vid, mac, inserted in cursor.fetchall():
+                    # If a previous binding was deleted, the move has already
+                    # been logged.
+                    if inserted and (interface_id, ip, vid) not in moved:
+                        maaslog.info(
+                            "%s: New MAC, IP binding observed%s: %s, %s" % (
+                                interfaces[interface_id].get_log_string(),
+                                self.get_vid_log_snippet(vid), mac, ip))
+
     def get_by_updated_with_related_nodes(self):
         """Returns a `QuerySet` of neighbours, while also selecting related
         interfaces and nodes.
@@ -63,6 +63,7 @@ from maasserver import (
 )
 from maasserver.clusterrpc.pods import decompose_machine
 from maasserver.clusterrpc.power import (
+    get_power_control_batch,
     power_cycle,
     power_driver_check,
     power_off_node,
@@ -179,7 +180,6 @@ import petname
 from piston3.models import Token
 from provisioningserver.drivers.osystem import OperatingSystemRegistry
 from provisioningserver.drivers.pod import Capabilities
-from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.events import (
     EVENT_DETAILS,
     EVENT_TYPES,
@@ -219,6 +219,7 @@ from provisioningserver.utils.fs import NamedLock
 from provisioningserver.utils.ipaddr import get_mac_addresses
 from provisioningserver.utils.network import (
     annotate_with_default_monitored_interfaces,
+    get_interfaces_hash,
 )
 from provisioningserver.utils.twisted import (
     asynchronous,
@@ -2566,6 +2567,11 @@ class Node(CleanSave, TimestampedModel):
             else:
                 can_be_started = True
                 can_be_stopped = True
+            # Importing the registry imports every power driver; only do so
+            # when needed.
+            from provisioningserver.drivers.power.registry import (
+                PowerDriverRegistry,
+            )
             power_driver = PowerDriverRegistry.get_item(power_type)
             if power_driver is not None:
                 can_be_queried = power_driver.queryable
@@ -3970,6 +3976,12 @@ class Node(CleanSave, TimestampedModel):
         return d
 
     def _power_control_node(self, defer, power_method, power_info):
+        # Power control many nodes together when asked to; see
+        # `batch_power_control`.
+        batch = get_power_control_batch()
+        if batch is not None:
+            return batch.add(self, defer, power_method, power_info)
+
         # Check if the BMC is accessible. If not we need to do some work to
         # make sure we can determine which rack controller can power
         # control this node.
@@ -4302,6 +4314,39 @@ class Machine(Node):
             node_type=NODE_TYPE.MACHINE, *args, **kwargs)
 
 
+def get_changed_interfaces(previous, interfaces):
+    """Return the names of the interfaces that have changed.
+
+    :param previous: The interfaces definition last applied.
+    :param interfaces: The new interfaces definition.
+    :return: The names of interfaces in `interfaces` that are new or differ
+        from those in `previous`, together with all of their descendants,
+        since the VLANs and links of a child depend on its parents.
+    """
+    changed = {
+        name
+        for name, config in interfaces.items()
+        if previous.get(name) != config
+    }
+    children = defaultdict(set)
+    for name, config in interfaces.items():
+        for parent in config["parents"]:
+            children[parent].add(name)
+    pending = list(changed)
+    while len(pending) > 0:
+        for child in children[pending.pop()]:
+            if child not in changed:
+                changed.add(child)
+                pending.append(child)
+    return changed
+
+
+def _same_hints(hints, other_hints):
+    """Return True if the two lists of topology hints are equivalent."""
+    return get_interfaces_hash({}, hints) == get_interfaces_hash(
+        {}, other_hints)
+
+
 class Controller(Node):
     """A node which is either a rack or region controller."""
 
@@ -4876,17 +4921,24 @@ class Controller(Node):
             Neighbour data is gathered directly from the ARP monitoring process
             running on each rack interface.
         """
+        # Circular imports
+        from maasserver.models.neighbour import Neighbour
         # Determine which interfaces' neighbours need updating.
         interface_set = {neighbour['interface'] for neighbour in neighbours}
         interfaces = Interface.objects.get_interface_dict_for_node(
             self, names=interface_set, fetch_fabric_vlan=True)
-        for neighbour in neighbours:
-            interface = interfaces.get(neighbour['interface'], None)
-            if interface is not None:
-                interface.update_neighbour(neighbour)
-                vid = neighbour.get("vid", None)
-                if vid is not None:
-                    interface.report_vid(vid)
+        observations = [
+            (interfaces[neighbour['interface']], neighbour)
+            for neighbour in neighbours
+            if neighbour['interface'] in interfaces
+        ]
+        Neighbour.objects.update_neighbours(observations)
+        reported_vids = set()
+        for interface, neighbour in observations:
+            vid = neighbour.get("vid", None)
+            if vid is not None and (interface.id, vid) not in reported_vids:
+                interface.report_vid(vid)
+                reported_vids.add((interface.id, vid))
 
     def report_mdns_entries(self, entries):
         """Update the mDNS entries on this controller.
@@ -4895,14 +4947,17 @@ class Controller(Node):
             entries. mDNS data is gathered from an `avahi-browse` process
             running on each rack interface.
         """
+        # Circular imports
+        from maasserver.models.mdns import MDNS
         # Determine which interfaces' entries need updating.
         interface_set = {entry['interface'] for entry in entries}
         interfaces = Interface.objects.get_interface_dict_for_node(
             self, names=interface_set)
-        for entry in entries:
-            interface = interfaces.get(entry['interface'], None)
-            if interface is not None:
-                interface.update_mdns_entry(entry)
+        MDNS.objects.update_mdns_entries([
+            (interfaces[entry['interface']], entry)
+            for entry in entries
+            if entry['interface'] in interfaces
+        ])
 
     def get_discovery_state(self):
         """Returns the interface monitoring state for this Controller.
@@ -4921,9 +4976,14 @@ class Controller(Node):
     @synchronised(locks.startup)
     @transactional
     def update_interfaces(
-            self, interfaces, topology_hints=None, create_fabrics=True):
+            self, interfaces, topology_hints=None, create_fabrics=True,
+            interfaces_hash=None):
         """Update the interfaces attached to the controller.
 
+        The interfaces and hints applied are recorded, so only the interfaces
+        that differ from those applied last time are updated, and nothing at
+        all is done when none differ.
+
         :param interfaces: Interfaces dictionary that was parsed from
             /etc/network/interfaces on the controller.
         :param topology_hints: List of dictionaries representing hints
@@ -4931,10 +4991,32 @@ class Controller(Node):
         :param create_fabrics: If True, creates fabrics associated with each
             VLAN. Otherwise, creates the interfaces but does not create any
             links or VLANs.
+        :param interfaces_hash: The hash of `interfaces` and `topology_hints`
+            as calculated by `get_interfaces_hash`, if already known.
         """
         # Avoid circular imports
+        from maasserver.models import ControllerInfo
         from metadataserver.builtin_scripts.hooks import parse_lshw_nic_info
 
+        if interfaces_hash is None:
+            interfaces_hash = get_interfaces_hash(interfaces, topology_hints)
+
+        # Work out which interfaces have changed since the last update. When
+        # the topology hints have changed any interface could be affected.
+        changed = None
+        if create_fabrics:
+            previous = ControllerInfo.objects.filter(node=self).values_list(
+                'interfaces', 'interface_update_hints',
+                'interfaces_hash').first()
+            if previous is not None:
+                previous_interfaces, previous_hints, previous_hash = previous
+                if previous_hash == interfaces_hash:
+                    return
+                elif (isinstance(previous_interfaces, dict) and
+                        _same_hints(previous_hints, topology_hints)):
+                    changed = get_changed_interfaces(
+                        previous_interfaces, interfaces)
+
         # Get all of the current interfaces on this controller.
         current_interfaces = {
             interface.id: interface
@@ -4962,6 +5044,8 @@ class Controller(Node):
         discovery_mode = Config.objects.get_network_discovery_config()
         extended_nic_info = parse_lshw_nic_info(self)
         for name in flatten(process_order):
+            if changed is not None and name not in changed:
+                continue
             settings = interfaces[name]
             # Note: the interface that comes back from this call may be None,
             # if we decided not to model an interface based on what the rack
@@ -4982,9 +5066,19 @@ class Controller(Node):
 
         if not create_fabrics:
             # This could be an existing rack controller re-registering,
-            # so don't delete interfaces during this phase.
+            # so don't delete interfaces during this phase. The interfaces
+            # may have been changed though, so the next update must be
+            # applied in full.
+            ControllerInfo.objects.clear_interface_update_info(self)
             return
 
+        if changed is not None:
+            # Interfaces that haven't changed were not updated above, but
+            # they still exist.
+            for nic_id, nic in list(current_interfaces.items()):
+                if nic.name in interfaces and nic.name not in changed:
+                    del current_interfaces[nic_id]
+
         # Remove all the interfaces that no longer exist. We do this in reverse
         # order so the child is deleted before the parent.
         deletion_order = {}
@@ -5005,6 +5099,8 @@ class Controller(Node):
                 self.boot_interface = None
             current_interfaces[delete_id].delete()
         self.save()
+        ControllerInfo.objects.set_interface_update_info(
+            self, interfaces, topology_hints, interfaces_hash=interfaces_hash)
 
     @transactional
     def _get_token_for_controller(self):
@@ -0,0 +1,37 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Forget cached preseed fragments when what they're made from changes."""
+
+__all__ = [
+    "signals",
+]
+
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from maasserver.models import (
+    BootResource,
+    Config,
+    PackageRepository,
+)
+from maasserver.preseed_cache import fragment_cache
+from maasserver.utils.signals import SignalsManager
+
+
+signals = SignalsManager()
+
+
+def invalidate_fragment_cache(sender, instance, **kwargs):
+    """Forget all cached preseed fragments, once this change commits."""
+    fragment_cache.invalidate()
+
+
+for klass in (BootResource, Config, PackageRepository):
+    signals.watch(post_save, invalidate_fragment_cache, sender=klass)
+    signals.watch(post_delete, invalidate_fragment_cache, sender=klass)
+
+
+# Enable all signals by default.
+signals.enable()
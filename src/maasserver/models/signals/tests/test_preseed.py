@@ -0,0 +1,45 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Test the behaviour of preseed fragment cache signals."""
+
+__all__ = []
+
+from unittest.mock import call
+
+from maasserver.models import Config
+from maasserver.preseed_cache import fragment_cache
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+)
+
+
+class TestPreseedSignals(MAASServerTestCase):
+
+    def patch_invalidate(self):
+        return self.patch(fragment_cache, "invalidate")
+
+    def test_setting_config_invalidates_cache(self):
+        invalidate = self.patch_invalidate()
+        Config.objects.set_config("curtin_verbose", True)
+        self.assertThat(invalidate, MockCalledOnceWith())
+
+    def test_changing_package_repository_invalidates_cache(self):
+        repository = factory.make_PackageRepository()
+        invalidate = self.patch_invalidate()
+        repository.save()
+        repository.delete()
+        self.assertThat(invalidate, MockCallsMatch(call(), call()))
+
+    def test_changing_boot_resource_invalidates_cache(self):
+        resource = factory.make_BootResource()
+        invalidate = self.patch_invalidate()
+        resource.delete()
+        self.assertThat(invalidate, MockCalledOnceWith())
+
+    def test_cache_is_bypassed_after_change_in_transaction(self):
+        Config.objects.set_config("curtin_verbose", True)
+        self.assertTrue(fragment_cache.invalidated_in_transaction())
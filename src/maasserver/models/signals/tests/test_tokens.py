@@ -0,0 +1,34 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Test the behaviour of OAuth token signals."""
+
+__all__ = []
+
+from maasserver.oauth_store import token_cache
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+
+
+class TestTokenSignals(MAASServerTestCase):
+
+    def make_cached_token(self):
+        user = factory.make_User()
+        token = user.userprofile.get_authorisation_tokens()[0]
+        token_cache.get(token.key)
+        return token
+
+    def test_deleting_token_discards_it(self):
+        token = self.make_cached_token()
+        token.delete()
+        self.assertNotIn(token.key, token_cache.values)
+
+    def test_saving_token_discards_it(self):
+        token = self.make_cached_token()
+        token.save()
+        self.assertNotIn(token.key, token_cache.values)
+
+    def test_deleting_consumer_discards_its_tokens(self):
+        token = self.make_cached_token()
+        token.consumer.delete()
+        self.assertNotIn(token.key, token_cache.values)
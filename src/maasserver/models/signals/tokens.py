@@ -0,0 +1,42 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Forget cached OAuth tokens when they change."""
+
+__all__ = [
+    "signals",
+]
+
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from maasserver.oauth_store import token_cache
+from maasserver.utils.signals import SignalsManager
+from piston3.models import (
+    Consumer,
+    Token,
+)
+
+
+signals = SignalsManager()
+
+
+def discard_token(sender, instance, **kwargs):
+    """Forget `instance` in the token cache."""
+    token_cache.discard(instance.key)
+
+
+def discard_consumer_tokens(sender, instance, **kwargs):
+    """Forget the tokens of consumer `instance` in the token cache."""
+    token_cache.discard_consumer(instance.id)
+
+
+signals.watch(post_save, discard_token, sender=Token)
+signals.watch(post_delete, discard_token, sender=Token)
+signals.watch(post_save, discard_consumer_tokens, sender=Consumer)
+signals.watch(post_delete, discard_consumer_tokens, sender=Consumer)
+
+
+# Enable all signals by default.
+signals.enable()
@@ -50,6 +50,7 @@ from maasserver.fields import (
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.staticroute import StaticRoute
 from maasserver.models.timestampedmodel import TimestampedModel
+from maasserver.processpool import callInProcessPool
 from maasserver.utils.orm import MAASQueriesMixin
 from netaddr import (
     AddrFormatError,
@@ -557,7 +558,8 @@ class Subnet(CleanSave, TimestampedModel):
             exclude_ip_ranges=exclude_ip_ranges)
         if with_neighbours:
             ranges |= self.get_maasipset_for_neighbours()
-        return MAASIPSet(ranges)
+        # Condensing many ranges is CPU-bound; do it in the process pool.
+        return callInProcessPool(MAASIPSet, ranges)
 
     def get_ipranges_available_for_reserved_range(
             self, exclude_ip_ranges: list=None):
@@ -695,7 +697,8 @@ class Subnet(CleanSave, TimestampedModel):
         reserved_ranges = self.get_ipranges_in_use()
         if with_neighbours is True:
             reserved_ranges |= self.get_maasipset_for_neighbours()
-        return reserved_ranges.get_full_range(self.get_ipnetwork())
+        return callInProcessPool(
+            reserved_ranges.get_full_range, self.get_ipnetwork())
 
     def get_next_ip_for_allocation(
             self, exclude_addresses: Optional[Iterable]=None,
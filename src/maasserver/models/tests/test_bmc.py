@@ -35,7 +35,10 @@ from maasserver.models.iscsiblockdevice import (
     get_iscsi_target,
     ISCSIBlockDevice,
 )
-from maasserver.models.node import Machine
+from maasserver.models.node import (
+    Machine,
+    RackController,
+)
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.resourcepool import ResourcePool
 from maasserver.models.staticipaddress import StaticIPAddress
@@ -483,6 +486,52 @@ class TestBMC(MAASServerTestCase):
             [rack_controller], machine.bmc.get_usable_rack_controllers(
                 with_connection=False))
 
+    def test_get_usable_rack_controllers_ignores_racks_on_other_subnets(self):
+        rack_controller = factory.make_RackController()
+        machine = factory.make_Node(bmc_connected_to=rack_controller)
+        other_rack = factory.make_RackController()
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            interface=factory.make_Interface(node=other_rack))
+        self.assertItemsEqual(
+            [rack_controller], machine.bmc.get_usable_rack_controllers(
+                with_connection=False))
+
+    def test_get_usable_rack_controllers_follows_racks_changing(self):
+        rack_controller = factory.make_RackController()
+        machine = factory.make_Node(bmc_connected_to=rack_controller)
+        bmc = machine.bmc
+        RackController.objects.filter(id=rack_controller.id).update(
+            node_type=NODE_TYPE.MACHINE)
+        self.assertThat(
+            bmc.get_layer2_usable_rack_controllers(with_connection=False),
+            HasLength(0))
+        other_rack = factory.make_RackController()
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            subnet=bmc.ip_address.subnet,
+            interface=factory.make_Interface(node=other_rack))
+        self.assertItemsEqual(
+            [other_rack], bmc.get_layer2_usable_rack_controllers(
+                with_connection=False))
+
+    def test_get_usable_rack_controllers_returns_running_rack_for_loopback(
+            self):
+        sip = StaticIPAddress.objects.create(
+            alloc_type=IPADDRESS_TYPE.STICKY, ip="127.0.0.1")
+        bmc = factory.make_BMC(
+            power_type="virsh",
+            power_parameters={
+                "power_address": "qemu+ssh://user@127.0.0.1/system",
+            }, ip_address=sip)
+        rack_controller = factory.make_RackController()
+        self.patch(
+            RackController.objects,
+            "get_running_controller").return_value = rack_controller
+        self.assertItemsEqual(
+            [rack_controller], bmc.get_usable_rack_controllers(
+                with_connection=False))
+
     def test_get_client_identifiers_returns_rack_controller_system_ids(self):
         rack_controllers = [
             factory.make_RackController()
@@ -19,6 +19,7 @@ from maasserver.models.controllerinfo import (
 )
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
 from testtools.matchers import (
     Equals,
     Is,
@@ -51,6 +52,16 @@ class TestControllerInfo(MAASServerTestCase):
         self.assertThat(controller.interfaces, Equals(interfaces))
         self.assertThat(controller.interface_update_hints, Equals(hints))
 
+    def test_controllerinfo_clear_interface_update_info(self):
+        controller = factory.make_RackController()
+        ControllerInfo.objects.set_interface_update_info(
+            controller, {'eth0': {}}, [], interfaces_hash="hash")
+        ControllerInfo.objects.clear_interface_update_info(controller)
+        info = reload_object(controller).controllerinfo
+        self.assertThat(info.interfaces, Equals(''))
+        self.assertThat(info.interface_update_hints, Equals(''))
+        self.assertIsNone(info.interfaces_hash)
+
 
 class TestGetControllerVersionInfo(MAASServerTestCase):
 
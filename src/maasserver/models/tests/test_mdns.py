@@ -5,9 +5,20 @@
 
 __all__ = []
 
+from fixtures import FakeLogger
+from maasserver.enum import INTERFACE_TYPE
+from maasserver.models import MDNS
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from testtools.matchers import Equals
+from maasserver.utils.orm import get_one
+from maastesting.matchers import DocTestMatches
+from testtools.matchers import (
+    Contains,
+    Equals,
+    MatchesSetwise,
+    MatchesStructure,
+    Not,
+)
 
 
 class TestMDNSModel(MAASServerTestCase):
@@ -16,3 +27,99 @@ class TestMDNSModel(MAASServerTestCase):
         mdns = factory.make_MDNS(hostname="Living room")
         # Expect no exception.
         self.assertThat(mdns.hostname, Equals("Living room"))
+
+
+class TestMDNSManagerUpdateMDNSEntries(MAASServerTestCase):
+    """Tests for `MDNSManager.update_mdns_entries`."""
+
+    def make_interface(self, mdns_discovery_state=True):
+        interface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        interface.mdns_discovery_state = mdns_discovery_state
+        return interface
+
+    def make_mdns_entry_json(self, ip=None, hostname=None):
+        if ip is None:
+            ip = factory.make_ip_address(ipv6=False)
+        if hostname is None:
+            hostname = factory.make_hostname()
+        return {
+            'address': ip,
+            'hostname': hostname,
+        }
+
+    def test__adds_new_entries(self):
+        iface = self.make_interface()
+        observations = [
+            (iface, self.make_mdns_entry_json()),
+            (iface, self.make_mdns_entry_json()),
+        ]
+        with FakeLogger("maas.mDNS") as maaslog:
+            MDNS.objects.update_mdns_entries(observations)
+        self.assertThat(
+            MDNS.objects.all(), MatchesSetwise(*(
+                MatchesStructure.byEquality(
+                    interface=iface, ip=json['address'],
+                    hostname=json['hostname'], count=1)
+                for _, json in observations
+            )))
+        self.assertThat(maaslog.output, DocTestMatches(
+            "...: New mDNS entry resolved..."))
+
+    def test__ignores_interfaces_without_mdns_discovery(self):
+        iface = self.make_interface(mdns_discovery_state=False)
+        MDNS.objects.update_mdns_entries(
+            [(iface, self.make_mdns_entry_json())])
+        self.assertThat(MDNS.objects.count(), Equals(0))
+
+    def test__updates_existing_entries(self):
+        iface = self.make_interface()
+        json = self.make_mdns_entry_json()
+        MDNS.objects.update_mdns_entries([(iface, json)])
+        MDNS.objects.update_mdns_entries([(iface, json), (iface, json)])
+        entry = get_one(MDNS.objects.all())
+        self.assertThat(entry.count, Equals(3))
+
+    def test__replaces_entry_when_hostname_moves(self):
+        iface = self.make_interface()
+        json = self.make_mdns_entry_json()
+        MDNS.objects.update_mdns_entries([(iface, json)])
+        json = dict(json, address=factory.make_ip_address(ipv6=False))
+        with FakeLogger("maas.mDNS") as maaslog:
+            MDNS.objects.update_mdns_entries([(iface, json)])
+        entry = get_one(MDNS.objects.all())
+        self.assertThat(entry.ip, Equals(json['address']))
+        self.assertThat(entry.count, Equals(1))
+        self.assertThat(maaslog.output, DocTestMatches(
+            "...: Hostname '...' moved from ... to ...."))
+        self.assertThat(maaslog.output, Not(Contains("New mDNS entry")))
+
+    def test__replaces_entry_when_hostname_changes(self):
+        iface = self.make_interface()
+        json = self.make_mdns_entry_json()
+        MDNS.objects.update_mdns_entries([(iface, json)])
+        json = dict(json, hostname=factory.make_hostname())
+        with FakeLogger("maas.mDNS") as maaslog:
+            MDNS.objects.update_mdns_entries([(iface, json)])
+        entry = get_one(MDNS.objects.all())
+        self.assertThat(entry.hostname, Equals(json['hostname']))
+        self.assertThat(maaslog.output, DocTestMatches(
+            "...: Hostname for ... updated from '...' to '...'."))
+
+    def test__keeps_hostname_in_each_address_family(self):
+        iface = self.make_interface()
+        hostname = factory.make_hostname()
+        MDNS.objects.update_mdns_entries([
+            (iface, self.make_mdns_entry_json(
+                ip=factory.make_ip_address(ipv6=False), hostname=hostname)),
+            (iface, self.make_mdns_entry_json(
+                ip=factory.make_ip_address(ipv6=True), hostname=hostname)),
+        ])
+        self.assertThat(MDNS.objects.count(), Equals(2))
+
+    def test__last_of_conflicting_observations_wins(self):
+        iface = self.make_interface()
+        first = self.make_mdns_entry_json()
+        last = dict(first, address=factory.make_ip_address(ipv6=False))
+        MDNS.objects.update_mdns_entries([(iface, first), (iface, last)])
+        entry = get_one(MDNS.objects.all())
+        self.assertThat(entry.ip, Equals(last['address']))
@@ -5,9 +5,25 @@
 
 __all__ = []
 
+import random
+
+from fixtures import FakeLogger
+from maasserver.enum import INTERFACE_TYPE
+from maasserver.models import Neighbour
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from maastesting.matchers import IsNonEmptyString
+from maasserver.utils.orm import get_one
+from maastesting.matchers import (
+    DocTestMatches,
+    IsNonEmptyString,
+)
+from testtools.matchers import (
+    Contains,
+    Equals,
+    MatchesSetwise,
+    MatchesStructure,
+    Not,
+)
 
 
 class TestNeighbourModel(MAASServerTestCase):
@@ -15,3 +31,96 @@ class TestNeighbourModel(MAASServerTestCase):
     def test_mac_organization(self):
         neighbour = factory.make_Neighbour(mac_address="48:51:b7:00:00:00")
         self.assertThat(neighbour.mac_organization, IsNonEmptyString)
+
+
+class TestNeighbourManagerUpdateNeighbours(MAASServerTestCase):
+    """Tests for `NeighbourManager.update_neighbours`."""
+
+    def make_interface(self, neighbour_discovery_state=True):
+        interface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        interface.neighbour_discovery_state = neighbour_discovery_state
+        return interface
+
+    def make_neighbour_json(self, ip=None, mac=None, vid=None):
+        if ip is None:
+            ip = factory.make_ip_address(ipv6=False)
+        if mac is None:
+            mac = factory.make_mac_address()
+        return {
+            'ip': ip,
+            'mac': mac,
+            'time': random.randint(0, 200000000),
+            'vid': vid,
+        }
+
+    def test__adds_new_neighbours(self):
+        iface = self.make_interface()
+        observations = [
+            (iface, self.make_neighbour_json()),
+            (iface, self.make_neighbour_json(vid=random.randint(1, 4094))),
+        ]
+        Neighbour.objects.update_neighbours(observations)
+        self.assertThat(
+            Neighbour.objects.all(), MatchesSetwise(*(
+                MatchesStructure.byEquality(
+                    interface=iface, ip=json['ip'], vid=json['vid'],
+                    mac_address=json['mac'], time=json['time'], count=1)
+                for _, json in observations
+            )))
+
+    def test__ignores_interfaces_without_neighbour_discovery(self):
+        iface = self.make_interface(neighbour_discovery_state=False)
+        Neighbour.objects.update_neighbours(
+            [(iface, self.make_neighbour_json())])
+        self.assertThat(Neighbour.objects.count(), Equals(0))
+
+    def test__updates_existing_neighbours(self):
+        iface = self.make_interface()
+        # Neighbours with and without a VID are both updated in place.
+        for vid in (None, 100):
+            json = self.make_neighbour_json(vid=vid)
+            Neighbour.objects.update_neighbours([(iface, json)])
+            json = dict(json, time=json['time'] + 1)
+            Neighbour.objects.update_neighbours([(iface, json), (iface, json)])
+            neighbour = Neighbour.objects.get(interface=iface, vid=vid)
+            self.assertThat(neighbour.time, Equals(json['time']))
+            self.assertThat(neighbour.count, Equals(3))
+        self.assertThat(Neighbour.objects.count(), Equals(2))
+
+    def test__replaces_obsolete_neighbours(self):
+        iface = self.make_interface()
+        json = self.make_neighbour_json()
+        Neighbour.objects.update_neighbours([(iface, json)])
+        json = dict(json, mac=factory.make_mac_address())
+        with FakeLogger("maas.neighbour") as maaslog:
+            Neighbour.objects.update_neighbours([(iface, json)])
+        neighbour = get_one(Neighbour.objects.all())
+        self.assertThat(neighbour.mac_address, Equals(json['mac']))
+        self.assertThat(neighbour.count, Equals(1))
+        self.assertThat(maaslog.output, DocTestMatches(
+            "...: IP address...moved from...to..."))
+        self.assertThat(maaslog.output, Not(Contains("New MAC")))
+
+    def test__last_of_conflicting_observations_wins(self):
+        iface = self.make_interface()
+        first = self.make_neighbour_json()
+        last = dict(first, mac=factory.make_mac_address())
+        Neighbour.objects.update_neighbours([(iface, first), (iface, last)])
+        neighbour = get_one(Neighbour.objects.all())
+        self.assertThat(neighbour.mac_address, Equals(last['mac']))
+
+    def test__logs_new_bindings(self):
+        iface = self.make_interface()
+        with FakeLogger("maas.neighbour") as maaslog:
+            Neighbour.objects.update_neighbours(
+                [(iface, self.make_neighbour_json())])
+        self.assertThat(maaslog.output, DocTestMatches(
+            "...: New MAC, IP binding observed..."))
+
+    def test__upserts_in_batches(self):
+        self.patch(Neighbour.objects, "upsert_batch_size", 2)
+        iface = self.make_interface()
+        observations = [
+            (iface, self.make_neighbour_json()) for _ in range(5)]
+        Neighbour.objects.update_neighbours(observations)
+        self.assertThat(Neighbour.objects.count(), Equals(5))
@@ -100,10 +100,13 @@ from maasserver.models.bmc import (
 from maasserver.models.config import NetworkDiscoveryConfig
 from maasserver.models.event import Event
 import maasserver.models.interface as interface_module
+import maasserver.models.mdns as mdns_module
+import maasserver.models.neighbour as neighbour_module
 from maasserver.models.node import (
     DefaultGateways,
     GatewayDefinition,
     generate_node_system_id,
+    get_changed_interfaces,
     PowerInfo,
 )
 from maasserver.models.resourcepool import ResourcePool
@@ -157,6 +160,7 @@ from maastesting.matchers import (
     MockCallsMatch,
     MockNotCalled,
 )
+from maastesting.testcase import MAASTestCase
 from metadataserver.builtin_scripts.tests import test_hooks
 from metadataserver.enum import (
     RESULT_TYPE,
@@ -210,6 +214,7 @@ from provisioningserver.utils.enum import (
 )
 from provisioningserver.utils.env import get_maas_id
 from provisioningserver.utils.fs import NamedLock
+from provisioningserver.utils.network import get_interfaces_hash
 from provisioningserver.utils.testing import MAASIDFixture
 from testscenarios import multiply_scenarios
 from testtools import ExpectedException
@@ -7080,32 +7085,35 @@ class TestControllerUpdateDiscoveryState(MAASServerTestCase):
 class TestReportNeighbours(MAASServerTestCase):
     """Tests for `Controller.report_neighbours()."""
 
-    def test__calls_update_neighbour_for_each_neighbour(self):
+    def test__updates_neighbours_together(self):
         rack = factory.make_RackController()
-        factory.make_Interface(name='eth0', node=rack)
-        factory.make_Interface(name='eth1', node=rack)
-        update_neighbour = self.patch(
-            interface_module.Interface, 'update_neighbour')
+        eth0 = factory.make_Interface(name='eth0', node=rack)
+        eth1 = factory.make_Interface(name='eth1', node=rack)
+        update_neighbours = self.patch(
+            neighbour_module.Neighbour.objects, 'update_neighbours')
         neighbours = [
             {'interface': 'eth0', 'mac': factory.make_mac_address()},
             {'interface': 'eth1', 'mac': factory.make_mac_address()},
+            {'interface': 'eth2', 'mac': factory.make_mac_address()},
         ]
         rack.report_neighbours(neighbours)
-        self.assertThat(update_neighbour, MockCallsMatch(
-            *[call(neighbour) for neighbour in neighbours]
-        ))
+        self.assertThat(update_neighbours, MockCalledOnceWith([
+            (eth0, neighbours[0]),
+            (eth1, neighbours[1]),
+        ]))
 
     def test__calls_report_vid_for_each_vid(self):
         rack = factory.make_RackController()
         factory.make_Interface(name='eth0', node=rack)
         factory.make_Interface(name='eth1', node=rack)
         # Just make this a no-op for simplicity.
-        self.patch(interface_module.Interface, 'update_neighbour')
+        self.patch(neighbour_module.Neighbour.objects, 'update_neighbours')
         report_vid = self.patch(
             interface_module.Interface, 'report_vid')
         neighbours = [
             {'interface': 'eth0', 'mac': factory.make_mac_address(), 'vid': 3},
             {'interface': 'eth1', 'mac': factory.make_mac_address(), 'vid': 7},
+            {'interface': 'eth1', 'mac': factory.make_mac_address(), 'vid': 7},
         ]
         rack.report_neighbours(neighbours)
         self.assertThat(report_vid, MockCallsMatch(call(3), call(7)))
@@ -7114,20 +7122,22 @@ class TestReportNeighbours(MAASServerTestCase):
 class TestReportMDNSEntries(MAASServerTestCase):
     """Tests for `Controller.report_mdns_entries()."""
 
-    def test__calls_update_mdns_entry_for_each_entry(self):
+    def test__updates_mdns_entries_together(self):
         rack = factory.make_RackController()
-        factory.make_Interface(name='eth0', node=rack)
-        factory.make_Interface(name='eth1', node=rack)
-        update_mdns_entry = self.patch(
-            interface_module.Interface, 'update_mdns_entry')
+        eth0 = factory.make_Interface(name='eth0', node=rack)
+        eth1 = factory.make_Interface(name='eth1', node=rack)
+        update_mdns_entries = self.patch(
+            mdns_module.MDNS.objects, 'update_mdns_entries')
         entries = [
             {'interface': 'eth0', 'hostname': factory.make_name('eth0')},
             {'interface': 'eth1', 'hostname': factory.make_name('eth1')},
+            {'interface': 'eth2', 'hostname': factory.make_name('eth2')},
         ]
         rack.report_mdns_entries(entries)
-        self.assertThat(update_mdns_entry, MockCallsMatch(
-            *[call(entry) for entry in entries]
-        ))
+        self.assertThat(update_mdns_entries, MockCalledOnceWith([
+            (eth0, entries[0]),
+            (eth1, entries[1]),
+        ]))
 
 
 class UpdateInterfacesMixin:
@@ -9833,6 +9843,142 @@ class TestUpdateInterfaces(MAASServerTestCase, UpdateInterfacesMixin):
         self.assertThat(alice_eth0.vlan, Equals(bob_eth0.vlan))
 
 
+class TestGetChangedInterfaces(MAASTestCase):
+
+    def test__returns_new_and_changed_interfaces(self):
+        previous = {
+            "eth0": {"type": "physical", "parents": [], "enabled": True},
+            "eth1": {"type": "physical", "parents": [], "enabled": True},
+        }
+        interfaces = {
+            "eth0": {"type": "physical", "parents": [], "enabled": True},
+            "eth1": {"type": "physical", "parents": [], "enabled": False},
+            "eth2": {"type": "physical", "parents": [], "enabled": True},
+        }
+        self.assertThat(
+            get_changed_interfaces(previous, interfaces),
+            Equals({"eth1", "eth2"}))
+
+    def test__includes_descendants_of_changed_interfaces(self):
+        previous = {
+            "eth0": {"type": "physical", "parents": [], "enabled": True},
+            "eth1": {"type": "physical", "parents": [], "enabled": True},
+            "bond0": {"type": "bond", "parents": ["eth0"]},
+            "bond0.10": {"type": "vlan", "parents": ["bond0"], "vid": 10},
+            "eth1.10": {"type": "vlan", "parents": ["eth1"], "vid": 10},
+        }
+        interfaces = dict(previous, eth0={
+            "type": "physical", "parents": [], "enabled": False})
+        self.assertThat(
+            get_changed_interfaces(previous, interfaces),
+            Equals({"eth0", "bond0", "bond0.10"}))
+
+
+class TestUpdateInterfacesChanges(MAASServerTestCase):
+    """Tests for updating only the interfaces that have changed."""
+
+    def make_interfaces(self):
+        return {
+            "eth0": {
+                "type": "physical",
+                "mac_address": factory.make_mac_address(),
+                "parents": [],
+                "links": [],
+                "enabled": True,
+            },
+            "eth1": {
+                "type": "physical",
+                "mac_address": factory.make_mac_address(),
+                "parents": [],
+                "links": [],
+                "enabled": True,
+            },
+            "eth1.100": {
+                "type": "vlan",
+                "vid": 100,
+                "parents": ["eth1"],
+                "links": [],
+                "enabled": True,
+            },
+        }
+
+    def get_updated_names(self, update_interface):
+        return {
+            call_args[0][0]
+            for call_args in update_interface.call_args_list
+        }
+
+    def test__records_interfaces_and_hints(self):
+        controller = factory.make_RackController()
+        interfaces = self.make_interfaces()
+        controller.update_interfaces(interfaces, [])
+        info = reload_object(controller).controllerinfo
+        self.assertThat(info.interfaces, Equals(interfaces))
+        self.assertThat(info.interface_update_hints, Equals([]))
+        self.assertThat(
+            info.interfaces_hash,
+            Equals(get_interfaces_hash(interfaces, [])))
+
+    def test__does_nothing_if_unchanged(self):
+        controller = factory.make_RackController()
+        interfaces = self.make_interfaces()
+        controller.update_interfaces(interfaces)
+        update_interface = self.patch(controller, "_update_interface")
+        controller.update_interfaces(interfaces)
+        self.assertThat(update_interface, MockNotCalled())
+
+    def test__updates_only_changed_interfaces_and_children(self):
+        controller = factory.make_RackController()
+        interfaces = self.make_interfaces()
+        controller.update_interfaces(interfaces)
+        interfaces["eth1"]["enabled"] = False
+        update_interface = self.patch(
+            controller, "_update_interface")
+        update_interface.side_effect = (
+            lambda name, *args, **kwargs: Interface.objects.get(
+                node=controller, name=name))
+        controller.update_interfaces(interfaces)
+        self.assertThat(
+            self.get_updated_names(update_interface),
+            Equals({"eth1", "eth1.100"}))
+        self.assertThat(
+            {interface.name for interface in controller.interface_set.all()},
+            Equals(set(interfaces)))
+
+    def test__removes_missing_interfaces(self):
+        controller = factory.make_RackController()
+        interfaces = self.make_interfaces()
+        controller.update_interfaces(interfaces)
+        del interfaces["eth1.100"]
+        controller.update_interfaces(interfaces)
+        self.assertThat(
+            {interface.name for interface in controller.interface_set.all()},
+            Equals({"eth0", "eth1"}))
+
+    def test__updates_all_interfaces_if_hints_changed(self):
+        controller = factory.make_RackController()
+        interfaces = self.make_interfaces()
+        controller.update_interfaces(interfaces, [])
+        update_interface = self.patch(controller, "_update_interface")
+        update_interface.return_value = None
+        hints = [{
+            "hint": "rx_own_beacon_on_other_interface",
+            "ifname": "eth1",
+            "related_ifname": "eth0",
+        }]
+        controller.update_interfaces(interfaces, hints)
+        self.assertThat(
+            self.get_updated_names(update_interface), Equals(set(interfaces)))
+
+    def test__updates_all_interfaces_after_partial_update(self):
+        controller = factory.make_RackController()
+        interfaces = self.make_interfaces()
+        controller.update_interfaces(interfaces)
+        controller.update_interfaces(interfaces, create_fabrics=False)
+        self.assertIsNone(
+            reload_object(controller).controllerinfo.interfaces_hash)
+
+
 class TestUpdateInterfacesWithHints(
         MAASTransactionServerTestCase, UpdateInterfacesMixin):
 
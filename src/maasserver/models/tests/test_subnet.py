@@ -11,6 +11,7 @@ from datetime import (
     timedelta,
 )
 import random
+from unittest.mock import ANY
 
 from django.core.exceptions import (
     PermissionDenied,
@@ -33,6 +34,7 @@ from maasserver.models import (
     Notification,
     Space,
 )
+from maasserver.models import subnet as subnet_module
 from maasserver.models.subnet import (
     create_cidr,
     Subnet,
@@ -49,7 +51,10 @@ from maasserver.utils.orm import (
     get_one,
     reload_object,
 )
-from maastesting.matchers import DocTestMatches
+from maastesting.matchers import (
+    DocTestMatches,
+    MockCalledOnceWith,
+)
 from netaddr import (
     AddrFormatError,
     IPAddress,
@@ -58,6 +63,7 @@ from netaddr import (
 from provisioningserver.utils.network import (
     inet_ntop,
     MAASIPRange,
+    MAASIPSet,
 )
 from testtools import ExpectedException
 from testtools.matchers import (
@@ -1042,6 +1048,35 @@ class TestSubnetGetMAASIPSetForNeighbours(MAASServerTestCase):
         self.assertThat(ipset, Not(Contains("10.0.0.2")))
 
 
+class TestSubnetIPRangesInProcessPool(MAASServerTestCase):
+
+    def patch_callInProcessPool(self):
+        callInProcessPool = self.patch(subnet_module, "callInProcessPool")
+        callInProcessPool.side_effect = (
+            lambda func, *args, **kwargs: func(*args, **kwargs))
+        return callInProcessPool
+
+    def test__get_ipranges_in_use_condenses_in_process_pool(self):
+        callInProcessPool = self.patch_callInProcessPool()
+        subnet = factory.make_Subnet(
+            cidr="10.0.0.0/24", gateway_ip="10.0.0.1", dns_servers=[])
+        ipset = subnet.get_ipranges_in_use()
+        self.assertThat(
+            callInProcessPool, MockCalledOnceWith(MAASIPSet, ANY))
+        self.assertThat(ipset, Contains("10.0.0.1"))
+
+    def test__get_iprange_usage_calculates_full_range_in_process_pool(self):
+        callInProcessPool = self.patch_callInProcessPool()
+        subnet = factory.make_Subnet(
+            cidr="10.0.0.0/24", gateway_ip="10.0.0.1", dns_servers=[])
+        ipset = subnet.get_iprange_usage()
+        self.assertThat(callInProcessPool.call_args_list, HasLength(2))
+        func, network = callInProcessPool.call_args[0]
+        self.assertThat(func.__func__, Is(MAASIPSet.get_full_range))
+        self.assertThat(network, Equals(IPNetwork("10.0.0.0/24")))
+        self.assertThat(ipset, Contains("10.0.0.254"))
+
+
 class TestSubnetGetLeastRecentlySeenUnknownNeighbour(MAASServerTestCase):
 
     def test__returns_least_recently_seen_neighbour(self):
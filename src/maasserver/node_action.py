@@ -14,6 +14,7 @@ order as they do in `ACTION_CLASSES`.
 
 __all__ = [
     'compile_node_actions',
+    'perform_bulk_node_action',
 ]
 
 from abc import (
@@ -24,9 +25,13 @@ from abc import (
 from collections import OrderedDict
 
 from crochet import TimeoutError
-from django.core.exceptions import ValidationError
+from django.core.exceptions import (
+    PermissionDenied,
+    ValidationError,
+)
 from maasserver import locks
 from maasserver.clusterrpc.boot_images import RackControllersImporter
+from maasserver.clusterrpc.power import batch_power_control
 from maasserver.enum import (
     NODE_PERMISSION,
     NODE_STATUS,
@@ -36,6 +41,7 @@ from maasserver.enum import (
     POWER_STATE,
 )
 from maasserver.exceptions import (
+    MAASAPIException,
     NodeActionError,
     StaticIPAddressExhaustion,
 )
@@ -45,7 +51,11 @@ from maasserver.node_status import (
     NON_MONITORED_STATUSES,
 )
 from maasserver.preseed import get_curtin_config
-from maasserver.utils.orm import post_commit_do
+from maasserver.utils.orm import (
+    post_commit_do,
+    post_commit_hooks,
+    savepoint,
+)
 from maasserver.utils.osystems import (
     validate_hwe_kernel,
     validate_osystem_and_distro_series,
@@ -55,9 +65,13 @@ from provisioningserver.rpc.exceptions import (
     NoConnectionsAvailable,
     PowerActionAlreadyInProgress,
 )
+from provisioningserver.logger import get_maas_logger
 from provisioningserver.utils.enum import map_enum
 from provisioningserver.utils.shell import ExternalProcessError
 
+
+maaslog = get_maas_logger("node_action")
+
 # All node statuses.
 ALL_STATUSES = set(NODE_STATUS_CHOICES_DICT.keys())
 
@@ -679,3 +693,68 @@ def compile_node_actions(node, user, request=None, classes=ACTION_CLASSES):
         (action.name, action)
         for action in applicable_actions
         if action.is_permitted())
+
+
+def perform_bulk_node_action(nodes, user, action_name, params=None):
+    """Perform the action named `action_name` on each of `nodes`.
+
+    All the nodes are validated and acted upon in the current transaction,
+    each within a savepoint, so a node that cannot be acted upon does not
+    prevent the others from being. Power control of the nodes, if the
+    action needs it, is batched by rack controller; see
+    `batch_power_control`.
+
+    :param nodes: An iterable of :class:`Node`.
+    :param user: The :class:`User` performing the action.
+    :param action_name: Name of a node action in `ACTIONS_DICT`.
+    :param params: Optional `dict` of parameters to the action's `execute`.
+    :return: An :class:`OrderedDict` mapping each node's system_id to a
+        `dict` with its "result": "done", "not_actionable", "not_permitted"
+        or "failed". Failed nodes also have an "error". Nodes that fail to
+        be power controlled are marked as failed after commit, once power
+        control has been attempted.
+    """
+    action_class = ACTIONS_DICT.get(action_name)
+    if action_class is None:
+        raise NodeActionError("%s is not a valid action." % action_name)
+    if params is None:
+        params = {}
+
+    results = OrderedDict()
+
+    def record_failure(failure, system_id, hostname):
+        maaslog.error(
+            "%s: Failed to %s: %s", hostname, action_name,
+            failure.getErrorMessage())
+        results[system_id] = {
+            "result": "failed",
+            "error": failure.getErrorMessage(),
+        }
+
+    with batch_power_control():
+        for node in nodes:
+            action = action_class(node, user)
+            if not action.is_actionable() or action.inhibit() is not None:
+                results[node.system_id] = {"result": "not_actionable"}
+            elif not action.is_permitted():
+                results[node.system_id] = {"result": "not_permitted"}
+            else:
+                try:
+                    with savepoint():
+                        action.execute(**params)
+                        # Within the savepoint, these are only this node's
+                        # hooks. Failures are recorded for this node rather
+                        # than cancelling the other nodes' hooks.
+                        for hook in post_commit_hooks.hooks:
+                            hook.addErrback(
+                                record_failure, node.system_id,
+                                node.hostname)
+                except (MAASAPIException, NodeActionError,
+                        PermissionDenied, ValidationError) as error:
+                    results[node.system_id] = {
+                        "result": "failed",
+                        "error": str(error),
+                    }
+                else:
+                    results[node.system_id] = {"result": "done"}
+    return results
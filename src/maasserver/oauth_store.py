@@ -0,0 +1,194 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Caching OAuth data store for the API.
+
+Piston's `DataStore` looks up the consumer and the token in the database
+and records each nonce in a new `Nonce` row, for every API request. The
+`MAASDataStore` here serves access tokens from a short-lived cache, and
+checks nonces against recently used ones kept in memory.
+"""
+
+__all__ = [
+    "MAASDataStore",
+    "nonce_store",
+    "token_cache",
+]
+
+from copy import copy
+import threading
+import time
+
+from django.contrib.auth.models import User
+from maasserver.utils.ttlcache import TTLCache
+from piston3.models import (
+    Nonce,
+    Token,
+)
+from piston3.oauth import OAuthServer
+from piston3.store import DataStore
+
+
+class TokenCache(TTLCache):
+    """Access tokens, with their consumers, by key.
+
+    Tokens are kept for at most `ttl` seconds, and are forgotten as soon as
+    they, or their consumer, are changed or deleted in this process; see
+    `maasserver.models.signals.tokens`. Tokens deleted by other processes
+    are caught by `MAASDataStore`, which loads the token's user afresh on
+    every request.
+    """
+
+    def get(self, key):
+        """Return the access token for `key`, or `None`."""
+        try:
+            return super(TokenCache, self).get(key, self._load, key)
+        except Token.DoesNotExist:
+            return None
+
+    def _load(self, key):
+        return Token.objects.select_related("consumer").get(
+            key=key, token_type=Token.ACCESS)
+
+    def discard_consumer(self, consumer_id):
+        """Forget the tokens of the consumer with `consumer_id`."""
+        self.discard_matching(
+            lambda token: token.consumer_id == consumer_id)
+
+
+class NonceStore:
+    """Recently used OAuth nonces, kept in memory.
+
+    The OAuth server rejects requests with timestamps more than
+    `threshold` seconds old, so a nonce only needs to be remembered until
+    the timestamp of the request it came with is that old. Nonces are kept
+    in buckets spanning `bucket_size` seconds of request timestamps, and
+    buckets are dropped as a whole once they expire.
+
+    At most `max_nonces` nonces are kept in memory. Past that, nonces are
+    recorded in the database as piston would, and until those expire,
+    nonces not found in memory are looked for in the database too.
+    """
+
+    def __init__(
+            self, threshold=OAuthServer.timestamp_threshold, bucket_size=60,
+            max_nonces=100000, clock=time.time):
+        super(NonceStore, self).__init__()
+        self.threshold = threshold
+        self.bucket_size = bucket_size
+        self.max_nonces = max_nonces
+        self.clock = clock
+        self.buckets = {}
+        self.size = 0
+        # The newest bucket for which nonces have been recorded in the
+        # database instead, if any.
+        self.overflow = None
+        self.lock = threading.Lock()
+
+    def _expire(self):
+        """Drop the buckets of nonces that can no longer be replayed."""
+        oldest = (self.clock() - self.threshold) // self.bucket_size
+        for bucket in [bucket for bucket in self.buckets if bucket < oldest]:
+            self.size -= len(self.buckets.pop(bucket))
+        if self.overflow is not None and self.overflow < oldest:
+            self.overflow = None
+
+    def use(self, consumer_key, token_key, nonce, timestamp):
+        """Record the use of `nonce` in a request made at `timestamp`.
+
+        :return: True if the nonce was already used, i.e. the request is a
+            replay, False otherwise.
+        """
+        bucket = int(timestamp) // self.bucket_size
+        key = consumer_key, token_key, nonce
+        with self.lock:
+            self._expire()
+            nonces = self.buckets.get(bucket)
+            if nonces is not None and key in nonces:
+                return True
+            elif self.size < self.max_nonces:
+                self.buckets.setdefault(bucket, set()).add(key)
+                self.size += 1
+                if self.overflow is None:
+                    return False
+                in_memory = True
+            else:
+                if self.overflow is None or self.overflow < bucket:
+                    self.overflow = bucket
+                in_memory = False
+        if in_memory:
+            # It might have been recorded in the database while memory was
+            # full.
+            return Nonce.objects.filter(
+                consumer_key=consumer_key, token_key=token_key,
+                key=nonce).exists()
+        else:
+            _, created = Nonce.objects.get_or_create(
+                consumer_key=consumer_key, token_key=token_key, key=nonce)
+            return not created
+
+    def forget(self, consumer_key, token_key, nonce):
+        """Forget that `nonce` was used, so its request can be retried."""
+        key = consumer_key, token_key, nonce
+        with self.lock:
+            for nonces in self.buckets.values():
+                if key in nonces:
+                    nonces.remove(key)
+                    self.size -= 1
+
+    def clear(self):
+        """Forget all nonces."""
+        with self.lock:
+            self.buckets.clear()
+            self.size = 0
+            self.overflow = None
+
+
+token_cache = TokenCache()
+nonce_store = NonceStore()
+
+
+class MAASDataStore(DataStore):
+    """OAuth data store using `token_cache` and `nonce_store`.
+
+    Only access tokens are cached: MAAS does not use the request token
+    dance. The token's user is always loaded from the database, which also
+    checks that the token still exists.
+    """
+
+    def __init__(self, oauth_request):
+        super(MAASDataStore, self).__init__(oauth_request)
+        self.token_key = oauth_request.parameters.get("oauth_token")
+
+    def lookup_consumer(self, key):
+        if self.token_key is not None:
+            token = token_cache.get(self.token_key)
+            if token is not None and token.consumer.key == key:
+                self.consumer = token.consumer
+                return self.consumer
+        return super(MAASDataStore, self).lookup_consumer(key)
+
+    def lookup_token(self, token_type, token):
+        if token_type != "access":
+            return super(MAASDataStore, self).lookup_token(token_type, token)
+        cached = token_cache.get(token)
+        if cached is None:
+            return None
+        try:
+            user = User.objects.get(id=cached.user_id, tokens__id=cached.id)
+        except User.DoesNotExist:
+            token_cache.discard(token)
+            return None
+        # Other requests share the cached token; attach the user to a copy.
+        self.request_token = copy(cached)
+        self.request_token.user = user
+        return self.request_token
+
+    def lookup_nonce(self, oauth_consumer, oauth_token, nonce):
+        if oauth_token is None:
+            return None
+        elif nonce_store.use(
+                oauth_consumer.key, oauth_token.key, nonce, self.timestamp):
+            return nonce
+        else:
+            return None
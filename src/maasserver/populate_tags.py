@@ -4,12 +4,13 @@
 """Populate what nodes are associated with a tag."""
 
 __all__ = [
+    'match_definitions',
+    'match_nodes',
     'populate_tag_for_multiple_nodes',
     'populate_tags',
     'populate_tags_for_single_node',
 ]
 
-from functools import partial
 from math import ceil
 
 from apiclient.creds import convert_tuple_to_string
@@ -29,6 +30,7 @@ from maasserver.models.user import (
     get_auth_tokens,
     get_creds_tuple,
 )
+from maasserver.processpool import callInProcessPool
 from maasserver.rpc import getAllClients
 from maasserver.utils.orm import transactional
 from provisioningserver.logger import (
@@ -195,12 +197,12 @@ def populate_tags_for_single_node(tags, node):
     connected.
     """
     probed_details = get_single_probed_details(node)
-    probed_details_doc = merge_details(probed_details)
-    # Same document, many queries: use XPathEvaluator.
-    evaluator = etree.XPathEvaluator(probed_details_doc, namespaces=tag_nsmap)
-    evaluator = partial(try_match_xpath, doc=evaluator, logger=logger)
-    tags_defined = ((tag, tag.definition) for tag in tags if tag.is_defined)
-    tags_matching, tags_nonmatching = classify(evaluator, tags_defined)
+    tags_defined = [tag for tag in tags if tag.is_defined]
+    matches = callInProcessPool(
+        match_definitions, [tag.definition for tag in tags_defined],
+        probed_details)
+    tags_matching, tags_nonmatching = classify(
+        bool, zip(tags_defined, matches))
     node.tags.remove(*tags_nonmatching)
     node.tags.add(*tags_matching)
 
@@ -214,17 +216,47 @@ def populate_tag_for_multiple_nodes(tag, nodes, batch_size=DEFAULT_BATCH_SIZE):
     to which to farm-out work. Use this only when many nodes need reevaluating
     locally, i.e. when there are no rack controllers connected.
     """
-    # Same expression, multuple documents: compile expression with XPath.
-    xpath = etree.XPath(tag.definition, namespaces=tag_nsmap)
     # The XML details documents can be large so work in batches.
     for batch in gen_batches(nodes, batch_size):
         probed_details = get_probed_details(batch)
-        probed_details_docs_by_node = {
-            node: merge_details(probed_details[node.system_id])
-            for node in batch
-        }
+        system_ids_matching = callInProcessPool(
+            match_nodes, tag.definition, probed_details)
         nodes_matching, nodes_nonmatching = classify(
-            partial(try_match_xpath, xpath, logger=maaslog),
-            probed_details_docs_by_node.items())
+            system_ids_matching.__contains__,
+            ((node, node.system_id) for node in batch))
         tag.node_set.remove(*nodes_nonmatching)
         tag.node_set.add(*nodes_matching)
+
+
+def match_definitions(definitions, probed_details):
+    """Evaluate each of `definitions` against a node's `probed_details`.
+
+    This is CPU-bound, so it is called in the process pool.
+
+    :return: A list of booleans, one for each of `definitions`.
+    """
+    probed_details_doc = merge_details(probed_details)
+    # Same document, many queries: use XPathEvaluator.
+    evaluator = etree.XPathEvaluator(probed_details_doc, namespaces=tag_nsmap)
+    return [
+        try_match_xpath(definition, doc=evaluator, logger=logger)
+        for definition in definitions
+    ]
+
+
+def match_nodes(definition, probed_details):
+    """Evaluate `definition` against the probed details of many nodes.
+
+    This is CPU-bound, so it is called in the process pool.
+
+    :param probed_details: A dict mapping system IDs to probed details, as
+        returned by `get_probed_details`.
+    :return: The set of system IDs of the nodes that match.
+    """
+    # Same expression, multiple documents: compile expression with XPath.
+    xpath = etree.XPath(definition, namespaces=tag_nsmap)
+    return {
+        system_id
+        for system_id, details in probed_details.items()
+        if try_match_xpath(xpath, merge_details(details), logger=maaslog)
+    }
@@ -25,8 +25,6 @@ from urllib.parse import (
 )
 
 from crochet import TimeoutError
-from curtin.config import merge_config
-from curtin.pack import pack_install
 from django.conf import settings
 from maasserver import logger
 from maasserver.clusterrpc.boot_images import get_boot_images_for
@@ -55,8 +53,10 @@ from maasserver.models import (
 )
 from maasserver.models.filesystem import Filesystem
 from maasserver.node_status import COMMISSIONING_LIKE_STATUSES
+from maasserver.preseed_cache import fragment_cache
 from maasserver.preseed_network import compose_curtin_network_config
 from maasserver.preseed_storage import compose_curtin_storage_config
+from maasserver.processpool import callInProcessPool
 from maasserver.server_address import get_maas_facing_server_host
 from maasserver.third_party_drivers import get_third_party_driver
 from maasserver.utils import absolute_reverse
@@ -272,6 +272,15 @@ def compose_curtin_cloud_config(node):
     return [yaml.safe_dump(config)]
 
 
+def get_rack_controller_key(rack_controller):
+    """Return what fragments rendered for `rack_controller` depend on, for
+    use in `fragment_cache` keys."""
+    if rack_controller is None:
+        return None
+    else:
+        return rack_controller.id, rack_controller.url
+
+
 def compose_curtin_archive_config(node):
     """Return the curtin preseed for configuring a node's apt sources.
 
@@ -280,8 +289,14 @@ def compose_curtin_archive_config(node):
     for Ubuntu.
     """
     if node.osystem in ['ubuntu', 'custom']:
-        archives = get_archive_config(node)
-        return [yaml.safe_dump(archives)]
+        # This only depends on the node's architecture and its boot rack
+        # controller, which provides the APT proxy.
+        key = (
+            "archive", node.split_arch()[0],
+            get_rack_controller_key(node.get_boot_rack_controller()))
+        archives = fragment_cache.get(
+            key, lambda: yaml.safe_dump(get_archive_config(node)))
+        return [archives]
     return []
 
 
@@ -333,7 +348,9 @@ def compose_curtin_verbose_preseed():
     """Return the curtin options for the preseed that will tell curtin
     to run with high verbosity.
     """
-    if Config.objects.get_config("curtin_verbose"):
+    verbose = fragment_cache.get(
+        ("curtin_verbose",), Config.objects.get_config, "curtin_verbose")
+    if verbose:
         return [yaml.safe_dump({
             "verbosity": 3,
             "showtrace": True,
@@ -396,6 +413,7 @@ def get_curtin_yaml_config(node, default_region_ip=None):
 
 def get_curtin_merged_config(node):
     """Return the merged curtin configuration for the node."""
+    from curtin.config import merge_config
     yaml_config = get_curtin_yaml_config(node)
     config = {}
     for cfg in yaml_config:
@@ -411,18 +429,34 @@ def get_curtin_userdata(node, default_region_ip=None):
     :rtype: unicode.
     """
     # Pack the curtin and the configuration into a script to execute on the
-    # deploying node.
+    # deploying node. Curtin is imported here because it's only needed when
+    # deploying, and it's slow to import.
+    from curtin.pack import pack_install
     return pack_install(
         configs=get_curtin_yaml_config(node, default_region_ip),
         args=[get_curtin_installer_url(node)])
 
 
 def get_curtin_image(node):
-    """Return boot image that supports 'xinstall' for the given node."""
+    """Return boot image that supports 'xinstall' for the given node.
+
+    Images are asked of the node's boot rack controller once for all the
+    nodes with the same operating system and architecture, as long as it is
+    kept in `fragment_cache`.
+    """
     osystem = node.get_osystem()
     series = node.get_distro_series()
     arch, subarch = node.split_arch()
     rack_controller = node.get_boot_rack_controller()
+    key = (
+        "curtin_image", get_rack_controller_key(rack_controller),
+        osystem, arch, subarch, series)
+    return dict(fragment_cache.get(
+        key, _get_curtin_image, rack_controller, osystem, arch, subarch,
+        series))
+
+
+def _get_curtin_image(rack_controller, osystem, arch, subarch, series):
     try:
         images = get_boot_images_for(
             rack_controller, osystem, arch, subarch, series)
@@ -493,9 +527,13 @@ def get_curtin_config(node, default_region_ip=None):
     template = load_preseed_template(
         node, USERDATA_TYPE.CURTIN, osystem, series)
     rack_controller = node.get_boot_rack_controller()
-    context = get_preseed_context(
-        osystem, series, rack_controller=rack_controller,
-        default_region_ip=default_region_ip)
+    key = (
+        "preseed_context", osystem, series,
+        get_rack_controller_key(rack_controller), default_region_ip)
+    context = dict(fragment_cache.get(
+        key, get_preseed_context, osystem, series,
+        rack_controller=rack_controller,
+        default_region_ip=default_region_ip))
     context.update(
         get_node_preseed_context(
             node, osystem, series, rack_controller=rack_controller,
@@ -508,22 +546,16 @@ def get_curtin_config(node, default_region_ip=None):
         'main_archive_hostname', 'main_archive_directory',
         'ports_archive_hostname', 'ports_archive_directory',
         'enable_http_proxy', 'http_proxy']
-    deprecated_config_variables = []
     for var in deprecated_context_variables:
         if var not in context:
             deprecated_context_variables.remove(var)
-    context.update(get_node_deprecated_preseed_context())
-    config = yaml.safe_load(template.substitute(**context))
-    # Remove deprecated config from the curtin preseed.
-    if 'power_state' in config:
-        del config['power_state']
-        deprecated_config_variables.append('power_state')
-    if 'apt_proxy' in config:
-        deprecated_config_variables.append('apt_proxy')
-        del config['apt_proxy']
-    if 'apt_mirrors' in config:
-        deprecated_config_variables.append('apt_mirrors')
-        del config['apt_mirrors']
+    context.update(fragment_cache.get(
+        ("deprecated_preseed_context",),
+        get_node_deprecated_preseed_context))
+    # Parsing and dumping the YAML is CPU-bound; do it in the process pool.
+    config, deprecated_config_variables = callInProcessPool(
+        finalise_curtin_config, template.substitute(**context),
+        node.distro_series)
     if deprecated_context_variables:
         log.warn(
             "WARNING: '%s' contains deprecated preseed "
@@ -534,9 +566,32 @@ def get_curtin_config(node, default_region_ip=None):
             "WARNING: '%s' contains deprecated preseed "
             "configuration. Please remove: %s" % (
                 template.name, ", ".join(deprecated_config_variables)))
+    return config
+
+
+def finalise_curtin_config(rendered, distro_series):
+    """Finalise a rendered curtin configuration for `distro_series`.
+
+    :return: A ``(config, deprecated_config_variables)`` tuple, where
+        ``config`` is the final configuration as YAML, and
+        ``deprecated_config_variables`` lists the deprecated settings that
+        were removed from it.
+    """
+    config = yaml.safe_load(rendered)
+    deprecated_config_variables = []
+    # Remove deprecated config from the curtin preseed.
+    if 'power_state' in config:
+        del config['power_state']
+        deprecated_config_variables.append('power_state')
+    if 'apt_proxy' in config:
+        deprecated_config_variables.append('apt_proxy')
+        del config['apt_proxy']
+    if 'apt_mirrors' in config:
+        deprecated_config_variables.append('apt_mirrors')
+        del config['apt_mirrors']
     # Precise does not support cloud-init performing the reboot, so curtin
     # must have this statement.
-    if node.distro_series == "precise":
+    if distro_series == "precise":
         config['power_state'] = {'mode': 'reboot'}
     # Ensure we always set debconf_selections for grub to ensure it doesn't
     # overwrite the config sent by MAAS. See LP: #1642298
@@ -545,7 +600,7 @@ def get_curtin_config(node, default_region_ip=None):
         config['debconf_selections'].update(grub2_debconf)
     else:
         config['debconf_selections'] = grub2_debconf
-    return yaml.safe_dump(config)
+    return yaml.safe_dump(config), deprecated_config_variables
 
 
 def get_curtin_context(node, rack_controller=None, default_region_ip=None):
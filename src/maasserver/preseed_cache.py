@@ -0,0 +1,70 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Cache of curtin preseed fragments shared between nodes.
+
+Much of a node's curtin configuration is the same for every node with the
+same architecture, operating system, and boot rack controller: the archive
+configuration, the installer image, and most of the template context. When
+many nodes are deployed at once, they all ask for their configuration at
+about the same time, so these fragments are worked out once and shared.
+"""
+
+__all__ = [
+    "INVALIDATE_CHANNEL",
+    "fragment_cache",
+]
+
+from django.db import (
+    connection,
+    transaction,
+)
+from maasserver.utils.ttlcache import TTLCache
+
+# Region processes listen on this channel to know when to forget fragments.
+INVALIDATE_CHANNEL = "sys_preseed_cache"
+
+
+class FragmentCache(TTLCache):
+    """Preseed fragments, by key.
+
+    Fragments are kept for at most `ttl` seconds, and all are forgotten, in
+    every region process, once a change to the configuration, package
+    repositories, or boot resources is committed; see `invalidate`.
+    """
+
+    def get(self, key, compute, *args, **kwargs):
+        """Return the fragment for `key`.
+
+        Fragments are neither taken from nor put into the cache while the
+        current transaction has changes that invalidate it, since those
+        changes could yet be rolled back.
+        """
+        if self.invalidated_in_transaction():
+            return compute(*args, **kwargs)
+        else:
+            return super(FragmentCache, self).get(
+                key, compute, *args, **kwargs)
+
+    def invalidate(self):
+        """Forget all fragments once the current transaction commits.
+
+        Other region processes are told to do the same with a notification
+        on `INVALIDATE_CHANNEL`, which PostgreSQL only delivers on commit.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("NOTIFY %s;" % INVALIDATE_CHANNEL)
+        transaction.on_commit(self.clear)
+
+    def invalidated_in_transaction(self):
+        """Has `invalidate` been called in the current transaction?"""
+        return connection.in_atomic_block and any(
+            func == self.clear for _, func in connection.run_on_commit)
+
+    def handle_notification(self, channel, payload):
+        """Forget all fragments; called for notifications sent by
+        `invalidate`."""
+        self.clear()
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,169 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Process pool for CPU-bound work in the region.
+
+Each regiond process runs the reactor and all of its database threads under
+one GIL, so a long stretch of pure-Python work -- generating DNS zones,
+condensing IP ranges, evaluating tags, rendering curtin configuration --
+delays everything else the process does, websocket traffic included. The
+`ProcessPoolService` hands such work to a small pool of helper processes.
+The pool is started when work is first sent to it, so only processes that
+use it pay for it.
+
+Functions, arguments, and results must all be picklable. The helper
+processes are forked from a clean fork server, not from regiond itself, so
+they have no reactor and start with no database connections; Django is set
+up in each as it starts. Work that needs the database must be sent with
+`callInProcessPoolWithDatabase`.
+
+The work is sent from threads, e.g. database threads, and blocks the
+calling thread, though without holding the GIL, until the work is done.
+When no pool is running in this process, as in tests and command-line
+tools, the work is done locally instead.
+"""
+
+__all__ = [
+    "callInProcessPool",
+    "callInProcessPoolWithDatabase",
+    "ProcessPoolService",
+]
+
+import multiprocessing
+import os
+import threading
+
+import django
+from django.db import connections
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.utils.twisted import asynchronous
+from twisted.application.service import Service
+from twisted.internet.threads import deferToThread
+
+
+log = LegacyLogger()
+
+
+def get_process_pool_size():
+    """Return the number of helper processes to run.
+
+    One is enough: each process sends work to the pool one piece at a time
+    from only a few threads. ``MAAS_REGIOND_PROCESS_POOL_SIZE`` overrides
+    this.
+    """
+    size = os.environ.get("MAAS_REGIOND_PROCESS_POOL_SIZE")
+    if size is None:
+        return 1
+    else:
+        return max(1, int(size))
+
+
+def _initialise_helper():
+    """Prepare a new helper process to do work."""
+    # Most of the work is defined in modules that define or use models, so
+    # they can't be imported, nor the work unpickled, until Django is set up.
+    django.setup()
+
+
+# The running service in this process, if any. Set by `ProcessPoolService`.
+_service = None
+
+
+class ProcessPoolService(Service, object):
+    """Run a pool of helper processes for CPU-bound work.
+
+    While this service is running, `callInProcessPool` and
+    `callInProcessPoolWithDatabase` send work to its pool, starting the pool
+    the first time.
+    """
+
+    def __init__(self, size=None):
+        super(ProcessPoolService, self).__init__()
+        self.size = get_process_pool_size() if size is None else size
+        self.pool = None
+        self.lock = threading.Lock()
+
+    @asynchronous
+    def startService(self):
+        global _service
+        super(ProcessPoolService, self).startService()
+        _service = self
+
+    @asynchronous
+    def stopService(self):
+        global _service
+        if _service is self:
+            _service = None
+        d = super(ProcessPoolService, self).stopService()
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            # Terminating the pool waits for its processes to exit; do that
+            # in a thread so as not to block the reactor.
+            d = deferToThread(pool.terminate)
+        return d
+
+    def getPool(self):
+        """Return the pool, starting it if needed.
+
+        :return: The pool, or `None` if this service has been stopped.
+        """
+        with self.lock:
+            if self.pool is None and self.running:
+                # Fork helpers from a fork server rather than from this
+                # process: a fork of regiond would inherit its threads,
+                # reactor, and database connections.
+                context = multiprocessing.get_context("forkserver")
+                self.pool = context.Pool(
+                    self.size, initializer=_initialise_helper)
+                log.msg(
+                    "Process pool started with %d process(es)." % self.size)
+            return self.pool
+
+
+def _get_pool():
+    """Return the pool to send work to, or `None` if there isn't one."""
+    service = _service
+    if service is None:
+        return None
+    else:
+        return service.getPool()
+
+
+def callInProcessPool(func, *args, **kwargs):
+    """Call `func` in the process pool and wait for its result.
+
+    This must not be called from the reactor thread. When there is no
+    process pool, `func` is called directly.
+    """
+    pool = _get_pool()
+    if pool is None:
+        return func(*args, **kwargs)
+    else:
+        return pool.apply(func, args, kwargs)
+
+
+def _call_with_database(func, args, kwargs):
+    """Call `func` in a helper process, then close its database connections.
+
+    Closing them means that idle helpers don't hold connections.
+    """
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connections.close_all()
+
+
+def callInProcessPoolWithDatabase(func, *args, **kwargs):
+    """Call `func`, which uses the database, in the process pool.
+
+    This is like `callInProcessPool` except that `func` can use the
+    database. It must manage its own transactions: it runs in a separate
+    transaction from its caller, so it does not see changes that the caller
+    has not committed.
+    """
+    pool = _get_pool()
+    if pool is None:
+        return func(*args, **kwargs)
+    else:
+        return pool.apply(_call_with_database, (func, args, kwargs))
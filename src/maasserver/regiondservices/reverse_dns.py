@@ -7,6 +7,8 @@ __all__ = [
     "ReverseDNSService"
 ]
 
+from collections import OrderedDict
+from datetime import timedelta
 from typing import List
 
 from maasserver.listener import PostgresListenerService
@@ -19,21 +21,41 @@ from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.network import reverseResolve
 from provisioningserver.utils.twisted import suppress
 from twisted.application.service import Service
-from twisted.internet import defer
+from twisted.internet import (
+    defer,
+    reactor,
+)
 
 
 log = LegacyLogger()
 
 
 class ReverseDNSService(Service):
-    """Service to resolve and cache reverse DNS names for neighbour entries."""
+    """Service to resolve and cache reverse DNS names for neighbour entries.
+
+    Neighbours are updated every time they're observed, so an IP address
+    that has been resolved recently is not resolved again for each update.
+    """
+
+    # Don't resolve an IP address again within this many seconds.
+    resolve_interval = timedelta(minutes=5).total_seconds()
+
+    # Remember when at most this many IP addresses were resolved.
+    resolved_cache_size = 10000
 
-    def __init__(self, postgresListener: PostgresListenerService=None):
+    def __init__(
+            self, postgresListener: PostgresListenerService=None,
+            clock=None):
         super().__init__()
         self.listener = postgresListener
+        self.clock = reactor if clock is None else clock
         # We will cache a reference to the region model object so we don't
         # need to look it up every time a DNS entry changes.
         self.region = None
+        # IP addresses being resolved right now.
+        self.resolving = set()
+        # When IP addresses were last resolved, least recent first.
+        self.resolved = OrderedDict()
 
     @defer.inlineCallbacks
     def startService(self):
@@ -68,6 +90,24 @@ class ReverseDNSService(Service):
         """
         RDNS.objects.delete_current_entry(ip, self.region)
 
+    def _shouldResolve(self, ip: str) -> bool:
+        """Return True if `ip` is not being, and hasn't recently been,
+        resolved."""
+        if ip in self.resolving:
+            return False
+        resolved_at = self.resolved.get(ip)
+        if resolved_at is None:
+            return True
+        else:
+            return self.clock.seconds() - resolved_at >= self.resolve_interval
+
+    def _resolved(self, ip: str):
+        """Record that `ip` has just been resolved."""
+        self.resolved.pop(ip, None)
+        self.resolved[ip] = self.clock.seconds()
+        while len(self.resolved) > self.resolved_cache_size:
+            self.resolved.popitem(last=False)
+
     @defer.inlineCallbacks
     def consumeNeighbourEvent(self, action: str=None, cidr: str=None):
         """Given an event from the postgresListener, resolve RDNS for an IP.
@@ -81,14 +121,19 @@ class ReverseDNSService(Service):
         """
         ip = cidr.split('/')[0]  # Strip off the "/<prefixlen>".
         if action in ('create', 'update'):
-            # XXX mpontillo 2016-10-19: We might consider throttling this on
-            # a per-IP-address basis, both because multiple racks can observe
-            # the same IP address, and because an IP address might repeatedly
-            # go back-and-forth between two MACs in the case of a duplicate IP
-            # address.
-            results = yield reverseResolve(ip).addErrback(
-                suppress, defer.TimeoutError, instead=None)
+            # Multiple racks can observe the same IP address, and every
+            # observation updates the neighbour, so only resolve each IP
+            # address once in a while.
+            if not self._shouldResolve(ip):
+                return
+            self.resolving.add(ip)
+            try:
+                results = yield reverseResolve(ip).addErrback(
+                    suppress, defer.TimeoutError, instead=None)
+            finally:
+                self.resolving.discard(ip)
             if results is not None:
+                self._resolved(ip)
                 if len(results) > 0:
                     yield deferToDatabase(self.set_rdns_entry, ip, results)
                 else:
@@ -98,6 +143,7 @@ class ReverseDNSService(Service):
                 # temporary failure, so take no action.
                 pass
         elif action == 'delete':
+            self.resolved.pop(ip, None)
             yield deferToDatabase(self.delete_rdns_entry, ip)
         else:
             log.msg("Unsupported event from listener: action=%r, cidr=%r" % (
@@ -5,7 +5,10 @@
 
 __all__ = []
 
-from unittest.mock import Mock
+from unittest.mock import (
+    call,
+    Mock,
+)
 
 from crochet import wait_for
 from maasserver.models import RDNS
@@ -14,7 +17,10 @@ from maasserver.regiondservices.reverse_dns import ReverseDNSService
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASTransactionServerTestCase
 from maasserver.utils.threads import deferToDatabase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+)
 from provisioningserver.utils.testing import callWithServiceRunning
 from provisioningserver.utils.tests.test_network import (
     TestReverseResolveMixIn,
@@ -25,6 +31,7 @@ from testtools.matchers import (
 )
 from twisted.internet import defer
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import Clock
 
 
 class TestReverseDNSService(
@@ -71,11 +78,13 @@ class TestReverseDNSService(
         hostname = factory.make_hostname()
         hostname2 = factory.make_hostname()
         self.set_fake_twisted_dns_reply([hostname])
-        service = ReverseDNSService()
+        clock = Clock()
+        service = ReverseDNSService(clock=clock)
         yield service.startService()
         ip = factory.make_ip_address(ipv6=False)
         yield service.consumeNeighbourEvent("create", "%s/32" % ip)
         self.set_fake_twisted_dns_reply([hostname2])
+        clock.advance(service.resolve_interval)
         yield service.consumeNeighbourEvent("update", "%s/32" % ip)
         service.stopService()
         result = yield deferToDatabase(RDNS.objects.first)
@@ -125,3 +134,58 @@ class TestReverseDNSService(
         self.assertThat(reverseResolve, MockCalledOnceWith(ip))
         result = yield deferToDatabase(RDNS.objects.first)
         self.assertThat(result, Is(None))
+
+    @wait_for(30)
+    @inlineCallbacks
+    def test__does_not_resolve_again_within_interval(self):
+        reverseResolve = self.patch(reverse_dns_module, "reverseResolve")
+        reverseResolve.side_effect = lambda ip: defer.succeed([])
+        ip = factory.make_ip_address(ipv6=False)
+        clock = Clock()
+        service = ReverseDNSService(clock=clock)
+        yield service.startService()
+        yield service.consumeNeighbourEvent("create", "%s/32" % ip)
+        clock.advance(service.resolve_interval - 1)
+        yield service.consumeNeighbourEvent("update", "%s/32" % ip)
+        self.assertThat(reverseResolve, MockCalledOnceWith(ip))
+        clock.advance(1)
+        yield service.consumeNeighbourEvent("update", "%s/32" % ip)
+        service.stopService()
+        self.assertThat(reverseResolve, MockCallsMatch(call(ip), call(ip)))
+
+    @wait_for(30)
+    @inlineCallbacks
+    def test__does_not_resolve_while_resolving(self):
+        reverseResolve = self.patch(reverse_dns_module, "reverseResolve")
+        reverseResolve.return_value = defer.Deferred()
+        ip = factory.make_ip_address(ipv6=False)
+        service = ReverseDNSService(clock=Clock())
+        yield service.startService()
+        d = service.consumeNeighbourEvent("create", "%s/32" % ip)
+        yield service.consumeNeighbourEvent("update", "%s/32" % ip)
+        reverseResolve.return_value.callback([])
+        yield d
+        service.stopService()
+        self.assertThat(reverseResolve, MockCalledOnceWith(ip))
+
+    @wait_for(30)
+    @inlineCallbacks
+    def test__resolves_again_after_delete(self):
+        reverseResolve = self.patch(reverse_dns_module, "reverseResolve")
+        reverseResolve.side_effect = lambda ip: defer.succeed([])
+        ip = factory.make_ip_address(ipv6=False)
+        service = ReverseDNSService(clock=Clock())
+        yield service.startService()
+        yield service.consumeNeighbourEvent("create", "%s/32" % ip)
+        yield service.consumeNeighbourEvent("delete", "%s/32" % ip)
+        yield service.consumeNeighbourEvent("create", "%s/32" % ip)
+        service.stopService()
+        self.assertThat(reverseResolve, MockCallsMatch(call(ip), call(ip)))
+
+    def test__limits_size_of_resolved_cache(self):
+        service = ReverseDNSService(clock=Clock())
+        service.resolved_cache_size = 2
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            service._resolved(ip)
+        self.assertThat(
+            list(service.resolved), Equals(["10.0.0.2", "10.0.0.3"]))
@@ -33,7 +33,6 @@ from maasserver.models import (
 )
 from maasserver.models.timestampedmodel import now
 from maasserver.utils.orm import transactional
-from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.rpc.exceptions import (
     CommissionNodeFailed,
     NodeAlreadyExists,
@@ -69,6 +68,9 @@ def _gen_cluster_nodes_power_parameters(nodes):
 
     :return: A generator yielding `dict`s.
     """
+    # Importing the registry imports every power driver; only do so when
+    # needed.
+    from provisioningserver.drivers.power.registry import PowerDriverRegistry
     five_minutes_ago = now() - timedelta(minutes=5)
     queryable_power_types = [
         driver.name
@@ -4,6 +4,7 @@
 """RPC helpers relating to rack controllers."""
 
 __all__ = [
+    "check_interfaces",
     "handle_upgrade",
     "register",
     "update_interfaces",
@@ -19,6 +20,7 @@ from maasserver import (
 )
 from maasserver.enum import NODE_TYPE
 from maasserver.models import (
+    ControllerInfo,
     Domain,
     Node,
     NodeGroupToRackController,
@@ -222,10 +224,24 @@ def update_foreign_dhcp(system_id, interface_name, dhcp_ip=None):
 
 @synchronous
 @transactional
-def update_interfaces(system_id, interfaces, topology_hints=None):
+def update_interfaces(
+        system_id, interfaces, topology_hints=None, interfaces_hash=None):
     """Update the interface definition on the rack controller."""
     rack_controller = RackController.objects.get(system_id=system_id)
-    rack_controller.update_interfaces(interfaces, topology_hints)
+    rack_controller.update_interfaces(
+        interfaces, topology_hints, interfaces_hash=interfaces_hash)
+
+
+@synchronous
+@transactional
+def check_interfaces(system_id, interfaces_hash):
+    """Check if the rack controller's interface definition has changed.
+
+    :return: False if `interfaces_hash` is the hash of the interface
+        definition last applied to the rack controller, True otherwise.
+    """
+    return not ControllerInfo.objects.filter(
+        node__system_id=system_id, interfaces_hash=interfaces_hash).exists()
 
 
 @synchronous
@@ -76,7 +76,11 @@ from provisioningserver.rpc import (
     exceptions,
     region,
 )
-from provisioningserver.rpc.common import RPCProtocol
+from provisioningserver.rpc.arguments import choose_compression_codec
+from provisioningserver.rpc.common import (
+    RPCProtocol,
+    select_connection,
+)
 from provisioningserver.rpc.exceptions import NoSuchCluster
 from provisioningserver.rpc.interfaces import IConnection
 from provisioningserver.security import calculate_digest
@@ -400,7 +404,9 @@ class Region(RPCProtocol):
         return d
 
     @region.UpdateInterfaces.responder
-    def update_interfaces(self, system_id, interfaces, topology_hints=None):
+    def update_interfaces(
+            self, system_id, interfaces, topology_hints=None,
+            interfaces_hash=None):
         """update_interfaces()
 
         Implementation of
@@ -408,10 +414,22 @@ class Region(RPCProtocol):
         """
         d = deferToDatabase(
             rackcontrollers.update_interfaces, system_id, interfaces,
-            topology_hints=topology_hints)
+            topology_hints=topology_hints, interfaces_hash=interfaces_hash)
         d.addCallback(lambda args: {})
         return d
 
+    @region.CheckInterfaces.responder
+    def check_interfaces(self, system_id, interfaces_hash):
+        """check_interfaces()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.CheckInterfaces`.
+        """
+        d = deferToDatabase(
+            rackcontrollers.check_interfaces, system_id, interfaces_hash)
+        d.addCallback(lambda changed: {'changed': changed})
+        return d
+
     @region.GetDiscoveryState.responder
     def get_discovery_state(self, system_id):
         """get_interface_monitoring_state()
@@ -612,7 +630,7 @@ class RegionServer(Region):
     @inlineCallbacks
     def register(
             self, system_id, hostname, interfaces, url, nodegroup_uuid=None,
-            beacon_support=False, version=None):
+            beacon_support=False, version=None, compression=None):
         # Hold off on fabric creation if the remote controller
         # supports beacons; it will happen later when UpdateInterfaces is
         # called.
@@ -627,6 +645,11 @@ class RegionServer(Region):
         if version:
             # The remote supports version checking, so reply to that.
             result['version'] = get_maas_version()
+        if compression is not None:
+            # The remote can negotiate compression; use the best codec we
+            # both support from now on, in both directions.
+            self.compression = choose_compression_codec(compression)
+            result['compression'] = self.compression
         return result
 
     @inlineCallbacks
@@ -838,15 +861,16 @@ class RegionService(service.Service, object):
             waiters.add(d)
             return d
         else:
-            connection = random.choice(conns)
+            connection = select_connection(conns)
             return defer.succeed(connection)
 
     def _getConnectionFromIdentifiers(self, identifiers, timeout):
         """Wait up to `timeout` seconds for at least one connection from
         `identifiers`.
 
-        Returns a `Deferred` which will fire with a list of random connections
-        to each client. Only one connection per client will be returned.
+        Returns a `Deferred` which will fire with a list of connections, the
+        least loaded to each client; see `select_connection`. Only one
+        connection per client will be returned.
 
         The public interface to this method is `getClientFromIdentifiers`.
         """
@@ -854,7 +878,7 @@ class RegionService(service.Service, object):
         for ident in identifiers:
             conns = list(self.connections[ident])
             if len(conns) > 0:
-                matched_connections.append(random.choice(conns))
+                matched_connections.append(select_connection(conns))
         if len(matched_connections) > 0:
             return defer.succeed(matched_connections)
         else:
@@ -1009,7 +1033,7 @@ class RegionService(service.Service, object):
 
         If more than one connection exists to that rack controller - implying
         that there are multiple rack controllers for the particular
-        cluster, for HA - one of them will be returned at random.
+        cluster, for HA - the least loaded of them will be returned.
 
         :param system_id: The system_id - as a string - of the rack controller
             that a connection is wanted for.
@@ -1037,7 +1061,7 @@ class RegionService(service.Service, object):
         identifiers.
 
         If more than one connection exists to that given `identifiers`, then
-        one of them will be returned at random.
+        the least loaded of them will be returned.
 
         :param identifiers: List of system_id's of the rack controller
             that a connection is wanted for.
@@ -1055,7 +1079,7 @@ class RegionService(service.Service, object):
                 "available." % ','.join(identifiers))
 
         def cb_client(conns):
-            connection = random.choice(conns)
+            connection = select_connection(conns)
             return RackClient(connection, self.connectionsCache[connection])
 
         return d.addCallbacks(cb_client, cancelled)
@@ -1068,7 +1092,7 @@ class RegionService(service.Service, object):
             return RackClient(connection, self.connectionsCache[connection])
 
         return [
-            _client(random.choice(list(connections)))
+            _client(select_connection(connections))
             for connections in self.connections.values()
             if len(connections) > 0
         ]
@@ -1086,7 +1110,7 @@ class RegionService(service.Service, object):
             # The connection object is a set of RegionServer objects.
             # Make sure a sane set was returned.
             assert len(connection) > 0, "Connection set empty."
-            connection = random.choice(list(connection))
+            connection = select_connection(connection)
             return RackClient(connection, self.connectionsCache[connection])
 
 
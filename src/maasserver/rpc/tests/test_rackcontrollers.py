@@ -20,6 +20,7 @@ from maasserver.enum import (
     NODE_TYPE,
 )
 from maasserver.models import (
+    ControllerInfo,
     Node,
     NodeGroupToRackController,
     RackController,
@@ -29,6 +30,7 @@ from maasserver.models.interface import PhysicalInterface
 from maasserver.models.timestampedmodel import now
 from maasserver.rpc import rackcontrollers
 from maasserver.rpc.rackcontrollers import (
+    check_interfaces,
     handle_upgrade,
     register,
     report_neighbours,
@@ -477,7 +479,34 @@ class TestUpdateInterfaces(MAASServerTestCase):
         update_interfaces(rack_controller.system_id, sentinel.interfaces)
         self.assertThat(
             patched_update_interfaces,
-            MockCalledOnceWith(sentinel.interfaces, None))
+            MockCalledOnceWith(
+                sentinel.interfaces, None, interfaces_hash=None))
+
+
+class TestCheckInterfaces(MAASServerTestCase):
+
+    def test__returns_false_if_hash_matches_last_update(self):
+        rack_controller = factory.make_RackController()
+        interfaces_hash = factory.make_name("hash")
+        ControllerInfo.objects.set_interface_update_info(
+            rack_controller, {}, None, interfaces_hash=interfaces_hash)
+        self.assertFalse(
+            check_interfaces(rack_controller.system_id, interfaces_hash))
+
+    def test__returns_true_if_hash_differs_from_last_update(self):
+        rack_controller = factory.make_RackController()
+        ControllerInfo.objects.set_interface_update_info(
+            rack_controller, {}, None,
+            interfaces_hash=factory.make_name("hash"))
+        self.assertTrue(
+            check_interfaces(
+                rack_controller.system_id, factory.make_name("hash")))
+
+    def test__returns_true_if_never_updated(self):
+        rack_controller = factory.make_RackController()
+        self.assertTrue(
+            check_interfaces(
+                rack_controller.system_id, factory.make_name("hash")))
 
 
 class TestReportNeighbours(MAASServerTestCase):
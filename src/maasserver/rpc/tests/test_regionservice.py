@@ -438,6 +438,23 @@ class TestRegionServer(MAASTransactionServerTestCase):
         self.assertThat(
             response['version'], Equals(get_maas_version()))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_register_negotiates_compression(self):
+        yield self.installFakeRegionAdvertisingService()
+        rack_controller = yield deferToDatabase(factory.make_RackController)
+        protocol = self.make_Region()
+        protocol.transport = MagicMock()
+        response = yield call_responder(
+            protocol, RegisterRackController, {
+                "system_id": rack_controller.system_id,
+                "hostname": rack_controller.hostname,
+                "interfaces": {},
+                "compression": ["lzma", "zlib"],
+            })
+        self.assertThat(response['compression'], Equals("zlib"))
+        self.assertThat(protocol.compression, Equals("zlib"))
+
     @wait_for_reactor
     @inlineCallbacks
     def test_register_updates_interfaces(self):
@@ -968,7 +985,7 @@ class TestRegionService(MAASTestCase):
             exceptions.NoConnectionsAvailable)
 
     @wait_for_reactor
-    def test_getClientFor_returns_random_connection(self):
+    def test_getClientFor_returns_selected_connection(self):
         c1 = DummyConnection()
         c2 = DummyConnection()
         chosen = DummyConnection()
@@ -981,7 +998,7 @@ class TestRegionService(MAASTestCase):
         def check_choice(choices):
             self.assertItemsEqual(choices, conns_for_uuid)
             return chosen
-        self.patch(random, "choice", check_choice)
+        self.patch(regionservice, "select_connection", check_choice)
 
         def check(client):
             self.assertThat(client, Equals(RackClient(chosen, {})))
@@ -73,6 +73,7 @@ from provisioningserver.rpc.exceptions import (
 )
 from provisioningserver.rpc.region import (
     Authenticate,
+    CheckInterfaces,
     CommissionNode,
     CreateNode,
     GetArchiveMirrors,
@@ -1183,7 +1184,37 @@ class TestRegionProtocol_UpdateInterfaces(MAASTransactionServerTestCase):
             update_interfaces,
             MockCalledOnceWith(
                 params['system_id'], params['interfaces'],
-                topology_hints=None))
+                topology_hints=None, interfaces_hash=None))
+
+
+class TestRegionProtocol_CheckInterfaces(MAASTransactionServerTestCase):
+
+    def test_check_interfaces_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(
+            CheckInterfaces.commandName)
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_check_interfaces_function(self):
+        check_interfaces = self.patch(
+            regionservice.rackcontrollers, 'check_interfaces')
+        check_interfaces.return_value = False
+
+        params = {
+            'system_id': factory.make_name('system_id'),
+            'interfaces_hash': factory.make_name('hash'),
+        }
+
+        response = yield call_responder(
+            Region(), CheckInterfaces, params)
+        self.assertThat(response, Equals({'changed': False}))
+
+        self.assertThat(
+            check_interfaces,
+            MockCalledOnceWith(
+                params['system_id'], params['interfaces_hash']))
 
 
 class TestRegionProtocol_ReportNeighbours(MAASTestCase):
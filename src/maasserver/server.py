@@ -66,6 +66,14 @@ def run():
         runWorkerServices()
         return
 
+    # The fork server is spawned by the master in the same way as a worker,
+    # and forks workers when the master asks; see `maasserver.forkserver`.
+    if os.environ.get('MAAS_REGIOND_PROCESS_MODE') == 'forkserver':
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        from maasserver.forkserver import serve
+        serve(runWorkerServices)
+        return
+
     # Debug mode, run the all-in-one mode.
     if args.debug:
         runAllInOneServices()
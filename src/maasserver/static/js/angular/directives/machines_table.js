@@ -189,11 +189,30 @@ angular.module('MAAS').directive('maasMachinesTable', [
           }
         };
 
+        // Only be notified about the machines on screen. When none are
+        // filtered out, be notified about all of them, new ones included.
+        scope.subscribeToListed = function() {
+          var filtered = scope.table.filteredMachines;
+          if(filtered.length === scope.table.machines.length) {
+            MachinesManager.subscribeItems(null);
+          } else {
+            MachinesManager.subscribeItems(filtered.map(function(machine) {
+              return machine.system_id;
+            }));
+          }
+        };
+
         // When the list of filtered machines change update the all checkbox.
         scope.$watchCollection("table.filteredMachines", function() {
           scope.updateAllChecked();
+          scope.subscribeToListed();
           scope.onListingChange({$machines: scope.table.filteredMachines});
         });
+
+        // Other views need to be notified about every machine.
+        scope.$on("$destroy", function() {
+          MachinesManager.subscribeItems(null);
+        });
       }
     };
 }]);
@@ -466,4 +466,48 @@ describe("maasMachinesTable", function() {
             expect($scope.onListingChange).toHaveBeenCalledWith(machines);
         });
     });
+
+    describe("subscribeToListed", function() {
+
+        it("subscribes to the filtered machines", function() {
+            var directive = compileDirective();
+            var scope = directive.isolateScope();
+            var listed = makeMachine();
+            makeMachine();
+            spyOn(MachinesManager, "subscribeItems");
+            scope.table.filteredMachines = [listed];
+            scope.subscribeToListed();
+            expect(MachinesManager.subscribeItems).toHaveBeenCalledWith(
+                [listed.system_id]);
+        });
+
+        it("subscribes to every machine when none is filtered out",
+            function() {
+                var directive = compileDirective();
+                var scope = directive.isolateScope();
+                var machine = makeMachine();
+                spyOn(MachinesManager, "subscribeItems");
+                scope.table.filteredMachines = [machine];
+                scope.subscribeToListed();
+                expect(MachinesManager.subscribeItems).toHaveBeenCalledWith(
+                    null);
+            });
+
+        it("called when filteredMachines changes", function() {
+            var directive = compileDirective();
+            var scope = directive.isolateScope();
+            spyOn(scope, "subscribeToListed");
+            scope.table.filteredMachines = [makeMachine()];
+            $scope.$digest();
+            expect(scope.subscribeToListed).toHaveBeenCalled();
+        });
+
+        it("subscribes to every machine on $destroy", function() {
+            var directive = compileDirective();
+            var scope = directive.isolateScope();
+            spyOn(MachinesManager, "subscribeItems");
+            scope.$destroy();
+            expect(MachinesManager.subscribeItems).toHaveBeenCalledWith(null);
+        });
+    });
 });
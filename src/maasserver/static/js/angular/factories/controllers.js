@@ -19,6 +19,7 @@ angular.module('MAAS').factory(
 
             this._pk = "system_id";
             this._handler = "controller";
+            this._resumable = true;
 
             // Listen for notify events for the controller object.
             var self = this;
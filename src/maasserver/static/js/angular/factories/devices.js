@@ -19,6 +19,7 @@ angular.module('MAAS').factory(
 
             this._pk = "system_id";
             this._handler = "device";
+            this._resumable = true;
             this._metadataAttributes = {
                 "owner": null,
                 "subnets": null,
@@ -17,6 +17,7 @@ angular.module('MAAS').factory(
 
             this._pk = "system_id";
             this._handler = "machine";
+            this._resumable = true;
 
             this._metadataAttributes = {
                 "architecture": null,
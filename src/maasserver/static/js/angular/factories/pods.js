@@ -18,6 +18,7 @@ angular.module('MAAS').service(
 
             this._pk = "id";
             this._handler = "pod";
+            this._resumable = true;
 
             // Listen for notify events for the pod object.
             var self = this;
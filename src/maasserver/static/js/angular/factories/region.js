@@ -37,6 +37,12 @@ angular.module('MAAS').factory(
             this.retryTimeout = 5000;
             this.error = null;
 
+            // When true the region is asked to send messages in its compact
+            // encoding, with object keys replaced by indexes into the list
+            // of keys it has sent on this connection.
+            this.compact = false;
+            this.keys = [];
+
             // Defer used for defaultConnect. If defaultConnect is called
             // quickly only the first one will start the connection. The
             // remaining will recieve this defer.
@@ -121,7 +127,13 @@ angular.module('MAAS').factory(
         RegionConnection.prototype.connect = function() {
             this.url = this._buildUrl();
             this.autoReconnect = true;
-            this.websocket = this.buildSocket(this.url);
+            this.keys = [];
+            var url = this.url;
+            if(this.compact) {
+                url += url.indexOf("?") >= 0 ? "&" : "?";
+                url += "encoding=compact";
+            }
+            this.websocket = this.buildSocket(url);
 
             var self = this;
             this.websocket.onopen = function(evt) {
@@ -148,8 +160,40 @@ angular.module('MAAS').factory(
                 }
             };
             this.websocket.onmessage = function(evt) {
-                self.onMessage(angular.fromJson(evt.data));
+                var msg = angular.fromJson(evt.data);
+                if(self.compact) {
+                    msg = self._decodeCompact(msg);
+                }
+                self.onMessage(msg);
+            };
+        };
+
+        // Decode a message in the region's compact encoding. The message is
+        // a list of the keys sent for the first time and the message itself.
+        // Keys are indexes into the list of keys, or the key itself prefixed
+        // with "~".
+        RegionConnection.prototype._decodeCompact = function(msg) {
+            var keys = this.keys;
+            keys.push.apply(keys, msg[0]);
+            var decode = function(value) {
+                if(angular.isArray(value)) {
+                    return value.map(decode);
+                } else if(angular.isObject(value)) {
+                    var decoded = {};
+                    angular.forEach(value, function(item, key) {
+                        if(key.charAt(0) === "~") {
+                            key = key.substr(1);
+                        } else {
+                            key = keys[parseInt(key, 10)];
+                        }
+                        decoded[key] = decode(item);
+                    });
+                    return decoded;
+                } else {
+                    return value;
+                }
             };
+            return decode(msg[1]);
         };
 
         // Closes the websocket connection.
@@ -46,6 +46,7 @@ describe("ControllersManager", function() {
     it("sanity check", function() {
         expect(ControllersManager._pk).toBe("system_id");
         expect(ControllersManager._handler).toBe("controller");
+        expect(ControllersManager._resumable).toBe(true);
     });
 
     it("set requires attributes", function() {
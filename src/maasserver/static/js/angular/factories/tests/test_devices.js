@@ -45,6 +45,7 @@ describe("DevicesManager", function() {
     it("set requires attributes", function() {
         expect(DevicesManager._pk).toBe("system_id");
         expect(DevicesManager._handler).toBe("device");
+        expect(DevicesManager._resumable).toBe(true);
         expect(Object.keys(DevicesManager._metadataAttributes)).toEqual(
             ["owner", "subnets", "tags", "zone"]);
     });
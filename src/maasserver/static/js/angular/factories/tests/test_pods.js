@@ -40,6 +40,7 @@ describe("PodsManager", function() {
     it("set requires attributes", function() {
         expect(PodsManager._pk).toBe("id");
         expect(PodsManager._handler).toBe("pod");
+        expect(PodsManager._resumable).toBe(true);
     });
 
     describe("refresh", function() {
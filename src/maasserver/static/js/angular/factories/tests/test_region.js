@@ -287,6 +287,28 @@ describe("RegionConnection", function() {
             expect(RegionConnection.onMessage).toHaveBeenCalledWith(
                 sampleData);
         });
+
+        it("asks for compact encoding if compact", function() {
+            RegionConnection.compact = true;
+            RegionConnection.connect();
+            expect(RegionConnection.buildSocket).toHaveBeenCalledWith(
+                url + "?encoding=compact");
+            expect(RegionConnection.url).toBe(url);
+        });
+
+        it("decodes compact messages if compact", function() {
+            spyOn(RegionConnection, "onMessage");
+            RegionConnection.compact = true;
+            RegionConnection.connect();
+            webSocket.onmessage({ data: angular.toJson(
+                [["sample", "list"], {"0": "data", "1": [{"0": 1}]}]) });
+            webSocket.onmessage({ data: angular.toJson(
+                [[], {"1": [], "~other": {"0": 2}}]) });
+            expect(RegionConnection.onMessage).toHaveBeenCalledWith(
+                { sample: "data", list: [{ sample: 1 }] });
+            expect(RegionConnection.onMessage).toHaveBeenCalledWith(
+                { list: [], other: { sample: 2 } });
+        });
     });
 
     describe("close", function() {
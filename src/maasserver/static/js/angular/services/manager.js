@@ -82,6 +82,25 @@ angular.module('MAAS').service(
             // to the region.
             this._autoReload = false;
 
+            // Set to true by managers whose handler on the region can catch
+            // up on the changes missed while disconnected, instead of loading
+            // all of the items again. See resumeItems.
+            this._resumable = false;
+
+            // Cursor into the region's log of changes, from which the changes
+            // missed while disconnected can be caught up on. Only used when
+            // _resumable is true.
+            this._cursor = null;
+
+            // Primary keys of the items to be notified about, or null to be
+            // notified about every item. Only used when _resumable is true,
+            // since items not subscribed to must be caught up on later. See
+            // subscribeItems.
+            this._subscription = null;
+
+            // The subscription as the region knows it.
+            this._subscribed = null;
+
             // Holds the item that is currenly being viewed. This object will
             // be updated if any notify events are recieved for it. This allows
             // the ability of not having to keep pulling the item out of the
@@ -201,6 +220,31 @@ angular.module('MAAS').service(
             this._metadataAttributes.length = 0;
         };
 
+        // Get a cursor into the region's log of changes, so that the changes
+        // made after now can be caught up on later. Failing to get one is not
+        // an error; the items will be reloaded instead.
+        Manager.prototype._getCursor = function() {
+            var self = this;
+            var method = this._handler + ".changes";
+            return RegionConnection.callMethod(method, {}).then(
+                function(result) {
+                    self._cursor = result.cursor;
+                }, function() {
+                    self._cursor = null;
+                });
+        };
+
+        // Call func once a cursor has been taken, when the manager is
+        // resumable. The cursor must be taken before the items are loaded,
+        // so that no change made while loading is missed.
+        Manager.prototype._withCursor = function(func) {
+            if(this._resumable) {
+                return this._getCursor().then(func);
+            } else {
+                return func();
+            }
+        };
+
         // Load all the items.
         Manager.prototype.loadItems = function() {
             // If the items have already been loaded then, we need to
@@ -219,14 +263,17 @@ angular.module('MAAS').service(
 
             var self = this;
             this._isLoading = true;
-            return this._batchLoadItems(this._items, function(item) {
-                item.$selected = false;
-                self._updateMetadata(item, METADATA_ACTIONS.CREATE);
-                self._processItem(item);
+            return this._withCursor(function() {
+                return self._batchLoadItems(self._items, function(item) {
+                    item.$selected = false;
+                    self._updateMetadata(item, METADATA_ACTIONS.CREATE);
+                    self._processItem(item);
+                });
             }).then(function() {
                 self._loaded = true;
                 self._isLoading = false;
                 self.processActions();
+                self._updateSubscription();
                 self._resolveDefers(self._extraLoadDefers, self._items);
                 self._extraLoadDefers = [];
                 return self._items;
@@ -292,10 +339,13 @@ angular.module('MAAS').service(
 
             // Start the reload process and once complete call updateItems.
             self._isLoading = true;
-            return this._batchLoadItems(currentItems).then(function(items) {
+            return this._withCursor(function() {
+                return self._batchLoadItems(currentItems);
+            }).then(function(items) {
                 updateItems(items);
                 self._isLoading = false;
                 self.processActions();
+                self._updateSubscription();
 
                 // Set the activeItem again so the region knows that its
                 // the active item.
@@ -313,13 +363,124 @@ angular.module('MAAS').service(
             });
         };
 
+        // Catch up on the changes missed since the cursor was taken, e.g.
+        // while disconnected from the region. The items are reloaded instead
+        // when that's not possible, or when too much has changed.
+        Manager.prototype.resumeItems = function() {
+            if(!this._resumable || this._cursor === null || !this._loaded ||
+                    this._isLoading) {
+                return this.reloadItems();
+            }
+
+            var self = this;
+            var method = this._handler + ".changes";
+            this._isLoading = true;
+            return RegionConnection.callMethod(
+                method, {since: this._cursor}).then(function(result) {
+                    self._isLoading = false;
+                    self._cursor = result.cursor;
+                    if(result.reset) {
+                        return self.reloadItems();
+                    }
+
+                    // The missed changes are processed before any actions
+                    // received while catching up.
+                    var actions = [];
+                    angular.forEach(result.changes, function(change) {
+                        actions.push({
+                            action: change.action,
+                            data: change.data
+                        });
+                    });
+                    self._actionQueue = actions.concat(self._actionQueue);
+                    self.processActions();
+                    self._updateSubscription();
+
+                    // Set the activeItem again so the region knows that its
+                    // the active item.
+                    if(angular.isObject(self._activeItem)) {
+                        self.setActiveItem(self._activeItem[self._pk]);
+                    }
+                    return self._items;
+                }, function() {
+                    self._isLoading = false;
+                    return self.reloadItems();
+                });
+        };
+
+        // Only be notified about the items with the given primary keys, e.g.
+        // those on screen, instead of every item. Pass null to be notified
+        // about every item again. The other items are caught up on once they
+        // are subscribed to again.
+        Manager.prototype.subscribeItems = function(pks) {
+            if(angular.isArray(pks)) {
+                this._subscription = pks.slice();
+            } else {
+                this._subscription = null;
+            }
+            return this._updateSubscription();
+        };
+
+        // Tell the region about changes to the subscription. This waits for
+        // the items to be loaded, and catches up on the items subscribed to
+        // again.
+        Manager.prototype._updateSubscription = function() {
+            if(!this._resumable || !this._loaded || this._isLoading) {
+                return $q.when();
+            }
+
+            var self = this;
+            var wanted = this._subscription;
+            var current = this._subscribed;
+            var calls = [];
+            var widened = false;
+            if(wanted === null) {
+                if(current !== null) {
+                    calls.push(RegionConnection.callMethod(
+                        this._handler + ".subscribe", {}));
+                    widened = true;
+                }
+            } else if(current === null) {
+                calls.push(RegionConnection.callMethod(
+                    this._handler + ".subscribe", {pks: wanted}));
+            } else {
+                var added = wanted.filter(function(pk) {
+                    return current.indexOf(pk) === -1;
+                });
+                var removed = current.filter(function(pk) {
+                    return wanted.indexOf(pk) === -1;
+                });
+                if(added.length > 0) {
+                    calls.push(RegionConnection.callMethod(
+                        this._handler + ".subscribe", {pks: added}));
+                    widened = true;
+                }
+                if(removed.length > 0) {
+                    calls.push(RegionConnection.callMethod(
+                        this._handler + ".unsubscribe", {pks: removed}));
+                }
+            }
+            this._subscribed = wanted;
+            return $q.all(calls).then(function() {
+                if(widened) {
+                    return self.resumeItems();
+                }
+            }, function() {
+                // Not an error; more is notified than needed. Try again on
+                // the next change to the subscription.
+                self._subscribed = current;
+            });
+        };
+
         // Enables auto reloading of the item list on connection to region.
         Manager.prototype.enableAutoReload = function() {
             if(!this._autoReload) {
                 this._autoReload = true;
                 var self = this;
                 this._reloadFunc = function() {
-                    self.reloadItems();
+                    // The region forgets the subscription when disconnected.
+                    self._subscribed = null;
+                    self.resumeItems();
                 };
                 RegionConnection.registerHandler("open", this._reloadFunc);
             }
@@ -515,6 +676,14 @@ angular.module('MAAS').service(
                     this._processItem(action.data);
                 } else if(action.action === "delete") {
                     this._removeItem(action.data);
+                } else if(action.action === "reload") {
+                    // The region was too busy to notify us of some changes,
+                    // so the items could be out of date. Once they have been
+                    // caught up on the rest of the queue will be processed.
+                    if(this._loaded) {
+                        this.resumeItems();
+                        return;
+                    }
                 }
             }
         };
@@ -257,6 +257,33 @@ describe("Manager", function() {
             });
         });
 
+        it("gets a cursor before loading when resumable", function(done) {
+            NodesManager._resumable = true;
+            webSocket.returnData.push(makeFakeResponse({cursor: 42}));
+            webSocket.returnData.push(makeFakeResponse([makeNode()]));
+            NodesManager.loadItems().then(function() {
+                var sentObject = angular.fromJson(webSocket.sentData[0]);
+                expect(sentObject.method).toBe("node.changes");
+                expect(sentObject.params).toEqual({});
+                sentObject = angular.fromJson(webSocket.sentData[1]);
+                expect(sentObject.method).toBe("node.list");
+                expect(NodesManager._cursor).toBe(42);
+                done();
+            });
+        });
+
+        it("loads when a cursor can't be got", function(done) {
+            NodesManager._resumable = true;
+            NodesManager._cursor = 42;
+            webSocket.returnData.push(makeFakeResponse("error", true));
+            webSocket.returnData.push(makeFakeResponse([makeNode()]));
+            NodesManager.loadItems().then(function(nodes) {
+                expect(nodes.length).toBe(1);
+                expect(NodesManager._cursor).toBeNull();
+                done();
+            });
+        });
+
         it("calls defer error handler on error", function(done) {
             var errorMsg = "Unable to load the nodes.";
             webSocket.returnData.push(makeFakeResponse(errorMsg, true));
@@ -550,6 +577,238 @@ describe("Manager", function() {
             expect(RegionConnection.registerHandler).toHaveBeenCalled();
             expect(NodesManager._autoReload).toBe(true);
         });
+
+        it("resumes items when the connection opens", function() {
+            spyOn(RegionConnection, "registerHandler");
+            spyOn(NodesManager, "resumeItems");
+            NodesManager.enableAutoReload();
+            var handler = RegionConnection.registerHandler.calls.argsFor(0)[1];
+            handler();
+            expect(NodesManager.resumeItems).toHaveBeenCalled();
+        });
+
+        it("forgets the region's subscription when the connection opens",
+            function() {
+                spyOn(RegionConnection, "registerHandler");
+                spyOn(NodesManager, "resumeItems");
+                NodesManager._subscribed = ["a"];
+                NodesManager.enableAutoReload();
+                var handler = (
+                    RegionConnection.registerHandler.calls.argsFor(0)[1]);
+                handler();
+                expect(NodesManager._subscribed).toBeNull();
+            });
+    });
+
+    describe("subscribeItems", function() {
+
+        beforeEach(function() {
+            NodesManager._loaded = true;
+            NodesManager._resumable = true;
+        });
+
+        it("does nothing if not resumable", function() {
+            NodesManager._resumable = false;
+            NodesManager.subscribeItems(["a"]);
+            expect(webSocket.sentData.length).toBe(0);
+            expect(NodesManager._subscription).toEqual(["a"]);
+            expect(NodesManager._subscribed).toBeNull();
+        });
+
+        it("waits until the items are loaded", function() {
+            NodesManager._loaded = false;
+            NodesManager.subscribeItems(["a"]);
+            expect(webSocket.sentData.length).toBe(0);
+            expect(NodesManager._subscribed).toBeNull();
+        });
+
+        it("subscribes once the items are loaded", function(done) {
+            NodesManager._loaded = false;
+            NodesManager._subscription = ["a"];
+            spyOn(NodesManager, "_updateSubscription");
+            webSocket.returnData.push(makeFakeResponse({cursor: 42}));
+            webSocket.returnData.push(makeFakeResponse([]));
+            NodesManager.loadItems().then(function() {
+                expect(NodesManager._updateSubscription).toHaveBeenCalled();
+                done();
+            });
+        });
+
+        it("calls node.subscribe with the primary keys", function(done) {
+            webSocket.returnData.push(makeFakeResponse(null));
+            spyOn(NodesManager, "resumeItems");
+            NodesManager.subscribeItems(["a", "b"]).then(function() {
+                var sentObject = angular.fromJson(webSocket.sentData[0]);
+                expect(sentObject.method).toBe("node.subscribe");
+                expect(sentObject.params).toEqual({pks: ["a", "b"]});
+                expect(NodesManager._subscribed).toEqual(["a", "b"]);
+                expect(NodesManager.resumeItems).not.toHaveBeenCalled();
+                done();
+            });
+        });
+
+        it("sends only the changes to the subscription", function(done) {
+            NodesManager._subscription = ["a", "b"];
+            NodesManager._subscribed = ["a", "b"];
+            webSocket.returnData.push(makeFakeResponse(null));
+            webSocket.returnData.push(makeFakeResponse(null));
+            spyOn(NodesManager, "resumeItems").and.returnValue(
+                $q.when(NodesManager._items));
+            NodesManager.subscribeItems(["b", "c"]).then(function() {
+                var sent = webSocket.sentData.map(angular.fromJson);
+                expect(sent[0].method).toBe("node.subscribe");
+                expect(sent[0].params).toEqual({pks: ["c"]});
+                expect(sent[1].method).toBe("node.unsubscribe");
+                expect(sent[1].params).toEqual({pks: ["a"]});
+                expect(NodesManager._subscribed).toEqual(["b", "c"]);
+                // Changes to "c" may have been missed.
+                expect(NodesManager.resumeItems).toHaveBeenCalled();
+                done();
+            });
+        });
+
+        it("subscribes to every item and catches up", function(done) {
+            NodesManager._subscription = ["a"];
+            NodesManager._subscribed = ["a"];
+            webSocket.returnData.push(makeFakeResponse(null));
+            spyOn(NodesManager, "resumeItems").and.returnValue(
+                $q.when(NodesManager._items));
+            NodesManager.subscribeItems(null).then(function() {
+                var sentObject = angular.fromJson(webSocket.sentData[0]);
+                expect(sentObject.method).toBe("node.subscribe");
+                expect(sentObject.params).toEqual({});
+                expect(NodesManager._subscribed).toBeNull();
+                expect(NodesManager.resumeItems).toHaveBeenCalled();
+                done();
+            });
+        });
+
+        it("does nothing if the subscription is unchanged", function() {
+            NodesManager._subscription = ["a"];
+            NodesManager._subscribed = ["a"];
+            NodesManager.subscribeItems(["a"]);
+            expect(webSocket.sentData.length).toBe(0);
+        });
+
+        it("keeps the region's subscription on error", function(done) {
+            webSocket.returnData.push(makeFakeResponse("error", true));
+            NodesManager.subscribeItems(["a"]).then(function() {
+                expect(NodesManager._subscribed).toBeNull();
+                done();
+            });
+        });
+    });
+
+    describe("resumeItems", function() {
+
+        beforeEach(function() {
+            NodesManager._loaded = true;
+            NodesManager._resumable = true;
+            NodesManager._cursor = 42;
+        });
+
+        it("calls reloadItems if not resumable", function() {
+            NodesManager._resumable = false;
+            spyOn(NodesManager, "reloadItems");
+            NodesManager.resumeItems();
+            expect(NodesManager.reloadItems).toHaveBeenCalled();
+        });
+
+        it("calls reloadItems if there is no cursor", function() {
+            NodesManager._cursor = null;
+            spyOn(NodesManager, "reloadItems");
+            NodesManager.resumeItems();
+            expect(NodesManager.reloadItems).toHaveBeenCalled();
+        });
+
+        it("calls reloadItems if the nodes are not loaded", function() {
+            NodesManager._loaded = false;
+            spyOn(NodesManager, "reloadItems");
+            NodesManager.resumeItems();
+            expect(NodesManager.reloadItems).toHaveBeenCalled();
+        });
+
+        it("calls node.changes since the cursor", function(done) {
+            webSocket.returnData.push(makeFakeResponse({
+                cursor: 43,
+                changes: []
+            }));
+            NodesManager.resumeItems().then(function() {
+                var sentObject = angular.fromJson(webSocket.sentData[0]);
+                expect(sentObject.method).toBe("node.changes");
+                expect(sentObject.params).toEqual({since: 42});
+                expect(NodesManager._cursor).toBe(43);
+                done();
+            });
+        });
+
+        it("processes the changes before queued actions", function(done) {
+            var fakeNode = makeNode(false);
+            var updatedNode = stripSelected(fakeNode);
+            updatedNode.name = makeName("name");
+            NodesManager._items.push(fakeNode);
+            var queuedAction = {
+                action: "delete",
+                data: fakeNode.system_id
+            };
+            webSocket.returnData.push(makeFakeResponse({
+                cursor: 43,
+                changes: [{
+                    name: "node",
+                    action: "update",
+                    data: updatedNode
+                }]
+            }));
+            spyOn(NodesManager, "_replaceItem").and.callThrough();
+            NodesManager.resumeItems().then(function(nodes) {
+                expect(NodesManager._replaceItem).toHaveBeenCalledWith(
+                    updatedNode);
+                expect(nodes.length).toBe(0);
+                expect(NodesManager._actionQueue.length).toBe(0);
+                done();
+            });
+            NodesManager._actionQueue.push(queuedAction);
+        });
+
+        it("calls reloadItems on reset", function(done) {
+            webSocket.returnData.push(makeFakeResponse({
+                cursor: 43,
+                reset: true
+            }));
+            spyOn(NodesManager, "reloadItems").and.returnValue(
+                $q.when(NodesManager._items));
+            NodesManager.resumeItems().then(function() {
+                expect(NodesManager.reloadItems).toHaveBeenCalled();
+                expect(NodesManager._cursor).toBe(43);
+                done();
+            });
+        });
+
+        it("calls reloadItems on error", function(done) {
+            webSocket.returnData.push(makeFakeResponse("error", true));
+            spyOn(NodesManager, "reloadItems").and.returnValue(
+                $q.when(NodesManager._items));
+            NodesManager.resumeItems().then(function() {
+                expect(NodesManager.reloadItems).toHaveBeenCalled();
+                expect(NodesManager._isLoading).toBe(false);
+                done();
+            });
+        });
+
+        it("calls setActiveItem after catching up", function(done) {
+            var activeNode = makeNode();
+            NodesManager._activeItem = activeNode;
+            spyOn(NodesManager, "setActiveItem");
+            webSocket.returnData.push(makeFakeResponse({
+                cursor: 43,
+                changes: []
+            }));
+            NodesManager.resumeItems().then(function() {
+                expect(NodesManager.setActiveItem).toHaveBeenCalledWith(
+                    activeNode.system_id);
+                done();
+            });
+        });
     });
 
     describe("disableAutoReload", function() {
@@ -924,6 +1183,48 @@ describe("Manager", function() {
             NodesManager.processActions();
             expect(NodesManager._actionQueue.length).toBe(0);
         });
+
+        it("reloads items on reload action", function() {
+            spyOn(NodesManager, "reloadItems");
+            NodesManager._loaded = true;
+            NodesManager._actionQueue.push({
+                action: "reload",
+                data: null
+            });
+            NodesManager.processActions();
+            expect(NodesManager.reloadItems).toHaveBeenCalled();
+        });
+
+        it("leaves later actions until reloaded on reload action",
+            function() {
+                spyOn(NodesManager, "reloadItems");
+                NodesManager._loaded = true;
+                var deleteAction = {
+                    action: "delete",
+                    data: makeName("system_id")
+                };
+                NodesManager._actionQueue = [
+                    {
+                        action: "reload",
+                        data: null
+                    },
+                    deleteAction
+                ];
+                NodesManager.processActions();
+                expect(NodesManager._actionQueue).toEqual([deleteAction]);
+            });
+
+        it("ignores reload action when not loaded", function() {
+            spyOn(NodesManager, "reloadItems");
+            NodesManager._loaded = false;
+            NodesManager._actionQueue.push({
+                action: "reload",
+                data: null
+            });
+            NodesManager.processActions();
+            expect(NodesManager.reloadItems).not.toHaveBeenCalled();
+            expect(NodesManager._actionQueue.length).toBe(0);
+        });
     });
 
     describe("getSelectedItems", function() {
@@ -28,6 +28,7 @@ from django.db.utils import (
     OperationalError,
 )
 from maasserver.fields import register_mac_type
+from maasserver.preseed_cache import fragment_cache
 from maasserver.testing.factory import factory
 from maasserver.testing.fixtures import (
     IntroCompletedFixture,
@@ -99,6 +100,9 @@ class MAASRegionTestCaseBase(PostCommitHooksTestMixin):
         # Disconnect the status transition event to speed up tests.
         self.patch(signals.events, 'STATE_TRANSITION_EVENT_CONNECT', False)
 
+        # Preseed fragments cached by an earlier test may no longer apply.
+        fragment_cache.clear()
+
     def client_log_in(self, as_admin=False, completed_intro=True):
         """Log `self.client` into MAAS.
 
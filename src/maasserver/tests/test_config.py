@@ -121,6 +121,7 @@ class TestRegionConfigurationDebugOptions(MAASTestCase):
     options_and_defaults = {
         "debug": False,
         "debug_queries": False,
+        "debug_transaction_retries": False,
     }
 
     scenarios = tuple(
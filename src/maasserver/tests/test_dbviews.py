@@ -8,12 +8,17 @@ __all__ = []
 from django.db import connection
 from maasserver.dbviews import (
     _ALL_VIEWS,
+    refresh_materialized_views,
     register_all_views,
 )
+from maasserver.models.discovery import Discovery
 from maasserver.models.subnet import Subnet
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from testtools.matchers import HasLength
+from testtools.matchers import (
+    Equals,
+    HasLength,
+)
 
 
 class TestDatabaseViews(MAASServerTestCase):
@@ -31,6 +36,15 @@ class TestDatabaseViews(MAASServerTestCase):
             with connection.cursor() as cursor:
                 cursor.execute("SELECT * from %s;" % view_name)
 
+    def test_refresh_materialized_views_repopulates_tables(self):
+        discovery = factory.make_Discovery()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM maasserver_discovery;")
+        refresh_materialized_views()
+        self.assertThat(
+            list(Discovery.objects.values_list("id", flat=True)),
+            Equals([discovery.id]))
+
 
 class TestRoutablePairs(MAASServerTestCase):
     """Tests for the `maasserver_routable_pairs` view."""
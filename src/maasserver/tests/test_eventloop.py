@@ -19,6 +19,7 @@ from maasserver import (
     eventloop,
     ipc,
     nonces_cleanup,
+    processpool,
     rack_controller,
     region_controller,
     stats,
@@ -40,10 +41,14 @@ from maasserver.utils.orm import (
     DisabledDatabaseConnection,
     transactional,
 )
+from maasserver.websockets import changes
 from maastesting.factory import factory
 from maastesting.matchers import MockCallsMatch
 from maastesting.testcase import MAASTestCase
-from metadataserver import api_twisted
+from metadataserver import (
+    api_twisted,
+    blobs_cleanup,
+)
 from provisioningserver.utils.twisted import asynchronous
 from testtools.matchers import (
     Equals,
@@ -340,6 +345,30 @@ class TestFactories(MAASTestCase):
         self.assertTrue(
             eventloop.loop.factories["nonce-cleanup"]["only_on_master"])
 
+    def test_make_BlobCleanupService(self):
+        service = eventloop.make_BlobCleanupService()
+        self.assertThat(service, IsInstance(
+            blobs_cleanup.BlobCleanupService))
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_BlobCleanupService,
+            eventloop.loop.factories["script-result-blob-cleanup"]["factory"])
+        self.assertTrue(
+            eventloop.loop.factories[
+                "script-result-blob-cleanup"]["only_on_master"])
+
+    def test_make_WebSocketChangesCleanupService(self):
+        service = eventloop.make_WebSocketChangesCleanupService()
+        self.assertThat(service, IsInstance(
+            changes.WebSocketChangesCleanupService))
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_WebSocketChangesCleanupService,
+            eventloop.loop.factories["websocket-changes-cleanup"]["factory"])
+        self.assertTrue(
+            eventloop.loop.factories[
+                "websocket-changes-cleanup"]["only_on_master"])
+
     def test_make_StatusMonitorService(self):
         service = eventloop.make_StatusMonitorService()
         self.assertThat(service, IsInstance(
@@ -496,6 +525,23 @@ class TestFactories(MAASTestCase):
         self.assertFalse(
             eventloop.loop.factories["ipc-worker"]["only_on_master"])
 
+    def test_make_ProcessPoolService(self):
+        service = eventloop.make_ProcessPoolService()
+        self.assertThat(service, IsInstance(
+            processpool.ProcessPoolService))
+        # It is registered as a factory in RegionEventLoop, for the master
+        # and for the workers; each starts a pool only when it's used.
+        self.assertIs(
+            eventloop.make_ProcessPoolService,
+            eventloop.loop.factories["process-pool-master"]["factory"])
+        self.assertTrue(
+            eventloop.loop.factories["process-pool-master"]["only_on_master"])
+        self.assertIs(
+            eventloop.make_ProcessPoolService,
+            eventloop.loop.factories["process-pool-worker"]["factory"])
+        self.assertFalse(
+            eventloop.loop.factories["process-pool-worker"]["only_on_master"])
+
 
 class TestDisablingDatabaseConnections(MAASServerTestCase):
 
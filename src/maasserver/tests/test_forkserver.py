@@ -0,0 +1,205 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.forkserver`."""
+
+__all__ = []
+
+import fcntl
+from io import BytesIO
+import os
+import select
+import sys
+import traceback
+
+from maasserver import forkserver
+from maasserver.utils.orm import disable_all_database_connections
+from maastesting.testcase import MAASTestCase
+from testtools.matchers import Equals
+from twisted.internet import epollreactor
+import twisted.internet
+
+
+def run_in_child(func, *args):
+    """Call `func` in a forked process; return the process's exit code.
+
+    The child exits with the code that `func` returns, or 1 if it raises.
+    """
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = func(*args)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stderr.flush()
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    return os.WEXITSTATUS(status)
+
+
+def has_database_guard(reactor):
+    """Return whether `reactor` will disable database connections before it
+    starts, as it must in a region worker."""
+    return any(
+        func is disable_all_database_connections
+        for func, _, _ in reactor._eventTriggers["startup"].before)
+
+
+class TestPrewarm(MAASTestCase):
+
+    def test__imports_prewarm_modules(self):
+        import_module = self.patch(forkserver, "import_module")
+        forkserver.prewarm()
+        self.assertThat(
+            [args[0] for args, _ in import_module.call_args_list],
+            Equals(list(forkserver.PREWARM_MODULES)))
+
+
+class TestReinitialiseReactor(MAASTestCase):
+
+    def make_reactor(self):
+        reactor = epollreactor.EPollReactor()
+        self.patch(twisted.internet, "reactor", reactor)
+        return reactor
+
+    def test__keeps_system_event_triggers(self):
+        reactor = self.make_reactor()
+        reactor.addSystemEventTrigger(
+            "before", "startup", disable_all_database_connections)
+        forkserver.reinitialise_reactor()
+        self.assertTrue(has_database_guard(reactor))
+
+    def test__does_not_duplicate_the_reactors_own_triggers(self):
+        reactor = self.make_reactor()
+        during_shutdown = list(reactor._eventTriggers["shutdown"].during)
+        forkserver.reinitialise_reactor()
+        self.assertThat(
+            reactor._eventTriggers["shutdown"].during,
+            Equals(during_shutdown))
+
+    def test__replaces_poller_and_waker(self):
+        reactor = self.make_reactor()
+        poller, waker = reactor._poller, reactor.waker
+        forkserver.reinitialise_reactor()
+        self.assertIsNot(poller, reactor._poller)
+        self.assertIsNot(waker, reactor.waker)
+        self.assertTrue(poller.closed)
+
+
+class TestRunWorker(MAASTestCase):
+
+    def test__exits_with_zero_when_worker_returns(self):
+        def run_worker():
+            if os.environ.get("MAAS_REGIOND_PROCESS_MODE") != "worker":
+                raise AssertionError("Not running as a worker.")
+        self.assertThat(
+            run_in_child(forkserver._run_worker, run_worker, ()), Equals(0))
+
+    def test__exits_with_code_from_SystemExit(self):
+        def run_worker():
+            raise SystemExit(3)
+        self.assertThat(
+            run_in_child(forkserver._run_worker, run_worker, ()), Equals(3))
+
+    def test__exits_with_one_when_worker_crashes(self):
+        def run_worker():
+            raise ZeroDivisionError()
+        self.assertThat(
+            run_in_child(forkserver._run_worker, run_worker, ()), Equals(1))
+
+
+class TestReap(MAASTestCase):
+
+    def test__reports_exited_workers(self):
+        # Reaping must be done in a child, away from the test process's own
+        # children.
+        def reap():
+            pid = os.fork()
+            if pid == 0:
+                os._exit(5)
+            # Wait for the worker to exit, but leave it to be reaped.
+            os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+            status = BytesIO()
+            forkserver._reap(status)
+            expected = ("exited %d %d\n" % (pid, 5 << 8)).encode("ascii")
+            return 0 if status.getvalue() == expected else 2
+
+        self.assertThat(run_in_child(reap), Equals(0))
+
+
+class TestServe(MAASTestCase):
+
+    def read_events(self, status, count):
+        """Read `count` events reported by the fork server."""
+        events, data = [], b""
+        while len(events) < count:
+            readable, _, _ = select.select([status], [], [], 10)
+            if status not in readable:
+                self.fail("Fork server did not report; got %r." % events)
+            chunk = os.read(status, 4096)
+            if len(chunk) == 0:
+                self.fail("Fork server exited; got %r." % events)
+            *lines, data = (data + chunk).split(b"\n")
+            events.extend(line.decode("ascii").split() for line in lines)
+        return events
+
+    def serve(self, run_worker):
+        """Run the fork server in a child with a database guard like the one
+        added by `maasserver.eventloop`; return its pid and pipes."""
+        commands_r, commands_w = os.pipe()
+        status_r, status_w = os.pipe()
+
+        def serve():
+            # Move the pipes out of the way before putting them in place.
+            commands = fcntl.fcntl(commands_r, fcntl.F_DUPFD, 10)
+            status = fcntl.fcntl(status_w, fcntl.F_DUPFD, 10)
+            for fd in (commands_r, commands_w, status_r, status_w):
+                os.close(fd)
+            os.dup2(commands, 0)
+            os.dup2(status, forkserver.STATUS_FD)
+            os.close(commands)
+            os.close(status)
+            # The test process's reactor has already started, so its startup
+            # triggers have gone; add the guard as if never started.
+            from twisted.internet import reactor
+            reactor.addSystemEventTrigger(
+                "before", "startup", disable_all_database_connections)
+            forkserver.prewarm = lambda: None
+            forkserver.serve(run_worker)
+            return 0
+
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = serve()
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stderr.flush()
+                os._exit(code)
+        os.close(commands_r)
+        os.close(status_w)
+        self.addCleanup(os.close, status_r)
+        return pid, commands_w, status_r
+
+    def test__spawns_workers_and_reports_them(self):
+        def run_worker():
+            from twisted.internet import reactor
+            raise SystemExit(0 if has_database_guard(reactor) else 4)
+
+        pid, commands, status = self.serve(run_worker)
+        try:
+            os.write(commands, b"spawn\n")
+            started, exited = self.read_events(status, 2)
+        finally:
+            os.close(commands)
+            _, server_status = os.waitpid(pid, 0)
+        self.assertThat(started[0], Equals("started"))
+        self.assertThat(exited[:2], Equals(["exited", started[1]]))
+        # The worker still had the database guard.
+        self.assertThat(os.WEXITSTATUS(int(exited[2])), Equals(0))
+        # The fork server exits when its stdin is closed.
+        self.assertThat(os.WEXITSTATUS(server_status), Equals(0))
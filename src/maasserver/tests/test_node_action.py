@@ -44,6 +44,7 @@ from maasserver.node_action import (
     MarkFixed,
     NodeAction,
     OverrideFailedTesting,
+    perform_bulk_node_action,
     PowerOff,
     PowerOn,
     Release,
@@ -1333,3 +1334,80 @@ class TestActionsErrorHandling(MAASServerTestCase):
             get_error_message_for_exception(
                 action.node.stop_rescue_mode.side_effect),
             str(exception))
+
+
+class TestPerformBulkNodeAction(MAASServerTestCase):
+
+    def test_performs_action_on_each_node(self):
+        user = factory.make_User()
+        nodes = [
+            factory.make_Node(owner=user, status=NODE_STATUS.READY)
+            for _ in range(3)
+        ]
+        results = perform_bulk_node_action(nodes, user, MarkBroken.name)
+        self.assertEqual(
+            {node.system_id: {"result": "done"} for node in nodes}, results)
+        self.assertEqual(
+            [NODE_STATUS.BROKEN] * 3,
+            [reload_object(node).status for node in nodes])
+
+    def test_reports_nodes_not_actionable_or_not_permitted(self):
+        user = factory.make_User()
+        broken = factory.make_Node(owner=user, status=NODE_STATUS.BROKEN)
+        not_owned = factory.make_Node(
+            owner=factory.make_User(), status=NODE_STATUS.READY)
+        results = perform_bulk_node_action(
+            [broken, not_owned], user, MarkBroken.name)
+        self.assertEqual({
+            broken.system_id: {"result": "not_actionable"},
+            not_owned.system_id: {"result": "not_permitted"},
+        }, results)
+
+    def test_rolls_back_failed_node_only(self):
+        user = factory.make_User()
+        node = factory.make_Node(owner=user, status=NODE_STATUS.READY)
+        failing = factory.make_Node(owner=user, status=NODE_STATUS.READY)
+
+        def execute(action):
+            action.node.mark_broken(action.user)
+            if action.node == failing:
+                raise NodeActionError("Oops")
+
+        self.patch(MarkBroken, "execute", execute)
+        results = perform_bulk_node_action(
+            [node, failing], user, MarkBroken.name)
+        self.assertEqual({
+            node.system_id: {"result": "done"},
+            failing.system_id: {"result": "failed", "error": "Oops"},
+        }, results)
+        self.assertEqual(NODE_STATUS.BROKEN, reload_object(node).status)
+        self.assertEqual(NODE_STATUS.READY, reload_object(failing).status)
+
+    def test_records_post_commit_failures_without_cancelling_others(self):
+        user = factory.make_User()
+        node = factory.make_Node(owner=user, status=NODE_STATUS.READY)
+        failing = factory.make_Node(owner=user, status=NODE_STATUS.READY)
+        powered = []
+
+        def power(_, node):
+            if node == failing:
+                raise NodeActionError("Cannot power")
+            powered.append(node)
+
+        def execute(action):
+            post_commit().addCallback(power, action.node)
+
+        self.patch(MarkBroken, "execute", execute)
+        results = perform_bulk_node_action(
+            [failing, node], user, MarkBroken.name)
+        post_commit_hooks.fire()
+        self.assertEqual([node], powered)
+        self.assertEqual({
+            failing.system_id: {"result": "failed", "error": "Cannot power"},
+            node.system_id: {"result": "done"},
+        }, results)
+
+    def test_rejects_unknown_action(self):
+        self.assertRaises(
+            NodeActionError, perform_bulk_node_action, [],
+            factory.make_User(), factory.make_name("action"))
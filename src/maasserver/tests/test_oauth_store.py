@@ -0,0 +1,152 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for the caching OAuth data store."""
+
+__all__ = []
+
+from maasserver.oauth_store import (
+    NonceStore,
+    TokenCache,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.testcase import MAASTestCase
+from piston3.models import (
+    Nonce,
+    Token,
+)
+
+
+class FakeClock:
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenCache(MAASServerTestCase):
+
+    def make_token(self):
+        return factory.make_User().userprofile.get_authorisation_tokens()[0]
+
+    def test_get_returns_access_token_with_consumer(self):
+        token = self.make_token()
+        cached = TokenCache().get(token.key)
+        self.assertEqual(token, cached)
+        self.assertEqual(token.consumer, cached.consumer)
+
+    def test_get_returns_none_for_unknown_or_request_token(self):
+        token = self.make_token()
+        token.token_type = Token.REQUEST
+        token.save()
+        cache = TokenCache()
+        self.assertIsNone(cache.get(token.key))
+        self.assertIsNone(cache.get(factory.make_string()))
+
+    def test_get_caches_tokens(self):
+        token = self.make_token()
+        cache = TokenCache()
+        cached = cache.get(token.key)
+        self.assertNumQueries(0, cache.get, token.key)
+        self.assertIs(cached, cache.get(token.key))
+
+    def test_get_reloads_tokens_after_ttl(self):
+        token = self.make_token()
+        clock = FakeClock()
+        cache = TokenCache(ttl=10, clock=clock)
+        cached = cache.get(token.key)
+        clock.now += 10
+        self.assertIsNot(cached, cache.get(token.key))
+
+    def test_discard(self):
+        token = self.make_token()
+        other = self.make_token()
+        cache = TokenCache()
+        cache.get(token.key)
+        cache.get(other.key)
+        cache.discard(token.key)
+        self.assertItemsEqual([other.key], cache.values)
+
+    def test_discard_consumer(self):
+        token = self.make_token()
+        other = self.make_token()
+        cache = TokenCache()
+        cache.get(token.key)
+        cache.get(other.key)
+        cache.discard_consumer(token.consumer_id)
+        self.assertItemsEqual([other.key], cache.values)
+
+
+class TestNonceStore(MAASTestCase):
+
+    def make_nonce(self):
+        return (
+            factory.make_string(), factory.make_string(),
+            factory.make_string())
+
+    def test_use_detects_replays(self):
+        store = NonceStore(clock=FakeClock(1000))
+        nonce = self.make_nonce()
+        self.assertFalse(store.use(*nonce, timestamp="1000"))
+        self.assertTrue(store.use(*nonce, timestamp="1000"))
+        self.assertFalse(store.use(*self.make_nonce(), timestamp="1000"))
+
+    def test_use_expires_nonces_older_than_threshold(self):
+        clock = FakeClock(1000)
+        store = NonceStore(threshold=300, bucket_size=60, clock=clock)
+        store.use(*self.make_nonce(), timestamp="1000")
+        clock.now += 300
+        store.use(*self.make_nonce(), timestamp=clock.now)
+        self.assertEqual(2, store.size)
+        clock.now += 60
+        store.use(*self.make_nonce(), timestamp=clock.now)
+        self.assertEqual(2, store.size)
+        self.assertEqual(2, len(store.buckets))
+
+    def test_forget(self):
+        store = NonceStore(clock=FakeClock(1000))
+        nonce = self.make_nonce()
+        store.use(*nonce, timestamp="1000")
+        store.forget(*nonce)
+        self.assertEqual(0, store.size)
+        self.assertFalse(store.use(*nonce, timestamp="1000"))
+
+
+class TestNonceStoreOverflow(MAASServerTestCase):
+
+    def make_nonce(self):
+        return (
+            factory.make_string(), factory.make_string(),
+            factory.make_string())
+
+    def test_use_records_nonces_in_database_when_full(self):
+        store = NonceStore(max_nonces=1, clock=FakeClock(1000))
+        in_memory, in_database = self.make_nonce(), self.make_nonce()
+        self.assertFalse(store.use(*in_memory, timestamp="1000"))
+        self.assertFalse(store.use(*in_database, timestamp="1000"))
+        consumer_key, token_key, key = in_database
+        self.assertTrue(
+            Nonce.objects.filter(
+                consumer_key=consumer_key, token_key=token_key,
+                key=key).exists())
+        self.assertTrue(store.use(*in_memory, timestamp="1000"))
+        self.assertTrue(store.use(*in_database, timestamp="1000"))
+
+    def test_use_checks_database_until_overflow_expires(self):
+        clock = FakeClock(1000)
+        store = NonceStore(
+            threshold=300, bucket_size=60, max_nonces=1, clock=clock)
+        in_memory, in_database = self.make_nonce(), self.make_nonce()
+        store.use(*in_memory, timestamp="1000")
+        store.use(*in_database, timestamp="1000")
+        # Once memory frees up, nonces found in the database are replays.
+        store.forget(*in_memory)
+        self.assertTrue(store.use(*in_database, timestamp="1000"))
+        # Once the overflowing nonces expire, the database is not checked.
+        clock.now += 360
+        self.assertNumQueries(
+            0, store.use, *self.make_nonce(), timestamp=clock.now)
+        self.assertIsNone(store.overflow)
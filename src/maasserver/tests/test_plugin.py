@@ -114,6 +114,7 @@ class TestRegionWorkerServiceMaker(TestServiceMaker):
             "status-worker",
             "web",
             "ipc-worker",
+            "process-pool-worker",
         ]
         self.assertItemsEqual(expected_services, service.namedServices.keys())
         self.assertEqual(
@@ -171,6 +172,8 @@ class TestRegionMasterServiceMaker(TestServiceMaker):
         expected_services = [
             "region-controller",
             "nonce-cleanup",
+            "websocket-changes-cleanup",
+            "script-result-blob-cleanup",
             "dns-publication-cleanup",
             "status-monitor",
             "stats",
@@ -183,6 +186,7 @@ class TestRegionMasterServiceMaker(TestServiceMaker):
             "ntp",
             "workers",
             "ipc-master",
+            "process-pool-master",
         ]
         self.assertItemsEqual(expected_services, service.namedServices.keys())
         self.assertEqual(
@@ -252,9 +256,12 @@ class TestRegionAllInOneServiceMaker(TestServiceMaker):
             "status-worker",
             "web",
             "ipc-worker",
+            "process-pool-worker",
             # Master services.
             "region-controller",
             "nonce-cleanup",
+            "websocket-changes-cleanup",
+            "script-result-blob-cleanup",
             "dns-publication-cleanup",
             "status-monitor",
             "stats",
@@ -267,6 +274,7 @@ class TestRegionAllInOneServiceMaker(TestServiceMaker):
             "ntp",
             # "workers",  Prevented in all-in-one.
             "ipc-master",
+            "process-pool-master",
         ]
         self.assertItemsEqual(expected_services, service.namedServices.keys())
         self.assertEqual(
@@ -29,6 +29,8 @@ from maasserver.models.user import (
 )
 from maasserver.populate_tags import (
     _do_populate_tags,
+    match_definitions,
+    match_nodes,
     populate_tag_for_multiple_nodes,
     populate_tags,
     populate_tags_for_single_node,
@@ -365,6 +367,46 @@ class TestPopulateTagsForSingleNode(MAASServerTestCase):
         self.assertSequenceEqual(
             ["foo"], [tag.name for tag in node.tags.all()])
 
+    def test_evaluates_tags_in_process_pool(self):
+        callInProcessPool = self.patch(
+            populate_tags_module, "callInProcessPool")
+        callInProcessPool.side_effect = lambda func, *args: func(*args)
+        node = factory.make_Node()
+        make_lshw_result(node, b"<foo/>")
+        tags = [
+            factory.make_Tag("foo", "/foo", populate=False),
+            factory.make_Tag("bar", "/bar", populate=False),
+            ]
+        populate_tags_for_single_node(tags, node)
+        self.assertThat(
+            callInProcessPool, MockCalledOnceWith(
+                match_definitions, ["/foo", "/bar"], ANY))
+        self.assertSequenceEqual(
+            ["foo"], [tag.name for tag in node.tags.all()])
+
+
+class TestMatchDefinitions(MAASServerTestCase):
+
+    def test_returns_whether_each_definition_matches(self):
+        probed_details = {"lshw": b"<foo/>", "lldp": b"<bar/>"}
+        self.assertEqual(
+            [True, True, False, False],
+            match_definitions(
+                ["/foo", "//lldp:bar", "/foo/bar", "//nge:bar"],
+                probed_details))
+
+
+class TestMatchNodes(MAASServerTestCase):
+
+    def test_returns_system_ids_of_matching_nodes(self):
+        probed_details = {
+            "abc": {"lshw": b"<foo/>", "lldp": None},
+            "def": {"lshw": None, "lldp": b"<bar/>"},
+            "ghi": {"lshw": None, "lldp": None},
+        }
+        self.assertEqual(
+            {"def"}, match_nodes("//lldp:bar", probed_details))
+
 
 class TestPopulateTagForMultipleNodes(MAASServerTestCase):
 
@@ -377,3 +419,16 @@ class TestPopulateTagForMultipleNodes(MAASServerTestCase):
         self.assertItemsEqual(
             [node.hostname for node in nodes[0:2]],
             [node.hostname for node in Node.objects.filter(tags__name='bar')])
+
+    def test_evaluates_tag_in_process_pool(self):
+        callInProcessPool = self.patch(
+            populate_tags_module, "callInProcessPool")
+        callInProcessPool.side_effect = lambda func, *args: func(*args)
+        nodes = [factory.make_Node() for _ in range(3)]
+        make_lldp_result(nodes[0], b"<bar/>")
+        tag = factory.make_Tag("bar", "//lldp:bar", populate=False)
+        populate_tag_for_multiple_nodes(tag, nodes)
+        self.assertThat(
+            callInProcessPool, MockCalledOnceWith(
+                match_nodes, "//lldp:bar", ANY))
+        self.assertItemsEqual([nodes[0]], tag.node_set.all())
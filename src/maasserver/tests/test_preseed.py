@@ -10,7 +10,10 @@ import json
 import os
 from pipes import quote
 from textwrap import dedent
-from unittest.mock import sentinel
+from unittest.mock import (
+    ANY,
+    sentinel,
+)
 from urllib.parse import urlparse
 
 from django.conf import settings
@@ -1041,6 +1044,18 @@ class TestCurtinUtilities(
             Contains("debconf_selections:"))
         self.assertThat(config, Not(Contains('mode: reboot')))
 
+    def test_get_curtin_config_finalises_config_in_process_pool(self):
+        node = factory.make_Node_with_Interface_on_Subnet(
+            primary_rack=self.rpc_rack_controller)
+        self.configure_get_boot_images_for_node(node, 'xinstall')
+        callInProcessPool = self.patch(preseed_module, "callInProcessPool")
+        callInProcessPool.return_value = ("config", [])
+        self.assertEqual("config", get_curtin_config(node))
+        self.assertThat(
+            callInProcessPool, MockCalledOnceWith(
+                preseed_module.finalise_curtin_config, ANY,
+                node.distro_series))
+
     def test_get_curtin_config_removes_power_state(self):
         node = factory.make_Node_with_Interface_on_Subnet(
             primary_rack=self.rpc_rack_controller)
@@ -1525,6 +1540,29 @@ XJzKwRUEuJlIkVEZ72OtuoUMoBrjuADRlJQUW0ZbcmpOxjK1c6w08nhSvA==
                 node.get_boot_primary_rack_controller(),
                 osystem, arch, subarch, series))
 
+    def test_get_curtin_image_shares_images_between_nodes(self):
+        osystem = factory.make_name('os')
+        series = factory.make_name('series')
+        architecture = make_usable_architecture(self)
+        arch, subarch = architecture.split('/')
+        rack_controller = factory.make_RackController()
+        nodes = [
+            factory.make_Node_with_Interface_on_Subnet(
+                primary_rack=rack_controller, osystem=osystem,
+                distro_series=series, architecture=architecture)
+            for _ in range(3)
+        ]
+        xinstall_image = make_rpc_boot_image(purpose='xinstall')
+        mock_get_boot_images_for = self.patch(
+            preseed_module, 'get_boot_images_for')
+        mock_get_boot_images_for.return_value = [xinstall_image]
+        for node in nodes:
+            self.assertEqual(xinstall_image, get_curtin_image(node))
+        self.assertThat(
+            mock_get_boot_images_for,
+            MockCalledOnceWith(
+                rack_controller, osystem, arch, subarch, series))
+
     def test_get_curtin_image_raises_ClusterUnavailable(self):
         node = factory.make_Node_with_Interface_on_Subnet()
         self.patch(
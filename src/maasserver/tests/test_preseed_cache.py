@@ -0,0 +1,97 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for the cache of shared preseed fragments."""
+
+__all__ = []
+
+from unittest.mock import (
+    Mock,
+    sentinel,
+)
+
+from django.db import (
+    connection,
+    transaction,
+)
+from maasserver.preseed_cache import (
+    FragmentCache,
+    INVALIDATE_CHANNEL,
+)
+from maasserver.testing.testcase import (
+    MAASServerTestCase,
+    MAASTransactionServerTestCase,
+)
+from maasserver.utils.orm import (
+    savepoint,
+    transactional,
+)
+
+
+class TestFragmentCache(MAASServerTestCase):
+
+    def test_get_caches_fragment(self):
+        compute = Mock(return_value=sentinel.fragment)
+        cache = FragmentCache()
+        cache.get("key", compute)
+        self.assertIs(sentinel.fragment, cache.get("key", compute))
+        self.assertEqual(1, compute.call_count)
+
+    def test_invalidate_bypasses_cache_for_rest_of_transaction(self):
+        compute = Mock(return_value=sentinel.fragment)
+        cache = FragmentCache()
+        cache.get("key", compute)
+        cache.invalidate()
+        self.assertTrue(cache.invalidated_in_transaction())
+        self.assertIs(sentinel.fragment, cache.get("key", compute))
+        self.assertIs(sentinel.fragment, cache.get("other", compute))
+        self.assertEqual(3, compute.call_count)
+        self.assertItemsEqual(["key"], cache.values)
+
+    def test_invalidate_in_rolled_back_savepoint_is_forgotten(self):
+        cache = FragmentCache()
+        try:
+            with savepoint():
+                cache.invalidate()
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertFalse(cache.invalidated_in_transaction())
+
+    def test_handle_notification_clears_cache(self):
+        cache = FragmentCache()
+        cache.get("key", lambda: sentinel.fragment)
+        cache.handle_notification(INVALIDATE_CHANNEL, "")
+        self.assertEqual({}, cache.values)
+
+
+class TestFragmentCacheTransactions(MAASTransactionServerTestCase):
+
+    def test_invalidate_clears_cache_on_commit(self):
+        cache = FragmentCache()
+        cache.get("key", lambda: sentinel.fragment)
+        transactional(cache.invalidate)()
+        self.assertEqual({}, cache.values)
+
+    def test_invalidate_notifies_other_processes_on_commit(self):
+        cache = FragmentCache()
+        with connection.cursor() as cursor:
+            cursor.execute("LISTEN %s;" % INVALIDATE_CHANNEL)
+        self.addCleanup(connection.close)
+        transactional(cache.invalidate)()
+        connection.connection.poll()
+        self.assertEqual(
+            [INVALIDATE_CHANNEL],
+            [notify.channel for notify in connection.connection.notifies])
+
+    def test_invalidate_does_nothing_on_rollback(self):
+        cache = FragmentCache()
+        cache.get("key", lambda: sentinel.fragment)
+        try:
+            with transaction.atomic():
+                cache.invalidate()
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertFalse(cache.invalidated_in_transaction())
+        self.assertItemsEqual(["key"], cache.values)
@@ -0,0 +1,133 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.processpool`."""
+
+__all__ = []
+
+import os
+import random
+from unittest.mock import sentinel
+
+from crochet import wait_for
+from fixtures import EnvironmentVariableFixture
+from maasserver import processpool
+from maasserver.processpool import (
+    callInProcessPool,
+    callInProcessPoolWithDatabase,
+    get_process_pool_size,
+    ProcessPoolService,
+)
+from maastesting.matchers import MockCalledOnceWith
+from maastesting.testcase import MAASTestCase
+from testtools import ExpectedException
+from testtools.matchers import (
+    Equals,
+    Is,
+    Not,
+)
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.threads import deferToThread
+
+
+wait_for_reactor = wait_for(30)  # 30 seconds.
+
+
+class TestGetProcessPoolSize(MAASTestCase):
+
+    def test__is_one_by_default(self):
+        self.useFixture(EnvironmentVariableFixture(
+            "MAAS_REGIOND_PROCESS_POOL_SIZE", None))
+        self.assertThat(get_process_pool_size(), Equals(1))
+
+    def test__is_at_least_one(self):
+        self.useFixture(EnvironmentVariableFixture(
+            "MAAS_REGIOND_PROCESS_POOL_SIZE", "0"))
+        self.assertThat(get_process_pool_size(), Equals(1))
+
+    def test__can_be_overridden(self):
+        size = random.randint(1, 16)
+        self.useFixture(EnvironmentVariableFixture(
+            "MAAS_REGIOND_PROCESS_POOL_SIZE", str(size)))
+        self.assertThat(get_process_pool_size(), Equals(size))
+
+
+class TestWithoutProcessPool(MAASTestCase):
+
+    def setUp(self):
+        super(TestWithoutProcessPool, self).setUp()
+        self.patch(processpool, "_service", None)
+
+    def test_callInProcessPool_calls_directly(self):
+        self.assertThat(callInProcessPool(os.getpid), Equals(os.getpid()))
+
+    def test_callInProcessPoolWithDatabase_calls_directly(self):
+        self.assertThat(
+            callInProcessPoolWithDatabase(os.getpid), Equals(os.getpid()))
+
+
+class TestCallInProcessPoolWithDatabase(MAASTestCase):
+
+    def test__sends_function_to_helper(self):
+        pool = self.patch(processpool, "_get_pool").return_value
+        pool.apply.return_value = sentinel.result
+        result = callInProcessPoolWithDatabase(
+            get_process_pool_size, sentinel.arg, kwarg=sentinel.kwarg)
+        self.assertThat(result, Is(sentinel.result))
+        self.assertThat(pool.apply, MockCalledOnceWith(
+            processpool._call_with_database, (
+                get_process_pool_size, (sentinel.arg,),
+                {"kwarg": sentinel.kwarg})))
+
+    def test__helper_closes_connections(self):
+        connections = self.patch(processpool, "connections")
+        self.assertThat(
+            processpool._call_with_database(os.getpid, (), {}),
+            Equals(os.getpid()))
+        self.assertThat(connections.close_all, MockCalledOnceWith())
+
+
+class TestInitialiseHelper(MAASTestCase):
+
+    def test__sets_up_django(self):
+        setup = self.patch(processpool.django, "setup")
+        processpool._initialise_helper()
+        self.assertThat(setup, MockCalledOnceWith())
+
+
+class TestProcessPoolService(MAASTestCase):
+
+    def setUp(self):
+        super(TestProcessPoolService, self).setUp()
+        self.patch(processpool, "_service", None)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_starts_pool_only_when_used(self):
+        service = ProcessPoolService(size=1)
+        yield service.startService()
+        try:
+            self.assertIs(service, processpool._service)
+            self.assertIsNone(service.pool)
+            pid = yield deferToThread(callInProcessPool, os.getpid)
+            self.assertThat(pid, Not(Equals(os.getpid())))
+            self.assertIsNotNone(service.pool)
+        finally:
+            yield service.stopService()
+        self.assertIsNone(processpool._service)
+        self.assertIsNone(service.pool)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_propagates_errors(self):
+        service = ProcessPoolService(size=1)
+        yield service.startService()
+        try:
+            with ExpectedException(ValueError, "invalid literal.*"):
+                yield deferToThread(callInProcessPool, int, "not-a-number")
+        finally:
+            yield service.stopService()
+
+    def test_getPool_returns_None_when_stopped(self):
+        service = ProcessPoolService(size=1)
+        self.assertIsNone(service.getPool())
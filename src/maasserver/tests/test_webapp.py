@@ -16,6 +16,10 @@ from maasserver import (
     eventloop,
     webapp,
 )
+from maasserver.preseed_cache import (
+    fragment_cache,
+    INVALIDATE_CHANNEL,
+)
 from maasserver.testing.listener import FakePostgresListenerService
 from maasserver.webapp import OverlaySite
 from maasserver.websockets.protocol import WebSocketFactory
@@ -23,6 +27,7 @@ from maastesting.factory import factory
 from maastesting.matchers import MockCalledOnceWith
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
+from provisioningserver.utils.metrics import MetricsResource
 from provisioningserver.utils.twisted import reducedWebLogFormatter
 from testtools.matchers import (
     Equals,
@@ -303,6 +308,9 @@ class TestWebApplicationService(MAASTestCase):
         self.assertThat(resource, IsInstance(Resource))
         overlay_resource = resource.getChildWithDefault(b"MAAS", request=None)
         self.assertThat(overlay_resource, IsInstance(Resource))
+        metrics_resource = overlay_resource.getChildWithDefault(
+            b"metrics", request=None)
+        self.assertThat(metrics_resource, IsInstance(MetricsResource))
 
         # Underlay
         site = service.site.underlay
@@ -323,3 +331,18 @@ class TestWebApplicationService(MAASTestCase):
         self.assertTrue(service.running)
         service.stopService()
         self.assertFalse(service.running)
+
+    def test__startService_listens_for_preseed_cache_invalidation(self):
+        service = self.make_webapp()
+        self.addCleanup(service.stopService)
+        service.startService()
+        self.assertEqual(
+            [fragment_cache.handle_notification],
+            service.listener.listeners[INVALIDATE_CHANNEL])
+
+    def test__stopService_stops_listening_for_preseed_cache_invalidation(
+            self):
+        service = self.make_webapp()
+        service.startService()
+        service.stopService()
+        self.assertEqual([], service.listener.listeners[INVALIDATE_CHANNEL])
@@ -8,13 +8,23 @@ __all__ = []
 import os
 import random
 import sys
+from unittest.mock import (
+    call,
+    Mock,
+)
 
 from crochet import wait_for
+from maasserver.forkserver import STATUS_FD
 from maasserver.workers import (
+    ForkedWorker,
+    ForkServerProcess,
     set_max_workers_count,
     WorkersService,
 )
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+)
 from maastesting.testcase import MAASTestCase
 from provisioningserver.utils.twisted import DeferredValue
 from twisted.internet import reactor
@@ -137,3 +147,76 @@ class TestWorkersService(MAASTestCase):
 
         yield dv.get(timeout=2)
         self.assertEqual({}, service.workers)
+
+
+class TestWorkersServicePrefork(MAASTestCase):
+    """Tests for `WorkersService` with a fork server."""
+
+    def make_service(self, worker_count=2):
+        return WorkersService(
+            Mock(), worker_count=worker_count, worker_cmd='regiond',
+            prefork=True)
+
+    def test_spawnWorkers_starts_fork_server_once(self):
+        service = self.make_service(worker_count=3)
+        self.patch(ForkServerProcess, 'spawnWorker')
+        service.spawnWorkers()
+        self.assertEquals(1, service.reactor.spawnProcess.call_count)
+        args, kwargs = service.reactor.spawnProcess.call_args
+        self.assertEquals(
+            (service.forkServer, 'regiond', ['regiond']), args)
+        self.assertEquals(
+            'forkserver', kwargs['env']['MAAS_REGIOND_PROCESS_MODE'])
+        self.assertEquals(
+            {0: 'w', 1: 1, 2: 2, STATUS_FD: 'r'}, kwargs['childFDs'])
+        self.assertEquals(3, service.forkServer.spawnWorker.call_count)
+        self.assertEquals(3, service.pending)
+
+    def test_spawnWorkers_counts_pending_workers(self):
+        service = self.make_service(worker_count=2)
+        self.patch(ForkServerProcess, 'spawnWorker')
+        service.spawnWorkers()
+        service.spawnWorkers()
+        self.assertEquals(2, service.forkServer.spawnWorker.call_count)
+
+    def test_started_registers_forked_worker(self):
+        service = self.make_service(worker_count=1)
+        self.patch(ForkServerProcess, 'spawnWorker')
+        service.spawnWorkers()
+        pid = random.randint(2, 50000)
+        service.forkServer.childDataReceived(
+            STATUS_FD, b"started %d\n" % pid)
+        self.assertEquals(0, service.pending)
+        self.assertIsInstance(service.workers[pid], ForkedWorker)
+
+    def test_events_can_be_split_across_reads(self):
+        service = self.make_service(worker_count=1)
+        self.patch(ForkServerProcess, 'spawnWorker')
+        service.spawnWorkers()
+        service.forkServer.childDataReceived(STATUS_FD, b"star")
+        service.forkServer.childDataReceived(STATUS_FD, b"ted 123\nexi")
+        self.assertIn(123, service.workers)
+
+    def test_exited_unregisters_worker_and_spawns_another(self):
+        service = self.make_service(worker_count=1)
+        self.patch(ForkServerProcess, 'spawnWorker')
+        service.spawnWorkers()
+        service.forkServer.childDataReceived(STATUS_FD, b"started 123\n")
+        service.forkServer.childDataReceived(STATUS_FD, b"exited 123 9\n")
+        self.assertEqual({}, service.workers)
+        self.assertThat(
+            service.forkServer.spawnWorker, MockCallsMatch(call(), call()))
+
+    def test_fork_server_ending_restarts_it_and_its_workers(self):
+        service = self.make_service(worker_count=1)
+        self.patch(ForkServerProcess, 'spawnWorker')
+        self.patch(ForkedWorker, 'signal')
+        service.spawnWorkers()
+        forkServer = service.forkServer
+        forkServer.childDataReceived(STATUS_FD, b"started 123\n")
+        forkServer.processEnded(None)
+        self.assertThat(ForkedWorker.signal, MockCalledOnceWith("KILL"))
+        self.assertNotIn(123, service.workers)
+        self.assertIsNot(forkServer, service.forkServer)
+        self.assertEquals(2, service.reactor.spawnProcess.call_count)
+        self.assertEquals(1, service.pending)
@@ -160,7 +160,11 @@ def register_trigger(
 @transactional
 def register_all_triggers():
     """Register all triggers into the database."""
+    from maasserver.triggers.bmc import register_bmc_triggers
+    from maasserver.triggers.discovery import register_discovery_triggers
     from maasserver.triggers.system import register_system_triggers
     from maasserver.triggers.websocket import register_websocket_triggers
+    register_bmc_triggers()
+    register_discovery_triggers()
     register_system_triggers()
     register_websocket_triggers()
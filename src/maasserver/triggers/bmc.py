@@ -0,0 +1,332 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""
+BMC Triggers
+
+The `maasserver_bmc_rack_controllers` table materializes the
+`maasserver_bmc_rack_controllers_view` view (see `maasserver.dbviews`), which
+holds the rack controllers that can reach each BMC directly. These triggers
+keep it up to date as BMCs, subnets, and the addresses of rack controllers
+change, refreshing only the BMCs that a change can affect.
+"""
+
+__all__ = [
+    "register_bmc_triggers"
+    ]
+
+from textwrap import dedent
+
+from maasserver.triggers import (
+    register_procedure,
+    register_trigger,
+)
+from maasserver.utils.orm import transactional
+
+# Helper that recomputes the rack controllers for the given BMCs.
+BMC_RACKS_REFRESH = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_refresh(bmcs integer[])
+    RETURNS void as $$
+    BEGIN
+      DELETE FROM maasserver_bmc_rack_controllers
+      WHERE bmc_id = ANY(bmcs);
+      INSERT INTO maasserver_bmc_rack_controllers
+      SELECT * FROM maasserver_bmc_rack_controllers_view
+      WHERE bmc_id = ANY(bmcs);
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Helper that recomputes the rack controllers for the BMCs in the given
+# subnet.
+BMC_RACKS_REFRESH_SUBNET = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_refresh_subnet(subnet integer)
+    RETURNS void as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh(ARRAY(
+        SELECT DISTINCT bmc_id
+        FROM maasserver_bmc_rack_controllers
+        WHERE subnet_id = subnet));
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Helper that recomputes the rack controllers for the BMCs with IP addresses
+# in the given network, which a subnet for that network could be the best
+# match for.
+BMC_RACKS_REFRESH_NETWORK = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_refresh_network(network cidr)
+    RETURNS void as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh(ARRAY(
+        SELECT bmc.id
+        FROM maasserver_bmc AS bmc
+        JOIN maasserver_staticipaddress AS sip
+          ON sip.id = bmc.ip_address_id
+        WHERE sip.ip << network));
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a BMC is added.
+BMC_RACKS_BMC_INSERT = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_bmc_insert()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh(ARRAY[NEW.id]);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when the IP address of a BMC is changed.
+BMC_RACKS_BMC_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_bmc_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh(ARRAY[NEW.id]);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a BMC is removed.
+BMC_RACKS_BMC_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_bmc_delete()
+    RETURNS trigger as $$
+    BEGIN
+      DELETE FROM maasserver_bmc_rack_controllers WHERE bmc_id = OLD.id;
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when the IP or subnet of an IP address is changed. This could be
+# the address of a BMC, or of a rack controller.
+BMC_RACKS_SIP_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_sip_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh(ARRAY(
+        SELECT id FROM maasserver_bmc WHERE ip_address_id = NEW.id));
+      PERFORM 1
+      FROM maasserver_interface_ip_addresses AS ifia
+      JOIN maasserver_interface AS iface ON iface.id = ifia.interface_id
+      JOIN maasserver_node AS node ON node.id = iface.node_id
+      WHERE ifia.staticipaddress_id = NEW.id
+      AND node.node_type IN (2, 4);
+      IF FOUND THEN
+        IF OLD.subnet_id IS NOT NULL THEN
+          PERFORM sys_bmc_racks_refresh_subnet(OLD.subnet_id);
+        END IF;
+        IF NEW.subnet_id IS NOT NULL THEN
+          PERFORM sys_bmc_racks_refresh_subnet(NEW.subnet_id);
+        END IF;
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when an IP address is linked to an interface.
+BMC_RACKS_INTERFACE_IP_INSERT = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_interface_ip_insert()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh_subnet(sip.subnet_id)
+      FROM maasserver_staticipaddress AS sip
+      JOIN maasserver_interface AS iface ON iface.id = NEW.interface_id
+      JOIN maasserver_node AS node ON node.id = iface.node_id
+      WHERE sip.id = NEW.staticipaddress_id
+      AND sip.subnet_id IS NOT NULL
+      AND node.node_type IN (2, 4);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when an IP address is unlinked from an interface.
+BMC_RACKS_INTERFACE_IP_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_interface_ip_delete()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh_subnet(sip.subnet_id)
+      FROM maasserver_staticipaddress AS sip
+      JOIN maasserver_interface AS iface ON iface.id = OLD.interface_id
+      JOIN maasserver_node AS node ON node.id = iface.node_id
+      WHERE sip.id = OLD.staticipaddress_id
+      AND sip.subnet_id IS NOT NULL
+      AND node.node_type IN (2, 4);
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when an interface is moved to another node.
+BMC_RACKS_INTERFACE_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_interface_update()
+    RETURNS trigger as $$
+    BEGIN
+      -- Refresh the subnets the interface's addresses are on, if either the
+      -- old or the new node is a rack controller.
+      PERFORM 1 FROM maasserver_node
+      WHERE id IN (OLD.node_id, NEW.node_id) AND node_type IN (2, 4);
+      IF FOUND THEN
+        PERFORM sys_bmc_racks_refresh_subnet(sip.subnet_id)
+        FROM (
+          SELECT DISTINCT sip.subnet_id
+          FROM maasserver_staticipaddress AS sip
+          JOIN maasserver_interface_ip_addresses AS ifia
+            ON ifia.staticipaddress_id = sip.id
+          WHERE ifia.interface_id = NEW.id
+          AND sip.subnet_id IS NOT NULL) AS sip;
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a node becomes, or stops being, a rack controller.
+BMC_RACKS_NODE_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_node_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF (OLD.node_type IN (2, 4)) != (NEW.node_type IN (2, 4)) THEN
+        PERFORM sys_bmc_racks_refresh_subnet(sip.subnet_id)
+        FROM (
+          SELECT DISTINCT sip.subnet_id
+          FROM maasserver_staticipaddress AS sip
+          JOIN maasserver_interface_ip_addresses AS ifia
+            ON ifia.staticipaddress_id = sip.id
+          JOIN maasserver_interface AS iface
+            ON iface.id = ifia.interface_id
+          WHERE iface.node_id = NEW.id
+          AND sip.subnet_id IS NOT NULL) AS sip;
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a subnet is added.
+BMC_RACKS_SUBNET_INSERT = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_subnet_insert()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh_network(NEW.cidr);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when the CIDR or VLAN of a subnet is changed.
+BMC_RACKS_SUBNET_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_subnet_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh_subnet(NEW.id);
+      PERFORM sys_bmc_racks_refresh_network(NEW.cidr);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a subnet is removed.
+BMC_RACKS_SUBNET_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_subnet_delete()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh_subnet(OLD.id);
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when DHCP is turned on or off for a VLAN, which changes the best
+# subnet for addresses in overlapping subnets.
+BMC_RACKS_VLAN_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_bmc_racks_vlan_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_bmc_racks_refresh_network(cidr)
+      FROM maasserver_subnet
+      WHERE vlan_id = NEW.id;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+@transactional
+def register_bmc_triggers():
+    """Register all BMC triggers into the database."""
+    # Helpers.
+    register_procedure(BMC_RACKS_REFRESH)
+    register_procedure(BMC_RACKS_REFRESH_SUBNET)
+    register_procedure(BMC_RACKS_REFRESH_NETWORK)
+
+    # - BMC
+    register_procedure(BMC_RACKS_BMC_INSERT)
+    register_trigger(
+        "maasserver_bmc",
+        "sys_bmc_racks_bmc_insert", "insert")
+    register_procedure(BMC_RACKS_BMC_UPDATE)
+    register_trigger(
+        "maasserver_bmc",
+        "sys_bmc_racks_bmc_update", "update",
+        fields=["ip_address_id"])
+    register_procedure(BMC_RACKS_BMC_DELETE)
+    register_trigger(
+        "maasserver_bmc",
+        "sys_bmc_racks_bmc_delete", "delete")
+
+    # - StaticIPAddress
+    register_procedure(BMC_RACKS_SIP_UPDATE)
+    register_trigger(
+        "maasserver_staticipaddress",
+        "sys_bmc_racks_sip_update", "update",
+        fields=["ip", "subnet_id"])
+
+    # - Interface
+    register_procedure(BMC_RACKS_INTERFACE_IP_INSERT)
+    register_trigger(
+        "maasserver_interface_ip_addresses",
+        "sys_bmc_racks_interface_ip_insert", "insert")
+    register_procedure(BMC_RACKS_INTERFACE_IP_DELETE)
+    register_trigger(
+        "maasserver_interface_ip_addresses",
+        "sys_bmc_racks_interface_ip_delete", "delete")
+    register_procedure(BMC_RACKS_INTERFACE_UPDATE)
+    register_trigger(
+        "maasserver_interface",
+        "sys_bmc_racks_interface_update", "update",
+        fields=["node_id"])
+
+    # - Node
+    register_procedure(BMC_RACKS_NODE_UPDATE)
+    register_trigger(
+        "maasserver_node",
+        "sys_bmc_racks_node_update", "update",
+        fields=["node_type"])
+
+    # - Subnet
+    register_procedure(BMC_RACKS_SUBNET_INSERT)
+    register_trigger(
+        "maasserver_subnet",
+        "sys_bmc_racks_subnet_insert", "insert")
+    register_procedure(BMC_RACKS_SUBNET_UPDATE)
+    register_trigger(
+        "maasserver_subnet",
+        "sys_bmc_racks_subnet_update", "update",
+        fields=["vlan_id", "cidr"])
+    register_procedure(BMC_RACKS_SUBNET_DELETE)
+    register_trigger(
+        "maasserver_subnet",
+        "sys_bmc_racks_subnet_delete", "delete")
+
+    # - VLAN
+    register_procedure(BMC_RACKS_VLAN_UPDATE)
+    register_trigger(
+        "maasserver_vlan",
+        "sys_bmc_racks_vlan_update", "update",
+        fields=["dhcp_on"])
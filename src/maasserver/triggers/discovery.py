@@ -0,0 +1,358 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""
+Discovery Triggers
+
+The `maasserver_discovery` table materializes the `maasserver_discovery_view`
+view (see `maasserver.dbviews`). These triggers keep it up to date as the
+tables the view is built from change, refreshing only the discoveries that a
+change can affect, and updating columns in place where that is enough.
+"""
+
+__all__ = [
+    "register_discovery_triggers"
+    ]
+
+from textwrap import dedent
+
+from maasserver.triggers import (
+    register_procedure,
+    register_trigger,
+)
+from maasserver.utils.orm import transactional
+
+# Helper that recomputes the discovery for the given MAC and IP address.
+DISCOVERY_REFRESH = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_refresh(mac macaddr, addr inet)
+    RETURNS void as $$
+    BEGIN
+      DELETE FROM maasserver_discovery
+      WHERE mac_address = mac AND ip = addr;
+      INSERT INTO maasserver_discovery
+      SELECT * FROM maasserver_discovery_view
+      WHERE mac_address = mac AND ip = addr;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Helper that recomputes the discoveries for the given IP address.
+DISCOVERY_REFRESH_IP = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_refresh_ip(addr inet)
+    RETURNS void as $$
+    BEGIN
+      DELETE FROM maasserver_discovery WHERE ip = addr;
+      INSERT INTO maasserver_discovery
+      SELECT * FROM maasserver_discovery_view WHERE ip = addr;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Helper that recomputes the discoveries that a subnet on the given VLAN can
+# match.
+DISCOVERY_REFRESH_SUBNET = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_refresh_subnet(
+      vlan integer, network cidr)
+    RETURNS void as $$
+    DECLARE
+      discovery RECORD;
+    BEGIN
+      FOR discovery IN (
+        SELECT mac_address, ip
+        FROM maasserver_discovery
+        WHERE vlan_id = vlan AND ip << network)
+      LOOP
+        PERFORM sys_discovery_refresh(discovery.mac_address, discovery.ip);
+      END LOOP;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a neighbour is added.
+DISCOVERY_NEIGHBOUR_INSERT = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_neighbour_insert()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_discovery_refresh(NEW.mac_address, NEW.ip);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a neighbour is updated. Most updates are of a neighbour that
+# has been seen again, which only moves its timestamps and count forward.
+DISCOVERY_NEIGHBOUR_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_neighbour_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF NEW.mac_address = OLD.mac_address AND NEW.ip = OLD.ip
+         AND NEW.interface_id = OLD.interface_id
+         AND NEW.vid IS NOT DISTINCT FROM OLD.vid THEN
+        -- If this is the neighbour being shown it will still be the most
+        -- recently seen, so only the times need updating.
+        UPDATE maasserver_discovery AS discovery
+        SET
+          first_seen = NEW.created,
+          last_seen = GREATEST(NEW.updated, (
+            SELECT mdns.updated
+            FROM maasserver_mdns AS mdns
+            WHERE mdns.id = discovery.mdns_id))
+        WHERE discovery.id = NEW.id;
+        IF FOUND THEN
+          RETURN NEW;
+        END IF;
+        -- Nothing changes unless this neighbour is now the most recently
+        -- seen.
+        PERFORM 1
+        FROM maasserver_discovery AS discovery
+        JOIN maasserver_neighbour AS neigh ON neigh.id = discovery.id
+        WHERE discovery.mac_address = NEW.mac_address
+        AND discovery.ip = NEW.ip
+        AND neigh.updated > NEW.updated;
+        IF FOUND THEN
+          RETURN NEW;
+        END IF;
+      ELSIF NEW.mac_address != OLD.mac_address OR NEW.ip != OLD.ip THEN
+        PERFORM sys_discovery_refresh(OLD.mac_address, OLD.ip);
+      END IF;
+      PERFORM sys_discovery_refresh(NEW.mac_address, NEW.ip);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a neighbour is removed.
+DISCOVERY_NEIGHBOUR_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_neighbour_delete()
+    RETURNS trigger as $$
+    BEGIN
+      -- Nothing changes unless this is the neighbour being shown.
+      PERFORM 1 FROM maasserver_discovery WHERE id = OLD.id;
+      IF FOUND THEN
+        PERFORM sys_discovery_refresh(OLD.mac_address, OLD.ip);
+      END IF;
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when an mDNS or reverse-DNS entry is added.
+DISCOVERY_IP_INSERT = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_ip_insert()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_discovery_refresh_ip(NEW.ip);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when an mDNS or reverse-DNS entry is updated.
+DISCOVERY_IP_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_ip_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF NEW.ip IS DISTINCT FROM OLD.ip THEN
+        PERFORM sys_discovery_refresh_ip(OLD.ip);
+      END IF;
+      PERFORM sys_discovery_refresh_ip(NEW.ip);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when an mDNS or reverse-DNS entry is removed.
+DISCOVERY_IP_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_ip_delete()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_discovery_refresh_ip(OLD.ip);
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when the name, VLAN, or node of an interface is changed.
+DISCOVERY_INTERFACE_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_interface_update()
+    RETURNS trigger as $$
+    DECLARE
+      neigh RECORD;
+    BEGIN
+      IF NEW.vlan_id IS DISTINCT FROM OLD.vlan_id
+         OR NEW.node_id IS DISTINCT FROM OLD.node_id THEN
+        FOR neigh IN (
+          SELECT DISTINCT mac_address, ip
+          FROM maasserver_neighbour
+          WHERE interface_id = NEW.id)
+        LOOP
+          PERFORM sys_discovery_refresh(neigh.mac_address, neigh.ip);
+        END LOOP;
+      ELSE
+        UPDATE maasserver_discovery
+        SET observer_interface_name = NEW.name
+        WHERE observer_interface_id = NEW.id;
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when the hostname or system ID of a node is changed.
+DISCOVERY_NODE_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_node_update()
+    RETURNS trigger as $$
+    BEGIN
+      UPDATE maasserver_discovery
+      SET
+        observer_system_id = NEW.system_id,
+        observer_hostname = NEW.hostname
+      WHERE observer_id = NEW.id;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when the fabric or external DHCP server of a VLAN is changed.
+DISCOVERY_VLAN_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_vlan_update()
+    RETURNS trigger as $$
+    BEGIN
+      UPDATE maasserver_discovery
+      SET
+        fabric_id = NEW.fabric_id,
+        fabric_name = (
+          SELECT name FROM maasserver_fabric WHERE id = NEW.fabric_id),
+        is_external_dhcp = COALESCE(ip = NEW.external_dhcp, FALSE)
+      WHERE vlan_id = NEW.id;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when the name of a fabric is changed.
+DISCOVERY_FABRIC_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_fabric_update()
+    RETURNS trigger as $$
+    BEGIN
+      UPDATE maasserver_discovery
+      SET fabric_name = NEW.name
+      WHERE fabric_id = NEW.id;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a subnet is added.
+DISCOVERY_SUBNET_INSERT = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_subnet_insert()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_discovery_refresh_subnet(NEW.vlan_id, NEW.cidr);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when the CIDR or VLAN of a subnet is changed.
+DISCOVERY_SUBNET_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_subnet_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_discovery_refresh_subnet(OLD.vlan_id, OLD.cidr);
+      PERFORM sys_discovery_refresh_subnet(NEW.vlan_id, NEW.cidr);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+# Triggered when a subnet is removed.
+DISCOVERY_SUBNET_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_discovery_subnet_delete()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_discovery_refresh_subnet(OLD.vlan_id, OLD.cidr);
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+@transactional
+def register_discovery_triggers():
+    """Register all discovery triggers into the database."""
+    # Helpers.
+    register_procedure(DISCOVERY_REFRESH)
+    register_procedure(DISCOVERY_REFRESH_IP)
+    register_procedure(DISCOVERY_REFRESH_SUBNET)
+
+    # - Neighbour
+    register_procedure(DISCOVERY_NEIGHBOUR_INSERT)
+    register_trigger(
+        "maasserver_neighbour",
+        "sys_discovery_neighbour_insert", "insert")
+    register_procedure(DISCOVERY_NEIGHBOUR_UPDATE)
+    register_trigger(
+        "maasserver_neighbour",
+        "sys_discovery_neighbour_update", "update",
+        fields=[
+            "ip", "mac_address", "interface_id", "vid", "created",
+            "updated"])
+    register_procedure(DISCOVERY_NEIGHBOUR_DELETE)
+    register_trigger(
+        "maasserver_neighbour",
+        "sys_discovery_neighbour_delete", "delete")
+
+    # - mDNS and reverse-DNS
+    register_procedure(DISCOVERY_IP_INSERT)
+    register_procedure(DISCOVERY_IP_UPDATE)
+    register_procedure(DISCOVERY_IP_DELETE)
+    for table in ("maasserver_mdns", "maasserver_rdns"):
+        register_trigger(table, "sys_discovery_ip_insert", "insert")
+        register_trigger(
+            table, "sys_discovery_ip_update", "update",
+            fields=["ip", "hostname", "updated"])
+        register_trigger(table, "sys_discovery_ip_delete", "delete")
+
+    # - Interface
+    register_procedure(DISCOVERY_INTERFACE_UPDATE)
+    register_trigger(
+        "maasserver_interface",
+        "sys_discovery_interface_update", "update",
+        fields=["name", "vlan_id", "node_id"])
+
+    # - Node
+    register_procedure(DISCOVERY_NODE_UPDATE)
+    register_trigger(
+        "maasserver_node",
+        "sys_discovery_node_update", "update",
+        fields=["system_id", "hostname"])
+
+    # - VLAN
+    register_procedure(DISCOVERY_VLAN_UPDATE)
+    register_trigger(
+        "maasserver_vlan",
+        "sys_discovery_vlan_update", "update",
+        fields=["fabric_id", "external_dhcp"])
+
+    # - Fabric
+    register_procedure(DISCOVERY_FABRIC_UPDATE)
+    register_trigger(
+        "maasserver_fabric",
+        "sys_discovery_fabric_update", "update",
+        fields=["name"])
+
+    # - Subnet
+    register_procedure(DISCOVERY_SUBNET_INSERT)
+    register_trigger(
+        "maasserver_subnet",
+        "sys_discovery_subnet_insert", "insert")
+    register_procedure(DISCOVERY_SUBNET_UPDATE)
+    register_trigger(
+        "maasserver_subnet",
+        "sys_discovery_subnet_update", "update",
+        fields=["vlan_id", "cidr"])
+    register_procedure(DISCOVERY_SUBNET_DELETE)
+    register_trigger(
+        "maasserver_subnet",
+        "sys_discovery_subnet_delete", "delete")
@@ -0,0 +1,163 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.triggers.bmc`."""
+
+__all__ = []
+
+from contextlib import closing
+
+from django.db import connection
+from maasserver.enum import (
+    IPADDRESS_TYPE,
+    NODE_TYPE,
+)
+from maasserver.models import (
+    Node,
+    StaticIPAddress,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.triggers.bmc import register_bmc_triggers
+from maasserver.utils.orm import psql_array
+from testtools.matchers import Equals
+
+
+class TestTriggers(MAASServerTestCase):
+
+    def test_register_bmc_triggers(self):
+        register_bmc_triggers()
+        triggers = [
+            "bmc_sys_bmc_racks_bmc_insert",
+            "bmc_sys_bmc_racks_bmc_update",
+            "bmc_sys_bmc_racks_bmc_delete",
+            "staticipaddress_sys_bmc_racks_sip_update",
+            "interface_ip_addresses_sys_bmc_racks_interface_ip_insert",
+            "interface_ip_addresses_sys_bmc_racks_interface_ip_delete",
+            "interface_sys_bmc_racks_interface_update",
+            "node_sys_bmc_racks_node_update",
+            "subnet_sys_bmc_racks_subnet_insert",
+            "subnet_sys_bmc_racks_subnet_update",
+            "subnet_sys_bmc_racks_subnet_delete",
+            "vlan_sys_bmc_racks_vlan_update",
+            ]
+        sql, args = psql_array(triggers, sql_type="text")
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(
+                "SELECT tgname::text FROM pg_trigger WHERE "
+                "tgname::text = ANY(%s)" % sql, args)
+            db_triggers = cursor.fetchall()
+        self.assertItemsEqual(
+            triggers, [trigger[0] for trigger in db_triggers])
+
+
+class TestBMCRackControllersTriggers(MAASServerTestCase):
+    """The triggers keep `maasserver_bmc_rack_controllers` the same as its
+    view."""
+
+    def get_rack_controller_ids(self, bmc):
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(
+                "SELECT rack_controller_id "
+                "FROM maasserver_bmc_rack_controllers WHERE bmc_id = %s",
+                [bmc.id])
+            return {
+                rack_id for rack_id, in cursor.fetchall()
+                if rack_id is not None
+            }
+
+    def assertBMCRacksUpToDate(self):
+        with closing(connection.cursor()) as cursor:
+            cursor.execute("SELECT * FROM maasserver_bmc_rack_controllers")
+            rows = cursor.fetchall()
+            cursor.execute(
+                "SELECT * FROM maasserver_bmc_rack_controllers_view")
+            expected = cursor.fetchall()
+        self.assertItemsEqual(expected, rows)
+
+    def make_rack_ip(self, subnet, rack=None):
+        if rack is None:
+            rack = factory.make_RackController()
+        return factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            ip=factory.pick_ip_in_Subnet(subnet), subnet=subnet,
+            interface=factory.make_Interface(node=rack))
+
+    def make_bmc(self, subnet, ip=None):
+        if ip is None:
+            ip = factory.pick_ip_in_Subnet(subnet)
+        sip = StaticIPAddress.objects.create(
+            alloc_type=IPADDRESS_TYPE.STICKY, ip=ip, subnet=subnet)
+        return factory.make_BMC(ip_address=sip)
+
+    def test__bmc_changes(self):
+        subnet = factory.make_Subnet()
+        rack_ip = self.make_rack_ip(subnet)
+        bmc = self.make_bmc(subnet)
+        rack_id = rack_ip.interface_set.first().node_id
+        self.assertThat(
+            self.get_rack_controller_ids(bmc), Equals({rack_id}))
+        other_subnet = factory.make_Subnet()
+        bmc.ip_address = StaticIPAddress.objects.create(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            ip=factory.pick_ip_in_Subnet(other_subnet), subnet=other_subnet)
+        bmc.save()
+        self.assertThat(self.get_rack_controller_ids(bmc), Equals(set()))
+        self.assertBMCRacksUpToDate()
+        bmc.delete()
+        self.assertBMCRacksUpToDate()
+
+    def test__rack_ip_changes(self):
+        subnet = factory.make_Subnet()
+        bmc = self.make_bmc(subnet)
+        rack_ip = self.make_rack_ip(subnet)
+        interface = rack_ip.interface_set.first()
+        self.assertThat(
+            self.get_rack_controller_ids(bmc), Equals({interface.node_id}))
+        rack_ip.ip = None
+        rack_ip.save()
+        self.assertThat(self.get_rack_controller_ids(bmc), Equals(set()))
+        rack_ip.ip = factory.pick_ip_in_Subnet(subnet)
+        rack_ip.save()
+        self.assertThat(
+            self.get_rack_controller_ids(bmc), Equals({interface.node_id}))
+        interface.ip_addresses.remove(rack_ip)
+        self.assertThat(self.get_rack_controller_ids(bmc), Equals(set()))
+        self.assertBMCRacksUpToDate()
+
+    def test__rack_interface_and_node_changes(self):
+        subnet = factory.make_Subnet()
+        bmc = self.make_bmc(subnet)
+        rack_ip = self.make_rack_ip(subnet)
+        interface = rack_ip.interface_set.first()
+        rack_id = interface.node_id
+        Node.objects.filter(id=rack_id).update(node_type=NODE_TYPE.MACHINE)
+        self.assertThat(self.get_rack_controller_ids(bmc), Equals(set()))
+        Node.objects.filter(id=rack_id).update(
+            node_type=NODE_TYPE.REGION_AND_RACK_CONTROLLER)
+        self.assertThat(
+            self.get_rack_controller_ids(bmc), Equals({rack_id}))
+        other_rack = factory.make_RackController()
+        interface.node = other_rack
+        interface.save()
+        self.assertThat(
+            self.get_rack_controller_ids(bmc), Equals({other_rack.id}))
+        self.assertBMCRacksUpToDate()
+
+    def test__subnet_changes(self):
+        subnet = factory.make_Subnet(cidr="10.0.0.0/16")
+        bmc = self.make_bmc(subnet, ip="10.0.0.1")
+        rack_ip = self.make_rack_ip(subnet)
+        rack_id = rack_ip.interface_set.first().node_id
+        best = factory.make_Subnet(cidr="10.0.0.0/8", vlan=subnet.vlan)
+        self.assertThat(
+            self.get_rack_controller_ids(bmc), Equals({rack_id}))
+        best.cidr = "10.0.0.0/24"
+        best.save()
+        self.assertThat(self.get_rack_controller_ids(bmc), Equals(set()))
+        self.make_rack_ip(best)
+        self.assertBMCRacksUpToDate()
+        best.delete()
+        self.assertThat(
+            self.get_rack_controller_ids(bmc), Equals({rack_id}))
+        self.assertBMCRacksUpToDate()
@@ -0,0 +1,184 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.triggers.discovery`."""
+
+__all__ = []
+
+from contextlib import closing
+from datetime import timedelta
+
+from django.db import connection
+from maasserver.models import (
+    Discovery,
+    Neighbour,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.triggers.discovery import register_discovery_triggers
+from maasserver.utils.orm import psql_array
+from testtools.matchers import (
+    Equals,
+    HasLength,
+)
+
+
+class TestTriggers(MAASServerTestCase):
+
+    def test_register_discovery_triggers(self):
+        register_discovery_triggers()
+        triggers = [
+            "neighbour_sys_discovery_neighbour_insert",
+            "neighbour_sys_discovery_neighbour_update",
+            "neighbour_sys_discovery_neighbour_delete",
+            "mdns_sys_discovery_ip_insert",
+            "mdns_sys_discovery_ip_update",
+            "mdns_sys_discovery_ip_delete",
+            "rdns_sys_discovery_ip_insert",
+            "rdns_sys_discovery_ip_update",
+            "rdns_sys_discovery_ip_delete",
+            "interface_sys_discovery_interface_update",
+            "node_sys_discovery_node_update",
+            "vlan_sys_discovery_vlan_update",
+            "fabric_sys_discovery_fabric_update",
+            "subnet_sys_discovery_subnet_insert",
+            "subnet_sys_discovery_subnet_update",
+            "subnet_sys_discovery_subnet_delete",
+            ]
+        sql, args = psql_array(triggers, sql_type="text")
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(
+                "SELECT tgname::text FROM pg_trigger WHERE "
+                "tgname::text = ANY(%s)" % sql, args)
+            db_triggers = cursor.fetchall()
+        self.assertItemsEqual(
+            triggers, [trigger[0] for trigger in db_triggers])
+
+
+class TestDiscoveryTriggers(MAASServerTestCase):
+    """The triggers keep `maasserver_discovery` the same as its view."""
+
+    def assertDiscoveriesUpToDate(self):
+        with closing(connection.cursor()) as cursor:
+            cursor.execute("SELECT * FROM maasserver_discovery")
+            discoveries = cursor.fetchall()
+            cursor.execute("SELECT * FROM maasserver_discovery_view")
+            expected = cursor.fetchall()
+        self.assertItemsEqual(expected, discoveries)
+
+    def make_rack_interface(self):
+        rack = factory.make_RackController()
+        return factory.make_Interface(node=rack)
+
+    def test__neighbour_insert(self):
+        discovery = factory.make_Discovery()
+        self.assertThat(Discovery.objects.all(), HasLength(1))
+        self.assertThat(
+            Discovery.objects.get().neighbour_id,
+            Equals(discovery.neighbour_id))
+        self.assertDiscoveriesUpToDate()
+
+    def test__neighbour_update_moves_last_seen(self):
+        discovery = factory.make_Discovery(hostname="")
+        neighbour = discovery.neighbour
+        neighbour.count += 1
+        neighbour.save(_updated=discovery.last_seen + timedelta(seconds=60))
+        self.assertThat(
+            Discovery.objects.get().last_seen,
+            Equals(discovery.last_seen + timedelta(seconds=60)))
+        self.assertDiscoveriesUpToDate()
+
+    def test__neighbour_update_shows_most_recently_seen(self):
+        discovery = factory.make_Discovery()
+        other = factory.make_Neighbour(
+            interface=self.make_rack_interface(), ip=discovery.ip,
+            mac_address=discovery.mac_address,
+            updated=discovery.last_seen - timedelta(seconds=60))
+        self.assertThat(
+            Discovery.objects.get().neighbour_id,
+            Equals(discovery.neighbour_id))
+        other.save(_updated=discovery.last_seen + timedelta(seconds=60))
+        self.assertThat(
+            Discovery.objects.get().neighbour_id, Equals(other.id))
+        self.assertDiscoveriesUpToDate()
+
+    def test__neighbour_update_of_ip(self):
+        discovery = factory.make_Discovery()
+        neighbour = discovery.neighbour
+        neighbour.ip = factory.make_ip_address()
+        neighbour.save()
+        self.assertThat(
+            Discovery.objects.get().ip, Equals(neighbour.ip))
+        self.assertDiscoveriesUpToDate()
+
+    def test__neighbour_delete(self):
+        discovery = factory.make_Discovery()
+        other = factory.make_Neighbour(
+            interface=self.make_rack_interface(), ip=discovery.ip,
+            mac_address=discovery.mac_address,
+            updated=discovery.last_seen - timedelta(seconds=60))
+        discovery.neighbour.delete()
+        self.assertThat(
+            Discovery.objects.get().neighbour_id, Equals(other.id))
+        Neighbour.objects.all().delete()
+        self.assertThat(Discovery.objects.all(), HasLength(0))
+        self.assertDiscoveriesUpToDate()
+
+    def test__mdns_and_rdns_changes(self):
+        discovery = factory.make_Discovery(hostname="")
+        mdns = factory.make_MDNS(
+            ip=discovery.ip, interface=discovery.observer_interface)
+        self.assertThat(
+            Discovery.objects.get().hostname, Equals(mdns.hostname))
+        rdns = factory.make_RDNS(ip=discovery.ip)
+        self.assertThat(
+            Discovery.objects.get().hostname, Equals(rdns.hostname))
+        rdns.hostname = factory.make_hostname()
+        rdns.save()
+        self.assertThat(
+            Discovery.objects.get().hostname, Equals(rdns.hostname))
+        rdns.delete()
+        mdns.delete()
+        self.assertThat(Discovery.objects.get().hostname, Equals(None))
+        self.assertDiscoveriesUpToDate()
+
+    def test__interface_node_vlan_and_fabric_changes(self):
+        discovery = factory.make_Discovery()
+        interface = discovery.observer_interface
+        interface.name = factory.make_name("eth")
+        interface.save()
+        rack = discovery.observer
+        rack.hostname = factory.make_name("rack")
+        rack.save()
+        fabric = discovery.fabric
+        fabric.name = factory.make_name("fabric")
+        fabric.save()
+        vlan = discovery.vlan
+        vlan.external_dhcp = discovery.ip
+        vlan.save()
+        discovery = Discovery.objects.get()
+        self.assertThat(
+            (discovery.observer_interface_name, discovery.observer_hostname,
+             discovery.fabric_name, discovery.is_external_dhcp),
+            Equals((interface.name, rack.hostname, fabric.name, True)))
+        interface.vlan = factory.make_VLAN()
+        interface.save()
+        self.assertThat(
+            Discovery.objects.get().vlan_id, Equals(interface.vlan_id))
+        self.assertDiscoveriesUpToDate()
+
+    def test__subnet_changes(self):
+        discovery = factory.make_Discovery(ip="10.0.0.1")
+        self.assertThat(Discovery.objects.get().subnet_id, Equals(None))
+        subnet = factory.make_Subnet(cidr="10.0.0.0/16", vlan=discovery.vlan)
+        self.assertThat(
+            Discovery.objects.get().subnet_id, Equals(subnet.id))
+        best = factory.make_Subnet(cidr="10.0.0.0/24", vlan=discovery.vlan)
+        self.assertThat(Discovery.objects.get().subnet_id, Equals(best.id))
+        best.delete()
+        self.assertThat(
+            Discovery.objects.get().subnet_id, Equals(subnet.id))
+        subnet.vlan = factory.make_VLAN()
+        subnet.save()
+        self.assertThat(Discovery.objects.get().subnet_id, Equals(None))
+        self.assertDiscoveriesUpToDate()
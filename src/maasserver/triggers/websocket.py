@@ -28,6 +28,7 @@ from maasserver.triggers import (
     register_trigger,
     register_triggers,
 )
+from maasserver.websockets.changes import UNLOGGED_CHANNELS
 from maasserver.utils.orm import transactional
 
 # Note that the corresponding test module (test_triggers) only tests that the
@@ -37,6 +38,31 @@ from maasserver.utils.orm import transactional
 # test_listener where all the Twisted infrastructure is already in place.
 
 
+# Function that all the procedures below use to send a notification. It first
+# records the notification in the change log, `maasserver_websocket_changes`,
+# so that websocket clients that were not connected at the time can catch up;
+# see `Handler.changes`. Notifications on `UNLOGGED_CHANNELS` are not
+# recorded. The log is pruned periodically; see
+# `maasserver.websockets.changes`.
+WS_NOTIFY = dedent("""\
+    CREATE OR REPLACE FUNCTION ws_notify(event text, payload text)
+    RETURNS void AS $$
+    DECLARE
+      event_channel text;
+    BEGIN
+      event_channel := split_part(event, '_', 1);
+      IF event_channel <> ALL(ARRAY[%s]) THEN
+        INSERT INTO maasserver_websocket_changes (channel, action, obj_id)
+        VALUES (
+          event_channel, substr(event, length(event_channel) + 2), payload);
+      END IF;
+      PERFORM pg_notify(event, payload);
+    END;
+    $$ LANGUAGE plpgsql;
+    """) % ", ".join(
+    "'%s'" % channel for channel in sorted(UNLOGGED_CHANNELS))
+
+
 # Procedure that is called when a tag is added or removed from a node/device.
 # Sends a notify message for machine_update or device_update depending on if
 # the node type is node.
@@ -51,16 +77,16 @@ NODE_TAG_NOTIFY = dedent("""\
       WHERE id = %s;
 
       IF node.node_type = %d THEN
-        PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
       ELSIF node.node_type IN (%d, %d, %d) THEN
-        PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
       ELSIF node.parent_id IS NOT NULL THEN
         SELECT system_id INTO pnode
         FROM maasserver_node
         WHERE id = node.parent_id;
-        PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
       ELSE
-        PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('device_update',CAST(node.system_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -87,16 +113,16 @@ TAG_NODES_NOTIFY = dedent("""\
         AND maasserver_node_tags.node_id = maasserver_node.id)
       LOOP
         IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
         ELSIF node.node_type IN (%d, %d, %d) THEN
-          PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
         ELSIF node.parent_id IS NOT NULL THEN
           SELECT system_id INTO pnode
           FROM maasserver_node
           WHERE id = node.parent_id;
-          PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
         ELSE
-          PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('device_update',CAST(node.system_id AS text));
         END IF;
       END LOOP;
       RETURN NEW;
@@ -110,7 +136,7 @@ POD_INSERT_NOTIFY = dedent("""\
     CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
     BEGIN
       IF NEW.bmc_type = %d THEN
-        PERFORM pg_notify('pod_create',CAST(NEW.id AS text));
+        PERFORM ws_notify('pod_create',CAST(NEW.id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -124,12 +150,12 @@ POD_UPDATE_NOTIFY = dedent("""\
     BEGIN
       IF OLD.bmc_type = NEW.bmc_type THEN
         IF OLD.bmc_type = %d THEN
-          PERFORM pg_notify('pod_update',CAST(OLD.id AS text));
+          PERFORM ws_notify('pod_update',CAST(OLD.id AS text));
         END IF;
       ELSIF OLD.bmc_type = %d AND NEW.bmc_type = %d THEN
-          PERFORM pg_notify('pod_create',CAST(NEW.id AS text));
+          PERFORM ws_notify('pod_create',CAST(NEW.id AS text));
       ELSIF OLD.bmc_type = %d AND NEW.bmc_type = %d THEN
-          PERFORM pg_notify('pod_delete',CAST(OLD.id AS text));
+          PERFORM ws_notify('pod_delete',CAST(OLD.id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -142,7 +168,7 @@ POD_DELETE_NOTIFY = dedent("""\
     CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
     BEGIN
       IF OLD.bmc_type = %d THEN
-          PERFORM pg_notify('pod_delete',CAST(OLD.id AS text));
+          PERFORM ws_notify('pod_delete',CAST(OLD.id AS text));
       END IF;
       RETURN OLD;
     END;
@@ -160,7 +186,7 @@ NODE_POD_INSERT_NOTIFY = dedent("""\
       IF NEW.bmc_id IS NOT NULL THEN
         SELECT * INTO bmc FROM maasserver_bmc WHERE id = NEW.bmc_id;
         IF bmc.bmc_type = %d THEN
-          PERFORM pg_notify('pod_update',CAST(NEW.bmc_id AS text));
+          PERFORM ws_notify('pod_update',CAST(NEW.bmc_id AS text));
         END IF;
       END IF;
       RETURN NEW;
@@ -182,14 +208,14 @@ NODE_POD_UPDATE_NOTIFY = dedent("""\
         IF OLD.bmc_id IS NOT NULL THEN
           SELECT * INTO bmc FROM maasserver_bmc WHERE id = OLD.bmc_id;
           IF bmc.bmc_type = %d THEN
-            PERFORM pg_notify('pod_update',CAST(OLD.bmc_id AS text));
+            PERFORM ws_notify('pod_update',CAST(OLD.bmc_id AS text));
           END IF;
         END IF;
       END IF;
       IF NEW.bmc_id IS NOT NULL THEN
         SELECT * INTO bmc FROM maasserver_bmc WHERE id = NEW.bmc_id;
         IF bmc.bmc_type = %d THEN
-          PERFORM pg_notify('pod_update',CAST(NEW.bmc_id AS text));
+          PERFORM ws_notify('pod_update',CAST(NEW.bmc_id AS text));
         END IF;
       END IF;
       RETURN NEW;
@@ -208,7 +234,7 @@ NODE_POD_DELETE_NOTIFY = dedent("""\
       IF OLD.bmc_id IS NOT NULL THEN
         SELECT * INTO bmc FROM maasserver_bmc WHERE id = OLD.bmc_id;
         IF bmc.bmc_type = %d THEN
-          PERFORM pg_notify('pod_update',CAST(OLD.bmc_id AS text));
+          PERFORM ws_notify('pod_update',CAST(OLD.bmc_id AS text));
         END IF;
       END IF;
       RETURN OLD;
@@ -231,7 +257,7 @@ INTERFACE_IP_ADDRESS_DOMAIN_NOTIFY = dedent("""\
       AND maasserver_interface.id = %s;
 
       IF domain.id IS NOT NULL THEN
-        PERFORM pg_notify('domain_update',CAST(domain.id AS text));
+        PERFORM ws_notify('domain_update',CAST(domain.id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -254,16 +280,16 @@ INTERFACE_IP_ADDRESS_NODE_NOTIFY = dedent("""\
       AND maasserver_interface.id = %s;
 
       IF node.node_type = %d THEN
-        PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
       ELSIF node.node_type IN (%d, %d, %d) THEN
-        PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
       ELSIF node.parent_id IS NOT NULL THEN
         SELECT system_id INTO pnode
         FROM maasserver_node
         WHERE id = node.parent_id;
-        PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
       ELSE
-        PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('device_update',CAST(node.system_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -289,16 +315,16 @@ INTERFACE_UPDATE_NODE_NOTIFY = dedent("""\
         WHERE id = OLD.node_id;
 
         IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
         ELSIF node.node_type IN (%d, %d, %d) THEN
-          PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
         ELSIF node.parent_id IS NOT NULL THEN
           SELECT system_id INTO pnode
           FROM maasserver_node
           WHERE id = node.parent_id;
-          PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
         ELSE
-          PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('device_update',CAST(node.system_id AS text));
         END IF;
       END IF;
 
@@ -307,16 +333,16 @@ INTERFACE_UPDATE_NODE_NOTIFY = dedent("""\
       WHERE id = NEW.node_id;
 
       IF node.node_type = %d THEN
-        PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
       ELSIF node.node_type IN (%d, %d, %d) THEN
-        PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
       ELSIF node.parent_id IS NOT NULL THEN
         SELECT system_id INTO pnode
         FROM maasserver_node
         WHERE id = node.parent_id;
-        PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
       ELSE
-        PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('device_update',CAST(node.system_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -338,7 +364,7 @@ PHYSICAL_OR_VIRTUAL_BLOCK_DEVICE_NODE_NOTIFY = dedent("""\
       AND maasserver_blockdevice.id = %s;
 
       IF node.node_type = %d THEN
-        PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -359,7 +385,7 @@ PARTITIONTABLE_NODE_NOTIFY = dedent("""\
         AND maasserver_blockdevice.id = %s;
 
       IF node.node_type = %d THEN
-        PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -382,7 +408,7 @@ PARTITION_NODE_NOTIFY = dedent("""\
       AND maasserver_partitiontable.id = %s;
 
       IF node.node_type = %d THEN
-        PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+        PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -424,7 +450,7 @@ FILESYSTEM_NODE_NOTIFY = dedent("""\
       END IF;
 
       IF node.node_type = {4:d} THEN
-          PERFORM pg_notify('machine_update', CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update', CAST(node.system_id AS text));
       END IF;
 
       RETURN NEW;
@@ -454,7 +480,7 @@ FILESYSTEMGROUP_NODE_NOTIFY = dedent("""\
           OR maasserver_filesystem.cache_set_id = %s);
 
       IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -482,7 +508,7 @@ CACHESET_NODE_NOTIFY = dedent("""\
       AND maasserver_filesystem.cache_set_id = %s;
 
       IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -512,16 +538,16 @@ SUBNET_NODE_NOTIFY = dedent("""\
         AND maasserver_node.id = maasserver_interface.node_id)
       LOOP
         IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
         ELSIF node.node_type IN (%d, %d, %d) THEN
-          PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
         ELSIF node.parent_id IS NOT NULL THEN
           SELECT system_id INTO pnode
           FROM maasserver_node
           WHERE id = node.parent_id;
-          PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
         ELSE
-          PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('device_update',CAST(node.system_id AS text));
         END IF;
       END LOOP;
       RETURN NEW;
@@ -551,16 +577,16 @@ FABRIC_NODE_NOTIFY = dedent("""\
         AND maasserver_vlan.id = maasserver_interface.vlan_id)
       LOOP
         IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
         ELSIF node.node_type IN (%d, %d, %d) THEN
-          PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
         ELSIF node.parent_id IS NOT NULL THEN
           SELECT system_id INTO pnode
           FROM maasserver_node
           WHERE id = node.parent_id;
-          PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
         ELSE
-          PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('device_update',CAST(node.system_id AS text));
         END IF;
       END LOOP;
       RETURN NEW;
@@ -596,16 +622,16 @@ SPACE_NODE_NOTIFY = dedent("""\
         AND maasserver_node.id = maasserver_interface.node_id)
       LOOP
         IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
         ELSIF node.node_type IN (%d, %d, %d) THEN
-          PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
         ELSIF node.parent_id IS NOT NULL THEN
           SELECT system_id INTO pnode
           FROM maasserver_node
           WHERE id = node.parent_id;
-          PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
         ELSE
-          PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('device_update',CAST(node.system_id AS text));
         END IF;
       END LOOP;
       RETURN NEW;
@@ -630,16 +656,16 @@ VLAN_NODE_NOTIFY = dedent("""\
         AND maasserver_vlan.id = maasserver_interface.vlan_id)
       LOOP
         IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
         ELSIF node.node_type IN (%d, %d, %d) THEN
-          PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
         ELSIF node.parent_id IS NOT NULL THEN
           SELECT system_id INTO pnode
           FROM maasserver_node
           WHERE id = node.parent_id;
-          PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
         ELSE
-          PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('device_update',CAST(node.system_id AS text));
         END IF;
       END LOOP;
       RETURN NEW;
@@ -659,7 +685,7 @@ VLAN_SUBNET_NOTIFY = dedent("""\
         FROM maasserver_subnet, maasserver_vlan
         WHERE maasserver_vlan.id = %s)
       LOOP
-        PERFORM pg_notify('subnet_update',CAST(subnet.id AS text));
+        PERFORM ws_notify('subnet_update',CAST(subnet.id AS text));
       END LOOP;
       RETURN NEW;
     END;
@@ -687,16 +713,16 @@ STATIC_IP_ADDRESS_NODE_NOTIFY = dedent("""\
         AND maasserver_node.id = maasserver_interface.node_id)
       LOOP
         IF node.node_type = %d THEN
-          PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
         ELSIF node.node_type IN (%d, %d, %d) THEN
-          PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('controller_update',CAST(node.system_id AS text));
         ELSIF node.parent_id IS NOT NULL THEN
           SELECT system_id INTO pnode
           FROM maasserver_node
           WHERE id = node.parent_id;
-          PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+          PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
         ELSE
-          PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+          PERFORM ws_notify('device_update',CAST(node.system_id AS text));
         END IF;
       END LOOP;
       RETURN NEW;
@@ -711,11 +737,11 @@ STATIC_IP_ADDRESS_SUBNET_NOTIFY = dedent("""\
     BEGIN
       IF OLD.subnet_id != NEW.subnet_id THEN
         IF OLD.subnet_id IS NOT NULL THEN
-          PERFORM pg_notify('subnet_update',CAST(OLD.subnet_id AS text));
+          PERFORM ws_notify('subnet_update',CAST(OLD.subnet_id AS text));
         END IF;
       END IF;
       IF NEW.subnet_id IS NOT NULL THEN
-        PERFORM pg_notify('subnet_update',CAST(NEW.subnet_id AS text));
+        PERFORM ws_notify('subnet_update',CAST(NEW.subnet_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -752,7 +778,7 @@ STATIC_IP_ADDRESS_DOMAIN_UPDATE_NOTIFY = dedent("""\
             domain.id = node.domain_id OR domain.id = dnsresource.domain_id
           WHERE staticipaddress.id = OLD.id OR staticipaddress.id = NEW.id)
         LOOP
-          PERFORM pg_notify('domain_update',CAST(dom.id AS text));
+          PERFORM ws_notify('domain_update',CAST(dom.id AS text));
         END LOOP;
       END IF;
       RETURN NEW;
@@ -787,7 +813,7 @@ STATIC_IP_ADDRESS_DOMAIN_NOTIFY = dedent("""\
           domain.id = node.domain_id OR domain.id = dnsresource.domain_id
         WHERE staticipaddress.id = %s)
       LOOP
-        PERFORM pg_notify('domain_update',CAST(dom.id AS text));
+        PERFORM ws_notify('domain_update',CAST(dom.id AS text));
       END LOOP;
       RETURN NEW;
     END;
@@ -800,7 +826,7 @@ IP_RANGE_SUBNET_INSERT_NOTIFY = dedent("""\
     CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
     BEGIN
       IF NEW.subnet_id IS NOT NULL THEN
-        PERFORM pg_notify('subnet_update',CAST(NEW.subnet_id AS text));
+        PERFORM ws_notify('subnet_update',CAST(NEW.subnet_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -814,11 +840,11 @@ IP_RANGE_SUBNET_UPDATE_NOTIFY = dedent("""\
     BEGIN
       IF OLD.subnet_id != NEW.subnet_id THEN
         IF OLD.subnet_id IS NOT NULL THEN
-          PERFORM pg_notify('subnet_update',CAST(OLD.subnet_id AS text));
+          PERFORM ws_notify('subnet_update',CAST(OLD.subnet_id AS text));
         END IF;
       END IF;
       IF NEW.subnet_id IS NOT NULL THEN
-        PERFORM pg_notify('subnet_update',CAST(NEW.subnet_id AS text));
+        PERFORM ws_notify('subnet_update',CAST(NEW.subnet_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -831,7 +857,7 @@ IP_RANGE_SUBNET_DELETE_NOTIFY = dedent("""\
     CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
     BEGIN
       IF OLD.subnet_id IS NOT NULL THEN
-        PERFORM pg_notify('subnet_update',CAST(OLD.subnet_id AS text));
+        PERFORM ws_notify('subnet_update',CAST(OLD.subnet_id AS text));
       END IF;
       RETURN OLD;
     END;
@@ -847,7 +873,7 @@ DNSDATA_DOMAIN_NOTIFY = dedent("""\
       SELECT DISTINCT ON (domain_id) domain_id INTO dom
       FROM maasserver_dnsresource AS dnsresource
       WHERE dnsresource.id = %s;
-      PERFORM pg_notify('domain_update',CAST(dom.domain_id AS text));
+      PERFORM ws_notify('domain_update',CAST(dom.domain_id AS text));
       RETURN NEW;
     END;
     $$ LANGUAGE plpgsql;
@@ -859,7 +885,7 @@ DNSRESOURCE_DOMAIN_NOTIFY = dedent("""\
     DECLARE
         domain RECORD;
     BEGIN
-      PERFORM pg_notify('domain_update',CAST(%s.domain_id AS text));
+      PERFORM ws_notify('domain_update',CAST(%s.domain_id AS text));
       RETURN NEW;
     END;
     $$ LANGUAGE plpgsql;
@@ -871,9 +897,9 @@ DNSRESOURCE_DOMAIN_UPDATE_NOTIFY = dedent("""\
     DECLARE
         domain RECORD;
     BEGIN
-      PERFORM pg_notify('domain_update',CAST(OLD.domain_id AS text));
+      PERFORM ws_notify('domain_update',CAST(OLD.domain_id AS text));
       IF OLD.domain_id != NEW.domain_id THEN
-        PERFORM pg_notify('domain_update',CAST(NEW.domain_id AS text));
+        PERFORM ws_notify('domain_update',CAST(NEW.domain_id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -894,7 +920,7 @@ DNSRESOURCE_IP_ADDRESS_DOMAIN_NOTIFY = dedent("""\
       AND maasserver_dnsresource.id = %s;
 
       IF domain.id IS NOT NULL THEN
-        PERFORM pg_notify('domain_update',CAST(domain.id AS text));
+        PERFORM ws_notify('domain_update',CAST(domain.id AS text));
       END IF;
       RETURN NEW;
     END;
@@ -918,18 +944,18 @@ DOMAIN_NODE_NOTIFY = dedent("""\
         LOOP
           IF node.system_id IS NOT NULL THEN
             IF node.node_type = %d THEN
-              PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+              PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
             ELSIF node.node_type IN (%d, %d, %d) THEN
-              PERFORM pg_notify(
+              PERFORM ws_notify(
                 'controller_update',CAST(node.system_id AS text));
             ELSIF node.parent_id IS NOT NULL THEN
               SELECT system_id INTO pnode
               FROM maasserver_node
               WHERE id = node.parent_id;
               PERFORM
-                pg_notify('machine_update',CAST(pnode.system_id AS text));
+                ws_notify('machine_update',CAST(pnode.system_id AS text));
             ELSE
-              PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+              PERFORM ws_notify('device_update',CAST(node.system_id AS text));
             END IF;
           END IF;
         END LOOP;
@@ -945,7 +971,7 @@ def render_notification_procedure(proc_name, event_name, cast):
         CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
         DECLARE
         BEGIN
-          PERFORM pg_notify('%s',CAST(%s AS text));
+          PERFORM ws_notify('%s',CAST(%s AS text));
           RETURN NEW;
         END;
         $$ LANGUAGE plpgsql;
@@ -962,9 +988,9 @@ def render_device_notification_procedure(proc_name, event_name, obj):
             SELECT system_id INTO pnode
             FROM maasserver_node
             WHERE id = {obj}.parent_id;
-            PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+            PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
           ELSE
-            PERFORM pg_notify('{event_name}',CAST({obj}.system_id AS text));
+            PERFORM ws_notify('{event_name}',CAST({obj}.system_id AS text));
           END IF;
           RETURN NEW;
         END;
@@ -984,17 +1010,17 @@ def render_node_related_notification_procedure(proc_name, node_id_relation):
           WHERE id = %s;
 
           IF node.node_type = %d THEN
-            PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+            PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
           ELSIF node.node_type IN (%d, %d, %d) THEN
-            PERFORM pg_notify('controller_update',CAST(
+            PERFORM ws_notify('controller_update',CAST(
               node.system_id AS text));
           ELSIF node.parent_id IS NOT NULL THEN
             SELECT system_id INTO pnode
             FROM maasserver_node
             WHERE id = node.parent_id;
-            PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+            PERFORM ws_notify('machine_update',CAST(pnode.system_id AS text));
           ELSE
-            PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+            PERFORM ws_notify('device_update',CAST(node.system_id AS text));
           END IF;
           RETURN NEW;
         END;
@@ -1015,7 +1041,7 @@ def render_switch_notification_procedure(proc_name, event_name,
           FROM maasserver_node
           WHERE id = {node_id_relation};
 
-          PERFORM pg_notify('{event_name}',CAST(node.system_id AS text));
+          PERFORM ws_notify('{event_name}',CAST(node.system_id AS text));
           RETURN NEW;
         END;
         $$ LANGUAGE plpgsql;
@@ -1040,36 +1066,36 @@ def node_type_change():
               ))) THEN
             CASE OLD.node_type
               WHEN {machine} THEN
-                PERFORM pg_notify('machine_delete',CAST(
+                PERFORM ws_notify('machine_delete',CAST(
                   OLD.system_id AS TEXT));
               WHEN {device} THEN
-                PERFORM pg_notify('device_delete',CAST(
+                PERFORM ws_notify('device_delete',CAST(
                   OLD.system_id AS TEXT));
               WHEN {rack_controller} THEN
-                PERFORM pg_notify('controller_delete',CAST(
+                PERFORM ws_notify('controller_delete',CAST(
                   OLD.system_id AS TEXT));
               WHEN {region_controller} THEN
-                PERFORM pg_notify('controller_delete',CAST(
+                PERFORM ws_notify('controller_delete',CAST(
                   OLD.system_id AS TEXT));
               WHEN {region_and_rack_controller} THEN
-                PERFORM pg_notify('controller_delete',CAST(
+                PERFORM ws_notify('controller_delete',CAST(
                   OLD.system_id AS TEXT));
             END CASE;
             CASE NEW.node_type
               WHEN {machine} THEN
-                PERFORM pg_notify('machine_create',CAST(
+                PERFORM ws_notify('machine_create',CAST(
                   NEW.system_id AS TEXT));
               WHEN {device} THEN
-                PERFORM pg_notify('device_create',CAST(
+                PERFORM ws_notify('device_create',CAST(
                   NEW.system_id AS TEXT));
               WHEN {rack_controller} THEN
-                PERFORM pg_notify('controller_create',CAST(
+                PERFORM ws_notify('controller_create',CAST(
                   NEW.system_id AS TEXT));
               WHEN {region_controller} THEN
-                PERFORM pg_notify('controller_create',CAST(
+                PERFORM ws_notify('controller_create',CAST(
                   NEW.system_id AS TEXT));
               WHEN {region_and_rack_controller} THEN
-                PERFORM pg_notify('controller_create',CAST(
+                PERFORM ws_notify('controller_create',CAST(
                   NEW.system_id AS TEXT));
             END CASE;
           END IF;
@@ -1098,12 +1124,12 @@ def render_script_result_notify(proc_name, script_set_id):
             scriptset.id = %s AND
             scriptset.node_id = nodet.id;
           IF node.node_type = %d THEN
-            PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+            PERFORM ws_notify('machine_update',CAST(node.system_id AS text));
           ELSIF node.node_type IN (%d, %d, %d) THEN
-            PERFORM pg_notify(
+            PERFORM ws_notify(
               'controller_update',CAST(node.system_id AS text));
           ELSIF node.node_type = %d THEN
-            PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+            PERFORM ws_notify('device_update',CAST(node.system_id AS text));
           END IF;
           RETURN NEW;
         END;
@@ -1129,7 +1155,7 @@ def render_notification_dismissal_notification_procedure(
         CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
         DECLARE
         BEGIN
-          PERFORM pg_notify(
+          PERFORM ws_notify(
               '%s', CAST(NEW.notification_id AS text) || ':' ||
               CAST(NEW.user_id AS text));
           RETURN NEW;
@@ -1172,6 +1198,8 @@ node_fields = (
 @transactional
 def register_websocket_triggers():
     """Register all websocket triggers into the database."""
+    register_procedure(WS_NOTIFY)
+
     for (proc_name_prefix, event_name_prefix, node_type) in (
         ('machine', 'machine', NODE_TYPE.MACHINE),
         ('rack_controller', 'controller', NODE_TYPE.RACK_CONTROLLER),
@@ -13,7 +13,10 @@ __all__ = [
     "DatabaseTasksService",
 ]
 
-from maasserver.utils.threads import deferToDatabase
+from maasserver.utils.threads import (
+    DATABASE_LANE,
+    deferToDatabaseInLane,
+)
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.twisted import (
     asynchronous,
@@ -79,7 +82,8 @@ class DatabaseTasksService(Service, object):
         done = Deferred(cancel)
 
         def task():
-            d = deferToDatabase(func, *args, **kwargs)
+            d = deferToDatabaseInLane(
+                DATABASE_LANE.BACKGROUND, func, *args, **kwargs)
             d.chainDeferred(done)
             return d
 
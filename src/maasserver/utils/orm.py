@@ -47,7 +47,10 @@ from itertools import (
 )
 import re
 import threading
-from time import sleep
+from time import (
+    monotonic,
+    sleep,
+)
 import types
 from typing import Container
 
@@ -75,11 +78,13 @@ from maasserver.exceptions import (
     MAASAPIForbidden,
 )
 from maasserver.utils.async import DeferredHooks
+from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils import flatten
 from provisioningserver.utils.backoff import (
     exponential_growth,
     full_jitter,
 )
+from provisioningserver.utils.metrics import METRICS
 from provisioningserver.utils.network import parse_integer
 from provisioningserver.utils.twisted import callOut
 import psycopg2
@@ -92,6 +97,19 @@ from psycopg2.errorcodes import (
 from twisted.internet.defer import Deferred
 
 
+log = LegacyLogger()
+
+TRANSACTION_RETRIES = METRICS.counter(
+    "maas_transaction_retries",
+    "Transactions retried by `retry_on_retryable_failure`, by the function "
+    "retried, the reason, and the table that conflicted, if known.",
+    labels=["site", "reason", "table"])
+
+TRANSACTION_RETRIES_EXHAUSTED = METRICS.counter(
+    "maas_transaction_retries_exhausted",
+    "Transactions that failed on their final attempt.", labels=["site"])
+
+
 def get_exception_class(items):
     """Return exception class to raise.
 
@@ -509,7 +527,88 @@ def is_retryable_failure(exception):
     )
 
 
-def gen_retry_intervals(base=0.01, rate=2.5, maximum=10.0):
+# Names for the PostgreSQL error codes of retryable failures.
+RETRYABLE_FAILURE_REASONS = {
+    SERIALIZATION_FAILURE: "serialization_failure",
+    DEADLOCK_DETECTED: "deadlock_detected",
+    UNIQUE_VIOLATION: "unique_violation",
+    FOREIGN_KEY_VIOLATION: "foreign_key_violation",
+}
+
+# PostgreSQL names the relation involved in a conflict in some messages, e.g.
+# 'while updating tuple (0,1) in relation "maasserver_node"'.
+relation_in_message = re.compile(r'\brelation "(?P<table>[^"]+)"')
+
+
+def describe_retryable_failure(exception):
+    """Describe why `exception`, a retryable failure, happened.
+
+    :return: A ``(reason, table, statement)`` tuple. `reason` names the
+        PostgreSQL error code. `table` is the table that conflicted, and
+        `statement` the SQL statement that failed; either may be `None` when
+        PostgreSQL or psycopg2 does not say.
+    """
+    error = get_psycopg2_exception(exception)
+    if error is None:
+        return "unknown", None, None
+    reason = RETRYABLE_FAILURE_REASONS.get(error.pgcode, error.pgcode)
+    table = error.diag.table_name
+    if table is None:
+        match = relation_in_message.search(error.pgerror or "")
+        if match is not None:
+            table = match.group("table")
+    statement = None if error.cursor is None else error.cursor.query
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", "replace")
+    return reason, table, statement
+
+
+def get_call_site(func):
+    """Return a name for `func` suitable for attributing retries to."""
+    name = getattr(func, "__qualname__", None)
+    if name is None:
+        name = getattr(func, "__name__", repr(func))
+    module = getattr(func, "__module__", None)
+    return name if module is None else "%s.%s" % (module, name)
+
+
+class RetryContention:
+    """Track how often transactions from each call site conflict.
+
+    Each conflict raises the level of contention for its call site by one,
+    and that level then decays exponentially, halving every `half_life`
+    seconds. `retry_on_retryable_failure` backs off for longer from sites
+    that have been conflicting recently, which spreads out retries when many
+    threads are contending for the same rows.
+    """
+
+    def __init__(self, half_life=10.0, clock=monotonic):
+        super(RetryContention, self).__init__()
+        self.half_life = half_life
+        self.clock = clock
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, site, now):
+        level, updated = self._levels.get(site, (0.0, now))
+        return level * (0.5 ** ((now - updated) / self.half_life))
+
+    def conflicted(self, site):
+        """Record a conflict at `site`."""
+        with self._lock:
+            now = self.clock()
+            self._levels[site] = (self._decayed(site, now) + 1.0, now)
+
+    def level(self, site):
+        """Return the current level of contention at `site`."""
+        with self._lock:
+            return self._decayed(site, self.clock())
+
+
+retry_contention = RetryContention()
+
+
+def gen_retry_intervals(base=0.01, rate=2.5, maximum=10.0, contention=0.0):
     """Generate retry intervals based on an exponential series.
 
     Once any interval exceeds `maximum` the interval generated will forever be
@@ -519,7 +618,12 @@ def gen_retry_intervals(base=0.01, rate=2.5, maximum=10.0):
     The defaults seem like reasonable coefficients for a capped, full-jitter,
     exponential back-off series, and were derived by experimentation at the
     command-line. Real-world experience may teach us better values.
+
+    :param contention: How contended the transaction being retried is, e.g.
+        from `RetryContention.level`. The series starts `contention` times
+        higher than `base`, up to `maximum`.
     """
+    base = min(base * (1.0 + contention), maximum)
     # An exponentially growing series...
     intervals = exponential_growth(base, rate)
     # from which we stop pulling one we've hit a maximum...
@@ -552,20 +656,38 @@ def retry_on_retryable_failure(func, reset=noop):
         with a retryable failure it will *not* be called. If an attempt
         fails with a non-retryable failure, it will *not* be called.
 
+    Retries are counted in `TRANSACTION_RETRIES`, attributed to `func` and,
+    where PostgreSQL says, the table that conflicted. Retryable failures add
+    to the contention recorded for `func` in `retry_contention`. When the
+    ``DEBUG_TRANSACTION_RETRIES`` setting is true, each retry is also logged
+    with the statement that failed.
     """
+    site = get_call_site(func)
+
+    def record_retry(reason, table=None, statement=None):
+        TRANSACTION_RETRIES.labels(site, reason, table or "").inc()
+        if getattr(settings, "DEBUG_TRANSACTION_RETRIES", False):
+            log.msg(
+                "Retrying %s after %s on table %s; statement: %s" % (
+                    site, reason, table, statement))
+
     @wraps(func)
     def retrier(*args, **kwargs):
         with retry_context:
-            intervals = gen_retry_intervals()
+            intervals = gen_retry_intervals(
+                contention=retry_contention.level(site))
             for _ in range(9):
                 retry_context.prepare()
                 try:
                     return func(*args, **kwargs)
                 except RetryTransaction:
+                    record_retry("requested")
                     reset()  # Which may do nothing.
                     sleep(next(intervals))
                 except DatabaseError as error:
                     if is_retryable_failure(error):
+                        retry_contention.conflicted(site)
+                        record_retry(*describe_retryable_failure(error))
                         reset()  # Which may do nothing.
                         sleep(next(intervals))
                     else:
@@ -575,9 +697,15 @@ def retry_on_retryable_failure(func, reset=noop):
                 try:
                     return func(*args, **kwargs)
                 except RetryTransaction:
+                    TRANSACTION_RETRIES_EXHAUSTED.labels(site).inc()
                     raise TooManyRetries(
                         "This transaction has already been attempted "
                         "multiple times; giving up.")
+                except DatabaseError as error:
+                    if is_retryable_failure(error):
+                        retry_contention.conflicted(site)
+                        TRANSACTION_RETRIES_EXHAUSTED.labels(site).inc()
+                    raise
     return retrier
 
 
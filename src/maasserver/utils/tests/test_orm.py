@@ -19,6 +19,7 @@ from unittest.mock import (
     sentinel,
 )
 
+from django.conf import settings
 from django.core.exceptions import MultipleObjectsReturned
 from django.db import (
     connection,
@@ -82,7 +83,10 @@ from maastesting.matchers import (
     MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
-from maastesting.twisted import extract_result
+from maastesting.twisted import (
+    extract_result,
+    TwistedLoggerFixture,
+)
 from provisioningserver.utils.twisted import (
     callOut,
     DeferredValue,
@@ -98,6 +102,7 @@ from testtools import ExpectedException
 from testtools.matchers import (
     AllMatch,
     Equals,
+    GreaterThan,
     Is,
     IsInstance,
     MatchesPredicate,
@@ -108,6 +113,7 @@ from twisted.internet.defer import (
     Deferred,
     passthru,
 )
+from twisted.internet.task import Clock
 from twisted.python.failure import Failure
 
 
@@ -577,6 +583,48 @@ class TestRetryOnRetryableFailure(SerializationFailureTestCase, NoSleepMixin):
         self.assertEqual(sentinel.result, function_wrapped())
         self.assertThat(function, MockCallsMatch(call(), call()))
 
+    def test_counts_retries_by_call_site_and_reason(self):
+        function = self.make_mock_function()
+        function.side_effect = [
+            orm.make_deadlock_failure(), orm.make_deadlock_failure(),
+            orm.RetryTransaction(), sentinel.result]
+        function_wrapped = retry_on_retryable_failure(function)
+        self.assertEqual(sentinel.result, function_wrapped())
+        site = orm.get_call_site(function)
+        self.assertThat(orm.TRANSACTION_RETRIES.labels(
+            site, "deadlock_detected", "").value, Equals(2))
+        self.assertThat(orm.TRANSACTION_RETRIES.labels(
+            site, "requested", "").value, Equals(1))
+
+    def test_counts_exhausted_retries(self):
+        function = self.make_mock_function()
+        function.side_effect = orm.make_deadlock_failure()
+        function_wrapped = retry_on_retryable_failure(function)
+        self.assertRaises(OperationalError, function_wrapped)
+        site = orm.get_call_site(function)
+        self.assertThat(
+            orm.TRANSACTION_RETRIES_EXHAUSTED.labels(site).value, Equals(1))
+
+    def test_records_contention_for_call_site(self):
+        function = self.make_mock_function()
+        function.side_effect = [orm.make_deadlock_failure(), sentinel.result]
+        function_wrapped = retry_on_retryable_failure(function)
+        site = orm.get_call_site(function)
+        self.assertThat(orm.retry_contention.level(site), Equals(0.0))
+        self.assertEqual(sentinel.result, function_wrapped())
+        self.assertThat(orm.retry_contention.level(site), GreaterThan(0.5))
+
+    def test_logs_retries_in_debug_mode(self):
+        self.patch(settings, "DEBUG_TRANSACTION_RETRIES", True)
+        function = self.make_mock_function()
+        function.side_effect = [orm.make_deadlock_failure(), sentinel.result]
+        function_wrapped = retry_on_retryable_failure(function)
+        with TwistedLoggerFixture() as logger:
+            function_wrapped()
+        self.assertDocTestMatches(
+            "Retrying ...%s after deadlock_detected on table None; "
+            "statement: None" % function.__name__, logger.output)
+
     def test_retries_on_unique_violation(self):
         function = self.make_mock_function()
         function.side_effect = orm.make_unique_violation()
@@ -896,6 +944,63 @@ class TestRequestTransactionRetry(MAASTestCase):
         self.assertThat(contexts, Equals([]))
 
 
+class TestDescribeRetryableFailure(MAASTestCase):
+    """Tests for `orm.describe_retryable_failure`."""
+
+    def test__names_reason(self):
+        self.assertThat(
+            orm.describe_retryable_failure(orm.make_deadlock_failure()),
+            Equals(("deadlock_detected", None, None)))
+        self.assertThat(
+            orm.describe_retryable_failure(orm.make_unique_violation()),
+            Equals(("unique_violation", None, None)))
+
+    def test__finds_table_in_message(self):
+
+        class DeadlockInRelation(orm.DeadlockFailure):
+            pgerror = (
+                'ERROR:  deadlock detected\n'
+                'CONTEXT:  while updating tuple (0,1) in relation '
+                '"maasserver_node"\n')
+
+        exception = OperationalError()
+        exception.__cause__ = DeadlockInRelation()
+        self.assertThat(
+            orm.describe_retryable_failure(exception),
+            Equals(("deadlock_detected", "maasserver_node", None)))
+
+    def test__describes_unknown_failure(self):
+        self.assertThat(
+            orm.describe_retryable_failure(ValueError()),
+            Equals(("unknown", None, None)))
+
+
+class TestGetCallSite(MAASTestCase):
+    """Tests for `orm.get_call_site`."""
+
+    def test__uses_module_and_name(self):
+        self.assertThat(
+            orm.get_call_site(TestGetCallSite.test__uses_module_and_name),
+            Equals(__name__ + ".TestGetCallSite.test__uses_module_and_name"))
+
+
+class TestRetryContention(MAASTestCase):
+    """Tests for `orm.RetryContention`."""
+
+    def test__level_decays_over_time(self):
+        clock = Clock()
+        contention = orm.RetryContention(half_life=10.0, clock=clock.seconds)
+        contention.conflicted("site")
+        contention.conflicted("site")
+        self.assertThat(contention.level("site"), Equals(2.0))
+        clock.advance(10.0)
+        self.assertThat(contention.level("site"), Equals(1.0))
+        contention.conflicted("site")
+        clock.advance(20.0)
+        self.assertThat(contention.level("site"), Equals(0.5))
+        self.assertThat(contention.level("other"), Equals(0.0))
+
+
 class TestGenRetryIntervals(MAASTestCase):
     """Tests for `orm.gen_retry_intervals`."""
 
@@ -924,6 +1029,18 @@ class TestGenRetryIntervals(MAASTestCase):
         self.assertThat(intervals[-1], Is(sentinel.end))
         self.assertThat(intervals[:-1], AllMatch(LessThanOrEqual(maximum)))
 
+    def test__contention_raises_start_of_series(self):
+        self.remove_jitter()
+        intervals = islice(orm.gen_retry_intervals(contention=3.0), 3)
+        intervals = [int(interval * 1000) for interval in intervals]
+        self.assertThat(intervals, Equals([100, 250, 625]))
+
+    def test__contention_does_not_exceed_maximum(self):
+        self.remove_jitter()
+        intervals = list(islice(
+            orm.gen_retry_intervals(maximum=1.0, contention=1000.0), 3))
+        self.assertThat(intervals, Equals([1.0, 1.0, 1.0]))
+
 
 class TestPostCommitHooks(MAASTestCase):
     """Tests for the `post_commit_hooks` singleton."""
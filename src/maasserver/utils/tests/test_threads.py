@@ -6,30 +6,43 @@
 __all__ = []
 
 import random
-from unittest.mock import sentinel
+from unittest.mock import (
+    Mock,
+    sentinel,
+)
 
 from crochet import wait_for
 from django.db import connection
+from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils import (
     orm,
     threads,
 )
+from maastesting.matchers import MockCalledOnceWith
 from maastesting.testcase import MAASTestCase
+from maastesting.twisted import (
+    extract_result,
+    TwistedLoggerFixture,
+)
 from provisioningserver.utils.twisted import (
     ThreadPool,
     ThreadUnpool,
 )
 from testtools.matchers import (
     Equals,
+    HasLength,
     Is,
     IsInstance,
 )
 from twisted.internet import reactor
 from twisted.internet.defer import (
     DeferredSemaphore,
+    fail,
     inlineCallbacks,
+    succeed,
 )
+from twisted.python.failure import Failure
 
 
 wait_for_reactor = wait_for(30)  # 30 seconds.
@@ -125,6 +138,151 @@ class TestDeferToDatabase(MAASServerTestCase):
         self.assertThat(result, Equals(
             (sentinel.called, sentinel.a, sentinel.b)))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__records_queue_depth_and_wait_time(self):
+        waits = threads.DATABASE_WAIT_SECONDS.labels()
+        count_before = sum(waits.counts)
+
+        def call_in_database_thread():
+            return threads.DATABASE_QUEUE_DEPTH.labels().value
+
+        depth_before = threads.DATABASE_QUEUE_DEPTH.labels().value
+        depth_during = yield threads.deferToDatabase(call_in_database_thread)
+        self.assertThat(depth_during, Equals(depth_before))
+        self.assertThat(sum(waits.counts), Equals(count_before + 1))
+
+
+class FakePool:
+    """A thread-pool that runs nothing until told to."""
+
+    def __init__(self):
+        self.calls = []
+
+    def callInThreadWithCallback(self, onResult, func, *args, **kwargs):
+        self.calls.append((onResult, func, args, kwargs))
+
+    def finish(self):
+        onResult, func, args, kwargs = self.calls.pop(0)
+        onResult(True, func(*args, **kwargs))
+
+
+class TestDatabaseLanes(MAASTestCase):
+    """Tests for `DatabaseLanes`."""
+
+    def make_lanes(self, size):
+        pool = FakePool()
+        return pool, threads.DatabaseLanes(pool, size)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__gives_free_thread_to_highest_priority_lane(self):
+        pool, lanes = self.make_lanes(1)
+        d_ui = lanes.deferToThread(
+            threads.DATABASE_LANE.UI, lambda: sentinel.ui)
+        lanes.deferToThread(
+            threads.DATABASE_LANE.BACKGROUND, lambda: sentinel.background)
+        lanes.deferToThread(
+            threads.DATABASE_LANE.INTERACTIVE, lambda: sentinel.interactive)
+        self.assertThat(pool.calls, HasLength(1))
+        pool.finish()
+        result = yield d_ui
+        self.assertThat(result, Is(sentinel.ui))
+        [(_, func, _, _)] = pool.calls
+        self.assertThat(func(), Is(sentinel.interactive))
+
+    def test__limits_threads_used_by_ui_lane(self):
+        pool, lanes = self.make_lanes(4)
+        for _ in range(3):
+            lanes.deferToThread(threads.DATABASE_LANE.UI, lambda: None)
+        self.assertThat(pool.calls, HasLength(2))
+        lanes.deferToThread(threads.DATABASE_LANE.INTERACTIVE, lambda: None)
+        self.assertThat(pool.calls, HasLength(3))
+
+    def test__sheds_calls_when_ui_lane_is_full(self):
+        pool, lanes = self.make_lanes(1)
+        lanes.depths[threads.DATABASE_LANE.UI] = 1
+        lanes.deferToThread(threads.DATABASE_LANE.UI, lambda: None)
+        lanes.deferToThread(threads.DATABASE_LANE.UI, lambda: None)
+        d = lanes.deferToThread(threads.DATABASE_LANE.UI, lambda: None)
+        self.assertRaises(threads.DatabaseLaneFull, extract_result, d)
+        self.assertThat(pool.calls, HasLength(1))
+
+    def test__does_not_count_shed_calls_as_queued(self):
+        pool, lanes = self.make_lanes(1)
+        lanes.depths[threads.DATABASE_LANE.UI] = 0
+        depth_before = threads.DATABASE_QUEUE_DEPTH.labels().value
+        d = lanes.deferToThread(threads.DATABASE_LANE.UI, lambda: None)
+        self.assertRaises(threads.DatabaseLaneFull, extract_result, d)
+        self.assertThat(
+            threads.DATABASE_QUEUE_DEPTH.labels().value,
+            Equals(depth_before))
+
+    def test__rejects_unknown_lanes(self):
+        pool, lanes = self.make_lanes(1)
+        self.assertRaises(
+            ValueError, lanes.deferToThread, factory.make_name("lane"),
+            lambda: None)
+
+    def test__does_not_count_rejected_calls_as_queued(self):
+        pool, lanes = self.make_lanes(1)
+        depth_before = threads.DATABASE_QUEUE_DEPTH.labels().value
+        self.assertRaises(
+            ValueError, lanes.deferToThread, factory.make_name("lane"),
+            lambda: None)
+        self.assertThat(
+            threads.DATABASE_QUEUE_DEPTH.labels().value,
+            Equals(depth_before))
+
+
+class TestDeferToDatabaseInLane(MAASServerTestCase):
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__defers_to_database_threadpool(self):
+
+        @orm.transactional
+        def call_in_database_thread(a, b):
+            orm.validate_in_transaction(connection)
+            return sentinel.called, a, b
+
+        result = yield threads.deferToDatabaseInLane(
+            threads.DATABASE_LANE.BACKGROUND, call_in_database_thread,
+            sentinel.a, b=sentinel.b)
+        self.assertThat(result, Equals(
+            (sentinel.called, sentinel.a, sentinel.b)))
+
+
+class TestDatabaseLanePool(MAASTestCase):
+    """Tests for `DatabaseLanePool`."""
+
+    def test__calls_in_lane(self):
+        deferToDatabaseInLane = self.patch(threads, "deferToDatabaseInLane")
+        deferToDatabaseInLane.return_value = succeed(sentinel.result)
+        pool = threads.DatabaseLanePool(threads.DATABASE_LANE.INTERACTIVE)
+        onResult = Mock()
+        pool.callInThreadWithCallback(onResult, sentinel.func, sentinel.arg)
+        self.assertThat(deferToDatabaseInLane, MockCalledOnceWith(
+            threads.DATABASE_LANE.INTERACTIVE, sentinel.func, sentinel.arg))
+        self.assertThat(onResult, MockCalledOnceWith(True, sentinel.result))
+
+    def test__passes_failures_to_onResult(self):
+        failure = Failure(ZeroDivisionError())
+        self.patch(threads, "deferToDatabaseInLane").return_value = (
+            fail(failure))
+        pool = threads.DatabaseLanePool(threads.DATABASE_LANE.INTERACTIVE)
+        onResult = Mock()
+        pool.callInThreadWithCallback(onResult, sentinel.func)
+        self.assertThat(onResult, MockCalledOnceWith(False, failure))
+
+    def test__logs_failures_without_onResult(self):
+        self.patch(threads, "deferToDatabaseInLane").return_value = (
+            fail(ZeroDivisionError()))
+        pool = threads.DatabaseLanePool(threads.DATABASE_LANE.INTERACTIVE)
+        with TwistedLoggerFixture() as logger:
+            pool.callInThread(sentinel.func)
+        self.assertIn("Failure in database lane interactive.", logger.output)
+
 
 class TestCallOutToDatabase(MAASServerTestCase):
 
@@ -0,0 +1,80 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for short-lived, process-wide caches."""
+
+__all__ = []
+
+from unittest.mock import (
+    Mock,
+    sentinel,
+)
+
+from maasserver.utils.ttlcache import TTLCache
+from maastesting.matchers import MockCalledOnceWith
+from maastesting.testcase import MAASTestCase
+
+
+class FakeClock:
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(MAASTestCase):
+
+    def test_get_computes_value_once(self):
+        compute = Mock(return_value=sentinel.value)
+        cache = TTLCache()
+        self.assertIs(sentinel.value, cache.get("key", compute, 1, two=2))
+        self.assertIs(sentinel.value, cache.get("key", compute, 1, two=2))
+        self.assertThat(compute, MockCalledOnceWith(1, two=2))
+
+    def test_get_computes_value_per_key(self):
+        compute = Mock(side_effect=lambda key: key)
+        cache = TTLCache()
+        self.assertEqual("a", cache.get("a", compute, "a"))
+        self.assertEqual("b", cache.get("b", compute, "b"))
+
+    def test_get_computes_value_again_after_ttl(self):
+        compute = Mock(return_value=sentinel.value)
+        clock = FakeClock()
+        cache = TTLCache(ttl=10, clock=clock)
+        cache.get("key", compute)
+        clock.now = 9
+        cache.get("key", compute)
+        clock.now = 10
+        cache.get("key", compute)
+        self.assertEqual(2, compute.call_count)
+
+    def test_get_does_not_cache_exceptions(self):
+        compute = Mock(side_effect=[ValueError(), sentinel.value])
+        cache = TTLCache()
+        self.assertRaises(ValueError, cache.get, "key", compute)
+        self.assertIs(sentinel.value, cache.get("key", compute))
+
+    def test_discard_forgets_value(self):
+        cache = TTLCache()
+        cache.get("a", lambda: 1)
+        cache.get("b", lambda: 2)
+        cache.discard("a")
+        cache.discard("c")
+        self.assertItemsEqual(["b"], cache.values)
+
+    def test_discard_matching_forgets_matching_values(self):
+        cache = TTLCache()
+        cache.get("a", lambda: 1)
+        cache.get("b", lambda: 2)
+        cache.discard_matching(lambda value: value == 1)
+        self.assertItemsEqual(["b"], cache.values)
+
+    def test_clear_forgets_values(self):
+        compute = Mock(return_value=sentinel.value)
+        cache = TTLCache()
+        cache.get("key", compute)
+        cache.clear()
+        cache.get("key", compute)
+        self.assertEqual(2, compute.call_count)
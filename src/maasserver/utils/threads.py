@@ -11,7 +11,11 @@ pools to limit the number of connections each `regiond` process will consume.
 
 __all__ = [
     "callOutToDatabase",
+    "DATABASE_LANE",
+    "DatabaseLaneFull",
+    "DatabaseLanePool",
     "deferToDatabase",
+    "deferToDatabaseInLane",
     "install_database_pool",
     "install_database_unpool",
     "install_default_pool",
@@ -19,6 +23,13 @@ __all__ = [
     "make_default_pool",
 ]
 
+from collections import (
+    defaultdict,
+    deque,
+)
+from functools import partial
+from time import monotonic
+
 from django.conf import settings
 from maasserver.utils.orm import (
     count_queries,
@@ -27,6 +38,7 @@ from maasserver.utils.orm import (
     TotallyDisconnected,
 )
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.utils.metrics import METRICS
 from provisioningserver.utils.twisted import (
     asynchronous,
     FOREVER,
@@ -37,11 +49,42 @@ from twisted.internet import (
     reactor,
     threads,
 )
-from twisted.internet.defer import DeferredSemaphore
+from twisted.internet.defer import (
+    Deferred,
+    DeferredSemaphore,
+    fail,
+)
 
 
 log = LegacyLogger()
 
+DATABASE_QUEUE_DEPTH = METRICS.gauge(
+    "maas_database_queue_depth",
+    "Calls waiting for a thread in the database thread-pool.")
+
+DATABASE_WAIT_SECONDS = METRICS.histogram(
+    "maas_database_wait_seconds",
+    "Time calls wait for a thread in the database thread-pool.")
+
+DATABASE_LANE_QUEUE_DEPTH = METRICS.gauge(
+    "maas_database_lane_queue_depth",
+    "Calls waiting in each lane for a database thread.",
+    labels=["lane"])
+
+DATABASE_LANE_BUSY_THREADS = METRICS.gauge(
+    "maas_database_lane_busy_threads",
+    "Database threads in use by each lane.",
+    labels=["lane"])
+
+DATABASE_LANE_SHED = METRICS.counter(
+    "maas_database_lane_shed",
+    "Calls refused because their lane's queue was full.",
+    labels=["lane"])
+
+DATABASE_POOL_THREADS = METRICS.gauge(
+    "maas_database_pool_threads",
+    "Threads in the database thread-pool.")
+
 
 max_threads_for_default_pool = 50
 
@@ -148,13 +191,175 @@ def install_database_unpool(maxthreads=max_threads_for_database_pool):
             "been configured and installed.")
 
 
+class DATABASE_LANE:
+    """Lanes for database work, from highest priority to lowest.
+
+    When a database thread becomes free it's given to the first call waiting
+    in the highest-priority lane.
+    """
+    # Requests that something is waiting on: RPC calls from rack
+    # controllers, API and web requests.
+    INTERACTIVE = "interactive"
+    # Work done for its own sake: database tasks and the status worker.
+    BACKGROUND = "background"
+    # Fanning out database changes to websocket clients.
+    UI = "ui"
+
+
+class DatabaseLaneFull(Exception):
+    """A call was refused because its lane's queue was full."""
+
+
+class DatabaseLanes:
+    """Share a database thread-pool between lanes of work.
+
+    At most `size` calls, one for each thread in `pool`, are handed to the
+    pool at a time; the rest wait in their lane. Lanes other than
+    `DATABASE_LANE.INTERACTIVE` can only use some of the threads, so there's
+    usually a thread free for interactive work, and the UI lane's queue is
+    limited: once it's full further calls in that lane fail immediately with
+    `DatabaseLaneFull`.
+
+    This must only be used from the reactor thread.
+    """
+
+    lanes = (
+        DATABASE_LANE.INTERACTIVE,
+        DATABASE_LANE.BACKGROUND,
+        DATABASE_LANE.UI,
+    )
+
+    def __init__(self, pool, size):
+        super(DatabaseLanes, self).__init__()
+        self.pool = pool
+        self.size = size
+        self.limits = {
+            DATABASE_LANE.INTERACTIVE: size,
+            DATABASE_LANE.BACKGROUND: max(1, size * 2 // 3),
+            DATABASE_LANE.UI: max(1, size // 2),
+        }
+        self.depths = {DATABASE_LANE.UI: 100}
+        self.queues = defaultdict(deque)
+        self.busy = defaultdict(int)
+        DATABASE_POOL_THREADS.set(size)
+
+    def deferToThread(self, lane, func, *args, **kwargs):
+        """Call `func` in a thread from the pool, in the given lane.
+
+        :return: A `Deferred` that fires with the result of `func`.
+        """
+        if lane not in self.limits:
+            raise ValueError("Unknown database lane: %r" % (lane,))
+        queue = self.queues[lane]
+        depth = self.depths.get(lane)
+        if depth is not None and len(queue) >= depth:
+            DATABASE_LANE_SHED.labels(lane).inc()
+            return fail(DatabaseLaneFull(lane))
+        d = Deferred()
+        # Account for the call only once it has been admitted to the queue.
+        queue.append((d, _queued_for_database(func), args, kwargs))
+        DATABASE_LANE_QUEUE_DEPTH.labels(lane).inc()
+        self._dispatch()
+        return d
+
+    def _dispatch(self):
+        for lane in self.lanes:
+            queue, limit = self.queues[lane], self.limits[lane]
+            while len(queue) != 0 and self.busy[lane] < limit:
+                if sum(self.busy.values()) >= self.size:
+                    return
+                d, func, args, kwargs = queue.popleft()
+                DATABASE_LANE_QUEUE_DEPTH.labels(lane).dec()
+                self.busy[lane] += 1
+                DATABASE_LANE_BUSY_THREADS.labels(lane).inc()
+                dthread = threads.deferToThreadPool(
+                    reactor, self.pool, func, *args, **kwargs)
+                dthread.addBoth(self._release, lane)
+                dthread.chainDeferred(d)
+
+    def _release(self, result, lane):
+        self.busy[lane] -= 1
+        DATABASE_LANE_BUSY_THREADS.labels(lane).dec()
+        self._dispatch()
+        return result
+
+
+# The lanes sharing the database thread-pool; see `get_database_lanes`.
+_database_lanes = None
+
+
+def get_database_lanes():
+    """Return the `DatabaseLanes` for the installed database thread-pool."""
+    global _database_lanes
+    pool = reactor.threadpoolForDatabase
+    if _database_lanes is None or _database_lanes.pool is not pool:
+        if isinstance(pool, ThreadUnpool):
+            size = pool.lock.limit
+        else:
+            size = pool.max
+        _database_lanes = DatabaseLanes(pool, size)
+    return _database_lanes
+
+
 def deferToDatabase(func, *args, **kwargs):
-    """Call `func` in a thread where database activity is permitted."""
+    """Call `func` in a thread where database activity is permitted.
+
+    The call is made in the interactive lane; see `deferToDatabaseInLane`.
+    """
+    return deferToDatabaseInLane(
+        DATABASE_LANE.INTERACTIVE, func, *args, **kwargs)
+
+
+def deferToDatabaseInLane(lane, func, *args, **kwargs):
+    """Call `func` in a thread where database activity is permitted.
+
+    :param lane: One of the `DATABASE_LANE` values. Calls in lower-priority
+        lanes wait for calls in higher-priority lanes.
+    :raise DatabaseLaneFull: via the returned `Deferred`, if too many calls
+        are already waiting in `lane`.
+    """
     if settings.DEBUG and getattr(settings, 'DEBUG_QUERIES', False):
         func = count_queries(log.msg)(func)
-    return threads.deferToThreadPool(
-        reactor, reactor.threadpoolForDatabase,
-        func, *args, **kwargs)
+    return get_database_lanes().deferToThread(lane, func, *args, **kwargs)
+
+
+class DatabaseLanePool:
+    """A thread-pool that makes its calls in a database lane.
+
+    This is for code, like Twisted's `WSGIResource`, that wants a thread-pool
+    rather than a function to call. It must only be used from the reactor
+    thread, and `onResult` callbacks are also called in the reactor thread.
+    """
+
+    def __init__(self, lane):
+        super(DatabaseLanePool, self).__init__()
+        self.lane = lane
+
+    def callInThread(self, func, *args, **kwargs):
+        self.callInThreadWithCallback(None, func, *args, **kwargs)
+
+    def callInThreadWithCallback(self, onResult, func, *args, **kwargs):
+        d = deferToDatabaseInLane(self.lane, func, *args, **kwargs)
+        if onResult is not None:
+            d.addCallbacks(partial(onResult, True), partial(onResult, False))
+        d.addErrback(log.err, "Failure in database lane %s." % self.lane)
+
+
+def _queued_for_database(func):
+    """Account for `func` waiting in the database thread-pool's queue.
+
+    Updates `DATABASE_QUEUE_DEPTH` now and when `func` is called, recording
+    how long it waited in `DATABASE_WAIT_SECONDS`.
+    """
+    queued = monotonic()
+    DATABASE_QUEUE_DEPTH.inc()
+
+    def call(*args, **kwargs):
+        DATABASE_QUEUE_DEPTH.dec()
+        DATABASE_WAIT_SECONDS.observe(monotonic() - queued)
+        return func(*args, **kwargs)
+
+    return call
 
 
 def callOutToDatabase(thing, func, *args, **kwargs):
@@ -0,0 +1,62 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Short-lived, process-wide caches."""
+
+__all__ = [
+    "TTLCache",
+]
+
+import threading
+import time
+
+
+class TTLCache:
+    """Values, by key, kept for at most `ttl` seconds.
+
+    This is safe to use from many threads. Values are computed outside of
+    the lock, so two threads may compute the same value at the same time;
+    the last to finish wins.
+    """
+
+    def __init__(self, ttl=30, clock=time.monotonic):
+        super(TTLCache, self).__init__()
+        self.ttl = ttl
+        self.clock = clock
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, compute, *args, **kwargs):
+        """Return the value for `key`.
+
+        If it's not cached, the value is computed by calling `compute` with
+        `args` and `kwargs`. Exceptions raised by `compute` are not cached.
+        """
+        now = self.clock()
+        with self.lock:
+            value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires > now:
+            return value
+        value = compute(*args, **kwargs)
+        with self.lock:
+            self.values[key] = value, now + self.ttl
+        return value
+
+    def discard(self, key):
+        """Forget the value for `key`, if it's cached."""
+        with self.lock:
+            self.values.pop(key, None)
+
+    def discard_matching(self, predicate):
+        """Forget the values for which `predicate(value)` is true."""
+        with self.lock:
+            self.values = {
+                key: (value, expires)
+                for key, (value, expires) in self.values.items()
+                if not predicate(value)
+            }
+
+    def clear(self):
+        """Forget all values."""
+        with self.lock:
+            self.values.clear()
@@ -19,6 +19,7 @@ from django.core.handlers.wsgi import WSGIHandler
 from django.db import transaction
 from django.template.response import SimpleTemplateResponse
 from maasserver.exceptions import MAASAPIException
+from maasserver.oauth_store import nonce_store
 from maasserver.utils.django_urls import get_resolver
 from maasserver.utils.orm import (
     gen_retry_intervals,
@@ -55,7 +56,7 @@ def log_final_failed_attempt(request, attempt, elapsed):
 
 
 def delete_oauth_nonce(request):
-    """Delete the OAuth nonce for the given request from the database.
+    """Delete the OAuth nonce for the given request from the nonce store.
 
     This is to allow the exact same request to be retried.
     """
@@ -69,6 +70,7 @@ def delete_oauth_nonce(request):
             # Missing OAuth parameter: skip Nonce deletion.
             pass
         else:
+            nonce_store.forget(consumer_key, token_key, nonce)
             Nonce.objects.filter(
                 consumer_key=consumer_key, token_key=token_key,
                 key=nonce).delete()
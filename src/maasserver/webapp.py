@@ -15,7 +15,15 @@ import re
 from django.conf import settings
 from lxml import html
 from maasserver import concurrency
-from maasserver.utils.threads import deferToDatabase
+from maasserver.preseed_cache import (
+    fragment_cache,
+    INVALIDATE_CHANNEL,
+)
+from maasserver.utils.threads import (
+    DATABASE_LANE,
+    DatabaseLanePool,
+    deferToDatabase,
+)
 from maasserver.utils.views import WebApplicationHandler
 from maasserver.websockets.protocol import WebSocketFactory
 from maasserver.websockets.websockets import (
@@ -24,6 +32,7 @@ from maasserver.websockets.websockets import (
 )
 from metadataserver.api_twisted import StatusHandlerResource
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.utils.metrics import MetricsResource
 from provisioningserver.utils.twisted import (
     asynchronous,
     reducedWebLogFormatter,
@@ -189,8 +198,9 @@ class WebApplicationService(StreamServerEndpointService):
         self.site.requestFactory = CleanPathRequest
         super(WebApplicationService, self).__init__(endpoint, self.site)
         self.websocket = WebSocketFactory(listener)
+        self.listener = listener
         self.threadpool = ThreadPoolLimiter(
-            reactor.threadpoolForDatabase, concurrency.webapp)
+            DatabaseLanePool(DATABASE_LANE.INTERACTIVE), concurrency.webapp)
         self.status_worker = status_worker
 
     def prepareApplication(self):
@@ -220,6 +230,7 @@ class WebApplicationService(StreamServerEndpointService):
         maas = Resource()
         maas.putChild(b'metadata', metadata)
         maas.putChild(b'static', File(settings.STATIC_ROOT))
+        maas.putChild(b'metrics', MetricsResource())
         maas.putChild(
             b'ws',
             WebSocketsResource(lookupProtocolForFactory(self.websocket)))
@@ -260,10 +271,15 @@ class WebApplicationService(StreamServerEndpointService):
     @asynchronous(timeout=30)
     def startService(self):
         super(WebApplicationService, self).startService()
+        # Preseed fragments are cached in each process serving preseeds.
+        self.listener.register(
+            INVALIDATE_CHANNEL, fragment_cache.handle_notification)
         return self.startApplication()
 
     @asynchronous(timeout=30)
     def stopService(self):
+        self.listener.unregister(
+            INVALIDATE_CHANNEL, fragment_cache.handle_notification)
         d = super(WebApplicationService, self).stopService()
         d.addCallback(lambda _: self.websocket.stopFactory())
         return d
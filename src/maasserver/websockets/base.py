@@ -22,6 +22,11 @@ from maasserver.enum import NODE_PERMISSION
 from maasserver.utils.forms import get_QueryDict
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
+from maasserver.websockets.changes import (
+    get_changes,
+    get_cursor,
+    UNLOGGED_CHANNELS,
+)
 from provisioningserver.utils.twisted import (
     asynchronous,
     IAsynchronous,
@@ -125,6 +130,22 @@ class HandlerMetaclass(type):
             handler_name = ''.join(name_bits).lower()
             new_class._meta.handler_name = handler_name
 
+        # Handlers that can be listed and that listen for changes can let a
+        # client choose the objects it's notified about and, unless changes
+        # on their channels aren't logged, catch it up on the changes it
+        # missed; see `Handler.subscribe` and `Handler.changes`.
+        allowed_methods = new_class._meta.allowed_methods
+        if (new_class._meta.listen_channels and
+                new_class._meta.queryset is not None and
+                'list' in allowed_methods):
+            methods = ['subscribe', 'unsubscribe']
+            if UNLOGGED_CHANNELS.isdisjoint(new_class._meta.listen_channels):
+                methods.insert(0, 'changes')
+            new_class._meta.allowed_methods = allowed_methods + [
+                method for method in methods
+                if method not in allowed_methods
+            ]
+
         # Setup the object_class if the queryset is provided.
         if new_class._meta.queryset is not None:
             new_class._meta.object_class = new_class._meta.queryset.model
@@ -365,6 +386,164 @@ class Handler(metaclass=HandlerMetaclass):
             for obj in objs
             ]
 
+    def changes(self, params):
+        """Catch up on the changes missed since `since`.
+
+        A client that reconnects can call this instead of `list` to find out
+        what changed while it was disconnected.
+
+        :param since: A cursor from an earlier call. If it's not given only
+            the cursor is returned; a client should get one before calling
+            `list` for the first time.
+        :return: A dict with a `cursor` to pass as `since` next time, and
+            either `changes`, a list of notifications, or `reset` if too much
+            has changed and the client must call `list` again.
+        """
+        if "since" not in params:
+            return {"cursor": get_cursor()}
+        cursor, changes = get_changes(
+            self._meta.listen_channels, int(params["since"]))
+        if changes is None:
+            return {"cursor": cursor, "reset": True}
+        # This handler is new, so it doesn't know what the client has loaded.
+        # Assume that the client has everything it can see now, and anything
+        # that has been updated or deleted since, so that the changes are
+        # notified as they would have been had the client been connected.
+        loaded_pks = self.cache["loaded_pks"]
+        loaded_pks.update(
+            self.get_queryset().prefetch_related(None).values_list(
+                self._meta.pk, flat=True))
+        notifications = []
+        for channel, action, pk in changes:
+            if not self.is_subscribed(channel, action, pk):
+                continue
+            if action != "create":
+                loaded_pks.add(self._meta.pk_type(pk))
+            notification = self.on_listen(channel, action, pk)
+            if notification is not None:
+                name, action, data = notification
+                notifications.append({
+                    "name": name,
+                    "action": action,
+                    "data": data,
+                })
+        return {"cursor": cursor, "changes": notifications}
+
+    def subscribe(self, params):
+        """Only be notified about some of the objects.
+
+        A client that hasn't subscribed is notified about every object that
+        it can see. Working out what to send it takes a database query for
+        every change, even to objects that the client isn't showing.
+
+        :param pks: Primary keys of objects to be notified about, as well as
+            those already subscribed to.
+        :param filter: A dict of field names and values. Also notify about
+            objects whose fields have these values, replacing any previous
+            filter. Objects that stop matching are notified as deleted.
+
+        If neither is given the client is notified about every object again.
+        """
+        if "pks" not in params and "filter" not in params:
+            self.cache.pop("subscription", None)
+            return None
+        subscription = self._get_subscription()
+        if "pks" in params:
+            subscription["pks"].update(
+                self._meta.pk_type(pk) for pk in params["pks"])
+        if "filter" in params:
+            subscription["filter"] = self._get_subscription_filter(
+                params["filter"])
+        return None
+
+    def unsubscribe(self, params):
+        """Stop being notified about some of the objects.
+
+        :param pks: Primary keys of objects to no longer be notified about.
+            If not given, the client is no longer notified about any object,
+            not even new ones, until it subscribes again.
+        """
+        subscription = self._get_subscription()
+        if "pks" in params:
+            subscription["pks"].difference_update(
+                self._meta.pk_type(pk) for pk in params["pks"])
+        else:
+            subscription["pks"].clear()
+            subscription["filter"] = None
+        return None
+
+    def _get_subscription(self):
+        return self.cache.setdefault(
+            "subscription", {"pks": set(), "filter": None})
+
+    def _get_subscription_filter(self, params):
+        """Return the fields and values to filter notifications by.
+
+        Only fields that would be sent to the client by `list` can be used.
+        Values are converted with the field's `to_python`, so that they
+        compare equal to those of the objects; the client may send a number
+        as a string, for example.
+        """
+        fields = {
+            field.name: field
+            for field in self._meta.object_class._meta.fields
+        }
+        allowed_fields = self._meta.list_fields
+        exclude_fields = self._meta.list_exclude
+        subscription_filter = []
+        errors = {}
+        for name, value in params.items():
+            if (name not in fields or
+                    (allowed_fields is not None and
+                     name not in allowed_fields) or
+                    (exclude_fields is not None and name in exclude_fields)):
+                errors[name] = ["Cannot subscribe by this field."]
+            else:
+                field = fields[name]
+                try:
+                    value = field.to_python(value)
+                except ValidationError as error:
+                    errors[name] = error.messages
+                else:
+                    subscription_filter.append((field, value))
+        if len(errors) != 0:
+            raise HandlerValidationError(errors)
+        return subscription_filter
+
+    def is_subscribed(self, channel, action, pk):
+        """Return whether the client could be interested in a notification.
+
+        This is called for every notification before `on_listen`, so it must
+        not use the database; notifications that no client is interested in
+        then cost almost nothing.
+        """
+        subscription = self.cache.get("subscription")
+        if subscription is None:
+            return True
+        try:
+            pk = self._meta.pk_type(pk)
+        except ValueError:
+            # Not one of this handler's objects; `on_listen` knows better.
+            return True
+        return (
+            pk in subscription["pks"] or
+            pk == self.cache.get("active_pk") or
+            subscription["filter"] is not None)
+
+    def _is_subscribed_to(self, pk, obj):
+        """Return whether the client is interested in `obj`."""
+        subscription = self.cache.get("subscription")
+        if subscription is None:
+            return True
+        elif pk in subscription["pks"] or pk == self.cache.get("active_pk"):
+            return True
+        elif subscription["filter"] is None:
+            return False
+        else:
+            return all(
+                field.value_from_object(obj) == value
+                for field, value in subscription["filter"])
+
     def get(self, params):
         """Get object.
 
@@ -466,6 +645,9 @@ class Handler(metaclass=HandlerMetaclass):
             obj = self.listen(channel, action, pk)
         except HandlerDoesNotExistError:
             obj = None
+        if obj is not None and not self._is_subscribed_to(pk, obj):
+            # To the client it's as if the object didn't exist.
+            obj = None
         if action == "create" and obj is not None:
             if pk in self.cache['loaded_pks']:
                 # The user already knows about this node, so its not a create
@@ -0,0 +1,116 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""The websocket change log.
+
+Websocket notifications are also recorded, with the id of the transaction
+that made them, in the ``maasserver_websocket_changes`` table; see
+`ws_notify` in `maasserver.triggers.websocket`. Notifications on
+`UNLOGGED_CHANNELS` are not. A client that was
+disconnected for a while can get the changes it missed from the log, instead
+of listing everything again, by passing the cursor it had reached.
+
+A cursor is a transaction horizon: every transaction before it had finished
+when the cursor was taken, so their changes were already visible. Changes
+from transactions at or after the cursor may not have been committed yet, so
+they are read again next time. A client can therefore get a change twice,
+which is harmless, but never misses one that was committed late.
+"""
+
+__all__ = [
+    "get_changes",
+    "get_cursor",
+    "prune_changes",
+    "UNLOGGED_CHANNELS",
+    "WebSocketChangesCleanupService",
+]
+
+from collections import OrderedDict
+
+from django.db import connection
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.utils.twisted import synchronous
+from twisted.application.internet import TimerService
+
+# The most changes returned by `get_changes`. A client that missed more than
+# this is better off listing everything again.
+MAX_CHANGES = 1000
+
+# The number of changes kept in the log by `prune_changes`.
+CHANGES_KEPT = 100000
+
+# Channels whose notifications are not recorded in the log. Events are
+# created far more often than anything else changes; logging them would
+# double the writes made for each, and push everything else out of the log.
+# Handlers listening on these channels can't catch a client up.
+UNLOGGED_CHANNELS = frozenset({"event"})
+
+
+def get_cursor():
+    """Return the current transaction horizon."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        [horizon] = cursor.fetchone()
+    return horizon
+
+
+def get_changes(channels, since, limit=MAX_CHANGES):
+    """Return the changes on `channels` from the cursor `since` onwards.
+
+    :return: ``(cursor, changes)``, where `cursor` is the new cursor and
+        `changes` is a list of ``(channel, action, obj_id)`` tuples, with
+        only the last change of each object, in order. `changes` is `None`
+        if some of the changes may no longer be in the log, or if there are
+        more than `limit` of them.
+    """
+    # Take the horizon first: transactions before it have finished, so all
+    # their changes are visible to the queries below.
+    horizon = get_cursor()
+    if since > horizon:
+        return horizon, None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT MIN(txid) FROM maasserver_websocket_changes")
+        [oldest] = cursor.fetchone()
+        if oldest is not None and since < oldest:
+            return horizon, None
+        cursor.execute(
+            "SELECT channel, action, obj_id "
+            "FROM maasserver_websocket_changes "
+            "WHERE txid >= %s AND channel = ANY(%s) "
+            "ORDER BY id LIMIT %s", [since, list(channels), limit + 1])
+        rows = cursor.fetchall()
+    if len(rows) > limit:
+        return horizon, None
+    changes = OrderedDict()
+    for channel, action, obj_id in rows:
+        changes.pop((channel, obj_id), None)
+        changes[channel, obj_id] = channel, action, obj_id
+    return horizon, list(changes.values())
+
+
+def prune_changes(kept=CHANGES_KEPT):
+    """Delete all but roughly the last `kept` changes from the log.
+
+    Changes are deleted a whole transaction at a time, so that `get_changes`
+    can tell when a cursor is older than the log.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM maasserver_websocket_changes WHERE txid < ("
+            "  SELECT txid FROM maasserver_websocket_changes"
+            "  ORDER BY txid DESC OFFSET %s LIMIT 1)", [kept])
+
+
+class WebSocketChangesCleanupService(TimerService, object):
+    """Service to periodically prune the websocket change log.
+
+    This will run immediately when it's started, then once again every five
+    minutes, though the interval can be overridden by passing it to the
+    constructor.
+    """
+
+    def __init__(self, interval=(5 * 60)):
+        cleanup = synchronous(transactional(prune_changes))
+        super(WebSocketChangesCleanupService, self).__init__(
+            interval, deferToDatabase, cleanup)
@@ -0,0 +1,74 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Compact JSON encoding for websocket messages.
+
+Most of a large message, such as a page of machines, is the same object keys
+over and over again. A client that connects with ``encoding=compact`` in the
+query string gets messages with the keys replaced by numbers instead.
+
+Each message is a JSON array of two items: the keys used for the first time
+in this message, and the message itself. The region and the client both keep
+a table of keys, appending the new keys from every message to it, so a key's
+number is its index in the table. A key that isn't in the table, because the
+table is full, is sent as itself prefixed with ``~``.
+"""
+
+__all__ = [
+    "KeyTable",
+]
+
+import json
+
+
+class KeyTable:
+    """The keys shared between the region and a websocket client.
+
+    :ivar size: The most keys to keep. Some objects, such as the results of
+        commissioning scripts, have keys that are data, so the table must
+        not grow without limit.
+    """
+
+    def __init__(self, size=4096):
+        super(KeyTable, self).__init__()
+        self.size = size
+        self.keys = {}
+
+    def encode(self, obj, default=None):
+        """Encode `obj` as compact JSON.
+
+        :param default: Passed to `json.dumps`.
+        :return: The encoded message, as `str`.
+        """
+        new_keys = []
+
+        def encode_key(key):
+            if not isinstance(key, str):
+                # Do what `json.dumps` would do with keys that are not
+                # strings, so that they're only sent once too.
+                key = json.dumps(key)
+            index = self.keys.get(key)
+            if index is not None:
+                return str(index)
+            elif len(self.keys) < self.size:
+                index = self.keys[key] = len(self.keys)
+                new_keys.append(key)
+                return str(index)
+            else:
+                return "~" + key
+
+        def encode_value(value):
+            if isinstance(value, dict):
+                encoded = {}
+                for key, item in value.items():
+                    # Number the keys of an object before those of its items.
+                    key = encode_key(key)
+                    encoded[key] = encode_value(item)
+                return encoded
+            elif isinstance(value, (list, tuple)):
+                return [encode_value(item) for item in value]
+            else:
+                return value
+
+        message = encode_value(obj)
+        return json.dumps([new_keys, message], default=default)
@@ -64,13 +64,17 @@ from maasserver.models.node import (
 )
 from maasserver.models.partition import Partition
 from maasserver.models.subnet import Subnet
-from maasserver.node_action import compile_node_actions
+from maasserver.node_action import (
+    compile_node_actions,
+    perform_bulk_node_action,
+)
 from maasserver.utils.orm import (
     reload_object,
     transactional,
 )
 from maasserver.utils.threads import deferToDatabase
 from maasserver.websockets.base import (
+    HandlerDoesNotExistError,
     HandlerError,
     HandlerPermissionError,
     HandlerValidationError,
@@ -103,6 +107,7 @@ class MachineHandler(NodeHandler):
             'create',
             'update',
             'action',
+            'bulk_action',
             'set_active',
             'check_power',
             'create_physical',
@@ -742,6 +747,26 @@ class MachineHandler(NodeHandler):
         extra_params = params.get("extra", {})
         return action.execute(**extra_params)
 
+    def bulk_action(self, params):
+        """Perform the action on many machines at once.
+
+        Power control of the machines is batched by rack controller. Each
+        machine's progress is sent as it changes, as for any update to a
+        machine; the result maps each system_id to the outcome of the action
+        on it, as returned by `perform_bulk_node_action`.
+        """
+        system_ids = set(params.get("system_ids", []))
+        machines = Machine.objects.get_nodes(
+            self.user, NODE_PERMISSION.VIEW, ids=system_ids)
+        unknown_ids = system_ids - {
+            machine.system_id for machine in machines}
+        if len(unknown_ids) > 0:
+            raise HandlerDoesNotExistError(
+                "Unknown machine(s): %s." % ", ".join(sorted(unknown_ids)))
+        return perform_bulk_node_action(
+            machines, self.user, params.get("action"),
+            params.get("extra", {}))
+
     def _create_link_on_interface(self, interface, params):
         """Create a link on a new interface."""
         mode = params.get("mode", None)
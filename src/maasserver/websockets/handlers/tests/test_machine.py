@@ -2716,6 +2716,34 @@ class TestMachineHandler(MAASServerTestCase):
         self.expectThat(
             node.distro_series, Equals(osystem["releases"][0]["name"]))
 
+    def test_bulk_action_performs_action_on_each_machine(self):
+        user = factory.make_User()
+        nodes = [
+            factory.make_Node(status=NODE_STATUS.READY, owner=user)
+            for _ in range(3)
+        ]
+        handler = MachineHandler(user, {})
+        results = handler.bulk_action({
+            "system_ids": [node.system_id for node in nodes],
+            "action": "mark-broken",
+        })
+        self.assertEqual(
+            {node.system_id: {"result": "done"} for node in nodes}, results)
+        self.assertEqual(
+            [NODE_STATUS.BROKEN] * 3,
+            [reload_object(node).status for node in nodes])
+
+    def test_bulk_action_raises_error_for_unknown_machines(self):
+        user = factory.make_User()
+        node = factory.make_Node(status=NODE_STATUS.READY, owner=user)
+        handler = MachineHandler(user, {})
+        self.assertRaises(
+            HandlerDoesNotExistError, handler.bulk_action, {
+                "system_ids": [node.system_id, factory.make_name("id")],
+                "action": "mark-broken",
+            })
+        self.assertEqual(NODE_STATUS.READY, reload_object(node).status)
+
     def test_create_physical_creates_interface(self):
         user = factory.make_admin()
         node = factory.make_Node(interface=False)
@@ -27,11 +27,18 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from maasserver.eventloop import services
 from maasserver.utils.orm import transactional
-from maasserver.utils.threads import deferToDatabase
+from maasserver.utils.threads import (
+    DATABASE_LANE,
+    DatabaseLaneFull,
+    deferToDatabase,
+    deferToDatabaseInLane,
+)
 from maasserver.websockets import handlers
+from maasserver.websockets.compact import KeyTable
 from maasserver.websockets.websockets import STATUSES
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils import typed
+from provisioningserver.utils.metrics import METRICS
 from provisioningserver.utils.twisted import (
     deferred,
     synchronous,
@@ -50,6 +57,17 @@ from twisted.web.server import NOT_DONE_YET
 
 log = LegacyLogger()
 
+NOTIFY_FANOUT_SECONDS = METRICS.histogram(
+    "maas_websocket_notify_fanout_seconds",
+    "Time taken to send a database notification to all websocket clients.",
+    labels=["channel"])
+
+NOTIFY_SKIPPED = METRICS.counter(
+    "maas_websocket_notify_skipped",
+    "Database notifications not processed for a websocket client because "
+    "it has not subscribed to the changed object.",
+    labels=["channel"])
+
 
 class MSG_TYPE:
     #: Request made from client.
@@ -92,9 +110,21 @@ class WebSocketProtocol(Protocol):
         self.messages = deque()
         self.user = None
         self.cache = {}
+        # Keys shared with the client when it asks for the compact encoding;
+        # see `maasserver.websockets.compact`.
+        self.keys = None
+        # Handlers for which the client missed notifications; see
+        # `sendReload`.
+        self.missed = set()
 
     def connectionMade(self):
         """Connection has been made to client."""
+        # The client can ask for the compact encoding in the query string.
+        encodings = parse_qs(
+            urlparse(self.transport.uri).query).get(b'encoding')
+        if encodings is not None and b'compact' in encodings:
+            self.keys = KeyTable()
+
         # Using the provided cookies on the connection request, authenticate
         # the client. If this fails or if the CSRF token can't be found, it
         # will call loseConnection. A websocket connection is only allowed
@@ -283,6 +313,7 @@ class WebSocketProtocol(Protocol):
                 "Handler %s does not exist." % handler_name)
             return None
 
+        self.missed.discard(handler_name)
         handler = self.buildHandler(handler_class)
         d = handler.execute(method, message.get("params", {}))
         d.addCallbacks(
@@ -299,6 +330,14 @@ class WebSocketProtocol(Protocol):
         else:
             raise TypeError("Could not convert object to JSON: %r" % obj)
 
+    def encode(self, message):
+        """Encode `message` to send to the client."""
+        if self.keys is None:
+            message = json.dumps(message, default=self._json_encode)
+        else:
+            message = self.keys.encode(message, default=self._json_encode)
+        return message.encode("ascii")
+
     def sendResult(self, request_id, result):
         """Send final result to client."""
         result_msg = {
@@ -307,8 +346,7 @@ class WebSocketProtocol(Protocol):
             "rtype": RESPONSE_TYPE.SUCCESS,
             "result": result,
             }
-        self.transport.write(json.dumps(
-            result_msg, default=self._json_encode).encode("ascii"))
+        self.transport.write(self.encode(result_msg))
         return result
 
     def sendError(self, request_id, handler, method, failure):
@@ -333,8 +371,7 @@ class WebSocketProtocol(Protocol):
             "rtype": RESPONSE_TYPE.ERROR,
             "error": error,
             }
-        self.transport.write(
-            json.dumps(error_msg, default=self._json_encode).encode("ascii"))
+        self.transport.write(self.encode(error_msg))
         return None
 
     def sendNotify(self, name, action, data):
@@ -345,8 +382,17 @@ class WebSocketProtocol(Protocol):
             "action": action,
             "data": data,
             }
-        self.transport.write(
-            json.dumps(notify_msg, default=self._json_encode).encode("ascii"))
+        self.transport.write(self.encode(notify_msg))
+
+    def sendReload(self, name):
+        """Tell the client that it missed notifications for handler `name`.
+
+        The client should catch up by calling the handler's `changes` method,
+        or `list` again. It's only told once until it next calls the handler.
+        """
+        if name not in self.missed:
+            self.missed.add(name)
+            self.sendNotify(name, "reload", None)
 
     def buildHandler(self, handler_class):
         """Return an initialised instance of `handler_class`."""
@@ -415,13 +461,30 @@ class WebSocketFactory(Factory):
 
     @inlineCallbacks
     def onNotify(self, handler_class, channel, action, obj_id):
-        for client in self.clients:
-            handler = client.buildHandler(handler_class)
-            data = yield deferToDatabase(
-                self.processNotify, handler, channel, action, obj_id)
-            if data is not None:
-                (name, client_action, data) = data
-                client.sendNotify(name, client_action, data)
+        dropped = 0
+        with NOTIFY_FANOUT_SECONDS.labels(channel).time():
+            for client in self.clients:
+                handler = client.buildHandler(handler_class)
+                if not handler.is_subscribed(channel, action, obj_id):
+                    NOTIFY_SKIPPED.labels(channel).inc()
+                    continue
+                try:
+                    data = yield deferToDatabaseInLane(
+                        DATABASE_LANE.UI, self.processNotify, handler,
+                        channel, action, obj_id)
+                except DatabaseLaneFull:
+                    # The database is too busy to notify this client; tell
+                    # it to catch up instead.
+                    client.sendReload(handler_class._meta.handler_name)
+                    dropped += 1
+                    continue
+                if data is not None:
+                    (name, client_action, data) = data
+                    client.sendNotify(name, client_action, data)
+        if dropped != 0:
+            log.msg(
+                "Dropped %s notification on %s for %d client(s); the "
+                "database is too busy." % (action, channel, dropped))
 
     @transactional
     def processNotify(self, handler, channel, action, obj_id):
@@ -100,6 +100,34 @@ class TestHandlerMeta(MAASTestCase):
             "TestHandler", queryset=Node.objects.all())
         self.assertIs(Node, handler._meta.object_class)
 
+    def test_allows_changes_if_listed_and_listening(self):
+        handler = make_handler(
+            "TestHandler", queryset=Node.objects.all(),
+            listen_channels=["machine"])
+        self.assertEqual(
+            ["list", "get", "create", "update", "delete", "set_active",
+             "changes", "subscribe", "unsubscribe"],
+            handler._meta.allowed_methods)
+
+    def test_doesnt_allow_changes_if_not_listed(self):
+        handler = make_handler(
+            "TestHandler", queryset=Node.objects.all(),
+            listen_channels=["machine"], allowed_methods=["get"])
+        self.assertEqual(["get"], handler._meta.allowed_methods)
+
+    def test_doesnt_allow_changes_if_not_listening(self):
+        handler = make_handler("TestHandler", queryset=Node.objects.all())
+        self.assertNotIn("changes", handler._meta.allowed_methods)
+
+    def test_doesnt_allow_changes_if_listening_to_unlogged_channel(self):
+        handler = make_handler(
+            "TestHandler", queryset=Node.objects.all(),
+            listen_channels=["machine", "event"])
+        self.assertEqual(
+            ["list", "get", "create", "update", "delete", "set_active",
+             "subscribe", "unsubscribe"],
+            handler._meta.allowed_methods)
+
     def test_copy_fields_and_excludes_to_list_fields_and_list_excludes(self):
         fields = [factory.make_name("field") for _ in range(3)]
         exclude = [factory.make_name("field") for _ in range(3)]
@@ -425,6 +453,150 @@ class TestHandler(MAASServerTestCase):
         handler.list({"start": nodes[0].id})
         self.assertItemsEqual(pks, handler.cache['loaded_pks'])
 
+    def test_changes_without_since_returns_cursor(self):
+        handler = self.make_nodes_handler()
+        self.patch(base, "get_cursor").return_value = sentinel.cursor
+        self.assertEqual({"cursor": sentinel.cursor}, handler.changes({}))
+
+    def test_changes_returns_reset_if_changes_are_missing(self):
+        handler = self.make_nodes_handler(listen_channels=["machine"])
+        get_changes = self.patch(base, "get_changes")
+        get_changes.return_value = sentinel.cursor, None
+        self.assertEqual(
+            {"cursor": sentinel.cursor, "reset": True},
+            handler.changes({"since": "10"}))
+        self.assertThat(get_changes, MockCalledOnceWith(["machine"], 10))
+
+    def test_changes_returns_notifications(self):
+        updated = factory.make_Node()
+        created = factory.make_Node()
+        handler = self.make_nodes_handler(listen_channels=["machine"])
+        mock_dehydrate = self.patch(handler, "full_dehydrate")
+        mock_dehydrate.side_effect = lambda obj, for_list: obj.system_id
+        self.patch(base, "get_changes").return_value = sentinel.cursor, [
+            ("machine", "update", updated.system_id),
+            ("machine", "create", created.system_id),
+            ("machine", "delete", "gone"),
+        ]
+        self.assertEqual({"cursor": sentinel.cursor, "changes": [
+            {"name": handler._meta.handler_name, "action": "update",
+             "data": updated.system_id},
+            {"name": handler._meta.handler_name, "action": "update",
+             "data": created.system_id},
+            {"name": handler._meta.handler_name, "action": "delete",
+             "data": "gone"},
+        ]}, handler.changes({"since": "10"}))
+        self.assertEqual(
+            {updated.system_id, created.system_id},
+            handler.cache["loaded_pks"])
+
+    def test_subscribe_pks(self):
+        handler = self.make_nodes_handler()
+        handler.subscribe({"pks": ["a", "b"]})
+        handler.subscribe({"pks": ["c"]})
+        self.assertEqual(
+            {"pks": {"a", "b", "c"}, "filter": None},
+            handler.cache["subscription"])
+
+    def test_subscribe_filter(self):
+        handler = self.make_nodes_handler()
+        handler.subscribe({"filter": {"hostname": "foo"}})
+        self.assertEqual(
+            {"pks": set(), "filter": [
+                (Node._meta.get_field("hostname"), "foo")]},
+            handler.cache["subscription"])
+
+    def test_subscribe_filter_rejects_fields_not_listed(self):
+        handler = self.make_nodes_handler(list_fields=["hostname"])
+        with ExpectedException(HandlerValidationError):
+            handler.subscribe({"filter": {"owner": 1}})
+        with ExpectedException(HandlerValidationError):
+            handler.subscribe({"filter": {"not_a_field": 1}})
+
+    def test_subscribe_filter_converts_values(self):
+        handler = self.make_nodes_handler()
+        handler.subscribe({"filter": {"cpu_count": "4"}})
+        self.assertEqual(
+            {"pks": set(), "filter": [
+                (Node._meta.get_field("cpu_count"), 4)]},
+            handler.cache["subscription"])
+
+    def test_subscribe_filter_rejects_invalid_values(self):
+        handler = self.make_nodes_handler()
+        with ExpectedException(HandlerValidationError):
+            handler.subscribe({"filter": {"cpu_count": "four"}})
+
+    def test_subscribe_without_params_subscribes_to_everything(self):
+        handler = self.make_nodes_handler()
+        handler.subscribe({"pks": ["a"]})
+        handler.subscribe({})
+        self.assertNotIn("subscription", handler.cache)
+
+    def test_unsubscribe_pks(self):
+        handler = self.make_nodes_handler()
+        handler.subscribe({"pks": ["a", "b"]})
+        handler.unsubscribe({"pks": ["a"]})
+        self.assertEqual(
+            {"pks": {"b"}, "filter": None}, handler.cache["subscription"])
+
+    def test_unsubscribe_without_params_unsubscribes_from_everything(self):
+        handler = self.make_nodes_handler()
+        handler.subscribe({"pks": ["a"], "filter": {"hostname": "foo"}})
+        handler.unsubscribe({})
+        self.assertEqual(
+            {"pks": set(), "filter": None}, handler.cache["subscription"])
+
+    def test_is_subscribed_without_subscription(self):
+        handler = self.make_nodes_handler()
+        self.assertTrue(handler.is_subscribed("machine", "update", "a"))
+
+    def test_is_subscribed_with_pks(self):
+        handler = self.make_nodes_handler()
+        handler.subscribe({"pks": ["a"]})
+        self.assertTrue(handler.is_subscribed("machine", "create", "a"))
+        self.assertFalse(handler.is_subscribed("machine", "create", "b"))
+
+    def test_is_subscribed_to_active_pk(self):
+        handler = self.make_nodes_handler()
+        handler.unsubscribe({})
+        handler.cache["active_pk"] = "a"
+        self.assertTrue(handler.is_subscribed("machine", "update", "a"))
+
+    def test_is_subscribed_with_filter(self):
+        handler = self.make_nodes_handler()
+        handler.subscribe({"filter": {"hostname": "foo"}})
+        self.assertTrue(handler.is_subscribed("machine", "update", "b"))
+
+    def test_on_listen_ignores_objects_not_matching_filter(self):
+        node = factory.make_Node()
+        other_node = factory.make_Node()
+        handler = self.make_nodes_handler(fields=['hostname'])
+        handler.subscribe({"filter": {"hostname": node.hostname}})
+        self.assertIsNone(
+            handler.on_listen("machine", "create", other_node.system_id))
+        self.assertEqual(
+            (handler._meta.handler_name, "create",
+             {"hostname": node.hostname}),
+            handler.on_listen("machine", "create", node.system_id))
+
+    def test_on_listen_matches_filter_values_sent_as_strings(self):
+        node = factory.make_Node(cpu_count=4)
+        handler = self.make_nodes_handler(fields=['hostname'])
+        handler.subscribe({"filter": {"cpu_count": "4"}})
+        self.assertEqual(
+            (handler._meta.handler_name, "create",
+             {"hostname": node.hostname}),
+            handler.on_listen("machine", "create", node.system_id))
+
+    def test_on_listen_deletes_objects_no_longer_matching_filter(self):
+        node = factory.make_Node()
+        handler = self.make_nodes_handler()
+        handler.cache["loaded_pks"].add(node.system_id)
+        handler.subscribe({"filter": {"hostname": node.hostname + "-x"}})
+        self.assertEqual(
+            (handler._meta.handler_name, "delete", node.system_id),
+            handler.on_listen("machine", "update", node.system_id))
+
     def test_get(self):
         node = factory.make_Node()
         handler = self.make_nodes_handler(fields=['hostname'])
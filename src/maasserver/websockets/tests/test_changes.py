@@ -0,0 +1,182 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.websockets.changes`."""
+
+__all__ = []
+
+from contextlib import closing
+from unittest.mock import call
+
+from django.db import connection
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.websockets import changes
+from maasserver.websockets.changes import (
+    get_changes,
+    get_cursor,
+    prune_changes,
+    WebSocketChangesCleanupService,
+)
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
+from testtools.matchers import Equals
+from twisted.internet.defer import maybeDeferred
+from twisted.internet.task import Clock
+
+
+def execute(query, params=None):
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(query, params)
+        if cursor.description is not None:
+            return cursor.fetchall()
+
+
+def record(channel, action, obj_id, txid):
+    """Record a change as if made by the transaction `txid`."""
+    execute(
+        "INSERT INTO maasserver_websocket_changes "
+        "(channel, action, obj_id, txid) VALUES (%s, %s, %s, %s)",
+        [channel, action, obj_id, txid])
+
+
+class TestChanges(MAASServerTestCase):
+
+    def notify(self, event, payload):
+        execute("SELECT ws_notify(%s, %s)", [event, payload])
+
+    def test_ws_notify_records_changes(self):
+        before = get_cursor()
+        zone = factory.make_Zone()
+        self.assertThat(
+            get_changes(["zone"], before),
+            Equals((get_cursor(), [("zone", "create", str(zone.id))])))
+
+    def test_ws_notify_records_the_transaction(self):
+        self.notify("test_create", "1")
+        self.assertThat(
+            execute(
+                "SELECT txid = txid_current() "
+                "FROM maasserver_websocket_changes WHERE channel = 'test'"),
+            Equals([(True,)]))
+
+    def test_ws_notify_does_not_record_unlogged_channels(self):
+        self.notify("event_create", "1")
+        self.assertThat(
+            execute(
+                "SELECT COUNT(*) FROM maasserver_websocket_changes "
+                "WHERE channel = 'event'"),
+            Equals([(0,)]))
+
+    def test_get_cursor_is_at_or_before_the_current_transaction(self):
+        [(txid,)] = execute("SELECT txid_current()")
+        self.assertTrue(get_cursor() <= txid)
+
+    def test_get_changes_returns_only_listened_channels(self):
+        before = get_cursor()
+        self.notify("zone_create", "1")
+        self.notify("tag_create", "2")
+        self.assertThat(
+            get_changes(["tag"], before),
+            Equals((get_cursor(), [("tag", "create", "2")])))
+
+    def test_get_changes_returns_the_last_change_of_each_object(self):
+        before = get_cursor()
+        self.notify("zone_create", "1")
+        self.notify("zone_create", "2")
+        self.notify("zone_update", "1")
+        self.assertThat(
+            get_changes(["zone"], before),
+            Equals((get_cursor(), [
+                ("zone", "create", "2"),
+                ("zone", "update", "1"),
+            ])))
+
+    def test_get_changes_returns_changes_from_the_cursor_onwards(self):
+        # Changes from transactions at the cursor were perhaps not committed
+        # when the cursor was taken, so they're returned again.
+        cursor = get_cursor()
+        record("test", "create", "1", cursor - 1)
+        record("test", "create", "2", cursor)
+        self.assertThat(
+            get_changes(["test"], cursor),
+            Equals((cursor, [("test", "create", "2")])))
+
+    def test_get_changes_resets_if_too_many_changes(self):
+        before = get_cursor()
+        self.notify("zone_create", "1")
+        self.notify("zone_create", "2")
+        self.assertThat(
+            get_changes(["zone"], before, limit=1),
+            Equals((get_cursor(), None)))
+
+    def test_get_changes_resets_if_changes_were_pruned(self):
+        cursor = get_cursor()
+        execute("DELETE FROM maasserver_websocket_changes")
+        record("zone", "create", "1", cursor)
+        self.assertThat(
+            get_changes(["zone"], cursor - 1), Equals((cursor, None)))
+
+    def test_get_changes_does_not_reset_if_log_is_empty(self):
+        cursor = get_cursor()
+        execute("DELETE FROM maasserver_websocket_changes")
+        self.assertThat(get_changes(["zone"], 1), Equals((cursor, [])))
+
+    def test_get_changes_resets_if_cursor_is_from_the_future(self):
+        cursor = get_cursor()
+        self.assertThat(
+            get_changes(["zone"], cursor + 1), Equals((cursor, None)))
+
+
+class TestPruneChanges(MAASServerTestCase):
+
+    def setUp(self):
+        super(TestPruneChanges, self).setUp()
+        execute("DELETE FROM maasserver_websocket_changes")
+        for obj_id, txid in enumerate([1, 2, 2, 3]):
+            record("zone", "create", str(obj_id), txid)
+
+    def get_txids(self):
+        return [
+            txid for (txid,) in execute(
+                "SELECT txid FROM maasserver_websocket_changes "
+                "ORDER BY id")
+        ]
+
+    def test_deletes_whole_transactions_beyond_those_kept(self):
+        prune_changes(kept=2)
+        self.assertThat(self.get_txids(), Equals([2, 2, 3]))
+
+    def test_keeps_everything_if_there_are_few_changes(self):
+        prune_changes(kept=4)
+        self.assertThat(self.get_txids(), Equals([1, 2, 2, 3]))
+
+
+class TestWebSocketChangesCleanupService(MAASServerTestCase):
+
+    def test_init_with_default_interval(self):
+        prune_changes = self.patch(changes, "prune_changes")
+        # Making `deferToDatabase` use the current thread helps testing.
+        self.patch(changes, "deferToDatabase", maybeDeferred)
+
+        service = WebSocketChangesCleanupService()
+        # Use a deterministic clock instead of the reactor for testing.
+        service.clock = Clock()
+
+        interval = 5 * 60  # seconds.
+        self.assertEqual(service.step, interval)
+        self.assertThat(prune_changes, MockNotCalled())
+        service.startService()
+        self.assertThat(prune_changes, MockCalledOnceWith())
+        service.clock.advance(interval - 1)
+        self.assertThat(prune_changes, MockCalledOnceWith())
+        service.clock.advance(1)
+        self.assertThat(prune_changes, MockCallsMatch(call(), call()))
+
+    def test_interval_can_be_set(self):
+        interval = self.getUniqueInteger()
+        service = WebSocketChangesCleanupService(interval)
+        self.assertEqual(interval, service.step)
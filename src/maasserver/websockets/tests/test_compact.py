@@ -0,0 +1,77 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.websockets.compact`."""
+
+__all__ = []
+
+import json
+
+from maasserver.websockets.compact import KeyTable
+from maastesting.testcase import MAASTestCase
+
+
+def decode(keys, message):
+    """Decode `message` like a client would, updating `keys`."""
+    new_keys, message = json.loads(message)
+    keys.extend(new_keys)
+
+    def decode_value(value):
+        if isinstance(value, dict):
+            return {
+                key[1:] if key.startswith("~") else keys[int(key)]:
+                decode_value(item)
+                for key, item in value.items()
+            }
+        elif isinstance(value, list):
+            return [decode_value(item) for item in value]
+        else:
+            return value
+
+    return decode_value(message)
+
+
+class TestKeyTable(MAASTestCase):
+
+    def test_encode_replaces_keys(self):
+        table = KeyTable()
+        message = {"type": 1, "result": [{"hostname": "a"}]}
+        self.assertEqual(
+            [["type", "result", "hostname"],
+             {"0": 1, "1": [{"2": "a"}]}],
+            json.loads(table.encode(message)))
+
+    def test_encode_sends_keys_once(self):
+        table = KeyTable()
+        table.encode({"hostname": "a"})
+        self.assertEqual(
+            [[], {"0": "b"}], json.loads(table.encode({"hostname": "b"})))
+
+    def test_encode_sends_keys_itself_when_table_is_full(self):
+        table = KeyTable(size=1)
+        self.assertEqual(
+            [["a"], {"0": 1, "~b": 2}],
+            json.loads(table.encode({"a": 1, "b": 2})))
+
+    def test_encode_converts_keys_like_json(self):
+        table = KeyTable()
+        self.assertEqual(
+            [["1", "null"], {"0": True, "1": False}],
+            json.loads(table.encode({1: True, None: False})))
+
+    def test_encode_uses_default(self):
+        table = KeyTable()
+        self.assertEqual(
+            [["a"], {"0": "b"}],
+            json.loads(table.encode({"a": b"b"}, default=bytes.decode)))
+
+    def test_round_trip(self):
+        table, keys = KeyTable(size=5), []
+        messages = [
+            {"type": 0, "data": {"hostname": "a", "tags": ["x"]}},
+            {"type": 0, "data": {"hostname": "b", "owner": None}},
+            {"type": 1, "result": [{"hostname": "c", "results": {"d": 1}}]},
+        ]
+        self.assertEqual(
+            messages,
+            [decode(keys, table.encode(message)) for message in messages])
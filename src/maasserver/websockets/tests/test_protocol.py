@@ -20,9 +20,14 @@ from maasserver.testing.factory import factory as maas_factory
 from maasserver.testing.listener import FakePostgresListenerService
 from maasserver.testing.testcase import MAASTransactionServerTestCase
 from maasserver.utils.orm import transactional
-from maasserver.utils.threads import deferToDatabase
+from maasserver.utils.threads import (
+    DATABASE_LANE,
+    DatabaseLaneFull,
+    deferToDatabase,
+)
 from maasserver.websockets import protocol as protocol_module
 from maasserver.websockets.base import Handler
+from maasserver.websockets.compact import KeyTable
 from maasserver.websockets.handlers import (
     DeviceHandler,
     MachineHandler,
@@ -38,6 +43,7 @@ from maastesting.matchers import (
     IsFiredDeferred,
     MockCalledOnceWith,
     MockCalledWith,
+    MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
@@ -663,6 +669,56 @@ class TestWebSocketProtocol(MAASTransactionServerTestCase):
         self.assertEquals(
             message, self.get_written_transport_message(protocol))
 
+    def test_connectionMade_uses_compact_encoding_if_asked(self):
+        protocol, factory = self.make_protocol(
+            transport_uri=b"/MAAS/ws?csrftoken=token&encoding=compact")
+        protocol.authenticate.return_value = defer.succeed(None)
+        protocol.connectionMade()
+        self.addCleanup(lambda: protocol.connectionLost(""))
+        self.assertIsInstance(protocol.keys, KeyTable)
+
+    def test_connectionMade_uses_json_encoding_by_default(self):
+        protocol, factory = self.make_protocol(
+            transport_uri=b"/MAAS/ws?csrftoken=token")
+        protocol.authenticate.return_value = defer.succeed(None)
+        protocol.connectionMade()
+        self.addCleanup(lambda: protocol.connectionLost(""))
+        self.assertIsNone(protocol.keys)
+
+    def test_sendReload_tells_client_once(self):
+        protocol, factory = self.make_protocol()
+        mock_sendNotify = self.patch(protocol, "sendNotify")
+        protocol.sendReload("machine")
+        protocol.sendReload("machine")
+        self.assertThat(
+            mock_sendNotify, MockCalledOnceWith("machine", "reload", None))
+
+    def test_handleRequest_clears_missed_notifications(self):
+        protocol, factory = self.make_protocol()
+        protocol.user = sentinel.user
+        handler_class = MagicMock()
+        handler_name = maas_factory.make_name("handler")
+        handler_class.return_value.execute.return_value = succeed(None)
+        factory.handlers[handler_name] = handler_class
+        self.patch(protocol, "sendNotify")
+        protocol.sendReload(handler_name)
+        protocol.handleRequest({
+            "type": MSG_TYPE.REQUEST,
+            "request_id": random.randint(1, 999999),
+            "method": "%s.changes" % handler_name,
+        })
+        self.assertThat(protocol.missed, Equals(set()))
+
+    def test_sendNotify_sends_compact_json(self):
+        protocol, factory = self.make_protocol()
+        protocol.keys = KeyTable()
+        protocol.sendNotify("machine", "update", {"hostname": "foo"})
+        self.assertEquals(
+            [["type", "name", "action", "data", "hostname"],
+             {"0": MSG_TYPE.NOTIFY, "1": "machine", "2": "update",
+              "3": {"4": "foo"}}],
+            self.get_written_transport_message(protocol))
+
 
 class MakeProtocolFactoryMixin:
 
@@ -681,6 +737,7 @@ class MakeProtocolFactoryMixin:
         protocol = factory.buildProtocol(None)
         protocol.transport = MagicMock()
         protocol.transport.cookies = b""
+        protocol.transport.uri = b""
         if user is None:
             user = maas_factory.make_User()
         mock_authenticate = self.patch(protocol, "authenticate")
@@ -887,6 +944,48 @@ class TestWebSocketFactoryTransactional(
         self.assertThat(
             mock_sendNotify, MockCalledWith(name, action, data))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_skips_clients_not_subscribed(self):
+        user = yield deferToDatabase(self.make_user)
+        protocol, factory = self.make_protocol_with_factory(user=user)
+        mock_class = MagicMock()
+        mock_class.return_value.is_subscribed.return_value = False
+        mock_sendNotify = self.patch(protocol, "sendNotify")
+        yield factory.onNotify(
+            mock_class, sentinel.channel, sentinel.action, sentinel.obj_id)
+        self.assertThat(
+            mock_class.return_value.is_subscribed,
+            MockCalledOnceWith(
+                sentinel.channel, sentinel.action, sentinel.obj_id))
+        self.assertThat(mock_class.return_value.on_listen, MockNotCalled())
+        self.assertThat(mock_sendNotify, MockNotCalled())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_tells_client_to_reload_when_database_is_busy(self):
+        user = yield deferToDatabase(self.make_user)
+        protocol, factory = self.make_protocol_with_factory(user=user)
+        other_client = MagicMock()
+        factory.clients.append(other_client)
+        self.addCleanup(factory.clients.remove, other_client)
+        name = maas_factory.make_name("name")
+        mock_class = MagicMock()
+        mock_class._meta.handler_name = name
+        self.patch(protocol_module, "deferToDatabaseInLane").side_effect = [
+            fail(DatabaseLaneFull(DATABASE_LANE.UI)),
+            succeed((name, "update", sentinel.data)),
+        ]
+        mock_sendNotify = self.patch(protocol, "sendNotify")
+        yield factory.onNotify(
+            mock_class, sentinel.channel, "update", sentinel.obj_id)
+        self.assertThat(
+            mock_sendNotify, MockCalledOnceWith(name, "reload", None))
+        # The other client still gets the notification.
+        self.assertThat(
+            other_client.sendNotify,
+            MockCalledOnceWith(name, "update", sentinel.data))
+
     @wait_for_reactor
     @inlineCallbacks
     def test_updateRackController_calls_onNotify_for_controller_update(self):
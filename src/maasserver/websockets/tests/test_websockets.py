@@ -16,7 +16,9 @@ from maasserver.websockets.websockets import (
     _makeAccept,
     _makeFrame,
     _mask,
+    _negotiateDeflate,
     _parseFrames,
+    _PerMessageDeflate,
     _WSException,
     CONTROLS,
     IWebSocketsFrameReceiver,
@@ -338,6 +340,157 @@ class TestFrameHelpers(MAASTestCase):
         buf = _makeFrame(b"Hello", CONTROLS.TEXT, True, mask=b"7\xfa!=")
         self.assertEqual(frame, buf)
 
+    def test_makeCompressedFrame(self):
+        """
+        L{_makeFrame} sets the I{RSV1} flag on compressed frames.
+        """
+        frame = b"\xc1\x05Hello"
+        buf = _makeFrame(b"Hello", CONTROLS.TEXT, True, compressed=True)
+        self.assertEqual(frame, buf)
+
+    def test_parseCompressedText(self):
+        """
+        L{_parseFrames} decompresses compressed messages when
+        permessage-deflate has been negotiated, using the example from RFC
+        7692.
+        """
+        frame = [b"\xc1\x07\xf2\x48\xcd\xc9\xc9\x07\x00"]
+        frames = list(_parseFrames(
+            frame, needMask=False, deflate=_PerMessageDeflate()))
+        self.assertEqual([(CONTROLS.TEXT, b"Hello", True)], frames)
+
+    def test_parseCompressedTextFragments(self):
+        """
+        L{_parseFrames} decompresses compressed messages split across
+        several frames.
+        """
+        frame = [
+            b"\x41\x03\xf2\x48\xcd",
+            b"\x80\x04\xc9\xc9\x07\x00",
+        ]
+        frames = list(_parseFrames(
+            frame, needMask=False, deflate=_PerMessageDeflate()))
+        self.assertEqual(
+            [(CONTROLS.TEXT, b"He", False), (CONTROLS.CONTINUE, b"llo", True)],
+            frames)
+
+    def test_parseUncompressedTextWithDeflate(self):
+        """
+        L{_parseFrames} passes uncompressed messages through when
+        permessage-deflate has been negotiated.
+        """
+        frame = [b"\x81\x05Hello"]
+        frames = list(_parseFrames(
+            frame, needMask=False, deflate=_PerMessageDeflate()))
+        self.assertEqual([(CONTROLS.TEXT, b"Hello", True)], frames)
+
+    def test_parseCompressedTextWithoutDeflate(self):
+        """
+        L{_parseFrames} refuses compressed frames when permessage-deflate
+        hasn't been negotiated.
+        """
+        frame = [b"\xc1\x07\xf2\x48\xcd\xc9\xc9\x07\x00"]
+        error = self.assertRaises(
+            _WSException, list, _parseFrames(frame, needMask=False))
+        self.assertEqual("Reserved flag in frame (193)", str(error))
+
+    def test_parseCompressedPing(self):
+        """
+        L{_parseFrames} refuses compressed control frames.
+        """
+        frame = [b"\xc9\x05Hello"]
+        error = self.assertRaises(
+            _WSException, list, _parseFrames(
+                frame, needMask=False, deflate=_PerMessageDeflate()))
+        self.assertEqual("Reserved flag in frame (201)", str(error))
+
+    def test_parseInvalidCompressedText(self):
+        """
+        L{_parseFrames} raises a L{_WSException} error when a compressed
+        message can't be decompressed.
+        """
+        frame = [b"\xc1\x05Hello"]
+        error = self.assertRaises(
+            _WSException, list, _parseFrames(
+                frame, needMask=False, deflate=_PerMessageDeflate()))
+        self.assertThat(str(error), StartsWith("Invalid compressed data"))
+
+
+class PerMessageDeflateTest(MAASTestCase):
+    """
+    Tests for L{_PerMessageDeflate} and L{_negotiateDeflate}.
+    """
+
+    def test_compress(self):
+        """
+        L{_PerMessageDeflate.compress} compresses messages using the same
+        context, as in the examples from RFC 7692.
+        """
+        deflate = _PerMessageDeflate()
+        self.assertEqual(
+            b"\xf2\x48\xcd\xc9\xc9\x07\x00", deflate.compress(b"Hello"))
+        self.assertEqual(
+            b"\xf2\x00\x11\x00\x00", deflate.compress(b"Hello"))
+
+    def test_compressNoContextTakeover(self):
+        """
+        L{_PerMessageDeflate.compress} compresses every message on its own
+        when the client asked for I{server_no_context_takeover}.
+        """
+        deflate = _PerMessageDeflate(serverNoContextTakeover=True)
+        deflate.compress(b"Hello")
+        self.assertEqual(
+            b"\xf2\x48\xcd\xc9\xc9\x07\x00", deflate.compress(b"Hello"))
+
+    def test_negotiate(self):
+        """
+        L{_negotiateDeflate} accepts a permessage-deflate offer.
+        """
+        deflate, extensions = _negotiateDeflate([b"permessage-deflate"])
+        self.assertIsInstance(deflate, _PerMessageDeflate)
+        self.assertEqual(b"permessage-deflate", extensions)
+        self.assertFalse(deflate.serverNoContextTakeover)
+        self.assertEqual(15, deflate.serverMaxWindowBits)
+
+    def test_negotiateParameters(self):
+        """
+        L{_negotiateDeflate} accepts the parameters of the offer, except
+        I{client_max_window_bits} which it doesn't need.
+        """
+        deflate, extensions = _negotiateDeflate([
+            b"permessage-deflate; server_no_context_takeover; "
+            b"client_no_context_takeover; server_max_window_bits=10; "
+            b"client_max_window_bits"])
+        self.assertEqual(
+            b"permessage-deflate; server_no_context_takeover; "
+            b"client_no_context_takeover; server_max_window_bits=10",
+            extensions)
+        self.assertTrue(deflate.serverNoContextTakeover)
+        self.assertEqual(10, deflate.serverMaxWindowBits)
+
+    def test_negotiateChoosesFirstAcceptableOffer(self):
+        """
+        L{_negotiateDeflate} skips other extensions and offers it can't
+        accept.
+        """
+        deflate, extensions = _negotiateDeflate([
+            b"x-webkit-deflate-frame, permessage-deflate; unknown",
+            b"permessage-deflate; server_max_window_bits=8",
+            b"permessage-deflate; server_no_context_takeover"])
+        self.assertEqual(
+            b"permessage-deflate; server_no_context_takeover", extensions)
+
+    def test_negotiateNothingAcceptable(self):
+        """
+        L{_negotiateDeflate} returns C{(None, None)} if there's no offer it
+        can accept.
+        """
+        self.assertEqual((None, None), _negotiateDeflate([]))
+        self.assertEqual(
+            (None, None), _negotiateDeflate([
+                b"permessage-deflate; server_no_context_takeover; "
+                b"server_no_context_takeover"]))
+
 
 @implementer(IWebSocketsFrameReceiver)
 class SavingEchoReceiver(object):
@@ -443,6 +596,35 @@ class WebSocketsTransportTest(MAASTestCase):
         webSocketsTranport.loseConnection(STATUSES.GOING_AWAY, b"Going away")
         self.assertEqual(b"\x88\x0c\x03\xe9Going away", transport.value())
 
+    def test_sendFrameCompressed(self):
+        """
+        L{WebSocketsTransport.sendFrame} compresses messages when
+        permessage-deflate has been negotiated.
+        """
+        transport = StringTransportWithDisconnection()
+        transport.protocol = Protocol()
+        webSocketsTranport = WebSocketsTransport(
+            transport, _PerMessageDeflate())
+        data = b"x" * 200
+        webSocketsTranport.sendFrame(CONTROLS.TEXT, data, True)
+        frames = list(_parseFrames(
+            [transport.value()], needMask=False,
+            deflate=_PerMessageDeflate()))
+        self.assertEqual([(CONTROLS.TEXT, data, True)], frames)
+        self.assertEqual(0x40, transport.value()[0] & 0x40)
+        self.assertLess(len(transport.value()), len(data))
+
+    def test_sendFrameSmallUncompressed(self):
+        """
+        L{WebSocketsTransport.sendFrame} doesn't compress small messages.
+        """
+        transport = StringTransportWithDisconnection()
+        transport.protocol = Protocol()
+        webSocketsTranport = WebSocketsTransport(
+            transport, _PerMessageDeflate())
+        webSocketsTranport.sendFrame(CONTROLS.TEXT, b"Hello", True)
+        self.assertEqual(b"\x81\x05Hello", transport.value())
+
 
 class WebSocketsProtocolWrapperTest(MAASTestCase):
     """
@@ -620,6 +802,33 @@ class WebSocketsResourceTest(MAASTestCase):
         self.assertEqual(request.getHeader(b"cookie"), transport.cookies)
         self.assertEqual(request.uri, transport.uri)
 
+    def test_renderDeflate(self):
+        """
+        If the client offers permessage-deflate via the
+        C{Sec-WebSocket-Extensions} header, L{WebSocketsResource} accepts it
+        and the protocol compresses its messages.
+        """
+        request = DummyRequest(b"/")
+        request.requestHeaders = Headers()
+        transport = StringTransportWithDisconnection()
+        transport.protocol = Protocol()
+        request.transport = transport
+        self.update_headers(request, headers={
+            b"upgrade": b"Websocket",
+            b"connection": b"Upgrade",
+            b"sec-websocket-key": b"secure",
+            b"sec-websocket-version": b"13",
+            b"sec-websocket-extensions": (
+                b"permessage-deflate; client_max_window_bits")})
+        result = self.resource.render(request)
+        self.assertEqual(NOT_DONE_YET, result)
+        self.assertEqual(
+            [b"permessage-deflate"],
+            request.responseHeaders.getRawHeaders(
+                b"Sec-WebSocket-Extensions"))
+        self.assertIsInstance(
+            transport.protocol._deflate, _PerMessageDeflate)
+
     def test_renderProtocol(self):
         """
         If protocols are specified via the C{Sec-WebSocket-Protocol} header,
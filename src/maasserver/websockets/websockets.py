@@ -26,6 +26,7 @@ from typing import (
     List,
     Sequence,
 )
+import zlib
 
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils import typed
@@ -93,6 +94,134 @@ class STATUSES(Values):
 # The GUID for WebSockets, from RFC 6455.
 _WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
 
+# The end of every message compressed with permessage-deflate, which is left
+# off when the message is sent, from RFC 7692.
+_DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+
+class _PerMessageDeflate(object):
+    """
+    The state of the permessage-deflate extension (RFC 7692) on a connection.
+
+    Messages are compressed with a single deflate stream, so later messages
+    can refer back to earlier ones, unless the client asked for
+    I{server_no_context_takeover}.
+
+    @ivar minimumSize: Messages smaller than this are sent uncompressed.
+    @type minimumSize: C{int}
+    """
+
+    minimumSize = 128
+
+    def __init__(self, serverNoContextTakeover=False, serverMaxWindowBits=15):
+        self.serverNoContextTakeover = serverNoContextTakeover
+        self.serverMaxWindowBits = serverMaxWindowBits
+        self._compressor = None
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        self._decompressing = False
+
+    @typed
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compress a message.
+
+        @type data: C{bytes}
+        @param data: The whole message.
+
+        @rtype: C{bytes}
+        @return: The compressed message.
+        """
+        if self._compressor is None or self.serverNoContextTakeover:
+            self._compressor = zlib.compressobj(
+                zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+                -self.serverMaxWindowBits)
+        data = self._compressor.compress(data)
+        data += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data[:-len(_DEFLATE_TAIL)]
+
+    @typed
+    def decompress(self, data: bytes, opcode, compressed: bool,
+                   fin: bool) -> bytes:
+        """
+        Decompress a data frame, if it's part of a compressed message.
+
+        @type data: C{bytes}
+        @param data: The content of the frame.
+
+        @type opcode: C{CONTROLS}
+        @param opcode: The type of the frame.
+
+        @type compressed: C{bool}
+        @param compressed: Whether or not the frame has the I{RSV1} flag
+            set, which marks the first frame of a compressed message.
+
+        @type fin: C{bool}
+        @param fin: Whether or not the frame is final.
+
+        @rtype: C{bytes}
+        @return: The decompressed content of the frame.
+        """
+        if opcode != CONTROLS.CONTINUE:
+            self._decompressing = compressed
+        if not self._decompressing:
+            return data
+        try:
+            data = self._decompressor.decompress(data)
+            if fin:
+                data += self._decompressor.decompress(_DEFLATE_TAIL)
+        except zlib.error as error:
+            raise _WSException("Invalid compressed data (%s)" % error)
+        if fin:
+            self._decompressing = False
+        return data
+
+
+@typed
+def _negotiateDeflate(offers: List[bytes]):
+    """
+    Choose the first permessage-deflate offer we can accept.
+
+    @type offers: C{list} of C{bytes}
+    @param offers: The I{Sec-WebSocket-Extensions} headers of the request.
+
+    @return: A tuple of (L{_PerMessageDeflate} instance, value of the
+        I{Sec-WebSocket-Extensions} response header), or C{(None, None)} if
+        no offer can be accepted.
+    """
+    for offer in b",".join(offers).split(b","):
+        name, *params = [part.strip() for part in offer.split(b";")]
+        if name != b"permessage-deflate":
+            continue
+        accepted = [b"permessage-deflate"]
+        deflate = _PerMessageDeflate()
+        names = set()
+        for param in params:
+            param, _, value = param.partition(b"=")
+            param, value = param.strip(), value.strip().strip(b'"')
+            if param in names:
+                break
+            names.add(param)
+            if param == b"server_no_context_takeover" and not value:
+                deflate.serverNoContextTakeover = True
+            elif param == b"server_max_window_bits" and value.isdigit():
+                # zlib can't produce streams with a window of 8 bits.
+                deflate.serverMaxWindowBits = int(value)
+                if not 9 <= deflate.serverMaxWindowBits <= 15:
+                    break
+            elif param == b"client_no_context_takeover" and not value:
+                # Our decompressor copes whether or not the client keeps
+                # its context between messages.
+                pass
+            elif param == b"client_max_window_bits":
+                # Our decompressor copes with any window size.
+                continue
+            else:
+                break
+            accepted.append(param if not value else b"%s=%s" % (param, value))
+        else:
+            return deflate, b"; ".join(accepted)
+    return None, None
+
 
 @typed
 def _makeAccept(key: bytes) -> bytes:
@@ -127,7 +256,8 @@ def _mask(buf: bytes, key: bytes) -> bytes:
 
 
 @typed
-def _makeFrame(buf: bytes, opcode, fin: bool, mask: bytes=None) -> bytes:
+def _makeFrame(buf: bytes, opcode, fin: bool, mask: bytes=None,
+               compressed: bool=False) -> bytes:
     """
     Make a frame.
 
@@ -146,6 +276,10 @@ def _makeFrame(buf: bytes, opcode, fin: bool, mask: bytes=None) -> bytes:
     @type mask: C{bytes} or C{NoneType}
     @param mask: If specified, the masking key to apply on the created frame.
 
+    @type compressed: C{bool}
+    @param compressed: Whether or not to set the I{RSV1} flag, which marks
+        the first frame of a message compressed with permessage-deflate.
+
     @rtype: C{bytes}
     @return: A packed frame.
     """
@@ -169,6 +303,9 @@ def _makeFrame(buf: bytes, opcode, fin: bool, mask: bytes=None) -> bytes:
     else:
         header = 0x01
 
+    if compressed:
+        header |= 0x40
+
     header = bytes([header | opcode.value])
     if mask is not None:
         buf = b"%s%s" % (mask, _mask(buf, mask))
@@ -177,7 +314,8 @@ def _makeFrame(buf: bytes, opcode, fin: bool, mask: bytes=None) -> bytes:
 
 
 @typed
-def _parseFrames(frameBuffer: List[bytes], needMask: bool=True):
+def _parseFrames(frameBuffer: List[bytes], needMask: bool=True,
+                 deflate=None):
     """
     Parse frames in a highly compliant manner. It modifies C{frameBuffer}
     removing the parsed content from it.
@@ -187,6 +325,10 @@ def _parseFrames(frameBuffer: List[bytes], needMask: bool=True):
 
     @param needMask: If C{True}, refuse any frame which is not masked.
     @type needMask: C{bool}
+
+    @param deflate: If specified, the permessage-deflate extension has been
+        negotiated, and compressed messages are decompressed with it.
+    @type deflate: L{_PerMessageDeflate} or C{NoneType}
     """
     start = 0
     payload = b"".join(frameBuffer)
@@ -198,10 +340,12 @@ def _parseFrames(frameBuffer: List[bytes], needMask: bool=True):
 
         # Grab the header. This single byte holds some flags and an opcode
         header = payload[start]
-        if header & 0x70:
+        if header & (0x70 if deflate is None else 0x30):
             # At least one of the reserved flags is set. Pork chop sandwiches!
             raise _WSException("Reserved flag in frame (%d)" % (header,))
 
+        compressed = header & 0x40
+
         fin = header & 0x80
 
         # Get the opcode, and translate it to a local enum which we actually
@@ -212,6 +356,10 @@ def _parseFrames(frameBuffer: List[bytes], needMask: bool=True):
         except ValueError:
             raise _WSException("Unknown opcode %d in frame" % opcode)
 
+        if compressed and opcode not in (CONTROLS.TEXT, CONTROLS.BINARY):
+            # Only the first frame of a data message can be compressed.
+            raise _WSException("Reserved flag in frame (%d)" % (header,))
+
         # Get the payload length and determine whether we need to look for an
         # extra length.
         length = payload[start + 1]
@@ -262,6 +410,11 @@ def _parseFrames(frameBuffer: List[bytes], needMask: bool=True):
         if masked:
             data = _mask(data, key)
 
+        if deflate is not None and opcode in (
+                CONTROLS.TEXT, CONTROLS.BINARY, CONTROLS.CONTINUE):
+            data = deflate.decompress(
+                data, opcode, bool(compressed), bool(fin))
+
         if opcode == CONTROLS.CLOSE:
             if len(data) >= 2:
                 # Gotta unpack the opcode and return usable data here.
@@ -322,8 +475,9 @@ class WebSocketsTransport(object):
 
     _disconnecting = False
 
-    def __init__(self, transport):
+    def __init__(self, transport, deflate=None):
         self._transport = transport
+        self._deflate = deflate
 
     @typed
     def sendFrame(self, opcode, data: bytes, fin: bool):
@@ -339,7 +493,14 @@ class WebSocketsTransport(object):
         @type fin: C{bool}
         @param fin: Whether or not we're sending a final frame.
         """
-        packet = _makeFrame(data, opcode, fin)
+        # Only whole data messages are compressed.
+        compressed = (
+            self._deflate is not None and fin and
+            opcode in (CONTROLS.TEXT, CONTROLS.BINARY) and
+            len(data) >= self._deflate.minimumSize)
+        if compressed:
+            data = self._deflate.compress(data)
+        packet = _makeFrame(data, opcode, fin, compressed=compressed)
         self._transport.write(packet)
 
     @typed
@@ -383,9 +544,13 @@ class WebSocketsProtocol(Protocol):
     @ivar _buffer: The pending list of frames not processed yet.
     @type _buffer: C{list}
 
+    @ivar _deflate: The permessage-deflate extension, if it was negotiated.
+    @type _deflate: L{_PerMessageDeflate} or C{NoneType}
+
     @since: 13.2
     """
     _buffer = None
+    _deflate = None
 
     def __init__(self, receiver):
         self._receiver = receiver
@@ -397,13 +562,15 @@ class WebSocketsProtocol(Protocol):
         peer = self.transport.getPeer()
         log.debug("Opening connection with {peer}", peer=peer)
         self._buffer = []
-        self._receiver.makeConnection(WebSocketsTransport(self.transport))
+        self._receiver.makeConnection(
+            WebSocketsTransport(self.transport, self._deflate))
 
     def _parseFrames(self):
         """
         Find frames in incoming data and pass them to the underlying protocol.
         """
-        for opcode, data, fin in _parseFrames(self._buffer):
+        frames = _parseFrames(self._buffer, deflate=self._deflate)
+        for opcode, data, fin in frames:
             self._receiver.frameReceived(opcode, data, fin)
             if opcode == CONTROLS.CLOSE:
                 # The other side wants us to close.
@@ -695,6 +862,13 @@ class WebSocketsResource(object):
         # 4.2.2.5.5 Optional codec declaration
         if protocolName:
             request.setHeader(b"Sec-WebSocket-Protocol", protocolName)
+        # 4.2.2.5.6 Optional extensions; only permessage-deflate (RFC 7692)
+        # is supported.
+        offers = request.requestHeaders.getRawHeaders(
+            b"Sec-WebSocket-Extensions")
+        deflate, extensions = _negotiateDeflate(offers or [])
+        if deflate is not None:
+            request.setHeader(b"Sec-WebSocket-Extensions", extensions)
 
         # Provoke request into flushing headers and finishing the handshake.
         request.write(b"")
@@ -713,6 +887,7 @@ class WebSocketsResource(object):
 
         if not isinstance(protocol, WebSocketsProtocol):
             protocol = WebSocketsProtocolWrapper(protocol)
+        protocol._deflate = deflate
 
         # Connect the transport to our factory, and make things go. We need to
         # do some stupid stuff here; see #3204, which could fix it.
@@ -4,8 +4,10 @@
 """Workers executor."""
 
 import os
+from signal import Signals
 import sys
 
+from maasserver.forkserver import STATUS_FD
 from provisioningserver.logger import LegacyLogger
 from twisted.application import service
 from twisted.internet import protocol
@@ -46,14 +48,72 @@ class WorkerProcess(protocol.ProcessProtocol):
             self.transport.reapProcess()
 
 
+class ForkedWorker:
+    """A worker forked by the fork server; see `maasserver.forkserver`."""
+
+    def __init__(self, pid):
+        super(ForkedWorker, self).__init__()
+        self.pid = pid
+
+    def signal(self, signal):
+        try:
+            os.kill(self.pid, Signals["SIG%s" % signal])
+        except ProcessLookupError:
+            pass
+
+
+class ForkServerProcess(protocol.ProcessProtocol):
+    """The fork server, as seen from the master."""
+
+    def __init__(self, service):
+        super(ForkServerProcess, self).__init__()
+        self.service = service
+        self.buffer = b""
+
+    def connectionMade(self):
+        self.pid = self.transport.pid
+
+    def spawnWorker(self):
+        """Ask the fork server for a new worker."""
+        self.transport.write(b"spawn\n")
+
+    def childDataReceived(self, childFD, data):
+        if childFD == STATUS_FD:
+            *lines, self.buffer = (self.buffer + data).split(b"\n")
+            for line in lines:
+                self.eventReceived(*line.decode("ascii").split())
+
+    def eventReceived(self, event, pid, *args):
+        if event == "started":
+            self.service.workerForked(int(pid))
+        elif event == "exited":
+            self.service.workerExited(int(pid), int(args[0]))
+
+    def signal(self, signal):
+        if self.transport:
+            try:
+                self.transport.signalProcess(signal)
+            except ProcessExitedAlready:
+                pass
+
+    def processEnded(self, status):
+        self.service.forkServerEnded(self, status)
+
+
 class WorkersService(service.Service, object):
     """
     Workers service.
 
     Manages the lifecycle of the workers.
+
+    With `prefork`, workers are forked from a fork server, which has already
+    imported everything a worker needs, instead of being started from
+    scratch; see `maasserver.forkserver`.
     """
 
-    def __init__(self, reactor, *, worker_count=None, worker_cmd=None):
+    def __init__(
+            self, reactor, *, worker_count=None, worker_cmd=None,
+            prefork=False):
         super(WorkersService, self).__init__()
         self.reactor = reactor
         self.stopping = False
@@ -64,6 +124,10 @@ class WorkersService(service.Service, object):
         if self.worker_cmd is None:
             self.worker_cmd = sys.argv[0]
         self.workers = {}
+        self.prefork = prefork
+        self.forkServer = None
+        # Workers asked of the fork server that have not yet started.
+        self.pending = 0
 
     def startService(self):
         """Start the workers."""
@@ -76,13 +140,16 @@ class WorkersService(service.Service, object):
         for pid, worker in self.workers.items():
             log.msg("Killing worker pid:%d." % pid)
             worker.signal("KILL")
+        if self.forkServer is not None:
+            log.msg("Killing fork server pid:%d." % self.forkServer.pid)
+            self.forkServer.signal("KILL")
 
     def spawnWorkers(self):
         """Spawn the missing workers."""
         if self.stopping:
             # Don't spwan new workers if the service is stopping.
             return
-        missing = self.worker_count - len(self.workers)
+        missing = self.worker_count - len(self.workers) - self.pending
         for _ in range(missing):
             self._spawnWorker()
 
@@ -109,12 +176,53 @@ class WorkersService(service.Service, object):
             log.msg("Killing worker pid:%d." % pid)
             worker.signal("KILL")
 
+    def workerForked(self, pid):
+        """The fork server has started a worker."""
+        self.pending = max(0, self.pending - 1)
+        self.registerWorker(ForkedWorker(pid))
+
+    def workerExited(self, pid, status):
+        """The fork server reports that a worker has exited."""
+        worker = self.workers.get(pid, None)
+        if worker is not None:
+            self.unregisterWorker(worker, status)
+
+    def forkServerEnded(self, forkServer, status):
+        """The fork server has died, taking its workers with it."""
+        if forkServer is not self.forkServer:
+            return
+        self.forkServer = None
+        self.pending = 0
+        for pid, worker in list(self.workers.items()):
+            if isinstance(worker, ForkedWorker):
+                worker.signal("KILL")
+                del self.workers[pid]
+        self.spawnWorkers()
+
+    def _getEnvironment(self, mode):
+        env = os.environ.copy()
+        env['MAAS_REGIOND_PROCESS_MODE'] = mode
+        env['MAAS_REGIOND_WORKER_COUNT'] = str(MAX_WORKERS_COUNT)
+        return env
+
     def _spawnWorker(self):
         """Spawn a new worker."""
+        if self.prefork:
+            self._forkWorker()
+            return
         worker = WorkerProcess(self)
-        env = os.environ.copy()
-        env['MAAS_REGIOND_PROCESS_MODE'] = 'worker'
-        env['MAAS_REGIOND_WORKER_COUNT'] = str(MAX_WORKERS_COUNT)
         self.reactor.spawnProcess(
             worker, self.worker_cmd, [self.worker_cmd],
-            env=env, childFDs={0: 0, 1: 1, 2: 2})
+            env=self._getEnvironment('worker'), childFDs={0: 0, 1: 1, 2: 2})
+
+    def _forkWorker(self):
+        """Fork a new worker, starting the fork server if need be."""
+        if self.forkServer is None:
+            forkServer = ForkServerProcess(self)
+            self.reactor.spawnProcess(
+                forkServer, self.worker_cmd, [self.worker_cmd],
+                env=self._getEnvironment('forkserver'),
+                childFDs={0: 'w', 1: 1, 2: 2, STATUS_FD: 'r'})
+            self.forkServer = forkServer
+        self.pending += 1
+        self.forkServer.spawnWorker()
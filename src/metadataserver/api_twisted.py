@@ -10,11 +10,14 @@ from datetime import datetime
 import json
 
 from django.db import DatabaseError
+from django.db.models import Q
 from maasserver.api.utils import extract_oauth_key_from_auth_header
 from maasserver.enum import (
     NODE_STATUS,
     NODE_TYPE,
 )
+from maasserver.models.event import Event
+from maasserver.models.eventtype import EventType
 from maasserver.models.node import Node
 from maasserver.models.timestampedmodel import now
 from maasserver.preseed import CURTIN_INSTALL_LOG
@@ -24,10 +27,14 @@ from maasserver.utils.orm import (
     transactional,
     TransactionManagementError,
 )
-from maasserver.utils.threads import deferToDatabase
+from maasserver.utils.threads import (
+    DATABASE_LANE,
+    deferToDatabaseInLane,
+)
 from metadataserver import logger
 from metadataserver.api import (
     add_event_to_node_event_log,
+    get_node_event_type_name,
     process_file,
 )
 from metadataserver.enum import SCRIPT_STATUS
@@ -35,10 +42,12 @@ from metadataserver.models import (
     NodeKey,
     ScriptSet,
 )
+from provisioningserver.events import EVENT_DETAILS
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.twisted import deferred
 from twisted.application.internet import TimerService
 from twisted.internet import reactor
+from twisted.python.failure import Failure
 from twisted.web.resource import Resource
 from twisted.web.server import NOT_DONE_YET
 
@@ -46,6 +55,14 @@ from twisted.web.server import NOT_DONE_YET
 log = LegacyLogger()
 
 
+# The script set whose last ping to update for a node, by its status.
+SCRIPT_SET_STATUSES = {
+    NODE_STATUS.COMMISSIONING: 'current_commissioning_script_set_id',
+    NODE_STATUS.TESTING: 'current_testing_script_set_id',
+    NODE_STATUS.DEPLOYING: 'current_installation_script_set_id',
+}
+
+
 class StatusHandlerResource(Resource):
 
     # Has no children, so getChild will not be called.
@@ -182,9 +199,17 @@ class StatusHandlerResource(Resource):
 
 
 class StatusWorkerService(TimerService, object):
-    """Service to update nodes from recieved status messages."""
+    """Service to update nodes from recieved status messages.
 
-    check_interval = 60  # Every second.
+    Messages that need not be processed immediately are queued. The queue is
+    flushed every `check_interval` seconds, or sooner once `flush_size`
+    messages are waiting. The messages for up to `batch_size` nodes are then
+    processed together, in one transaction.
+    """
+
+    check_interval = 2  # Every two seconds.
+    flush_size = 1000
+    batch_size = 100
 
     def __init__(self, dbtasks, clock=reactor):
         # Call self._tryUpdateNodes() every self.check_interval.
@@ -193,11 +218,14 @@ class StatusWorkerService(TimerService, object):
         self.dbtasks = dbtasks
         self.clock = clock
         self.queue = defaultdict(list)
+        self.queued = 0
 
     def _tryUpdateNodes(self):
         if len(self.queue) != 0:
             queue, self.queue = self.queue, defaultdict(list)
-            d = deferToDatabase(self._preProcessQueue, queue)
+            self.queued = 0
+            d = deferToDatabaseInLane(
+                DATABASE_LANE.BACKGROUND, self._preProcessQueue, queue)
             d.addCallback(self._processMessagesLater)
             d.addErrback(log.err, "Failed to process node status messages.")
             return d
@@ -217,12 +245,87 @@ class StatusWorkerService(TimerService, object):
         ]
 
     def _processMessagesLater(self, tasks):
-        # Move all messages on the queue off onto the database tasks queue.
-        # We're not going to wait for them to be processed because we can't /
-        # don't apply back-pressure to those systems that are producing these
-        # messages anyway.
+        # Move all messages on the queue off onto the database tasks queue,
+        # in batches of nodes. We're not going to wait for them to be
+        # processed because we can't / don't apply back-pressure to those
+        # systems that are producing these messages anyway.
+        for index in range(0, len(tasks), self.batch_size):
+            self.dbtasks.addTask(
+                self._processBatch, tasks[index:index + self.batch_size])
+
+    def _processBatch(self, tasks):
+        # Push the messages for a batch of nodes into the database together.
+        # This should be called in a non-reactor thread with a pre-existing
+        # connection (e.g. via deferToDatabase).
+        if in_transaction():
+            raise TransactionManagementError(
+                "_processBatch must be called from "
+                "outside of a transaction.")
+        else:
+            try:
+                self._processBatchTogether(tasks)
+            except Exception:
+                log.err(
+                    Failure(), "Failed to process messages for %d node(s) "
+                    "together; processing them separately." % len(tasks))
+                for node, messages in tasks:
+                    self._processMessages(node, messages)
+
+    @transactional
+    def _processBatchTogether(self, tasks):
+        """Process queued messages for several nodes in one transaction.
+
+        Queued messages never carry files nor change a node's status --
+        `queueMessage` processes those immediately -- so all that's needed
+        is to log them as events, which is done in bulk, and to update the
+        last ping of each node's current script set.
+        """
+        # Validate that the nodes still exist since this is a new
+        # transaction, and get their current status.
+        nodes = Node.objects.in_bulk([node.id for node, _ in tasks])
+        event_types = {}
+        events = []
         for node, messages in tasks:
-            self.dbtasks.addTask(self._processMessages, node, messages)
+            node = nodes.get(node.id)
+            if node is None:
+                # Node has been deleted; drop its messages.
+                continue
+            for message in messages:
+                type_name = get_node_event_type_name(
+                    node, message.get('result', None))
+                if type_name not in event_types:
+                    event_details = EVENT_DETAILS[type_name]
+                    event_types[type_name] = EventType.objects.register(
+                        type_name, event_details.description,
+                        event_details.level)
+                # Event.save() would set these timestamps; bulk_create won't.
+                timestamp = message['timestamp']
+                events.append(Event(
+                    type=event_types[type_name], node=node,
+                    action=message['name'],
+                    description="'%s' %s" % (
+                        message['origin'], message['description']),
+                    created=timestamp, updated=timestamp))
+        Event.objects.bulk_create(events)
+        self._updateLastPings(nodes.values())
+
+    def _updateLastPings(self, nodes):
+        """Update the last ping of each of `nodes`' current script set.
+
+        This is `_updateLastPing` for many nodes at once.
+        """
+        script_set_ids = set()
+        for node in nodes:
+            script_set_property = SCRIPT_SET_STATUSES.get(node.status)
+            if script_set_property is not None:
+                script_set_id = getattr(node, script_set_property)
+                if script_set_id is not None:
+                    script_set_ids.add(script_set_id)
+        if len(script_set_ids) != 0:
+            current_time = now()
+            ScriptSet.objects.filter(id__in=script_set_ids).filter(
+                Q(last_ping__isnull=True) | Q(last_ping__lt=current_time)
+            ).update(last_ping=current_time)
 
     def _processMessages(self, node, messages):
         # Push the messages into the database, recording them for this node.
@@ -264,12 +367,7 @@ class StatusWorkerService(TimerService, object):
         Update the last ping in any status which uses a script_set whenever a
         node in that status contacts us.
         """
-        script_set_statuses = {
-            NODE_STATUS.COMMISSIONING: 'current_commissioning_script_set_id',
-            NODE_STATUS.TESTING: 'current_testing_script_set_id',
-            NODE_STATUS.DEPLOYING: 'current_installation_script_set_id',
-        }
-        script_set_property = script_set_statuses.get(node.status)
+        script_set_property = SCRIPT_SET_STATUSES.get(node.status)
         if script_set_property is not None:
             script_set_id = getattr(node, script_set_property)
             if script_set_id is not None:
@@ -459,10 +557,15 @@ class StatusWorkerService(TimerService, object):
             message['event_type'] == 'finish')
         has_files = len(message.get('files', [])) > 0
         if is_starting_event or is_final_event or has_files:
-            d = deferToDatabase(
-                self._processMessageNow, authorization, message)
+            d = deferToDatabaseInLane(
+                DATABASE_LANE.BACKGROUND, self._processMessageNow,
+                authorization, message)
             d.addErrback(
                 log.err, "Failed to process status message instantly.")
             return d
         else:
             self.queue[authorization].append(message)
+            self.queued += 1
+            if self.queued >= self.flush_size:
+                # Don't wait for the timer; there's plenty to do now.
+                self._tryUpdateNodes()
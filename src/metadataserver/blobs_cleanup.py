@@ -0,0 +1,38 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Clean-up of script result blobs that are no longer referred to."""
+
+__all__ = [
+    'BlobCleanupService',
+    ]
+
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from metadataserver.models import ScriptResultBlob
+from provisioningserver.utils.twisted import synchronous
+from twisted.application.internet import TimerService
+
+
+def cleanup_unreferenced_blobs():
+    """Delete the script result blobs that no script result refers to.
+
+    Old results are deleted with their blobs when new ones are made, but
+    results deleted in other ways, for example with their node, leave their
+    blobs behind.
+    """
+    return ScriptResultBlob.objects.delete_unreferenced()
+
+
+class BlobCleanupService(TimerService, object):
+    """Service to periodically clean-up unreferenced script result blobs.
+
+    This will run immediately when it's started, then once again each
+    day, though the interval can be overridden by passing it to the
+    constructor.
+    """
+
+    def __init__(self, interval=(24 * 60 * 60)):
+        cleanup = synchronous(transactional(cleanup_unreferenced_blobs))
+        super(BlobCleanupService, self).__init__(
+            interval, deferToDatabase, cleanup)
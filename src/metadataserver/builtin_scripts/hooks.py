@@ -17,7 +17,10 @@ import re
 
 from lxml import etree
 from maasserver.enum import NODE_METADATA
-from maasserver.models import Fabric
+from maasserver.models import (
+    ControllerInfo,
+    Fabric,
+)
 from maasserver.models.blockdevice import MIN_BLOCK_DEVICE_SIZE
 from maasserver.models.interface import (
     Interface,
@@ -224,6 +227,11 @@ def update_node_network_information(node, output, exit_status):
         if iface not in current_interfaces:
             iface.delete()
 
+    if node.is_controller:
+        # The interfaces have been rewritten, so the next update from the
+        # controller cannot be applied as a difference from its last one.
+        ControllerInfo.objects.clear_interface_update_info(node)
+
 
 def update_node_network_interface_tags(node, output, exit_status):
     """Updates the network interfaces tags from the results of `SRIOV_SCRIPT`.
@@ -19,6 +19,7 @@ from maasserver.enum import (
 )
 from maasserver.fields import MAC
 from maasserver.models.blockdevice import MIN_BLOCK_DEVICE_SIZE
+from maasserver.models.controllerinfo import ControllerInfo
 from maasserver.models.interface import Interface
 from maasserver.models.nodemetadata import NodeMetadata
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
@@ -1426,6 +1427,14 @@ class TestUpdateNodeNetworkInformation(MAASServerTestCase):
         update_node_network_information(node, self.IP_ADDR_OUTPUT, 0)
         self.assertIsNotNone(reload_object(boot_interface))
 
+    def test__clears_controller_interface_update_info(self):
+        controller = factory.make_RackController()
+        ControllerInfo.objects.set_interface_update_info(
+            controller, {}, None, interfaces_hash="hash")
+        update_node_network_information(controller, self.IP_ADDR_OUTPUT, 0)
+        self.assertIsNone(
+            reload_object(controller).controllerinfo.interfaces_hash)
+
     def test__add_all_interfaces(self):
         """Test a node that has no previously known interfaces on which we
         need to add a series of interfaces.
@@ -5,17 +5,28 @@
 
 __all__ = [
     'BinaryField',
+    'BlobReference',
+    'CompressedBinaryField',
     ]
 
 from base64 import (
     b64decode,
     b64encode,
 )
+import zlib
 
 from django.db import connection
+from django.db.models.query_utils import DeferredAttribute
 from maasserver.fields import Field
 
 
+# Prefixes for the database form of a `CompressedBinaryField`. Base64 never
+# contains a colon, so neither can be confused with a plain `BinaryField`
+# value stored before the field was compressed.
+COMPRESSED_PREFIX = "zlib:"
+BLOB_PREFIX = "sha256:"
+
+
 class Bin(bytes):
     """Wrapper class to convince django that a string is really binary.
 
@@ -143,3 +154,111 @@ class BinaryField(Field):
         """Override Django's crack-smoking ``Field.get_default``."""
         default = self._get_default()
         return None if default is None else Bin(default)
+
+
+class BlobReference:
+    """A reference to content held out of row, in a `ScriptResultBlob`.
+
+    The content is loaded from the database when first needed, then kept.
+    """
+
+    def __init__(self, sha256, content=None):
+        self.sha256 = sha256
+        self.content = content
+
+    def get_content(self):
+        if self.content is None:
+            # Circular imports.
+            from metadataserver.models import ScriptResultBlob
+            self.content = ScriptResultBlob.objects.get_content(self.sha256)
+        return self.content
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, BlobReference) and
+            other.sha256 == self.sha256)
+
+    def __hash__(self):
+        return hash(self.sha256)
+
+    def __repr__(self):
+        return "<BlobReference %s>" % self.sha256
+
+
+class BlobReferenceAttribute(DeferredAttribute):
+    """Model attribute for a `CompressedBinaryField`.
+
+    Like Django's own, this loads deferred values on demand. It also loads
+    the content of a `BlobReference` on demand, but leaves the reference in
+    place so that saving the model does not copy the content back in row.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = self.get_stored(instance)
+        if isinstance(value, BlobReference):
+            return value.get_content()
+        else:
+            return value
+
+    def get_stored(self, instance):
+        """Return the value of this field in `instance`, as stored.
+
+        That's a `BlobReference` when the content is held out of row.
+        """
+        data = instance.__dict__
+        if self.field_name not in data:
+            # Not `refresh_from_db`: that would replace a reference with the
+            # content it refers to.
+            manager = type(instance)._base_manager.db_manager(
+                instance._state.db)
+            data[self.field_name] = manager.filter(
+                pk=instance.pk).values_list(self.field_name, flat=True).get()
+        return data[self.field_name]
+
+
+class CompressedBinaryField(BinaryField):
+    """A `BinaryField` that compresses its values.
+
+    Values of `compress_min_length` bytes or more are compressed with zlib.
+    Values stored before this field was compressed are still read.
+
+    A `BlobReference` can be stored instead of a `Bin`, so that content is
+    kept out of row, and shared, in a `ScriptResultBlob`.
+    """
+
+    # Smaller values don't compress well enough to be worth it.
+    compress_min_length = 1024
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super(CompressedBinaryField, self).contribute_to_class(
+            cls, name, *args, **kwargs)
+        setattr(cls, self.attname, BlobReferenceAttribute(self.attname, cls))
+
+    def to_python(self, value):
+        if isinstance(value, BlobReference):
+            return value
+        elif isinstance(value, str) and value.startswith(BLOB_PREFIX):
+            return BlobReference(value[len(BLOB_PREFIX):])
+        elif isinstance(value, str) and value.startswith(COMPRESSED_PREFIX):
+            return Bin(zlib.decompress(
+                b64decode(value[len(COMPRESSED_PREFIX):])))
+        else:
+            return super(CompressedBinaryField, self).to_python(value)
+
+    def get_db_prep_value(self, value, connection=None, prepared=False):
+        if isinstance(value, BlobReference):
+            return BLOB_PREFIX + value.sha256
+        elif isinstance(value, Bin) and (
+                len(value) >= self.compress_min_length):
+            compressed = zlib.compress(value)
+            if len(compressed) < len(value):
+                return COMPRESSED_PREFIX + b64encode(compressed).decode(
+                    "ascii")
+        return super(CompressedBinaryField, self).get_db_prep_value(
+            value, connection, prepared)
+
+    def pre_save(self, model_instance, add):
+        # Save a reference as it is, not the content it refers to.
+        return model_instance.__dict__.get(self.attname)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import (
+    migrations,
+    models,
+)
+import maasserver.models.cleansave
+import metadataserver.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metadataserver', '0017_store_requested_scripts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScriptResultBlob',
+            fields=[
+                ('id', models.AutoField(primary_key=True, verbose_name='ID', auto_created=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64, unique=True, editable=False)),
+                ('size', models.BigIntegerField(editable=False)),
+                ('data', metadataserver.fields.CompressedBinaryField(blank=True, editable=False)),
+            ],
+            bases=(maasserver.models.cleansave.CleanSave, models.Model),
+        ),
+        # Blobs are already compressed, and are read in slices; keep
+        # PostgreSQL from compressing them again, which would make every
+        # slice read the whole blob.
+        migrations.RunSQL(
+            "ALTER TABLE metadataserver_scriptresultblob "
+            "ALTER COLUMN data SET STORAGE EXTERNAL",
+            migrations.RunSQL.noop),
+        migrations.AddField(
+            model_name='scriptresult',
+            name='blobs',
+            field=models.ManyToManyField(blank=True, editable=False, to='metadataserver.ScriptResultBlob'),
+        ),
+        migrations.AlterField(
+            model_name='scriptresult',
+            name='output',
+            field=metadataserver.fields.CompressedBinaryField(blank=True, default=b'', max_length=1048576),
+        ),
+        migrations.AlterField(
+            model_name='scriptresult',
+            name='stdout',
+            field=metadataserver.fields.CompressedBinaryField(blank=True, default=b'', max_length=1048576),
+        ),
+        migrations.AlterField(
+            model_name='scriptresult',
+            name='stderr',
+            field=metadataserver.fields.CompressedBinaryField(blank=True, default=b'', max_length=1048576),
+        ),
+        migrations.AlterField(
+            model_name='scriptresult',
+            name='result',
+            field=metadataserver.fields.CompressedBinaryField(blank=True, default=b'', max_length=1048576),
+        ),
+    ]
@@ -9,6 +9,7 @@ __all__ = [
     'NodeUserData',
     'Script',
     'ScriptResult',
+    'ScriptResultBlob',
     'ScriptSet',
 ]
 
@@ -16,4 +17,5 @@ from metadataserver.models.nodekey import NodeKey
 from metadataserver.models.nodeuserdata import NodeUserData
 from metadataserver.models.script import Script
 from metadataserver.models.scriptresult import ScriptResult
+from metadataserver.models.scriptresultblob import ScriptResultBlob
 from metadataserver.models.scriptset import ScriptSet
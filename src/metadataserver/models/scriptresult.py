@@ -17,11 +17,13 @@ from django.db.models import (
     DateTimeField,
     ForeignKey,
     IntegerField,
+    ManyToManyField,
     Q,
     SET_NULL,
 )
 from maasserver.fields import JSONObjectField
 from maasserver.models.cleansave import CleanSave
+from maasserver.models.config import Config
 from maasserver.models.event import Event
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.timestampedmodel import (
@@ -42,9 +44,11 @@ from metadataserver.enum import (
 )
 from metadataserver.fields import (
     Bin,
-    BinaryField,
+    BlobReference,
+    CompressedBinaryField,
 )
 from metadataserver.models.script import Script
+from metadataserver.models.scriptresultblob import ScriptResultBlob
 from metadataserver.models.scriptset import ScriptSet
 from provisioningserver.events import EVENT_TYPES
 import yaml
@@ -86,13 +90,21 @@ class ScriptResult(CleanSave, TimestampedModel):
     script_name = CharField(
         max_length=255, unique=False, editable=False, null=True)
 
-    output = BinaryField(max_length=1024 * 1024, blank=True, default=b'')
+    output = CompressedBinaryField(
+        max_length=1024 * 1024, blank=True, default=b'')
 
-    stdout = BinaryField(max_length=1024 * 1024, blank=True, default=b'')
+    stdout = CompressedBinaryField(
+        max_length=1024 * 1024, blank=True, default=b'')
 
-    stderr = BinaryField(max_length=1024 * 1024, blank=True, default=b'')
+    stderr = CompressedBinaryField(
+        max_length=1024 * 1024, blank=True, default=b'')
 
-    result = BinaryField(max_length=1024 * 1024, blank=True, default=b'')
+    result = CompressedBinaryField(
+        max_length=1024 * 1024, blank=True, default=b'')
+
+    # The `ScriptResultBlob`s that the fields above refer to, so that they
+    # are not deleted while they're in use.
+    blobs = ManyToManyField(ScriptResultBlob, blank=True, editable=False)
 
     # When the script started to run
     started = DateTimeField(editable=False, null=True, blank=True)
@@ -243,14 +255,17 @@ class ScriptResult(CleanSave, TimestampedModel):
             else:
                 self.status = SCRIPT_STATUS.FAILED
 
+        if any(data is not None for data in (output, stdout, stderr, result)):
+            blob_threshold = Config.objects.get_config(
+                'script_result_blob_threshold')
         if output is not None:
-            self.output = Bin(output)
+            self.output = self._make_content(output, blob_threshold)
         if stdout is not None:
-            self.stdout = Bin(stdout)
+            self.stdout = self._make_content(stdout, blob_threshold)
         if stderr is not None:
-            self.stderr = Bin(stderr)
+            self.stderr = self._make_content(stderr, blob_threshold)
         if result is not None:
-            self.result = Bin(result)
+            self.result = self._make_content(result, blob_threshold)
             try:
                 parsed_yaml = self.read_results()
             except ValidationError as err:
@@ -326,6 +341,33 @@ class ScriptResult(CleanSave, TimestampedModel):
 
         self.save()
 
+    def _make_content(self, data, blob_threshold):
+        """Return `data` as it should be stored in this script result.
+
+        Content at least `blob_threshold` bytes long is put into the
+        `ScriptResultBlob` store, unless `blob_threshold` is zero.
+        """
+        if blob_threshold > 0 and len(data) >= blob_threshold:
+            return ScriptResultBlob.objects.store(data)
+        else:
+            return Bin(data)
+
+    def iter_content(self, field_name):
+        """Generate the content of `field_name`, e.g. "output", in chunks.
+
+        Content held in the `ScriptResultBlob` store is streamed from the
+        database rather than loaded into memory all at once.
+        """
+        stored = getattr(ScriptResult, field_name).get_stored(self)
+        if isinstance(stored, BlobReference):
+            if stored.content is None:
+                yield from ScriptResultBlob.objects.iter_content(
+                    stored.sha256)
+            else:
+                yield stored.content
+        elif stored is not None and len(stored) != 0:
+            yield stored
+
     @property
     def history(self):
         qs = ScriptResult.objects.filter(
@@ -373,4 +415,28 @@ class ScriptResult(CleanSave, TimestampedModel):
                     param['value'][
                         'physical_blockdevice_id'] = physical_blockdevice.id
 
-        return super().save(*args, **kwargs)
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        output_fields = {'output', 'stdout', 'stderr', 'result'}
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or not output_fields.isdisjoint(
+                update_fields):
+            self._update_blob_references(output_fields, adding)
+
+    def _update_blob_references(self, output_fields, adding):
+        """Refer to the blobs that `output_fields` refer to, and no others.
+
+        Blobs that were referred to by content that has since been replaced
+        are no longer referred to, so they can be deleted.
+        """
+        references = set()
+        for field_name in output_fields:
+            stored = getattr(type(self), field_name).get_stored(self)
+            if isinstance(stored, BlobReference):
+                references.add(stored.sha256)
+        blobs = ScriptResultBlob.objects.filter(sha256__in=references)
+        if not adding:
+            self.blobs.set(blobs)
+        elif len(references) != 0:
+            self.blobs.add(*blobs)
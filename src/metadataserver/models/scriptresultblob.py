@@ -0,0 +1,166 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+""":class:`ScriptResultBlob` model."""
+
+__all__ = [
+    'ScriptResultBlob',
+    ]
+
+from base64 import b64decode
+import hashlib
+import zlib
+
+from django.db import connection
+from django.db.models import (
+    BigIntegerField,
+    CharField,
+    Manager,
+    Model,
+)
+from maasserver.models.cleansave import CleanSave
+from metadataserver import DefaultMeta
+from metadataserver.fields import (
+    Bin,
+    BlobReference,
+    COMPRESSED_PREFIX,
+    CompressedBinaryField,
+)
+
+
+class ScriptResultBlobManager(Manager):
+    """Utility for the content store for large script results."""
+
+    # Read blobs from the database in slices of this many bytes of base64;
+    # a multiple of 4 so each slice can be decoded by itself.
+    slice_length = 2 ** 16
+
+    def store(self, data):
+        """Store `data`, unless identical content is already stored.
+
+        The blob is locked until the end of the transaction, so that it's
+        not deleted by `delete_unreferenced` before the `ScriptResult` that
+        refers to it is saved and committed.
+
+        :return: A `BlobReference` to the stored content.
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        table = self.model._meta.db_table
+        while True:
+            self.get_or_create(
+                sha256=sha256, defaults={'size': len(data), 'data': Bin(data)})
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM " + table + " WHERE sha256 = %s "
+                    "FOR SHARE", [sha256])
+                if cursor.fetchone() is not None:
+                    break
+            # The blob was deleted before it could be locked; store it
+            # again.
+        return BlobReference(sha256, Bin(data))
+
+    def get_content(self, sha256):
+        """Return the content of blob `sha256` as a `Bin`."""
+        return self.filter(sha256=sha256).values_list(
+            'data', flat=True).get()
+
+    def iter_content(self, sha256):
+        """Generate the content of blob `sha256` a slice at a time.
+
+        The content is read and decompressed a slice at a time, so it's never
+        all in memory at once.
+        """
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT left(data, %s) FROM " + table + " WHERE sha256 = %s",
+                [len(COMPRESSED_PREFIX), sha256])
+            row = cursor.fetchone()
+            if row is None:
+                raise self.model.DoesNotExist(
+                    "No script result blob %s." % sha256)
+            elif row[0] == COMPRESSED_PREFIX:
+                decompressor = zlib.decompressobj()
+                start = len(COMPRESSED_PREFIX) + 1
+            else:
+                decompressor = None
+                start = 1
+            while True:
+                cursor.execute(
+                    "SELECT substr(data, %s, %s) FROM " + table +
+                    " WHERE sha256 = %s", [start, self.slice_length, sha256])
+                piece, = cursor.fetchone()
+                if len(piece) == 0:
+                    break
+                start += len(piece)
+                data = b64decode(piece)
+                if decompressor is not None:
+                    data = decompressor.decompress(data)
+                if len(data) != 0:
+                    yield data
+            if decompressor is not None:
+                data = decompressor.flush()
+                if len(data) != 0:
+                    yield data
+
+    def delete_unreferenced(self, ids=None):
+        """Delete blobs that no `ScriptResult` refers to any longer.
+
+        Blobs locked by `store` in transactions that have not finished yet
+        are left alone.
+
+        :param ids: The ids of the blobs to consider, or `None` for all.
+        :return: The number of blobs deleted.
+        """
+        unreferenced = """\
+            NOT EXISTS (
+                SELECT 1 FROM metadataserver_scriptresult_blobs AS reference
+                WHERE reference.scriptresultblob_id = blob.id)
+            """
+        params = []
+        if ids is not None:
+            unreferenced += " AND blob.id = ANY(%s)"
+            params.append(list(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT blob.id FROM metadataserver_scriptresultblob AS blob "
+                "WHERE " + unreferenced + " FOR UPDATE SKIP LOCKED", params)
+            locked = [row[0] for row in cursor.fetchall()]
+            if len(locked) == 0:
+                return 0
+            # Check again now that the blobs are locked: a reference may have
+            # been committed after this transaction's last snapshot.
+            cursor.execute(
+                "DELETE FROM metadataserver_scriptresultblob AS blob "
+                "WHERE " + unreferenced + " AND blob.id = ANY(%s)",
+                params + [locked])
+            return cursor.rowcount
+
+
+class ScriptResultBlob(CleanSave, Model):
+    """Content of a large script result, shared by identical results.
+
+    Script results at least as large as the `script_result_blob_threshold`
+    setting are stored here rather than in the `ScriptResult` row. Output
+    like lshw's is often identical between runs and between machines, so
+    each distinct output is stored only once, keyed by its SHA-256.
+
+    :ivar sha256: The hex SHA-256 of the content.
+    :ivar size: The size of the content, uncompressed, in bytes.
+    :ivar data: The content.
+    """
+
+    # Force model into the metadataserver namespace.
+    class Meta(DefaultMeta):
+        pass
+
+    objects = ScriptResultBlobManager()
+
+    sha256 = CharField(max_length=64, unique=True, editable=False)
+
+    size = BigIntegerField(editable=False)
+
+    data = CompressedBinaryField(blank=True, editable=False)
+
+    def __str__(self):
+        return self.sha256
@@ -252,7 +252,10 @@ class ScriptSetManager(Manager):
 
     def _clean_old(self, node, result_type, new_script_set):
         # Avoid circular dependencies.
-        from metadataserver.models import ScriptResult
+        from metadataserver.models import (
+            ScriptResult,
+            ScriptResultBlob,
+        )
 
         config_var = {
             RESULT_TYPE.COMMISSIONING: 'max_node_commissioning_results',
@@ -260,13 +263,19 @@ class ScriptSetManager(Manager):
             RESULT_TYPE.INSTALLATION: 'max_node_installation_results',
         }
         limit = Config.objects.get_config(config_var[result_type])
+        # The blobs referred to by the deleted results.
+        blob_ids = set()
 
         for script_result in new_script_set.scriptresult_set.all():
             first_to_delete = script_result.history.order_by(
                 '-id')[limit:limit + 1].first()
             if first_to_delete is not None:
-                script_result.history.filter(
-                    pk__lte=first_to_delete.pk).delete()
+                old_results = script_result.history.filter(
+                    pk__lte=first_to_delete.pk)
+                blob_ids.update(ScriptResultBlob.objects.filter(
+                    scriptresult__in=old_results).values_list(
+                        'id', flat=True))
+                old_results.delete()
 
         # LP:1731075 - Before commissioning is run on a node MAAS does not know
         # what storage devices are available on the system. If storage tests
@@ -287,6 +296,8 @@ class ScriptSetManager(Manager):
             for param in script_result.parameters.values():
                 if (param.get('type') == 'storage' and
                         param.get('value') == 'all'):
+                    blob_ids.update(
+                        script_result.blobs.values_list('id', flat=True))
                     script_result.delete()
                     break
 
@@ -296,6 +307,11 @@ class ScriptSetManager(Manager):
                 node=node, results_count=0)
         empty_scriptsets.delete()
 
+        # Delete the content of deleted results, unless it's shared with
+        # results that remain.
+        if len(blob_ids) != 0:
+            ScriptResultBlob.objects.delete_unreferenced(blob_ids)
+
 
 class ScriptSet(CleanSave, Model):
 
@@ -13,6 +13,7 @@ from unittest.mock import MagicMock
 from django.core.exceptions import ValidationError
 from maasserver.enum import NODE_TYPE
 from maasserver.models import (
+    Config,
     Event,
     EventType,
 )
@@ -31,9 +32,11 @@ from metadataserver.enum import (
     SCRIPT_STATUS_CHOICES,
     SCRIPT_TYPE,
 )
+from metadataserver.fields import BlobReference
 from metadataserver.models import (
     ScriptResult,
     scriptresult as scriptresult_module,
+    ScriptResultBlob,
 )
 from provisioningserver.events import EVENT_TYPES
 import yaml
@@ -134,6 +137,88 @@ class TestScriptResult(MAASServerTestCase):
         self.assertEquals(exit_status, script_result.exit_status)
         self.assertEquals(output, script_result.output)
 
+    def test_store_result_stores_large_output_in_blob_store(self):
+        Config.objects.set_config('script_result_blob_threshold', 100)
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        output = factory.make_bytes(200)
+
+        script_result.store_result(0, output=output)
+
+        script_result = reload_object(script_result)
+        self.assertEquals(output, script_result.output)
+        self.assertEquals(
+            output, ScriptResultBlob.objects.get(size=200).data)
+        self.assertIsInstance(
+            ScriptResult.output.get_stored(script_result), BlobReference)
+
+    def test_store_result_shares_identical_output_in_blob_store(self):
+        Config.objects.set_config('script_result_blob_threshold', 100)
+        output = factory.make_bytes(200)
+        for _ in range(2):
+            script_result = factory.make_ScriptResult(
+                status=SCRIPT_STATUS.RUNNING)
+            script_result.store_result(0, output=output)
+        self.assertEquals(1, ScriptResultBlob.objects.count())
+
+    def test_save_drops_reference_to_replaced_output(self):
+        Config.objects.set_config('script_result_blob_threshold', 100)
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        script_result.store_result(output=factory.make_bytes(200))
+
+        script_result = reload_object(script_result)
+        script_result.store_result(output=factory.make_bytes(300))
+
+        self.assertItemsEqual(
+            [ScriptResultBlob.objects.get(size=300)],
+            script_result.blobs.all())
+
+    def test_save_keeps_references_of_deferred_output(self):
+        Config.objects.set_config('script_result_blob_threshold', 100)
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        script_result.store_result(0, output=factory.make_bytes(200))
+
+        script_result = ScriptResult.objects.defer('output').get(
+            id=script_result.id)
+        script_result.save()
+
+        self.assertItemsEqual(
+            [ScriptResultBlob.objects.get(size=200)],
+            script_result.blobs.all())
+
+    def test_store_result_keeps_small_output_in_row(self):
+        Config.objects.set_config('script_result_blob_threshold', 100)
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        output = factory.make_bytes(50)
+
+        script_result.store_result(0, output=output)
+
+        self.assertEquals(output, reload_object(script_result).output)
+        self.assertEquals(0, ScriptResultBlob.objects.count())
+
+    def test_iter_content_streams_blob_content(self):
+        Config.objects.set_config('script_result_blob_threshold', 100)
+        self.patch(ScriptResultBlob.objects, 'slice_length', 8)
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        output = b'output ' * 1000
+
+        script_result.store_result(0, output=output)
+
+        script_result = ScriptResult.objects.defer('output').get(
+            id=script_result.id)
+        chunks = list(script_result.iter_content('output'))
+        self.assertGreater(len(chunks), 1)
+        self.assertEquals(output, b''.join(chunks))
+
+    def test_iter_content_yields_content_in_row(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        stdout = factory.make_bytes()
+
+        script_result.store_result(0, stdout=stdout)
+
+        self.assertEquals(
+            [stdout], list(reload_object(script_result).iter_content(
+                'stdout')))
+
     def test_store_result_stores_stdout(self):
         script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
         exit_status = random.randint(0, 255)
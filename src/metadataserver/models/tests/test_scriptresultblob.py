@@ -0,0 +1,101 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+__all__ = []
+
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from metadataserver.enum import SCRIPT_STATUS
+from metadataserver.fields import BlobReference
+from metadataserver.models import ScriptResultBlob
+
+
+class TestScriptResultBlobManager(MAASServerTestCase):
+    """Test the ScriptResultBlob manager."""
+
+    def test_store_stores_content(self):
+        data = factory.make_bytes(1000)
+        reference = ScriptResultBlob.objects.store(data)
+        self.assertIsInstance(reference, BlobReference)
+        blob = ScriptResultBlob.objects.get(sha256=reference.sha256)
+        self.assertEqual(data, blob.data)
+        self.assertEqual(1000, blob.size)
+
+    def test_store_stores_identical_content_once(self):
+        data = factory.make_bytes(1000)
+        first = ScriptResultBlob.objects.store(data)
+        second = ScriptResultBlob.objects.store(data)
+        self.assertEqual(first, second)
+        self.assertEqual(1, ScriptResultBlob.objects.count())
+
+    def test_get_content(self):
+        data = factory.make_bytes(1000)
+        reference = ScriptResultBlob.objects.store(data)
+        self.assertEqual(
+            data, ScriptResultBlob.objects.get_content(reference.sha256))
+
+    def test_iter_content_reads_compressed_content_in_slices(self):
+        self.patch(ScriptResultBlob.objects, 'slice_length', 16)
+        data = b'lshw ' * 1000
+        reference = ScriptResultBlob.objects.store(data)
+        self.assertEqual(
+            data, b''.join(
+                ScriptResultBlob.objects.iter_content(reference.sha256)))
+
+    def test_iter_content_reads_uncompressed_content_in_slices(self):
+        self.patch(ScriptResultBlob.objects, 'slice_length', 16)
+        data = factory.make_bytes(100)
+        reference = ScriptResultBlob.objects.store(data)
+        chunks = list(ScriptResultBlob.objects.iter_content(reference.sha256))
+        self.assertEqual(data, b''.join(chunks))
+        self.assertEqual(9, len(chunks))
+
+    def test_iter_content_raises_for_unknown_blob(self):
+        self.assertRaises(
+            ScriptResultBlob.DoesNotExist, list,
+            ScriptResultBlob.objects.iter_content('0' * 64))
+
+    def test_delete_unreferenced_keeps_referenced_blobs(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        script_result.stdout = ScriptResultBlob.objects.store(
+            factory.make_bytes(1000))
+        script_result.save()
+        ScriptResultBlob.objects.store(factory.make_bytes(1000))
+        self.assertEqual(1, ScriptResultBlob.objects.delete_unreferenced())
+        self.assertEqual(
+            [script_result.stdout],
+            [blob.data for blob in ScriptResultBlob.objects.all()])
+
+    def test_delete_unreferenced_considers_only_given_blobs(self):
+        first = ScriptResultBlob.objects.store(factory.make_bytes(1000))
+        second = ScriptResultBlob.objects.store(factory.make_bytes(1000))
+        first_id = ScriptResultBlob.objects.get(sha256=first.sha256).id
+        self.assertEqual(
+            1, ScriptResultBlob.objects.delete_unreferenced([first_id]))
+        self.assertEqual(
+            [second.sha256],
+            [blob.sha256 for blob in ScriptResultBlob.objects.all()])
+
+
+class TestScriptResultBlobReferences(MAASServerTestCase):
+    """Test that script results record the blobs they refer to."""
+
+    def test_save_records_references(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        script_result.stdout = ScriptResultBlob.objects.store(
+            factory.make_bytes(1000))
+        script_result.result = ScriptResultBlob.objects.store(
+            factory.make_bytes(1000))
+        script_result.save()
+        self.assertItemsEqual(
+            [script_result.stdout, script_result.result],
+            [blob.data for blob in script_result.blobs.all()])
+
+    def test_deleting_result_deletes_references(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        script_result.stdout = ScriptResultBlob.objects.store(
+            factory.make_bytes(1000))
+        script_result.save()
+        blob = script_result.blobs.get()
+        script_result.delete()
+        self.assertFalse(blob.scriptresult_set.exists())
@@ -32,6 +32,7 @@ from metadataserver.enum import (
 )
 from metadataserver.models import (
     ScriptResult,
+    ScriptResultBlob,
     ScriptSet,
     scriptset as scriptset_module,
 )
@@ -335,6 +336,35 @@ class TestScriptSetManager(MAASServerTestCase):
                 limit,
                 ScriptResult.objects.filter(script_name=script_name).count())
 
+    def test_create_commissioning_script_set_cleans_up_blobs(self):
+        Config.objects.set_config('script_result_blob_threshold', 100)
+        Config.objects.set_config('max_node_commissioning_results', 1)
+        node = factory.make_Node()
+        script_set = ScriptSet.objects.create_commissioning_script_set(node)
+        script_result = script_set.scriptresult_set.first()
+        script_result.store_result(0, output=factory.make_bytes(200))
+        self.assertEqual(1, ScriptResultBlob.objects.count())
+
+        ScriptSet.objects.create_commissioning_script_set(node)
+
+        self.assertEqual(0, ScriptResultBlob.objects.count())
+
+    def test_create_commissioning_script_set_keeps_shared_blobs(self):
+        Config.objects.set_config('script_result_blob_threshold', 100)
+        Config.objects.set_config('max_node_commissioning_results', 1)
+        output = factory.make_bytes(200)
+        node = factory.make_Node()
+        script_set = ScriptSet.objects.create_commissioning_script_set(node)
+        script_set.scriptresult_set.first().store_result(0, output=output)
+        other_script_set = ScriptSet.objects.create_commissioning_script_set(
+            factory.make_Node())
+        other_script_set.scriptresult_set.first().store_result(
+            0, output=output)
+
+        ScriptSet.objects.create_commissioning_script_set(node)
+
+        self.assertEqual(1, ScriptResultBlob.objects.count())
+
     def test_create_commissioning_script_set_cleans_up_by_node(self):
         limit = Config.objects.get_config('max_node_commissioning_results')
         node1 = factory.make_Node()
@@ -11,6 +11,7 @@ from datetime import datetime
 from io import BytesIO
 import json
 from unittest.mock import (
+    ANY,
     call,
     Mock,
     sentinel,
@@ -36,11 +37,13 @@ from maasserver.utils.orm import (
 )
 from maasserver.utils.threads import deferToDatabase
 from maastesting.matchers import (
+    DocTestMatches,
     MockCalledOnceWith,
     MockCallsMatch,
     MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
+from maastesting.twisted import TwistedLoggerFixture
 from metadataserver import api
 from metadataserver.api_twisted import (
     StatusHandlerResource,
@@ -48,6 +51,7 @@ from metadataserver.api_twisted import (
 )
 from metadataserver.enum import SCRIPT_STATUS
 from metadataserver.models import NodeKey
+from provisioningserver.events import EVENT_TYPES
 from testtools import ExpectedException
 from testtools.matchers import (
     Equals,
@@ -187,7 +191,7 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
         worker = StatusWorkerService(sentinel.dbtasks, clock=sentinel.reactor)
         self.assertEqual(sentinel.dbtasks, worker.dbtasks)
         self.assertEqual(sentinel.reactor, worker.clock)
-        self.assertEqual(60, worker.step)
+        self.assertEqual(2, worker.step)
         self.assertEqual((worker._tryUpdateNodes, tuple(), {}), worker.call)
 
     def test__tryUpdateNodes_returns_None_when_empty_queue(self):
@@ -212,15 +216,70 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
             for message in node_messages[node]:
                 worker.queueMessage(token.key, message)
         yield worker._tryUpdateNodes()
-        call_args = [
-            (call_arg[0][1], call_arg[0][2])
-            for call_arg in dbtasks.addTask.call_args_list
-        ]
-        self.assertThat(call_args, MatchesSetwise(*[
+        self.assertThat(dbtasks.addTask, MockCalledOnceWith(
+            worker._processBatch, ANY))
+        [batch] = dbtasks.addTask.call_args[0][1:]
+        self.assertThat(batch, MatchesSetwise(*[
             MatchesListwise([Equals(node), Equals(messages)])
             for node, messages in node_messages.items()
         ]))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__tryUpdateNodes_sends_work_in_batches_of_nodes(self):
+        nodes_with_tokens = yield deferToDatabase(self.make_nodes_with_tokens)
+        dbtasks = Mock()
+        dbtasks.addTask = Mock()
+        worker = StatusWorkerService(dbtasks)
+        worker.batch_size = 2
+        for node, token in nodes_with_tokens:
+            worker.queueMessage(token.key, self.make_message())
+        yield worker._tryUpdateNodes()
+        self.assertThat(
+            [len(call_arg[0][1])
+             for call_arg in dbtasks.addTask.call_args_list],
+            Equals([2, 1]))
+
+    def test_queueMessage_flushes_queue_when_full(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        worker.flush_size = 3
+        tryUpdateNodes = self.patch(worker, "_tryUpdateNodes")
+        for _ in range(2):
+            worker.queueMessage(sentinel.key, self.make_message())
+        self.assertThat(tryUpdateNodes, MockNotCalled())
+        worker.queueMessage(sentinel.key, self.make_message())
+        self.assertThat(tryUpdateNodes, MockCalledOnceWith())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__processBatch_fails_when_in_transaction(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        with ExpectedException(TransactionManagementError):
+            yield deferToDatabase(
+                transactional(worker._processBatch),
+                [(sentinel.node, [sentinel.message])])
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__processBatch_falls_back_to_processing_nodes_separately(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        self.patch(worker, "_processBatchTogether").side_effect = (
+            factory.make_exception("together"))
+        mock_processMessages = self.patch(worker, "_processMessages")
+        logger = self.useFixture(TwistedLoggerFixture())
+        yield deferToDatabase(
+            worker._processBatch, [
+                (sentinel.node1, [sentinel.message1]),
+                (sentinel.node2, [sentinel.message2]),
+            ])
+        self.assertThat(
+            mock_processMessages, MockCallsMatch(
+                call(sentinel.node1, [sentinel.message1]),
+                call(sentinel.node2, [sentinel.message2])))
+        self.assertThat(logger.output, DocTestMatches(
+            "Failed to process messages for 2 node(s) together; ..."
+            "Traceback (most recent call last):...: together..."))
+
     @wait_for_reactor
     @inlineCallbacks
     def test__processMessages_fails_when_in_transaction(self):
@@ -896,6 +955,83 @@ class TestStatusWorkerService(MAASServerTestCase):
                 break
         self.assertEqual(content, script_result.stdout)
 
+    def test_processBatchTogether_logs_events_for_all_nodes(self):
+        nodes = [
+            factory.make_Node(status=NODE_STATUS.DEPLOYING)
+            for _ in range(3)
+        ]
+        timestamp = datetime.utcnow()
+        tasks = [
+            (node, [{
+                'event_type': 'progress',
+                'origin': 'curtin',
+                'name': 'cmd-install/stage-%d' % index,
+                'description': 'Stage %d' % index,
+                'timestamp': timestamp,
+            } for index in range(2)])
+            for node in nodes
+        ]
+        worker = StatusWorkerService(sentinel.dbtasks)
+        worker._processBatchTogether(tasks)
+        for node in nodes:
+            events = Event.objects.filter(
+                node=node, action__startswith='cmd-install/').order_by('id')
+            self.assertEqual(
+                ["'curtin' Stage 0", "'curtin' Stage 1"],
+                [event.description for event in events])
+            self.assertEqual(
+                ['cmd-install/stage-0', 'cmd-install/stage-1'],
+                [event.action for event in events])
+            self.assertEqual(
+                {EVENT_TYPES.NODE_INSTALL_EVENT},
+                {event.type.name for event in events})
+            self.assertEqual(
+                {timestamp}, {event.created for event in events})
+
+    def test_processBatchTogether_skips_deleted_nodes(self):
+        node = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        deleted_node = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        deleted_node.delete()
+        message = {
+            'event_type': 'progress',
+            'origin': 'curtin',
+            'name': 'cmd-install/stage',
+            'description': 'Stage',
+            'timestamp': datetime.utcnow(),
+        }
+        worker = StatusWorkerService(sentinel.dbtasks)
+        worker._processBatchTogether(
+            [(deleted_node, [message]), (node, [message])])
+        self.assertEqual(
+            [node.id],
+            [event.node_id for event in Event.objects.filter(
+                action='cmd-install/stage')])
+
+    def test_processBatchTogether_updates_script_sets_last_ping(self):
+        nodes = [
+            factory.make_Node(status=status, with_empty_script_sets=True)
+            for status in (
+                NODE_STATUS.COMMISSIONING,
+                NODE_STATUS.TESTING,
+                NODE_STATUS.DEPLOYING)
+        ]
+        message = {
+            'event_type': 'progress',
+            'origin': 'curtin',
+            'name': 'test',
+            'description': 'testing',
+            'timestamp': datetime.utcnow(),
+        }
+        worker = StatusWorkerService(sentinel.dbtasks)
+        worker._processBatchTogether([(node, [message]) for node in nodes])
+        script_sets = [
+            nodes[0].current_commissioning_script_set,
+            nodes[1].current_testing_script_set,
+            nodes[2].current_installation_script_set,
+        ]
+        for script_set in script_sets:
+            self.assertIsNotNone(reload_object(script_set).last_ping)
+
     def test_updateLastPing_updates_script_status_last_ping(self):
         nodes = {
             status: factory.make_Node(
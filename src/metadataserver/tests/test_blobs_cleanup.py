@@ -0,0 +1,64 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `metadataserver.blobs_cleanup`."""
+
+__all__ = []
+
+from unittest.mock import call
+
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
+from metadataserver import blobs_cleanup
+from metadataserver.blobs_cleanup import (
+    BlobCleanupService,
+    cleanup_unreferenced_blobs,
+)
+from metadataserver.enum import SCRIPT_STATUS
+from metadataserver.models import ScriptResultBlob
+from twisted.internet.defer import maybeDeferred
+from twisted.internet.task import Clock
+
+
+class TestCleanupUnreferencedBlobs(MAASServerTestCase):
+
+    def test_deletes_blobs_of_deleted_results(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.RUNNING)
+        script_result.stdout = ScriptResultBlob.objects.store(
+            factory.make_bytes(1000))
+        script_result.save()
+        script_result.script_set.node.delete()
+        self.assertEqual(1, cleanup_unreferenced_blobs())
+        self.assertEqual(0, ScriptResultBlob.objects.count())
+
+
+class TestBlobCleanupService(MAASServerTestCase):
+
+    def test_init_with_default_interval(self):
+        cleanup = self.patch(blobs_cleanup, "cleanup_unreferenced_blobs")
+        # Making `deferToDatabase` use the current thread helps testing.
+        self.patch(blobs_cleanup, "deferToDatabase", maybeDeferred)
+
+        service = BlobCleanupService()
+        # Use a deterministic clock instead of the reactor for testing.
+        service.clock = Clock()
+
+        interval = 24 * 60 * 60  # seconds.
+        self.assertEqual(service.step, interval)
+        self.assertThat(cleanup, MockNotCalled())
+        service.startService()
+        self.assertThat(cleanup, MockCalledOnceWith())
+        service.clock.advance(interval - 1)
+        self.assertThat(cleanup, MockCalledOnceWith())
+        service.clock.advance(1)
+        self.assertThat(cleanup, MockCallsMatch(call(), call()))
+
+    def test_interval_can_be_set(self):
+        interval = self.getUniqueInteger()
+        service = BlobCleanupService(interval)
+        self.assertEqual(interval, service.step)
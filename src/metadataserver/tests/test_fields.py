@@ -6,15 +6,19 @@
 __all__ = []
 
 from base64 import b64encode
+import zlib
 
 from maasserver.testing.testcase import (
     MAASLegacyTransactionServerTestCase,
     MAASServerTestCase,
 )
 from maastesting.factory import factory
+from maastesting.testcase import MAASTestCase
 from metadataserver.fields import (
     Bin,
     BinaryField,
+    BlobReference,
+    CompressedBinaryField,
 )
 from metadataserver.tests.models import BinaryFieldModel
 
@@ -104,3 +108,44 @@ class TestBinaryField(MAASLegacyTransactionServerTestCase):
         field = BinaryField(null=True)
         self.patch(field, "default", b"wotcha")
         self.assertEqual(Bin(b"wotcha"), field.get_default())
+
+
+class TestCompressedBinaryField(MAASTestCase):
+    """Test CompressedBinaryField's conversions."""
+
+    def test_round_trips_small_values_uncompressed(self):
+        field = CompressedBinaryField()
+        data = Bin(b"small")
+        stored = field.get_db_prep_value(data)
+        self.assertEqual(b64encode(data).decode("ascii"), stored)
+        self.assertEqual(data, field.to_python(stored))
+
+    def test_round_trips_large_values_compressed(self):
+        field = CompressedBinaryField()
+        data = Bin(b"repetitive " * 1000)
+        stored = field.get_db_prep_value(data)
+        self.assertTrue(stored.startswith("zlib:"))
+        self.assertLess(len(stored), len(data))
+        self.assertEqual(data, field.to_python(stored))
+
+    def test_stores_incompressible_values_uncompressed(self):
+        field = CompressedBinaryField()
+        data = Bin(zlib.compress(factory.make_bytes(4096)))
+        stored = field.get_db_prep_value(data)
+        self.assertEqual(b64encode(data).decode("ascii"), stored)
+
+    def test_reads_values_stored_by_BinaryField(self):
+        data = Bin(b"old " * 1000)
+        stored = BinaryField().get_db_prep_value(data)
+        self.assertEqual(data, CompressedBinaryField().to_python(stored))
+
+    def test_round_trips_blob_references(self):
+        field = CompressedBinaryField()
+        reference = BlobReference("0123abcd")
+        stored = field.get_db_prep_value(reference)
+        self.assertEqual("sha256:0123abcd", stored)
+        self.assertEqual(reference, field.to_python(stored))
+
+    def test_blob_reference_uses_content_when_known(self):
+        reference = BlobReference("0123abcd", Bin(b"content"))
+        self.assertEqual(b"content", reference.get_content())
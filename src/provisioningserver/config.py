@@ -783,6 +783,12 @@ class ClusterConfiguration(Configuration, metaclass=ClusterConfigurationMeta):
         "The root directory for GRUB resources."
         return os.path.join(self.tftp_root, "grub")
 
+    # Pod options.
+    pod_discovery_concurrency = ConfigurationOption(
+        "pod_discovery_concurrency",
+        "The maximum number of pods this rack discovers at the same time.",
+        Number(min=1, if_missing=4))
+
     # NodeGroup UUID Option, used for migrating to rack controller
     cluster_uuid = ConfigurationOption(
         "cluster_uuid", "The UUID for this cluster controller",
@@ -19,6 +19,7 @@ from maastesting.factory import factory
 from maastesting.matchers import (
     MockCalledOnceWith,
     MockCallsMatch,
+    MockNotCalled,
 )
 from maastesting.testcase import (
     MAASTestCase,
@@ -27,6 +28,7 @@ from maastesting.testcase import (
 import pexpect
 from provisioningserver.drivers.pod import (
     Capabilities,
+    DiscoveredMachine,
     RequestedMachine,
     RequestedMachineBlockDevice,
     RequestedMachineInterface,
@@ -177,6 +179,45 @@ SAMPLE_DUMPXML_4 = dedent("""
     </domain>
     """)
 
+SAMPLE_DUMPXML_DEVICES = dedent("""
+    <domain type='kvm'>
+      <name>%(name)s</name>
+      <memory unit='KiB'>2097152</memory>
+      <currentMemory unit='KiB'>2097152</currentMemory>
+      <vcpu placement='static' current='2'>4</vcpu>
+      <os>
+        <type arch='x86_64'>hvm</type>
+        <boot dev='network'/>
+      </os>
+      <devices>
+        <disk type='file' device='disk'>
+          <source file='/var/lib/libvirt/images/%(name)s-1.qcow2'/>
+          <target dev='vda' bus='virtio'/>
+        </disk>
+        <disk type='file' device='cdrom'>
+          <target dev='hdb' bus='ide'/>
+        </disk>
+        <interface type='network'>
+          <mac address='%(mac1)s'/>
+        </interface>
+        <interface type='network'>
+          <mac address='%(mac2)s'/>
+        </interface>
+      </devices>
+    </domain>
+    """)
+
+SAMPLE_DOMSTATS = dedent("""
+    Domain: '%(name)s'
+      state.state=5
+      state.reason=1
+      block.count=2
+      block.0.name=vda
+      block.0.path=/var/lib/libvirt/images/%(name)s-1.qcow2
+      block.0.capacity=%(capacity)d
+      block.1.name=hdb
+    """)
+
 SAMPLE_CAPABILITY_KVM = dedent("""\
     <domainCapabilities>
       <path>/usr/bin/qemu-system-x86_64</path>
@@ -417,6 +458,15 @@ class TestVirshSSH(MAASTestCase):
         self.assertThat(mock_prompt, MockCalledOnceWith())
         self.assertEqual('\n'.join(names), output)
 
+    def test_run_many(self):
+        conn = self.configure_virshssh('')
+        output = conn.run_many(
+            [['dumpxml', 'a'], ['dumpxml', 'b'], ['domstats']])
+        self.assertThat(
+            conn.run, MockCalledOnceWith(
+                ['dumpxml a ; dumpxml b ; domstats']))
+        self.assertEquals('', output)
+
     def test_get_column_values(self):
         keys = ['Source', 'Model']
         expected = (('br0', 'e1000'), ('br1', 'e1000'))
@@ -758,6 +808,110 @@ class TestVirshSSH(MAASTestCase):
         discovered_machine = conn.get_discovered_machine(hostname)
         self.assertIsNone(discovered_machine)
 
+    def make_domain(self, capacity=None):
+        name = factory.make_name('machine')
+        if capacity is None:
+            capacity = random.randint(4096, 8192)
+        domain = {
+            'name': name,
+            'mac1': factory.make_mac_address(),
+            'mac2': factory.make_mac_address(),
+            'capacity': capacity,
+        }
+        return domain
+
+    def test_get_machines_xml_batches_dumpxml(self):
+        domains = [self.make_domain() for _ in range(3)]
+        names = [domain['name'] for domain in domains]
+        conn = self.configure_virshssh(
+            "\n".join(SAMPLE_DUMPXML_DEVICES % domain for domain in domains))
+        self.patch(conn, "BULK_BATCH_SIZE", 2)
+        machines_xml = conn.get_machines_xml(names)
+        self.assertThat(conn.run, MockCallsMatch(
+            call(['dumpxml %s ; dumpxml %s' % (names[0], names[1])]),
+            call(['dumpxml %s' % names[2]])))
+        self.assertItemsEqual(names, list(machines_xml))
+        self.assertEquals(machines_xml, conn.xml)
+
+    def test_get_machines_xml_skips_missing_domains(self):
+        domain = self.make_domain()
+        missing = factory.make_name('machine')
+        conn = self.configure_virshssh(
+            "error: failed to get domain '%s'\n" % missing +
+            SAMPLE_DUMPXML_DEVICES % domain)
+        machines_xml = conn.get_machines_xml([missing, domain['name']])
+        self.assertItemsEqual([domain['name']], list(machines_xml))
+
+    def test_get_machines_stats(self):
+        domains = [self.make_domain() for _ in range(2)]
+        conn = self.configure_virshssh(
+            "".join(SAMPLE_DOMSTATS % domain for domain in domains))
+        stats = conn.get_machines_stats()
+        self.assertThat(
+            conn.run, MockCalledOnceWith(['domstats', '--state', '--block']))
+        self.assertItemsEqual(
+            [domain['name'] for domain in domains], list(stats))
+        for domain in domains:
+            self.assertEquals(
+                str(domain['capacity']),
+                stats[domain['name']]['block.0.capacity'])
+            self.assertEquals('5', stats[domain['name']]['state.state'])
+
+    def test_get_machines_stats_returns_None_when_unsupported(self):
+        conn = self.configure_virshssh(
+            "error: unknown command: 'domstats'")
+        self.assertIsNone(conn.get_machines_stats())
+
+    def test_get_discovered_machines(self):
+        domains = [self.make_domain() for _ in range(3)]
+        names = [domain['name'] for domain in domains]
+        conn = self.configure_virshssh('')
+        self.patch(conn, "get_machines_stats").return_value = {
+            domain['name']: {
+                'state.state': '1',
+                'block.0.name': 'vda',
+                'block.0.capacity': str(domain['capacity']),
+                'block.1.name': 'hdb',
+            }
+            for domain in domains
+        }
+        conn.xml = {
+            domain['name']: SAMPLE_DUMPXML_DEVICES % domain
+            for domain in domains
+        }
+        discovered_machines = conn.get_discovered_machines(names)
+        self.assertThat(conn.run, MockNotCalled())
+        self.assertEquals(
+            names, [machine.hostname for machine in discovered_machines])
+        for domain, machine in zip(domains, discovered_machines):
+            self.assertEquals("amd64/generic", machine.architecture)
+            self.assertEquals(2, machine.cores)
+            self.assertEquals(2048, machine.memory)
+            self.assertEquals("on", machine.power_state)
+            self.assertEquals(
+                {'power_id': domain['name']}, machine.power_parameters)
+            self.assertEquals(
+                [(domain['capacity'], "/dev/vda")],
+                [(bd.size, bd.id_path) for bd in machine.block_devices])
+            self.assertEquals(
+                [(domain['mac1'], True), (domain['mac2'], False)],
+                [(nic.mac_address, nic.boot) for nic in machine.interfaces])
+
+    def test_get_discovered_machines_skips_bad_storage_device(self):
+        domain = self.make_domain()
+        conn = self.configure_virshssh('')
+        self.patch(conn, "get_machines_stats").return_value = {
+            domain['name']: {'state.state': '5', 'block.0.name': 'vda'},
+        }
+        conn.xml = {domain['name']: SAMPLE_DUMPXML_DEVICES % domain}
+        self.assertEquals([], conn.get_discovered_machines([domain['name']]))
+
+    def test_get_discovered_machines_returns_None_when_unsupported(self):
+        conn = self.configure_virshssh('')
+        self.patch(conn, "get_machines_stats").return_value = None
+        self.assertIsNone(
+            conn.get_discovered_machines([factory.make_name('machine')]))
+
     def test_poweron(self):
         conn = self.configure_virshssh('')
         expected = conn.poweron(factory.make_name('machine'))
@@ -788,7 +942,7 @@ class TestVirshSSH(MAASTestCase):
         self.assertThat(
             mock_spawn,
             MockCalledOnceWith(
-                None, timeout=30, maxread=2000, env=c_utf8_environment))
+                None, timeout=30, maxread=65536, env=c_utf8_environment))
 
     def test_get_usable_pool(self):
         conn = self.configure_virshssh('')
@@ -1430,6 +1584,9 @@ class TestVirshPodDriver(MAASTestCase):
         mock_get_pod_hints = self.patch(
             virsh.VirshSSH, 'get_pod_hints')
         mock_list_machines = self.patch(virsh.VirshSSH, 'list_machines')
+        mock_get_discovered_machines = self.patch(
+            virsh.VirshSSH, 'get_discovered_machines')
+        mock_get_discovered_machines.return_value = None
         mock_get_discovered_machine = self.patch(
             virsh.VirshSSH, 'get_discovered_machine')
         mock_list_machines.return_value = machines
@@ -1448,6 +1605,47 @@ class TestVirshPodDriver(MAASTestCase):
                 call(machines[2])))
         self.expectThat(['virtual'], Equals(discovered_pod.tags))
 
+    @inlineCallbacks
+    def test_discover_in_bulk(self):
+        driver = VirshPodDriver()
+        system_id = factory.make_name('system_id')
+        context = {
+            'power_address': factory.make_name('power_address'),
+            'power_pass': factory.make_name('power_pass')
+        }
+        machines = [
+            factory.make_name('machine')
+            for _ in range(3)
+        ]
+        discovered_machines = [
+            DiscoveredMachine(
+                hostname=machine, architecture="amd64/generic", cores=1,
+                cpu_speed=0, memory=1024, interfaces=[], block_devices=[])
+            for machine in machines
+        ]
+        mock_login = self.patch(virsh.VirshSSH, 'login')
+        mock_login.return_value = True
+        mock_get_pod_resources = self.patch(
+            virsh.VirshSSH, 'get_pod_resources')
+        mock_get_pod_resources.return_value.cpu_speed = 2400
+        self.patch(virsh.VirshSSH, 'get_pod_hints')
+        self.patch(virsh.VirshSSH, 'list_machines').return_value = machines
+        mock_get_discovered_machines = self.patch(
+            virsh.VirshSSH, 'get_discovered_machines')
+        mock_get_discovered_machines.return_value = discovered_machines
+        mock_get_discovered_machine = self.patch(
+            virsh.VirshSSH, 'get_discovered_machine')
+
+        discovered_pod = yield driver.discover(system_id, context)
+        self.expectThat(
+            mock_get_discovered_machines, MockCalledOnceWith(machines))
+        self.expectThat(mock_get_discovered_machine, MockNotCalled())
+        self.expectThat(
+            discovered_machines, Equals(discovered_pod.machines))
+        self.expectThat(
+            [2400, 2400, 2400],
+            Equals([m.cpu_speed for m in discovered_pod.machines]))
+
     @inlineCallbacks
     def test_compose(self):
         driver = VirshPodDriver()
@@ -8,6 +8,7 @@ __all__ = [
     'VirshPodDriver',
     ]
 
+import re
 import string
 from tempfile import NamedTemporaryFile
 from textwrap import dedent
@@ -56,6 +57,15 @@ maaslog = get_maas_logger("drivers.pod.virsh")
 XPATH_ARCH = "/domain/os/type/@arch"
 XPATH_BOOT = "/domain/os/boot"
 XPATH_OS = "/domain/os"
+XPATH_NAME = "/domain/name/text()"
+XPATH_VCPU = "/domain/vcpu"
+XPATH_MEMORY = "/domain/memory"
+XPATH_DISK_TARGETS = "/domain/devices/disk[@device='disk']/target/@dev"
+XPATH_MAC_ADDRESSES = "/domain/devices/interface/mac/@address"
+
+# Matches each domain definition in the output of several `dumpxml`
+# commands run together.
+DOMAIN_XML_PATTERN = re.compile(r"<domain\b.*?</domain>", re.DOTALL)
 
 
 DOM_TEMPLATE = dedent("""\
@@ -136,6 +146,20 @@ class VirshVMState:
     PM_SUSPENDED = "pmsuspended"
 
 
+# Maps `virDomainState` values, as reported by `virsh domstats --state`, to
+# the names that `virsh domstate` uses for them.
+DOMSTATS_STATE_TO_VM_STATE = {
+    "0": VirshVMState.NO_STATE,
+    "1": VirshVMState.ON,
+    "2": VirshVMState.IDLE,
+    "3": VirshVMState.PAUSED,
+    "4": VirshVMState.IN_SHUTDOWN,
+    "5": VirshVMState.OFF,
+    "6": VirshVMState.CRASHED,
+    "7": VirshVMState.PM_SUSPENDED,
+}
+
+
 VM_STATE_TO_POWER_STATE = {
     VirshVMState.OFF: "off",
     VirshVMState.ON: "on",
@@ -174,7 +198,12 @@ class VirshSSH(pexpect.spawn):
     I_PROMPT_SSHKEY = PROMPTS.index(PROMPT_SSHKEY)
     I_PROMPT_PASSWORD = PROMPTS.index(PROMPT_PASSWORD)
 
-    def __init__(self, timeout=30, maxread=2000, dom_prefix=None):
+    # The number of domains to ask about in each round trip to virsh when
+    # discovering in bulk. Commands are sent on a single line, so this is
+    # kept well within the length a terminal line can reasonably hold.
+    BULK_BATCH_SIZE = 25
+
+    def __init__(self, timeout=30, maxread=65536, dom_prefix=None):
         super(VirshSSH, self).__init__(
             None, timeout=timeout, maxread=maxread,
             env=get_env_with_locale())
@@ -252,6 +281,15 @@ class VirshSSH(pexpect.spawn):
         result = self.before.decode("utf-8").splitlines()
         return '\n'.join(result[1:])
 
+    def run_many(self, commands):
+        """Run several commands in one round trip to virsh.
+
+        The commands are sent on one line, separated by semicolons, so that
+        virsh executes them back-to-back and only one prompt is waited for.
+        The combined output of all the commands is returned.
+        """
+        return self.run([' ; '.join(' '.join(args) for args in commands)])
+
     def get_column_values(self, data, keys):
         """Return tuple of column value tuples based off keys."""
         data = data.strip().splitlines()
@@ -533,6 +571,136 @@ class VirshSSH(pexpect.spawn):
         discovered_machine.interfaces = interfaces
         return discovered_machine
 
+    def get_machines_xml(self, machines):
+        """Gets the XML for all `machines`, in as few round trips as possible.
+
+        :return: A dict mapping machine names to their XML. Machines that virsh
+            does not return a definition for are omitted.
+        """
+        missing = [machine for machine in machines if machine not in self.xml]
+        for index in range(0, len(missing), self.BULK_BATCH_SIZE):
+            batch = missing[index:index + self.BULK_BATCH_SIZE]
+            output = self.run_many(
+                ['dumpxml', machine] for machine in batch)
+            for match in DOMAIN_XML_PATTERN.finditer(output):
+                xml = match.group(0)
+                names = etree.XML(xml).xpath(XPATH_NAME)
+                if len(names) == 1 and names[0] in batch:
+                    self.xml[names[0]] = xml
+        return {
+            machine: self.xml[machine]
+            for machine in machines
+            if machine in self.xml
+        }
+
+    def get_machines_stats(self):
+        """Gets state and block statistics for all machines in one command.
+
+        :return: A dict mapping machine names to a dict of statistics, as
+            reported by ``virsh domstats``, or `None` if this virsh does not
+            support ``domstats``.
+        """
+        output = self.run(['domstats', '--state', '--block']).strip()
+        if output.startswith("error:"):
+            return None
+        stats = {}
+        current = None
+        for line in output.splitlines():
+            line = line.strip()
+            if line.startswith("Domain:"):
+                name = line.split(":", 1)[1].strip().strip("'")
+                current = stats[name] = {}
+            elif current is not None and "=" in line:
+                key, value = line.split("=", 1)
+                current[key] = value
+        return stats
+
+    def get_discovered_machines(self, machines):
+        """Gets discovered machines for all `machines` in bulk.
+
+        This fetches all domain definitions in batches of `BULK_BATCH_SIZE`
+        and the state and storage of all domains in one ``domstats``
+        command, then works out each machine locally. It costs a handful of
+        round trips to virsh, no matter how many machines there are, where
+        `get_discovered_machine` costs several per machine.
+
+        :return: A list of `DiscoveredMachine`, or `None` when the virsh on
+            the pod cannot report statistics in bulk.
+        """
+        stats = self.get_machines_stats()
+        if stats is None:
+            return None
+        machines_xml = self.get_machines_xml(machines)
+        discovered_machines = []
+        for machine in machines:
+            xml = machines_xml.get(machine)
+            if xml is None:
+                maaslog.error("%s: Failed to get XML for machine", machine)
+                continue
+            discovered_machine = self._make_discovered_machine(
+                machine, etree.XML(xml), stats.get(machine, {}))
+            if discovered_machine is not None:
+                discovered_machines.append(discovered_machine)
+        return discovered_machines
+
+    def _make_discovered_machine(self, machine, doc, stats):
+        """Make a `DiscoveredMachine` from a domain definition and its stats.
+
+        Mirrors `get_discovered_machine` without talking to virsh.
+        """
+        discovered_machine = DiscoveredMachine(
+            architecture="", cores=0, cpu_speed=0, memory=0,
+            interfaces=[], block_devices=[], tags=[])
+        discovered_machine.hostname = machine
+        arch = doc.xpath(XPATH_ARCH)[0]
+        discovered_machine.architecture = ARCH_FIX.get(arch, arch)
+        vcpu = doc.xpath(XPATH_VCPU)[0]
+        discovered_machine.cores = int(vcpu.get("current", vcpu.text))
+        # libvirt always reports memory in KiB; store it in MiB.
+        discovered_machine.memory = int(
+            int(doc.xpath(XPATH_MEMORY)[0].text) / 1024)
+        state = DOMSTATS_STATE_TO_VM_STATE.get(
+            stats.get("state.state"), VirshVMState.NO_STATE)
+        discovered_machine.power_state = VM_STATE_TO_POWER_STATE[state]
+        discovered_machine.power_parameters = {
+            'power_id': machine,
+        }
+
+        # Map block device targets to their capacity.
+        capacities = {}
+        for key, value in stats.items():
+            if key.startswith("block.") and key.endswith(".name"):
+                index = key[len("block."):-len(".name")]
+                capacity = stats.get("block.%s.capacity" % index)
+                if capacity is not None:
+                    capacities[value] = int(capacity)
+
+        block_devices = []
+        for device in doc.xpath(XPATH_DISK_TARGETS):
+            size = capacities.get(device)
+            if size is None:
+                # Bug lp:1690144 - see `get_discovered_machine`.
+                maaslog.error(
+                    "Unable to discover machine '%s' in virsh pod: storage "
+                    "device '%s' is missing its storage backing." % (
+                        machine, device))
+                return None
+            block_devices.append(
+                DiscoveredMachineBlockDevice(
+                    model=None, serial=None, size=size,
+                    id_path="/dev/%s" % device))
+        discovered_machine.block_devices = block_devices
+
+        interfaces = []
+        boot = True
+        for mac in doc.xpath(XPATH_MAC_ADDRESSES):
+            interfaces.append(
+                DiscoveredMachineInterface(
+                    mac_address=mac, boot=boot))
+            boot = False
+        discovered_machine.interfaces = interfaces
+        return discovered_machine
+
     def configure_pxe_boot(self, machine):
         """Given the specified machine, reads the XML dump and determines
         if the boot order needs to be changed. The boot order needs to be
@@ -898,15 +1066,19 @@ class VirshPodDriver(PodDriver):
         # Discovered pod hints.
         discovered_pod.hints = yield deferToThread(conn.get_pod_hints)
 
-        # Discover VMs.
-        machines = []
+        # Discover VMs, in bulk if virsh on the pod allows it.
         virtual_machines = yield deferToThread(conn.list_machines)
-        for vm in virtual_machines:
-            discovered_machine = yield deferToThread(
-                conn.get_discovered_machine, vm)
-            if discovered_machine is not None:
-                discovered_machine.cpu_speed = discovered_pod.cpu_speed
-                machines.append(discovered_machine)
+        machines = yield deferToThread(
+            conn.get_discovered_machines, virtual_machines)
+        if machines is None:
+            machines = []
+            for vm in virtual_machines:
+                discovered_machine = yield deferToThread(
+                    conn.get_discovered_machine, vm)
+                if discovered_machine is not None:
+                    machines.append(discovered_machine)
+        for discovered_machine in machines:
+            discovered_machine.cpu_speed = discovered_pod.cpu_speed
         discovered_pod.machines = machines
 
         # Set KVM Pod tags to 'virtual'.
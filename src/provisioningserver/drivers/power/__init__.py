@@ -30,6 +30,7 @@ from provisioningserver.drivers import (
     IP_EXTRACTOR_SCHEMA,
     SETTING_PARAMETER_FIELD_SCHEMA,
 )
+from provisioningserver.utils.metrics import METRICS
 from provisioningserver.utils.twisted import (
     IAsynchronous,
     pause,
@@ -50,6 +51,12 @@ UNKNOWN_POWER_TYPE = ''
 # A policy used when waiting between retries of power changes.
 DEFAULT_WAITING_POLICY = (1, 2, 2, 4, 6, 8, 12)
 
+# The duration of each attempt to query a node's power state.
+POWER_QUERY_SECONDS = METRICS.histogram(
+    "maas_power_query_seconds",
+    "Time taken by each attempt to query a node's power state.",
+    labels=["driver"])
+
 # JSON schema for what a power driver definition should look like
 JSON_POWER_DRIVER_SCHEMA = {
     'title': "Power driver setting set",
@@ -331,15 +338,16 @@ class PowerDriver(PowerDriverBase):
         exc_info = None, None, None
         for waiting_time in self.wait_time:
             try:
-                # Power queries are predominantly transactional and thus
-                # blocking/synchronous. Genuinely non-blocking/asynchronous
-                # methods must out themselves explicitly.
-                if IAsynchronous.providedBy(self.power_query):
-                    # The @asynchronous decorator will DTRT.
-                    state = yield self.power_query(system_id, context)
-                else:
-                    state = yield deferToThread(
-                        self.power_query, system_id, context)
+                with POWER_QUERY_SECONDS.labels(self.name).time():
+                    # Power queries are predominantly transactional and thus
+                    # blocking/synchronous. Genuinely non-blocking/asynchronous
+                    # methods must out themselves explicitly.
+                    if IAsynchronous.providedBy(self.power_query):
+                        # The @asynchronous decorator will DTRT.
+                        state = yield self.power_query(system_id, context)
+                    else:
+                        state = yield deferToThread(
+                            self.power_query, system_id, context)
             except PowerFatalError:
                 raise  # Don't retry.
             except PowerError:
@@ -11,6 +11,11 @@ from subprocess import (
     Popen,
 )
 from tempfile import NamedTemporaryFile
+from threading import (
+    Event,
+    Lock,
+)
+import time
 
 from provisioningserver.drivers import (
     make_ip_extractor,
@@ -187,6 +192,159 @@ IPMI_BOOT_TYPE_MAPPING = {
     }
 
 
+def _make_ipmipower_error(message):
+    """Return an exception for `message` as printed by `ipmipower`.
+
+    :return: An instance of the exception class registered in `IPMI_ERRORS`
+        for the first matching error, or `None` if `message` is not a known
+        error.
+    """
+    for error, error_info in IPMI_ERRORS.items():
+        if error in message:
+            return error_info.get('exception')(error_info.get('message'))
+    return None
+
+
+class _IPMIQueryBatch:
+    """A set of power addresses to be queried with one `ipmipower` call."""
+
+    def __init__(self):
+        self.addresses = []
+        self.results = {}
+        self.failure = None
+        self.done = Event()
+
+
+class IPMIQueryBatcher:
+    """Coalesce concurrent power queries into shared `ipmipower` processes.
+
+    `ipmipower` accepts a list of hosts and talks to all of them from a
+    single process, managing an IPMI session per BMC concurrently. Power
+    queries that share the same driver type and credentials and arrive
+    within `window` seconds of each other are issued together, so a sweep
+    of the power monitor costs one process spawn per group of BMCs rather
+    than one per node.
+
+    This is meant to be called from threads, as `PowerDriver.query` does.
+    The first caller in a batch waits for `window` seconds, runs the query
+    on behalf of all callers, then wakes them up.
+    """
+
+    # Characters that `ipmipower` interprets in its host range syntax. An
+    # address containing one of these is always queried on its own.
+    unbatchable = re.compile(r"[,\[\]]")
+
+    def __init__(self, window=0.1, max_addresses=64):
+        super(IPMIQueryBatcher, self).__init__()
+        self.window = window
+        self.max_addresses = max_addresses
+        self._lock = Lock()
+        self._batches = {}
+
+    def query(self, command, power_address):
+        """Query the power state of the BMC at `power_address`.
+
+        :param command: The `ipmipower` command as a sequence, including
+            ``-h power_address``. Queries with otherwise identical commands
+            are run together.
+        :return: The power state reported for `power_address`.
+        """
+        # Replace the host with a placeholder so that the command can be
+        # used both to group queries and, later, to run them.
+        command = list(command)
+        command[command.index('-h') + 1] = None
+        command = tuple(command)
+        if self.unbatchable.search(power_address) is not None:
+            return self._raise_or_return(
+                power_address, self._run(command, [power_address]))
+
+        with self._lock:
+            batch = self._batches.get(command)
+            leader = (
+                batch is None or len(batch.addresses) >= self.max_addresses)
+            if leader:
+                batch = self._batches[command] = _IPMIQueryBatch()
+            if power_address not in batch.addresses:
+                batch.addresses.append(power_address)
+
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                # Close the batch before running it; later arrivals start
+                # a new one.
+                if self._batches.get(command) is batch:
+                    del self._batches[command]
+            try:
+                batch.results = self._run(command, batch.addresses)
+            except Exception as error:
+                batch.failure = error
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.failure is not None:
+            raise batch.failure
+        return self._raise_or_return(power_address, batch.results)
+
+    @staticmethod
+    def _raise_or_return(power_address, results):
+        result = results.get(power_address)
+        if result is None:
+            raise PowerError(
+                "Failed to power query %s: no result from ipmipower." % (
+                    power_address))
+        elif isinstance(result, Exception):
+            raise result
+        else:
+            return result
+
+    def _run(self, command, addresses):
+        """Run `command` for all `addresses`; return a dict of results.
+
+        Each result is either a power state or an exception instance.
+        """
+        if len(addresses) == 1:
+            # A lone query behaves exactly as an unbatched one does.
+            [power_address] = addresses
+            try:
+                result = IPMIPowerDriver._issue_ipmipower_command(
+                    self._make_command(command, power_address),
+                    'query', power_address)
+            except PowerError as error:
+                result = error
+            return {power_address: result}
+
+        env = shell.get_env_with_locale()
+        process = Popen(
+            self._make_command(command, ",".join(addresses)),
+            stdout=PIPE, stderr=PIPE, env=env)
+        stdout, _ = process.communicate()
+        # ipmipower reports one line per host, "<host>: <state-or-error>",
+        # and exits non-zero when any one of them failed; the per-host lines
+        # are what matter.
+        results = {}
+        for line in stdout.decode("utf-8").splitlines():
+            host, sep, message = line.strip().rpartition(": ")
+            if sep == "" or host not in addresses:
+                continue
+            message = message.strip()
+            if message in ("on", "off"):
+                results[host] = message
+            else:
+                error = _make_ipmipower_error(message)
+                if error is None:
+                    error = PowerError(
+                        "Failed to power query %s: %s" % (host, message))
+                results[host] = error
+        return results
+
+    @staticmethod
+    def _make_command(command, hosts):
+        """Substitute `hosts` for the placeholder in `command`."""
+        return tuple(hosts if arg is None else arg for arg in command)
+
+
 class IPMIPowerDriver(PowerDriver):
 
     name = 'ipmi'
@@ -210,6 +368,8 @@ class IPMIPowerDriver(PowerDriver):
     ]
     ip_extractor = make_ip_extractor('power_address')
     wait_time = (4, 8, 16, 32)
+    # Issue power queries through `ipmi_query_batcher`.
+    batch_queries = True
 
     def detect_missing_packages(self):
         if not shell.has_command_available('ipmipower'):
@@ -259,10 +419,10 @@ class IPMIPowerDriver(PowerDriver):
         process = Popen(command, stdout=PIPE, stderr=PIPE, env=env)
         stdout, _ = process.communicate()
         stdout = stdout.decode("utf-8").strip()
-        for error, error_info in IPMI_ERRORS.items():
-            # ipmipower dumps errors to stdout
-            if error in stdout:
-                raise error_info.get('exception')(error_info.get('message'))
+        # ipmipower dumps errors to stdout.
+        error = _make_ipmipower_error(stdout)
+        if error is not None:
+            raise error
         if process.returncode != 0:
             raise PowerError(
                 "Failed to power %s %s: %s" % (
@@ -325,9 +485,13 @@ class IPMIPowerDriver(PowerDriver):
         elif power_change == 'query':
             ipmipower_command.append('--stat')
 
-        # Update or query the power state.
-        return self._issue_ipmipower_command(
-            ipmipower_command, power_change, power_address)
+        # Update or query the power state. Queries are coalesced with those
+        # for other BMCs that share the same credentials.
+        if power_change == 'query' and self.batch_queries:
+            return ipmi_query_batcher.query(ipmipower_command, power_address)
+        else:
+            return self._issue_ipmipower_command(
+                ipmipower_command, power_change, power_address)
 
     def power_on(self, system_id, context):
         self._issue_ipmi_command('on', **context)
@@ -337,3 +501,7 @@ class IPMIPowerDriver(PowerDriver):
 
     def power_query(self, system_id, context):
         return self._issue_ipmi_command('query', **context)
+
+
+# Shared by all IPMI power queries issued by this process.
+ipmi_query_batcher = IPMIQueryBatcher()
@@ -460,6 +460,16 @@ class TestPowerDriverQuery(MAASTestCase):
         output = yield driver.query(sentinel.system_id, sentinel.context)
         self.assertEqual(sentinel.state, output)
 
+    @inlineCallbacks
+    def test_records_duration_of_each_attempt(self):
+        driver = make_power_driver()
+        driver.name = factory.make_name("driver")
+        self.patch(driver, 'power_query').side_effect = [
+            PowerError("one"), sentinel.state]
+        yield driver.query(sentinel.system_id, sentinel.context)
+        durations = power.POWER_QUERY_SECONDS.labels(driver.name)
+        self.assertThat(sum(durations.counts), Equals(2))
+
     @inlineCallbacks
     def test_raises_last_exception_after_all_retries_fail(self):
         wait_time = [random.randrange(1, 10) for _ in range(3)]
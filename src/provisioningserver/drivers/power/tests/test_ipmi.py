@@ -7,6 +7,7 @@ __all__ = []
 
 import random
 from subprocess import PIPE
+from threading import Thread
 from unittest.mock import (
     ANY,
     call,
@@ -22,6 +23,7 @@ from maastesting.testcase import MAASTestCase
 from provisioningserver.drivers.power import (
     ipmi as ipmi_module,
     PowerAuthError,
+    PowerConnError,
     PowerError,
 )
 from provisioningserver.drivers.power.ipmi import (
@@ -31,6 +33,7 @@ from provisioningserver.drivers.power.ipmi import (
     IPMI_CONFIG_WITH_BOOT_TYPE,
     IPMI_ERRORS,
     IPMIPowerDriver,
+    IPMIQueryBatcher,
 )
 from provisioningserver.utils.shell import (
     get_env_with_locale,
@@ -39,6 +42,8 @@ from provisioningserver.utils.shell import (
 from testtools.matchers import (
     Contains,
     Equals,
+    HasLength,
+    IsInstance,
 )
 
 
@@ -76,6 +81,166 @@ def make_ipmipower_command(
     )
 
 
+class FakeBMCs:
+    """Simulate a set of BMCs as seen through `ipmipower`.
+
+    Use an instance in place of `Popen`. Each BMC is keyed by address and
+    either has a power state, "on" or "off", or an error message that
+    `ipmipower` would print for it, like "connection timeout". Every
+    invocation is recorded in `commands`.
+    """
+
+    def __init__(self, bmcs):
+        self.bmcs = bmcs
+        self.commands = []
+
+    def __call__(self, command, stdout=None, stderr=None, env=None):
+        self.commands.append(command)
+        hosts = command[command.index('-h') + 1].split(",")
+        output = "\n".join(
+            "%s: %s" % (host, self.bmcs.get(host, "connection timeout"))
+            for host in hosts)
+        failed = any(
+            self.bmcs.get(host) not in ("on", "off") for host in hosts)
+        process = FakeProcess(output.encode("utf-8"), int(failed))
+        return process
+
+
+class FakeProcess:
+
+    def __init__(self, stdout, returncode):
+        self.stdout = stdout
+        self.returncode = returncode
+
+    def communicate(self):
+        return self.stdout, b""
+
+
+class TestIPMIQueryBatcher(MAASTestCase):
+
+    def make_bmcs(self, count, states=("on", "off")):
+        return {
+            factory.make_ipv4_address(): random.choice(states)
+            for _ in range(count)
+        }
+
+    def query_concurrently(self, batcher, commands_and_addresses):
+        results = {}
+
+        def query(command, address):
+            try:
+                results[address] = batcher.query(command, address)
+            except Exception as error:
+                results[address] = error
+
+        threads = [
+            Thread(target=query, args=(command, address))
+            for command, address in commands_and_addresses
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def make_command(self, address, user="user", password="pass"):
+        return (
+            'ipmipower', '-W', 'opensesspriv', '--driver-type', 'LAN_2_0',
+            '-h', address, '-u', user, '-p', password, '--stat')
+
+    def test_query_returns_power_state_for_single_bmc(self):
+        bmcs = self.make_bmcs(1)
+        [(address, state)] = bmcs.items()
+        fake = FakeBMCs(bmcs)
+        self.patch(ipmi_module, "Popen", fake)
+        batcher = IPMIQueryBatcher(window=0)
+        self.assertThat(
+            batcher.query(self.make_command(address), address),
+            Equals(state))
+        self.assertThat(fake.commands, Equals([self.make_command(address)]))
+
+    def test_concurrent_queries_share_one_process(self):
+        bmcs = self.make_bmcs(20)
+        fake = FakeBMCs(bmcs)
+        self.patch(ipmi_module, "Popen", fake)
+        batcher = IPMIQueryBatcher(window=0.5)
+        results = self.query_concurrently(batcher, [
+            (self.make_command(address), address) for address in bmcs])
+        self.assertThat(results, Equals(bmcs))
+        self.assertThat(fake.commands, HasLength(1))
+        [command] = fake.commands
+        self.assertItemsEqual(
+            list(bmcs), command[command.index('-h') + 1].split(","))
+
+    def test_queries_with_different_credentials_are_not_shared(self):
+        bmcs = self.make_bmcs(2)
+        fake = FakeBMCs(bmcs)
+        self.patch(ipmi_module, "Popen", fake)
+        batcher = IPMIQueryBatcher(window=0.5)
+        results = self.query_concurrently(batcher, [
+            (self.make_command(address, user=factory.make_name("user")),
+             address)
+            for address in bmcs])
+        self.assertThat(results, Equals(bmcs))
+        self.assertThat(fake.commands, HasLength(2))
+
+    def test_batches_are_limited_in_size(self):
+        bmcs = self.make_bmcs(10)
+        fake = FakeBMCs(bmcs)
+        self.patch(ipmi_module, "Popen", fake)
+        batcher = IPMIQueryBatcher(window=0.5, max_addresses=5)
+        results = self.query_concurrently(batcher, [
+            (self.make_command(address), address) for address in bmcs])
+        self.assertThat(results, Equals(bmcs))
+        self.assertThat(fake.commands, HasLength(2))
+
+    def test_errors_are_reported_per_bmc(self):
+        bmcs = self.make_bmcs(4)
+        broken = factory.make_ipv4_address()
+        bmcs[broken] = "connection timeout"
+        fake = FakeBMCs(bmcs)
+        self.patch(ipmi_module, "Popen", fake)
+        batcher = IPMIQueryBatcher(window=0.5)
+        results = self.query_concurrently(batcher, [
+            (self.make_command(address), address) for address in bmcs])
+        self.assertThat(results.pop(broken), IsInstance(PowerConnError))
+        del bmcs[broken]
+        self.assertThat(results, Equals(bmcs))
+
+    def test_missing_result_raises_power_error(self):
+        # ipmipower said nothing about this BMC.
+        address = factory.make_ipv4_address()
+        self.assertRaises(
+            PowerError, IPMIQueryBatcher._raise_or_return, address, {})
+
+    def test_unbatchable_address_is_queried_alone(self):
+        bmcs = self.make_bmcs(1)
+        [(address, state)] = bmcs.items()
+        host = "[%s]" % address
+        bmcs[host] = bmcs.pop(address)
+        fake = FakeBMCs(bmcs)
+        self.patch(ipmi_module, "Popen", fake)
+        batcher = IPMIQueryBatcher(window=5)
+        self.assertThat(
+            batcher.query(self.make_command(host), host), Equals(state))
+
+    def test_throughput_against_simulated_bmcs(self):
+        # 500 BMCs queried 50 at a time, as the power monitor might, need
+        # ten ipmipower processes, not 500.
+        bmcs = self.make_bmcs(500)
+        fake = FakeBMCs(bmcs)
+        self.patch(ipmi_module, "Popen", fake)
+        batcher = IPMIQueryBatcher(window=0.2)
+        addresses = list(bmcs)
+        results = {}
+        for index in range(0, len(addresses), 50):
+            results.update(self.query_concurrently(batcher, [
+                (self.make_command(address), address)
+                for address in addresses[index:index + 50]]))
+        self.assertThat(results, Equals(bmcs))
+        self.assertThat(fake.commands, HasLength(10))
+
+
 class TestIPMIPowerDriver(MAASTestCase):
 
     def test_missing_packages(self):
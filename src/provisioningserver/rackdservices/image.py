@@ -7,6 +7,7 @@ __all__ = [
     "BootImageEndpointService",
     ]
 
+from provisioningserver.utils.metrics import MetricsResource
 from provisioningserver.utils.twisted import reducedWebLogFormatter
 from twisted.application.internet import StreamServerEndpointService
 from twisted.web.resource import Resource
@@ -17,6 +18,8 @@ from twisted.web.static import File
 class BootImageEndpointService(StreamServerEndpointService):
     """Service for serving images to the TFTP server via HTTP
 
+    It also serves this process's metrics at ``/metrics``.
+
     :ivar site: The twisted site resource
 
     """
@@ -29,5 +32,6 @@ class BootImageEndpointService(StreamServerEndpointService):
         """
         resource = Resource()
         resource.putChild(b'images', File(resource_root))
+        resource.putChild(b'metrics', MetricsResource())
         self.site = Site(resource, logFormatter=reducedWebLogFormatter)
         super(BootImageEndpointService, self).__init__(endpoint, self.site)
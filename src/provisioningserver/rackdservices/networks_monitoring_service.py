@@ -10,15 +10,18 @@ __all__ = [
 from provisioningserver.logger import get_maas_logger
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
 from provisioningserver.rpc.region import (
+    CheckInterfaces,
     GetDiscoveryState,
     ReportMDNSEntries,
     ReportNeighbours,
     RequestRackRefresh,
     UpdateInterfaces,
 )
+from provisioningserver.utils.network import get_interfaces_hash
 from provisioningserver.utils.services import NetworksMonitoringService
 from provisioningserver.utils.twisted import pause
 from twisted.internet.defer import inlineCallbacks
+from twisted.protocols.amp import UnhandledCommand
 
 
 maaslog = get_maas_logger("networks.monitor")
@@ -49,7 +52,14 @@ class RackNetworksMonitoringService(NetworksMonitoringService):
 
     @inlineCallbacks
     def recordInterfaces(self, interfaces, hints=None):
-        """Record the interfaces information to the region."""
+        """Record the interfaces information to the region.
+
+        This is only called when the interfaces have changed, or for the
+        first time after a restart. In the latter case only the hash of the
+        information is sent at first; the information itself is sent only
+        when the region doesn't already have it.
+        """
+        interfaces_hash = get_interfaces_hash(interfaces, hints)
         while self.running:
             try:
                 client = yield self.clientService.getClientNow()
@@ -58,9 +68,20 @@ class RackNetworksMonitoringService(NetworksMonitoringService):
                 continue
             if self._recorded is None:
                 yield client(RequestRackRefresh, system_id=client.localIdent)
+                try:
+                    response = yield client(
+                        CheckInterfaces, system_id=client.localIdent,
+                        interfaces_hash=interfaces_hash)
+                except UnhandledCommand:
+                    # The region is older than 2.4.
+                    pass
+                else:
+                    if not response["changed"]:
+                        break
             yield client(
                 UpdateInterfaces, system_id=client.localIdent,
-                interfaces=interfaces, topology_hints=hints)
+                interfaces=interfaces, topology_hints=hints,
+                interfaces_hash=interfaces_hash)
             break
 
     def reportNeighbours(self, neighbours):
@@ -14,6 +14,7 @@ from maastesting.factory import factory
 from maastesting.matchers import (
     MockCalledOnceWith,
     MockCallsMatch,
+    MockNotCalled,
 )
 from maastesting.testcase import (
     MAASTestCase,
@@ -26,6 +27,8 @@ from provisioningserver.rackdservices.networks_monitoring_service import (
 from provisioningserver.rpc import region
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
 from provisioningserver.utils import services as services_module
+from provisioningserver.utils.network import get_interfaces_hash
+from testtools.matchers import Equals
 from twisted.internet.defer import (
     inlineCallbacks,
     maybeDeferred,
@@ -62,7 +65,8 @@ class TestRackNetworksMonitoringService(MAASTestCase):
     @inlineCallbacks
     def test_reports_interfaces_to_region(self):
         fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
-        protocol, connecting = fixture.makeEventLoop(region.UpdateInterfaces)
+        protocol, connecting = fixture.makeEventLoop(
+            region.CheckInterfaces, region.UpdateInterfaces)
         self.addCleanup((yield connecting))
 
         interfaces = {
@@ -91,7 +95,84 @@ class TestRackNetworksMonitoringService(MAASTestCase):
         self.assertThat(
             protocol.UpdateInterfaces, MockCalledOnceWith(
                 protocol, system_id=rpc_service.getClient().localIdent,
-                interfaces=interfaces, topology_hints=None))
+                interfaces=interfaces, topology_hints=None,
+                interfaces_hash=get_interfaces_hash(interfaces)))
+        # The interfaces are known to have changed; there's no need to ask.
+        self.assertThat(protocol.CheckInterfaces, MockNotCalled())
+
+    @inlineCallbacks
+    def test_checks_interfaces_first_time(self):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(
+            region.RequestRackRefresh, region.CheckInterfaces,
+            region.UpdateInterfaces)
+        protocol.CheckInterfaces.return_value = {"changed": True}
+        self.addCleanup((yield connecting))
+
+        interfaces = {
+            "eth0": {
+                "type": "physical",
+                "mac_address": factory.make_mac_address(),
+                "parents": [],
+                "links": [],
+                "enabled": True,
+            }
+        }
+
+        rpc_service = services.getServiceNamed('rpc')
+        service = RackNetworksMonitoringService(
+            rpc_service, Clock(), enable_monitoring=False,
+            enable_beaconing=False)
+        service.getInterfaces = lambda: succeed(interfaces)
+
+        service.startService()
+        yield service.stopService()
+
+        system_id = rpc_service.getClient().localIdent
+        interfaces_hash = get_interfaces_hash(interfaces)
+        self.assertThat(
+            protocol.CheckInterfaces, MockCalledOnceWith(
+                protocol, system_id=system_id,
+                interfaces_hash=interfaces_hash))
+        self.assertThat(
+            protocol.UpdateInterfaces, MockCalledOnceWith(
+                protocol, system_id=system_id, interfaces=interfaces,
+                topology_hints=None, interfaces_hash=interfaces_hash))
+
+    @inlineCallbacks
+    def test_does_not_report_unchanged_interfaces_first_time(self):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(
+            region.RequestRackRefresh, region.CheckInterfaces,
+            region.UpdateInterfaces)
+        protocol.CheckInterfaces.return_value = {"changed": False}
+        self.addCleanup((yield connecting))
+
+        interfaces = {
+            "eth0": {
+                "type": "physical",
+                "mac_address": factory.make_mac_address(),
+                "parents": [],
+                "links": [],
+                "enabled": True,
+            }
+        }
+
+        rpc_service = services.getServiceNamed('rpc')
+        service = RackNetworksMonitoringService(
+            rpc_service, Clock(), enable_monitoring=False,
+            enable_beaconing=False)
+        service.getInterfaces = lambda: succeed(interfaces)
+
+        service.startService()
+        yield service.stopService()
+
+        self.assertThat(
+            protocol.CheckInterfaces, MockCalledOnceWith(
+                protocol, system_id=rpc_service.getClient().localIdent,
+                interfaces_hash=get_interfaces_hash(interfaces)))
+        self.assertThat(protocol.UpdateInterfaces, MockNotCalled())
+        self.assertThat(service._recorded, Equals(interfaces))
 
     @inlineCallbacks
     def test_reports_interfaces_with_hints_if_beaconing_enabled(self):
@@ -129,7 +210,8 @@ class TestRackNetworksMonitoringService(MAASTestCase):
         self.assertThat(
             protocol.UpdateInterfaces, MockCalledOnceWith(
                 protocol, system_id=rpc_service.getClient().localIdent,
-                interfaces=interfaces, topology_hints=[]))
+                interfaces=interfaces, topology_hints=[],
+                interfaces_hash=get_interfaces_hash(interfaces, [])))
         # The service should have sent out beacons, waited three seconds,
         # solicited for more beacons, then waited another three seconds before
         # deciding that beaconing is complete.
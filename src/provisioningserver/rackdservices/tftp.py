@@ -13,6 +13,7 @@ from socket import (
     AF_INET,
     AF_INET6,
 )
+from time import monotonic
 
 from netaddr import IPAddress
 from provisioningserver.boot import (
@@ -40,6 +41,7 @@ from provisioningserver.utils import (
     tftp,
     typed,
 )
+from provisioningserver.utils.metrics import METRICS
 from provisioningserver.utils.network import get_all_interface_addresses
 from provisioningserver.utils.tftp import TFTPPath
 from provisioningserver.utils.twisted import (
@@ -76,6 +78,10 @@ from twisted.python.filepath import FilePath
 maaslog = get_maas_logger("tftp")
 log = LegacyLogger()
 
+TFTP_REQUEST_SECONDS = METRICS.histogram(
+    "maas_tftp_request_seconds",
+    "Time taken to prepare the response to a TFTP read request.")
+
 
 def get_boot_image(params):
     """Get the boot image for the params on this rack controller."""
@@ -370,6 +376,7 @@ class TFTPBackend(FilesystemSynchronousBackend):
         # of '/', example being 'bootx64.efi'. Convert all '\' to '/' to be
         # unix compatiable.
         file_name = file_name.replace(b'\\', b'/')
+        started = monotonic()
         mac_address = get_remote_mac()
         if mac_address is not None:
             log_request(mac_address, file_name)
@@ -377,8 +384,14 @@ class TFTPBackend(FilesystemSynchronousBackend):
         d.addCallback(partial(self.handle_boot_method, file_name))
         d.addErrback(self.no_response_errback, file_name)
         d.addErrback(self.all_is_lost_errback)
+        d.addBoth(self.record_latency, started)
         return d
 
+    @staticmethod
+    def record_latency(result, started):
+        TFTP_REQUEST_SECONDS.observe(monotonic() - started)
+        return result
+
 
 class Port(udp.Port):
     """A :py:class:`udp.Port` that groks IPv6."""
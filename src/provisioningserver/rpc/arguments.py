@@ -9,11 +9,14 @@ __all__ = [
     "IPAddress",
     "IPNetwork",
     "ParsedURL",
+    "StreamedAmpList",
     "StructureAsJSON",
 ]
 
 import collections
+import itertools
 import json
+import struct
 import urllib.parse
 import zlib
 
@@ -22,6 +25,41 @@ import netaddr
 from twisted.protocols import amp
 
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Every zstd frame starts with these bytes; zlib streams never do.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def get_compression_codecs():
+    """Return the compression codecs this process supports, best first.
+
+    zlib is always supported; zstd only when the `zstandard` module can be
+    imported.
+    """
+    if zstandard is None:
+        return ["zlib"]
+    else:
+        return ["zstd", "zlib"]
+
+
+def choose_compression_codec(offered):
+    """Choose the best codec we support from those `offered` by a peer.
+
+    :param offered: A list of codec names, or `None` if the peer did not
+        say, in which case it must be an older peer that only knows zlib.
+    """
+    if offered is not None:
+        for codec in get_compression_codecs():
+            if codec in offered:
+                return codec
+    return "zlib"
+
+
 class Bytes(amp.Argument):
     """Encode a structure on the wire as bytes.
 
@@ -167,6 +205,145 @@ class CompressedAmpList(AmpList):
         return fromStringProto(zlib.decompress(inString), proto)
 
 
+def _make_compressor(codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compressobj()
+    else:
+        return zlib.compressobj()
+
+
+def _make_decompressor(chunk):
+    if chunk.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError(
+                "Cannot decompress zstd data: zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompressobj()
+    else:
+        return zlib.decompressobj()
+
+
+def _parse_boxes(pieces):
+    """Parse AMP boxes from `pieces` of a serialised stream of boxes.
+
+    Boxes are yielded as soon as they are complete, so the whole stream is
+    never held in memory.
+    """
+    buffer = bytearray()
+    box, key = amp.AmpBox(), None
+    for piece in pieces:
+        buffer += piece
+        offset = 0
+        while len(buffer) - offset >= 2:
+            length, = struct.unpack_from("!H", buffer, offset)
+            if len(buffer) - offset - 2 < length:
+                break
+            value = bytes(buffer[offset + 2:offset + 2 + length])
+            offset += 2 + length
+            if key is not None:
+                box[key], key = value, None
+            elif length == 0:
+                yield box
+                box = amp.AmpBox()
+            else:
+                key = value
+        del buffer[:offset]
+    if len(buffer) != 0 or key is not None or len(box) != 0:
+        raise ValueError("Truncated stream of AMP boxes.")
+
+
+class StreamedAmpList(CompressedAmpList):
+    """A compressed :py:class:`amp.AmpList` that can exceed AMP's limits.
+
+    A plain `CompressedAmpList` must compress to no more than
+    :py:data:`~twisted.protocols.amp.MAX_VALUE_LENGTH` bytes. This instead
+    compresses the list one item at a time and splits the result into as
+    many chunks as needed. The first chunk is sent under the argument's own
+    name and the rest as ``name.1``, ``name.2``, and so on. The receiver
+    decompresses and decodes it a chunk at a time, so neither end ever holds
+    the whole serialised list in memory.
+
+    The list is compressed with the protocol's ``compression`` codec, which
+    is negotiated when a rack controller registers; see
+    `choose_compression_codec`. A zlib-compressed list that fits into one
+    chunk is indistinguishable from a `CompressedAmpList`, so existing
+    commands can switch to this without breaking older peers.
+    """
+
+    def toBox(self, name, strings, objects, proto):
+        obj = self.retrieve(
+            objects, amp._wireNameToPythonIdentifier(name), proto)
+        if self.optional and obj is None:
+            return
+        for index, chunk in enumerate(self.toChunks(obj, proto)):
+            strings[self.chunkName(name, index)] = chunk
+
+    def fromBox(self, name, strings, objects, proto):
+        first = self.retrieve(strings, name, proto)
+        key = amp._wireNameToPythonIdentifier(name)
+        if self.optional and first is None:
+            objects[key] = None
+        else:
+            chunks = self._gatherChunks(name, first, strings)
+            objects[key] = list(self.fromChunks(chunks, proto))
+
+    def chunkName(self, name, index):
+        """Return the name of the `index`th chunk of argument `name`."""
+        if index == 0:
+            return name
+        else:
+            return b"%s.%d" % (name, index)
+
+    def _gatherChunks(self, name, first, strings):
+        # Like `retrieve`, remove each chunk from `strings` as it's taken.
+        yield first
+        for index in itertools.count(1):
+            chunk = strings.pop(self.chunkName(name, index), None)
+            if chunk is None:
+                break
+            else:
+                yield chunk
+
+    def _compress(self, inObject, proto):
+        compressor = _make_compressor(getattr(proto, "compression", "zlib"))
+        for objects in inObject:
+            box = amp._objectsToStrings(
+                objects, self.subargs, amp.Box(), proto)
+            yield compressor.compress(box.serialize())
+        yield compressor.flush()
+
+    def toChunks(self, inObject, proto):
+        """Generate the compressed chunks of `inObject`."""
+        buffer = bytearray()
+        for piece in self._compress(inObject, proto):
+            buffer += piece
+            while len(buffer) > amp.MAX_VALUE_LENGTH:
+                yield bytes(buffer[:amp.MAX_VALUE_LENGTH])
+                del buffer[:amp.MAX_VALUE_LENGTH]
+        yield bytes(buffer)
+
+    def _decompress(self, chunks):
+        decompressor = None
+        for chunk in chunks:
+            if decompressor is None:
+                decompressor = _make_decompressor(chunk)
+            yield decompressor.decompress(chunk)
+
+    def fromChunks(self, chunks, proto):
+        """Generate the objects decoded from compressed `chunks`."""
+        for box in _parse_boxes(self._decompress(chunks)):
+            yield amp._stringsToObjects(box, self.subargs, proto)
+
+    def toStringProto(self, inObject, proto):
+        chunks = list(self.toChunks(inObject, proto))
+        if len(chunks) == 1:
+            return chunks[0]
+        else:
+            raise amp.TooLong(False, True, b"".join(chunks), None)
+
+    def fromStringProto(self, inString, proto):
+        return list(self.fromChunks([inString], proto))
+
+
 class IPAddress(amp.Argument):
     """Encode a `netaddr.IPAddress` object on the wire."""
 
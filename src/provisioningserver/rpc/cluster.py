@@ -46,6 +46,7 @@ from provisioningserver.rpc.arguments import (
     IPAddress,
     IPNetwork,
     ParsedURL,
+    StreamedAmpList,
     StructureAsJSON,
 )
 from provisioningserver.rpc.common import (
@@ -87,7 +88,7 @@ class ListBootImagesV2(amp.Command):
 
     arguments = []
     response = [
-        (b"images", CompressedAmpList(
+        (b"images", StreamedAmpList(
             [(b"osystem", amp.Unicode()),
              (b"architecture", amp.Unicode()),
              (b"subarchitecture", amp.Unicode()),
@@ -258,6 +259,8 @@ class _Power(amp.Command):
     :since: 1.7
     """
 
+    longRunning = True
+
     arguments = [
         (b"system_id", amp.Unicode()),
         (b"hostname", amp.Unicode()),
@@ -317,6 +320,7 @@ class _ConfigureDHCP(amp.Command):
 
     :since: 2.0
     """
+    longRunning = True
     arguments = [
         (b"omapi_key", amp.Unicode()),
         (b"failover_peers", AmpList([
@@ -384,6 +388,7 @@ class _ConfigureDHCP_V2(amp.Command):
 
     :since: 2.1
     """
+    longRunning = True
     arguments = [
         (b"omapi_key", amp.Unicode()),
         (b"failover_peers", AmpList([
@@ -392,7 +397,7 @@ class _ConfigureDHCP_V2(amp.Command):
             (b"address", amp.Unicode()),
             (b"peer_address", amp.Unicode()),
             ])),
-        (b"shared_networks", CompressedAmpList([
+        (b"shared_networks", StreamedAmpList([
             (b"name", amp.Unicode()),
             (b"subnets", AmpList([
                 (b"subnet", amp.Unicode()),
@@ -417,7 +422,7 @@ class _ConfigureDHCP_V2(amp.Command):
                 ])),
             (b"mtu", amp.Integer(optional=True)),
         ])),
-        (b"hosts", CompressedAmpList([
+        (b"hosts", StreamedAmpList([
             (b"host", amp.Unicode()),
             (b"mac", amp.Unicode()),
             (b"ip", amp.Unicode()),
@@ -430,7 +435,7 @@ class _ConfigureDHCP_V2(amp.Command):
         (b"interfaces", AmpList([
             (b"name", amp.Unicode()),
             ])),
-        (b"global_dhcp_snippets", CompressedAmpList([
+        (b"global_dhcp_snippets", StreamedAmpList([
             (b"name", amp.Unicode()),
             (b"description", amp.Unicode(optional=True)),
             (b"value", amp.Unicode()),
@@ -533,6 +538,8 @@ class ImportBootImages(amp.Command):
     :since: 1.7
     """
 
+    longRunning = True
+
     arguments = [
         (b"sources", AmpList(
             [(b"url", amp.Unicode()),
@@ -556,6 +563,8 @@ class EvaluateTag(amp.Command):
     :since: 2.0
     """
 
+    longRunning = True
+
     arguments = [
         # System ID for rack controller.
         (b"system_id", amp.Unicode()),
@@ -593,6 +602,7 @@ class RefreshRackControllerInfo(amp.Command):
 
     :since: 2.0
     """
+    longRunning = True
     arguments = [
         (b"system_id", amp.Unicode()),
         (b"consumer_key", amp.Unicode()),
@@ -618,6 +628,7 @@ class AddChassis(amp.Command):
 
     :since: 2.0
     """
+    longRunning = True
     arguments = [
         (b"user", amp.Unicode()),
         (b"chassis_type", amp.Unicode()),
@@ -639,6 +650,7 @@ class DiscoverPod(amp.Command):
 
     :since: 2.2
     """
+    longRunning = True
     arguments = [
         (b"pod_id", amp.Integer(optional=True)),
         (b"name", amp.Unicode(optional=True)),
@@ -665,6 +677,7 @@ class ComposeMachine(amp.Command):
 
     :since: 2.2
     """
+    longRunning = True
     arguments = [
         (b"pod_id", amp.Integer()),
         (b"name", amp.Unicode()),
@@ -695,6 +708,7 @@ class DecomposeMachine(amp.Command):
 
     :since: 2.2
     """
+    longRunning = True
     arguments = [
         (b"pod_id", amp.Integer()),
         (b"name", amp.Unicode()),
@@ -734,6 +748,10 @@ class ScanNetworks(amp.Command):
     If the `interface` paramter is supplied, limits the scan to the specified
     interface.
 
+    If the `rate` parameter is supplied, overrides the maximum number of
+    packets per second the rack controller sends on each interface while
+    scanning (when scanning with ARP requests).
+
     If both the `cidrs` and the `interface` parameters are supplied, the rack
     will scan for the specified `cidrs` on the specified interface, no
     matter if those CIDRs appear to be configured on that interface or not.
@@ -743,6 +761,7 @@ class ScanNetworks(amp.Command):
 
     :since: 2.1
     """
+    longRunning = True
     arguments = [
         (b"scan_all", amp.Boolean(optional=True)),
         (b"force_ping", amp.Boolean(optional=True)),
@@ -750,6 +769,7 @@ class ScanNetworks(amp.Command):
         (b"threads", amp.Integer(optional=True)),
         (b"cidrs", amp.ListOf(IPNetwork(), optional=True)),
         (b"interface", amp.Unicode(optional=True)),
+        (b"rate", amp.Integer(optional=True)),
     ]
     errors = {
         exceptions.ScanNetworksAlreadyInProgress: (
@@ -12,7 +12,6 @@ import json
 from operator import itemgetter
 import os
 from os import urandom
-import random
 from socket import (
     AF_INET,
     AF_INET6,
@@ -57,6 +56,7 @@ from provisioningserver.rpc import (
     pods,
     region,
 )
+from provisioningserver.rpc.arguments import get_compression_codecs
 from provisioningserver.rpc.boot_images import (
     import_boot_images,
     is_import_boot_images_running,
@@ -155,7 +155,7 @@ def catch_probe_and_enlist_error(name, failure):
 
 def get_scan_all_networks_args(
         scan_all=False, force_ping=False, threads=None, cidrs=None, slow=False,
-        interface=None):
+        interface=None, rate=None):
     """Return the arguments needed to perform a scan of all networks.
 
     The output of this function is suitable for passing into a call
@@ -172,6 +172,8 @@ def get_scan_all_networks_args(
         args.append("--ping")
     if slow:
         args.append("--slow")
+    if rate is not None:
+        args.extend(["--rate", str(rate)])
     # None of these parameters are relevant if we are scanning everything...
     if not scan_all:
         # ... but force the caller to be explicit about scanning all networks.
@@ -214,7 +216,7 @@ def spawnProcessAndNullifyStdout(protocol, args):
 
 def executeScanNetworksSubprocess(
         scan_all=False, force_ping=False, slow=False, threads=None, cidrs=None,
-        interface=None):
+        interface=None, rate=None):
     """Runs the network scanning subprocess.
 
     Redirects stdout and stderr in the subprocess to /dev/null. Leaves
@@ -234,7 +236,7 @@ def executeScanNetworksSubprocess(
         log.msg("Scan all networks: " + data.decode("utf-8")))
     args = get_scan_all_networks_args(
         scan_all=scan_all, force_ping=force_ping, slow=slow, threads=threads,
-        cidrs=cidrs, interface=interface)
+        cidrs=cidrs, interface=interface, rate=rate)
     spawnProcessAndNullifyStdout(protocol, args)
     return done
 
@@ -663,7 +665,7 @@ class Cluster(RPCProtocol):
     @cluster.ScanNetworks.responder
     def scan_all_networks(
             self, scan_all=False, force_ping=False, slow=False, threads=None,
-            cidrs=None, interface=None):
+            cidrs=None, interface=None, rate=None):
         """ScanNetworks()
 
         Implementation of
@@ -683,7 +685,7 @@ class Cluster(RPCProtocol):
             d = maybeDeferred(
                 executeScanNetworksSubprocess, scan_all=scan_all,
                 force_ping=force_ping, slow=slow, cidrs=cidrs, threads=threads,
-                interface=interface)
+                interface=interface, rate=rate)
             d.addErrback(suppress, ProcessDone)  # Exited normally.
             d.addErrback(log.err, 'Failed to scan all networks.')
             d.addBoth(callOut, lock.release)
@@ -811,8 +813,10 @@ class ClusterClient(Cluster):
                 region.RegisterRackController, system_id=system_id,
                 hostname=hostname, interfaces=interfaces, url=parsed_url,
                 nodegroup_uuid=cluster_uuid, beacon_support=True,
-                version=version)
+                version=version, compression=get_compression_codecs())
             self.localIdent = data["system_id"]
+            # Older regions don't negotiate compression and only know zlib.
+            self.compression = data.get("compression") or "zlib"
             set_maas_id(self.localIdent)
             version = data.get("version", None)
             if version is None:
@@ -976,7 +980,7 @@ class ClusterClientService(TimerService, object):
     def getClient(self):
         """Returns a :class:`common.Client` connected to a region.
 
-        The client is chosen at random.
+        The least loaded connection is chosen; see `select_connection`.
 
         :raises: :py:class:`~.exceptions.NoConnectionsAvailable` when
             there are no open connections to a region controller.
@@ -985,7 +989,7 @@ class ClusterClientService(TimerService, object):
         if len(conns) == 0:
             raise exceptions.NoConnectionsAvailable()
         else:
-            return common.Client(random.choice(conns))
+            return common.Client(common.select_connection(conns))
 
     @deferred
     def getClientNow(self):
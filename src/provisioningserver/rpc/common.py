@@ -8,16 +8,20 @@ __all__ = [
     "Client",
     "Identify",
     "RPCProtocol",
+    "select_connection",
 ]
 
 from os import getpid
+import random
 from socket import gethostname
+from time import monotonic
 
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.rpc.interfaces import (
     IConnection,
     IConnectionToRegion,
 )
+from provisioningserver.utils.metrics import METRICS
 from provisioningserver.utils.twisted import asynchronous
 from twisted.internet.defer import Deferred
 from twisted.protocols import amp
@@ -26,6 +30,11 @@ from twisted.python.failure import Failure
 
 log = LegacyLogger()
 
+RPC_COMMAND_SECONDS = METRICS.histogram(
+    "maas_rpc_command_seconds",
+    "Time taken to respond to RPC commands, including failures.",
+    labels=["command"])
+
 
 class Identify(amp.Command):
     """Request the identity of the remote side, e.g. its UUID.
@@ -207,16 +216,63 @@ class RPCProtocol(amp.AMP, object):
     and override `connectionMade` and `connectionLost` and signal from there,
     which is what this class does.
 
+    It also tracks how loaded the remote side appears to be, for the benefit
+    of `select_connection`.
+
     :ivar onConnectionMade: A `Deferred` that fires when `connectionMade` has
         been called, i.e. this protocol is now connected.
     :ivar onConnectionLost: A `Deferred` that fires when `connectionLost` has
         been called, i.e. this protocol is no longer connected.
+    :ivar inFlight: The number of calls made with `callRemote` that have not
+        yet been answered.
+    :ivar latency: An exponentially weighted moving average of the time, in
+        seconds, taken to answer calls made with `callRemote`, or `None` if
+        no calls have been answered. Calls to commands with a true
+        ``longRunning`` attribute, like `ImportBootImages`, take as long as
+        the work they start, not as long as the remote side takes to get to
+        them, so they are not counted.
+    :ivar latencyAt: The time, from `time.monotonic`, when `latency` was
+        last updated.
+    :ivar compression: The codec used to compress large arguments, like
+        `StreamedAmpList`, sent on this connection. This is "zlib" until
+        the peers negotiate something better.
     """
 
+    # The weight given to each new latency sample in `latency`.
+    latencyWeight = 0.2
+
+    # Understood by every peer; see `choose_compression_codec`.
+    compression = "zlib"
+
     def __init__(self):
         super(RPCProtocol, self).__init__()
         self.onConnectionMade = Deferred()
         self.onConnectionLost = Deferred()
+        self.inFlight = 0
+        self.latency = None
+        self.latencyAt = 0.0
+
+    def callRemote(self, command, **kwargs):
+        """Call up, but track in-flight calls and their latency."""
+        d = super(RPCProtocol, self).callRemote(command, **kwargs)
+        if d is not None:
+            self.inFlight += 1
+            d.addBoth(self._callRemoteDone, command, monotonic())
+        return d
+
+    def _callRemoteDone(self, result, command, started):
+        self.inFlight -= 1
+        if not getattr(command, "longRunning", False):
+            now = monotonic()
+            elapsed = now - started
+            if _recent_latency(self, now) is None:
+                # Start afresh rather than from an average so old that
+                # `select_connection` no longer heeds it.
+                self.latency = elapsed
+            else:
+                self.latency += self.latencyWeight * (elapsed - self.latency)
+            self.latencyAt = now
+        return result
 
     def connectionMade(self):
         super(RPCProtocol, self).connectionMade()
@@ -237,9 +293,17 @@ class RPCProtocol(amp.AMP, object):
         Here we capture all errors before `_commandReceived` sees them and
         wrap them with :class:`amp.RemoteAmpError`. This prevents the
         disconnecting behaviour.
+
+        The time taken to respond is recorded in `RPC_COMMAND_SECONDS`.
         """
+        started = monotonic()
         d = super(RPCProtocol, self).dispatchCommand(box)
 
+        def record_latency(result):
+            command = box[amp.COMMAND].decode("ascii")
+            RPC_COMMAND_SECONDS.labels(command).observe(monotonic() - started)
+            return result
+
         def coerce_error(failure):
             if failure.check(amp.RemoteAmpError):
                 return failure
@@ -255,7 +319,7 @@ class RPCProtocol(amp.AMP, object):
                     amp.UNHANDLED_ERROR_CODE, b"Unknown Error [%s]" %
                     command_ref.encode("ascii"), fatal=False, local=failure))
 
-        return d.addErrback(coerce_error)
+        return d.addBoth(record_latency).addErrback(coerce_error)
 
     def unhandledError(self, failure):
         """Terminal errback, after application code has seen the failure.
@@ -271,3 +335,71 @@ class RPCProtocol(amp.AMP, object):
             "Unhandled failure during AMP request. This is probably a bug. "
             "Please ensure that this error is handled within application "
             "code."))
+
+
+# A connection whose latency is this many times that of the fastest, and
+# is above `EJECT_LATENCY_MINIMUM` seconds, is ejected. A latency that has
+# not been updated for `EJECT_SECONDS` is forgotten, so an ejected
+# connection is given another chance after that long.
+EJECT_LATENCY_FACTOR = 5.0
+EJECT_LATENCY_MINIMUM = 1.0
+EJECT_SECONDS = 30.0
+
+
+def _recent_latency(conn, now):
+    """Return the latency of `conn`, or `None` if unknown or forgotten."""
+    latency = getattr(conn, "latency", None)
+    if latency is None:
+        return None
+    elif now - getattr(conn, "latencyAt", 0.0) >= EJECT_SECONDS:
+        return None
+    else:
+        return latency
+
+
+def _load(conn, now):
+    """Return a sort key for the load on `conn`; lower is better."""
+    latency = _recent_latency(conn, now)
+    return getattr(conn, "inFlight", 0), (0.0 if latency is None else latency)
+
+
+def select_connection(connections):
+    """Choose the least loaded of `connections`, using two random choices.
+
+    Two connections are picked at random, and the one with fewer calls in
+    flight, or lower latency when those are equal, is chosen. This "power of
+    two choices" avoids busy connections without herding every caller onto
+    the single least busy one.
+
+    Connections that are much slower than the fastest are ejected: they are
+    not chosen until their latency is forgotten, `EJECT_SECONDS` after it
+    was last updated, when they're given another chance. Connections that do
+    not track their load, i.e. are not `RPCProtocol`s, are treated as idle.
+
+    Nothing is changed on the connections, so choosing has no side-effects.
+
+    :param connections: A non-empty sequence of connections.
+    """
+    connections = list(connections)
+    if len(connections) == 1:
+        return connections[0]
+
+    now = monotonic()
+    latencies = [_recent_latency(conn, now) for conn in connections]
+    known = [latency for latency in latencies if latency is not None]
+    if len(known) == 0:
+        candidates = connections
+    else:
+        # The fastest connection is always below the threshold, so there's
+        # at least one candidate.
+        threshold = max(
+            EJECT_LATENCY_MINIMUM, min(known) * EJECT_LATENCY_FACTOR)
+        candidates = [
+            conn for conn, latency in zip(connections, latencies)
+            if latency is None or latency <= threshold
+        ]
+    if len(candidates) == 1:
+        return candidates[0]
+    else:
+        return min(
+            random.sample(candidates, 2), key=lambda conn: _load(conn, now))
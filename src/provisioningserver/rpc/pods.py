@@ -13,6 +13,7 @@ from provisioningserver.drivers.pod import (
     DiscoveredPodHints,
     get_error_message,
 )
+from provisioningserver.config import ClusterConfiguration
 from provisioningserver.drivers.pod.registry import PodDriverRegistry
 from provisioningserver.logger import (
     get_maas_logger,
@@ -24,12 +25,32 @@ from provisioningserver.rpc.exceptions import (
     UnknownPodType,
 )
 from provisioningserver.utils.twisted import asynchronous
-from twisted.internet.defer import Deferred
+from twisted.internet.defer import (
+    Deferred,
+    DeferredSemaphore,
+)
 
 
 maaslog = get_maas_logger("pod")
 log = LegacyLogger()
 
+# Limits the number of pods discovered at the same time by this rack. It is
+# created on first use; see `get_discovery_semaphore`.
+_discovery_semaphore = None
+
+
+def get_discovery_semaphore():
+    """Return the semaphore that limits concurrent pod discovery.
+
+    Its size comes from the ``pod_discovery_concurrency`` rack option.
+    """
+    global _discovery_semaphore
+    if _discovery_semaphore is None:
+        with ClusterConfiguration.open() as config:
+            tokens = config.pod_discovery_concurrency
+        _discovery_semaphore = DeferredSemaphore(tokens)
+    return _discovery_semaphore
+
 
 @asynchronous
 def discover_pod(pod_type, context, pod_id=None, name=None):
@@ -42,6 +63,12 @@ def discover_pod(pod_type, context, pod_id=None, name=None):
     pod_driver = PodDriverRegistry.get_item(pod_type)
     if pod_driver is None:
         raise UnknownPodType(pod_type)
+    return get_discovery_semaphore().run(
+        _discover_pod, pod_driver, pod_type, context, pod_id)
+
+
+def _discover_pod(pod_driver, pod_type, context, pod_id):
+    """Discover the pod with `pod_driver`; see `discover_pod`."""
     d = pod_driver.discover(pod_id, context)
     if not isinstance(d, Deferred):
         raise PodActionFail(
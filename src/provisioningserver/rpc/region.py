@@ -8,6 +8,7 @@ These are commands that a region controller ought to respond to.
 
 __all__ = [
     "Authenticate",
+    "CheckInterfaces",
     "CommissionNode",
     "CreateNode",
     "GetArchiveMirrors",
@@ -67,6 +68,8 @@ class RegisterRackController(amp.Command):
     :since: 2.0
     """
 
+    longRunning = True
+
     arguments = [
         (b"system_id", amp.Unicode(optional=True)),
         (b"hostname", amp.Unicode()),
@@ -77,11 +80,15 @@ class RegisterRackController(amp.Command):
         (b"nodegroup_uuid", amp.Unicode(optional=True)),
         (b"beacon_support", amp.Boolean(optional=True)),
         (b"version", amp.Unicode(optional=True)),
+        # The codecs the rack controller can use for large arguments.
+        (b"compression", amp.ListOf(amp.Unicode(), optional=True)),
     ]
     response = [
         (b"system_id", amp.Unicode()),
         (b"beacon_support", amp.Boolean(optional=True)),
         (b"version", amp.Unicode(optional=True)),
+        # The codec chosen by the region for large arguments.
+        (b"compression", amp.Unicode(optional=True)),
     ]
     errors = {
         CannotRegisterRackController: b"CannotRegisterRackController",
@@ -466,11 +473,35 @@ class UpdateInterfaces(amp.Command):
         (b'system_id', amp.Unicode()),
         (b'interfaces', StructureAsJSON()),
         (b'topology_hints', StructureAsJSON(optional=True)),
+        # Since 2.4: the hash of the interfaces and hints, as calculated by
+        # `get_interfaces_hash`.
+        (b'interfaces_hash', amp.Unicode(optional=True)),
     ]
     response = []
     errors = []
 
 
+class CheckInterfaces(amp.Command):
+    """Called by a rack controller to check if the region needs its interface
+    definition.
+
+    The rack controller sends only the hash of its interfaces definition and
+    topology hints. If it matches the hash of the definition the region last
+    applied there's no need to call `UpdateInterfaces`.
+
+    :since: 2.4
+    """
+
+    arguments = [
+        (b'system_id', amp.Unicode()),
+        (b'interfaces_hash', amp.Unicode()),
+    ]
+    response = [
+        (b'changed', amp.Boolean()),
+    ]
+    errors = []
+
+
 class GetDiscoveryState(amp.Command):
     """Called by a rack controller to get its interface discovery state.
 
@@ -559,6 +590,8 @@ class RequestRackRefresh(amp.Command):
     :since: 2.0
     """
 
+    longRunning = True
+
     arguments = [
         (b"system_id", amp.Unicode()),
     ]
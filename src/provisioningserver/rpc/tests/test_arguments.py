@@ -9,6 +9,7 @@ import random
 import zlib
 
 from maastesting.factory import factory
+from maastesting.matchers import MockCalledOnceWith
 from maastesting.testcase import MAASTestCase
 import netaddr
 from provisioningserver.drivers.pod import (
@@ -24,8 +25,11 @@ from provisioningserver.drivers.pod import (
 from provisioningserver.rpc import arguments
 from testtools import ExpectedException
 from testtools.matchers import (
+    Contains,
     Equals,
+    GreaterThan,
     HasLength,
+    Is,
     IsInstance,
     LessThan,
 )
@@ -160,6 +164,123 @@ class TestCompressedAmpList(MAASTestCase):
             LessThan(2 ** 16))
 
 
+class TestCompressionCodecs(MAASTestCase):
+
+    def test_zlib_is_always_supported(self):
+        self.patch(arguments, "zstandard", None)
+        self.assertThat(arguments.get_compression_codecs(), Equals(["zlib"]))
+
+    def test_prefers_zstd_when_available(self):
+        self.patch(arguments, "zstandard", object())
+        self.assertThat(
+            arguments.get_compression_codecs(), Equals(["zstd", "zlib"]))
+
+    def test_chooses_best_shared_codec(self):
+        self.patch(arguments, "zstandard", object())
+        self.assertThat(
+            arguments.choose_compression_codec(["zlib", "zstd"]),
+            Equals("zstd"))
+        self.assertThat(
+            arguments.choose_compression_codec(["lzma", "zlib"]),
+            Equals("zlib"))
+
+    def test_chooses_zlib_for_older_peers(self):
+        self.assertThat(
+            arguments.choose_compression_codec(None), Equals("zlib"))
+
+
+class TestStreamedAmpList(MAASTestCase):
+
+    def make_argument(self):
+        return arguments.StreamedAmpList(
+            [(b"ip", amp.Unicode()), (b"mac", amp.Unicode())])
+
+    def make_leases(self, count):
+        return [
+            {"ip": factory.make_ipv4_address(),
+             "mac": factory.make_mac_address()}
+            for _ in range(count)
+        ]
+
+    def round_trip(self, argument, objects, proto=None):
+        strings = amp.AmpBox()
+        argument.toBox(b"leases", strings, {"leases": objects}, proto)
+        decoded = {}
+        argument.fromBox(b"leases", strings.copy(), decoded, proto)
+        return strings, decoded["leases"]
+
+    def test_round_trip_small_list_in_one_value(self):
+        argument = self.make_argument()
+        leases = self.make_leases(5)
+        strings, decoded = self.round_trip(argument, leases)
+        self.assertThat(list(strings), Equals([b"leases"]))
+        self.assertThat(decoded, Equals(leases))
+
+    def test_small_list_is_compatible_with_CompressedAmpList(self):
+        argument = self.make_argument()
+        leases = self.make_leases(5)
+        strings, _ = self.round_trip(argument, leases)
+        compressed = arguments.CompressedAmpList(argument.subargs)
+        self.assertThat(
+            compressed.fromStringProto(strings[b"leases"], None),
+            Equals(leases))
+
+    def test_round_trip_large_list_in_chunks(self):
+        argument = self.make_argument()
+        # Random addresses don't compress well, so this is well over the
+        # AMP value limit once compressed.
+        leases = self.make_leases(10000)
+        strings, decoded = self.round_trip(argument, leases)
+        self.assertThat(decoded, Equals(leases))
+        self.assertThat(len(strings), GreaterThan(1))
+        self.assertThat(strings, Contains(b"leases.1"))
+        for value in strings.values():
+            self.assertThat(len(value), LessThan(amp.MAX_VALUE_LENGTH + 1))
+        # The whole box can be serialised without error.
+        self.assertThat(strings.serialize(), IsInstance(bytes))
+
+    def test_round_trip_empty_list(self):
+        _, decoded = self.round_trip(self.make_argument(), [])
+        self.assertThat(decoded, Equals([]))
+
+    def test_optional(self):
+        argument = arguments.StreamedAmpList(
+            [(b"ip", amp.Unicode())], optional=True)
+        strings, decoded = self.round_trip(argument, None)
+        self.assertThat(strings, Equals({}))
+        self.assertThat(decoded, Is(None))
+
+    def test_compresses_with_protocols_codec(self):
+        compressobj = self.patch(arguments.zlib, "compressobj")
+        compressobj.return_value.compress.return_value = b""
+        compressobj.return_value.flush.return_value = zlib.compress(b"")
+        proto = amp.AMP()
+        proto.compression = "zlib"
+        self.round_trip(self.make_argument(), [], proto)
+        self.assertThat(compressobj, MockCalledOnceWith())
+
+    def test_zstd_without_zstandard_is_an_error(self):
+        self.patch(arguments, "zstandard", None)
+        strings = amp.AmpBox(leases=arguments.ZSTD_MAGIC + b"...")
+        self.assertRaises(
+            ValueError, self.make_argument().fromBox,
+            b"leases", strings, {}, None)
+
+    def test_truncated_stream_is_an_error(self):
+        argument = self.make_argument()
+        leases = self.make_leases(5)
+        encoded = zlib.decompress(argument.toStringProto(leases, None))
+        truncated = zlib.compress(encoded[:-3])
+        self.assertRaises(
+            ValueError, argument.fromStringProto, truncated, None)
+
+    def test_toStringProto_rejects_large_lists(self):
+        argument = self.make_argument()
+        self.assertRaises(
+            amp.TooLong, argument.toStringProto, self.make_leases(10000),
+            None)
+
+
 class TestIPAddress(MAASTestCase):
 
     argument = arguments.IPAddress()
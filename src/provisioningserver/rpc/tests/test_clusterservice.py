@@ -87,6 +87,7 @@ from provisioningserver.rpc import (
     region,
     tags,
 )
+from provisioningserver.rpc.arguments import get_compression_codecs
 from provisioningserver.rpc.clusterservice import (
     Cluster,
     ClusterClient,
@@ -1445,6 +1446,32 @@ class TestClusterClient(MAASTestCase):
         self.assertTrue(result)
         self.assertEqual(system_id, client.localIdent)
 
+    @inlineCallbacks
+    def test_registerRackWithRegion_sets_compression(self):
+        client = self.make_running_client()
+
+        callRemote = self.patch_autospec(client, "callRemote")
+        callRemote.side_effect = always_succeed_with({
+            "system_id": "...",
+            "compression": "zstd",
+        })
+
+        result = yield client.registerRackWithRegion()
+        self.assertTrue(result)
+        self.assertEqual("zstd", client.compression)
+
+    @inlineCallbacks
+    def test_registerRackWithRegion_uses_zlib_with_older_regions(self):
+        client = self.make_running_client()
+        client.compression = "zstd"
+
+        callRemote = self.patch_autospec(client, "callRemote")
+        callRemote.side_effect = always_succeed_with({"system_id": "..."})
+
+        result = yield client.registerRackWithRegion()
+        self.assertTrue(result)
+        self.assertEqual("zlib", client.compression)
+
     @inlineCallbacks
     def test_registerRackWithRegion_calls_set_maas_id(self):
         client = self.make_running_client()
@@ -1476,7 +1503,8 @@ class TestClusterClient(MAASTestCase):
                 protocol, system_id='', hostname=hostname,
                 interfaces=interfaces, url=urlparse(maas_url),
                 nodegroup_uuid=None, beacon_support=True,
-                version=get_maas_version()))
+                version=get_maas_version(),
+                compression=get_compression_codecs()))
         # Clear cache for the next test
         set_maas_id(None)
 
@@ -1531,7 +1559,8 @@ class TestClusterClient(MAASTestCase):
                 protocol, system_id='', hostname=hostname,
                 interfaces=interfaces, url=urlparse(maas_url),
                 nodegroup_uuid=None, beacon_support=True,
-                version=get_maas_version()))
+                version=get_maas_version(),
+                compression=get_compression_codecs()))
 
 
 class TestClusterProtocol_ListSupportedArchitectures(MAASTestCase):
@@ -2486,7 +2515,7 @@ class TestClusterProtocol_ScanNetworks(
             mock_maybeDeferred, MockCalledOnceWith(
                 clusterservice.executeScanNetworksSubprocess,
                 cidrs=None, force_ping=None, interface=None, scan_all=True,
-                slow=None, threads=None))
+                slow=None, threads=None, rate=None))
 
     def test_get_scan_all_networks_args_asserts_for_invalid_config(self):
         with ExpectedException(AssertionError, "Invalid scan parameters.*"):
@@ -2530,16 +2559,19 @@ class TestClusterProtocol_ScanNetworks(
 
     def test_get_scan_all_networks_with_all_optional_arguments(self):
         threads = random.randint(1, 10)
+        rate = random.randint(1, 1000)
         args = get_scan_all_networks_args(
             scan_all=False, slow=True, threads=threads, force_ping=True,
             interface='eth0', cidrs=[
-                IPNetwork('192.168.0.0/24'), IPNetwork('192.168.1.0/24')])
+                IPNetwork('192.168.0.0/24'), IPNetwork('192.168.1.0/24')],
+            rate=rate)
         self.assertThat(args, Equals([
             get_maas_common_command().encode('utf-8'),
             b'scan-network',
             b'--threads', str(threads).encode('utf-8'),
             b'--ping',
             b'--slow',
+            b'--rate', str(rate).encode('utf-8'),
             b'eth0',
             b'192.168.0.0/24',
             b'192.168.1.0/24'
@@ -21,7 +21,10 @@ from maastesting.twisted import (
     extract_result,
     TwistedLoggerFixture,
 )
-from provisioningserver.rpc import common
+from provisioningserver.rpc import (
+    cluster,
+    common,
+)
 from provisioningserver.rpc.testing.doubles import (
     DummyConnection,
     FakeConnection,
@@ -158,6 +161,116 @@ class TestRPCProtocol(MAASTestCase):
         self.assertThat(protocol.onConnectionLost, IsFiredDeferred())
 
 
+class TestRPCProtocol_LoadTracking(MAASTestCase):
+
+    def test_tracks_calls_in_flight_and_their_latency(self):
+        self.patch(common, "monotonic").side_effect = [10.0, 12.5]
+        protocol = common.RPCProtocol()
+        protocol.makeConnection(StringTransport())
+        d = protocol.callRemote(common.Identify)
+        self.assertThat(protocol.inFlight, Equals(1))
+        self.assertThat(protocol.latency, Is(None))
+        protocol.ampBoxReceived(amp.AmpBox(_answer=b"1", ident=b"ident"))
+        self.assertThat(extract_result(d), Equals({"ident": "ident"}))
+        self.assertThat(protocol.inFlight, Equals(0))
+        self.assertThat(protocol.latency, Equals(2.5))
+        self.assertThat(protocol.latencyAt, Equals(12.5))
+
+    def test_latency_is_a_moving_average(self):
+        protocol = common.RPCProtocol()
+        protocol.latency = 1.0
+        protocol.latencyAt = 2.0
+        protocol.inFlight = 1
+        self.patch(common, "monotonic").return_value = 3.0
+        self.assertThat(
+            protocol._callRemoteDone(sentinel.result, common.Identify, 1.0),
+            Is(sentinel.result))
+        self.assertThat(protocol.latency, Equals(1.2))
+
+    def test_latency_starts_afresh_once_forgotten(self):
+        protocol = common.RPCProtocol()
+        protocol.latency = 10.0
+        protocol.latencyAt = 2.0
+        protocol.inFlight = 1
+        self.patch(common, "monotonic").return_value = 40.0
+        protocol._callRemoteDone(None, common.Identify, 39.0)
+        self.assertThat(protocol.latency, Equals(1.0))
+
+    def test_long_running_commands_do_not_count_towards_latency(self):
+        protocol = common.RPCProtocol()
+        protocol.latency = 1.0
+        protocol.inFlight = 1
+        self.patch(common, "monotonic").return_value = 100.0
+        protocol._callRemoteDone(None, cluster.ScanNetworks, 1.0)
+        self.assertThat(protocol.inFlight, Equals(0))
+        self.assertThat(protocol.latency, Equals(1.0))
+        self.assertThat(protocol.latencyAt, Equals(0.0))
+
+
+class TestSelectConnection(MAASTestCase):
+    """Tests for `common.select_connection`."""
+
+    def setUp(self):
+        super(TestSelectConnection, self).setUp()
+        self.monotonic = self.patch(common, "monotonic")
+        self.monotonic.return_value = 100.0
+
+    def make_protocol(self, inFlight=0, latency=None):
+        protocol = common.RPCProtocol()
+        protocol.inFlight = inFlight
+        protocol.latency = latency
+        protocol.latencyAt = 100.0
+        return protocol
+
+    def test__returns_only_connection(self):
+        conn = DummyConnection()
+        self.assertThat(common.select_connection([conn]), Is(conn))
+
+    def test__prefers_fewer_calls_in_flight(self):
+        busy = self.make_protocol(inFlight=5, latency=0.01)
+        idle = self.make_protocol(inFlight=0, latency=0.1)
+        for _ in range(10):
+            self.assertThat(
+                common.select_connection([busy, idle]), Is(idle))
+
+    def test__prefers_lower_latency_when_equally_busy(self):
+        slower = self.make_protocol(inFlight=1, latency=0.2)
+        faster = self.make_protocol(inFlight=1, latency=0.1)
+        self.assertThat(
+            common.select_connection([slower, faster]), Is(faster))
+
+    def test__ejects_slow_connections_until_their_latency_is_forgotten(self):
+        fast = [self.make_protocol(latency=0.1) for _ in range(2)]
+        slow = self.make_protocol(latency=common.EJECT_LATENCY_MINIMUM * 10)
+        conns = fast + [slow]
+        for _ in range(10):
+            self.assertThat(common.select_connection(conns), Not(Is(slow)))
+        # Once its latency is forgotten it is chosen again.
+        self.monotonic.return_value = slow.latencyAt + common.EJECT_SECONDS
+        for conn in fast:
+            conn.latencyAt = self.monotonic.return_value
+        self.patch(common.random, "sample").return_value = [fast[0], slow]
+        self.assertThat(common.select_connection(conns), Is(slow))
+
+    def test__does_not_change_connections(self):
+        fast = self.make_protocol(latency=0.1)
+        slow = self.make_protocol(latency=common.EJECT_LATENCY_MINIMUM * 10)
+        before = [vars(conn).copy() for conn in (fast, slow)]
+        common.select_connection([fast, slow])
+        self.assertThat(
+            [vars(conn) for conn in (fast, slow)], Equals(before))
+
+    def test__does_not_eject_connections_faster_than_minimum(self):
+        fast = self.make_protocol(latency=0.001)
+        slow = self.make_protocol(latency=common.EJECT_LATENCY_MINIMUM / 2)
+        self.patch(common.random, "sample").return_value = [slow, slow]
+        self.assertThat(common.select_connection([fast, slow]), Is(slow))
+
+    def test__treats_untracked_connections_as_idle(self):
+        conns = [DummyConnection(), DummyConnection()]
+        self.assertIn(common.select_connection(conns), conns)
+
+
 class TestRPCProtocol_UnhandledErrorsWhenHandlingResponses(MAASTestCase):
 
     answer_seq = b"%d" % random.randrange(0, 2 ** 32)
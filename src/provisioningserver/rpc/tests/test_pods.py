@@ -27,8 +27,11 @@ from provisioningserver.rpc import (
     exceptions,
     pods,
 )
+from provisioningserver.testing.config import ClusterConfigurationFixture
 from testtools import ExpectedException
 from twisted.internet.defer import (
+    Deferred,
+    DeferredSemaphore,
     fail,
     inlineCallbacks,
     succeed,
@@ -134,6 +137,43 @@ class TestDiscoverPod(MAASTestCase):
             yield pods.discover_pod(fake_driver.name, {})
 
 
+class TestDiscoverPodConcurrency(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def setUp(self):
+        super(TestDiscoverPodConcurrency, self).setUp()
+        self.patch(pods, "_discovery_semaphore", None)
+
+    def test_semaphore_size_comes_from_configuration(self):
+        self.useFixture(
+            ClusterConfigurationFixture(pod_discovery_concurrency=3))
+        semaphore = pods.get_discovery_semaphore()
+        self.assertEquals(3, semaphore.limit)
+        self.assertIs(semaphore, pods.get_discovery_semaphore())
+
+    def test_limits_concurrent_discovery(self):
+        self.patch(pods, "_discovery_semaphore", DeferredSemaphore(1))
+        discoveries = [Deferred(), Deferred()]
+        fake_driver = MagicMock()
+        fake_driver.name = factory.make_name("pod")
+        fake_driver.discover.side_effect = discoveries
+        self.patch(
+            PodDriverRegistry, "get_item").return_value = fake_driver
+        discovered_pod = DiscoveredPod(
+            architectures=[], cores=1, cpu_speed=1000, memory=1024,
+            local_storage=0, hints=DiscoveredPodHints(
+                cores=1, cpu_speed=1000, memory=1024, local_storage=0),
+            machines=[])
+        pods.discover_pod(fake_driver.name, {})
+        pods.discover_pod(fake_driver.name, {})
+        # Only the first discovery has started.
+        self.assertEquals(1, fake_driver.discover.call_count)
+        discoveries[0].callback(discovered_pod)
+        self.assertEquals(2, fake_driver.discover.call_count)
+        discoveries[1].callback(discovered_pod)
+
+
 class TestComposeMachine(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
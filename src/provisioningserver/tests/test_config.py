@@ -12,6 +12,7 @@ from operator import (
     setitem,
 )
 import os.path
+import random
 import sqlite3
 from unittest.mock import sentinel
 from uuid import uuid4
@@ -650,6 +651,24 @@ class TestClusterConfiguration(MAASTestCase):
         # It's also stored in the configuration database.
         self.assertEqual({"tftp_root": example_dir}, config.store)
 
+    def test_default_pod_discovery_concurrency(self):
+        config = ClusterConfiguration({})
+        self.assertEqual(4, config.pod_discovery_concurrency)
+
+    def test_set_and_get_pod_discovery_concurrency(self):
+        config = ClusterConfiguration({})
+        example_concurrency = random.randint(1, 20)
+        config.pod_discovery_concurrency = example_concurrency
+        self.assertEqual(example_concurrency, config.pod_discovery_concurrency)
+        # It's also stored in the configuration database.
+        self.assertEqual(
+            {"pod_discovery_concurrency": example_concurrency}, config.store)
+
+    def test_pod_discovery_concurrency_must_be_positive(self):
+        config = ClusterConfiguration({})
+        with ExpectedException(formencode.api.Invalid):
+            config.pod_discovery_concurrency = 0
+
     def test_default_cluster_uuid(self):
         config = ClusterConfiguration({})
         self.assertIsNone(config.cluster_uuid)
@@ -46,6 +46,7 @@ from provisioningserver.rackdservices.tftp import (
 )
 from provisioningserver.rackdservices.tftp_offload import TFTPOffloadService
 from provisioningserver.testing.config import ClusterConfigurationFixture
+from provisioningserver.utils.metrics import MetricsResource
 from provisioningserver.utils.twisted import reducedWebLogFormatter
 from testtools.matchers import (
     AfterPreprocessing,
@@ -218,6 +219,8 @@ class TestProvisioningServiceMaker(MAASTestCase):
             resource_root = FilePath(config.tftp_root)
 
         self.assertEqual(resource_root, root)
+        metrics = resource.getChildWithDefault(b"metrics", request=None)
+        self.assertThat(metrics, IsInstance(MetricsResource))
 
     def test_lease_socket_service(self):
         options = Options()
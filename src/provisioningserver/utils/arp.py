@@ -9,7 +9,10 @@ __all__ = [
     "run"
 ]
 
-from collections import namedtuple
+from collections import (
+    namedtuple,
+    OrderedDict,
+)
 from datetime import datetime
 import json
 import os
@@ -27,7 +30,9 @@ from provisioningserver.path import get_path
 from provisioningserver.utils import sudo
 from provisioningserver.utils.ethernet import (
     Ethernet,
+    ETHERNET_HEADER_LEN,
     ETHERTYPE,
+    VLAN_HEADER_LEN,
 )
 from provisioningserver.utils.network import (
     bytes_to_int,
@@ -62,6 +67,16 @@ ARPPacket = namedtuple('ARPPacket', (
 
 SIZEOF_ARP_PACKET = 28
 
+# Definitions used with `struct` to decode ARP packets in place, within a
+# block of PCAP output; see `decode_arp_bindings`. Starting at the Ethernet
+# header's Ethertype: the Ethertype, then (in 802.1q frames) the VLAN tag and
+# the encapsulated frame's Ethertype.
+ETHERNET_TYPE_AND_VLAN_TAG = struct.Struct('!2sH2s')
+ARP_FIELDS = struct.Struct('!HHBBH6s4s6s4s')
+
+NULL_MAC = b'\0' * 6
+NULL_IP = b'\0' * 4
+
 
 class ARP_OPERATION:
     """Enumeration to represent ARP operation types."""
@@ -277,6 +292,104 @@ def update_bindings_and_get_event(bindings, vid, ip, mac, time):
             event="NEW", vid=vid)
 
 
+def decode_arp_bindings(block, packets):
+    """Yields each (MAC, IP) binding found in a block of PCAP output.
+
+    This is equivalent to decoding each packet with `Ethernet` and `ARP` and
+    calling `ARP.bindings`, but the packets are decoded in place, without
+    making objects for them, so that it keeps up with busy networks.
+
+    :param block: A block of PCAP output, as returned by `PCAP.read_block`.
+    :param packets: The packets in the block, as returned by
+        `PCAP.read_block`.
+    :return: An iterator of (vid, ip, mac, time) tuples, where ip and mac
+        are the addresses as `bytes`, vid is the 802.1q VLAN ID (or None if
+        untagged), and time is the timestamp of the packet.
+    """
+    unpack_ethernet = ETHERNET_TYPE_AND_VLAN_TAG.unpack_from
+    unpack_arp = ARP_FIELDS.unpack_from
+    untagged_length = ETHERNET_HEADER_LEN + SIZEOF_ARP_PACKET
+    tagged_length = untagged_length + VLAN_HEADER_LEN
+    for (time, _, length, _), offset in packets:
+        if length < untagged_length:
+            # Ignore truncated packets.
+            continue
+        ethertype, tag, inner_ethertype = unpack_ethernet(
+            block, offset + ETHERNET_HEADER_LEN - 2)
+        if ethertype == ETHERTYPE.VLAN:
+            if length < tagged_length:
+                continue
+            # The VLAN is the lower 12 bits; the upper 4 bits are for QoS.
+            vid = tag & 0xFFF
+            ethertype = inner_ethertype
+            offset += ETHERNET_HEADER_LEN + VLAN_HEADER_LEN
+        else:
+            vid = None
+            offset += ETHERNET_HEADER_LEN
+        if ethertype != ETHERTYPE.ARP:
+            continue
+        (hardware_type, protocol, hardware_length, protocol_length, operation,
+         sender_mac, sender_ip, target_mac, target_ip) = unpack_arp(
+            block, offset)
+        # Only (Ethernet MAC, IPv4) bindings are supported; see
+        # `ARP.is_valid`.
+        if (hardware_type != 1 or protocol != 0x800 or
+                hardware_length != 6 or protocol_length != 4):
+            continue
+        if operation in (ARP_OPERATION.REQUEST, ARP_OPERATION.REPLY):
+            if sender_ip != NULL_IP and sender_mac != NULL_MAC:
+                yield vid, sender_ip, sender_mac, time
+        if operation == ARP_OPERATION.REPLY:
+            if target_ip != NULL_IP and target_mac != NULL_MAC:
+                yield vid, target_ip, target_mac, time
+
+
+def update_bindings_and_get_events(bindings, observed):
+    """Update the specified bindings dictionary with a batch of bindings and
+    return a list of the resulting events.
+
+    This is the batch equivalent of `update_bindings_and_get_event`, for
+    bindings as yielded by `decode_arp_bindings`. The bindings dictionary is
+    keyed on (vid, ip) with the addresses as `bytes`, so addresses are only
+    formatted for the events returned.
+
+    Events are deduplicated: at most one event is returned for each
+    (vid, ip, mac) in the batch, the latest, in the order they occurred.
+    """
+    events = OrderedDict()
+    for vid, ip, mac, time in observed:
+        binding = bindings.get((vid, ip))
+        if binding is None:
+            bindings[(vid, ip)] = {'mac': mac, 'time': time}
+            event = "NEW", None, time
+        elif binding['mac'] != mac:
+            event = "MOVED", binding['mac'], time
+            binding['mac'] = mac
+            binding['time'] = time
+        elif time - binding['time'] >= SEEN_AGAIN_THRESHOLD:
+            binding['time'] = time
+            event = "REFRESHED", None, time
+        else:
+            continue
+        events.pop((vid, ip, mac), None)
+        events[(vid, ip, mac)] = event
+    return [
+        make_binding_event(vid, ip, mac, event, previous_mac, time)
+        for (vid, ip, mac), (event, previous_mac, time) in events.items()
+    ]
+
+
+def make_binding_event(vid, ip, mac, event, previous_mac, time):
+    """Return an event, as for `update_bindings_and_get_event`, for a binding
+    with addresses given as `bytes`."""
+    event = dict(
+        ip=str(IPAddress(bytes_to_int(ip))), mac=format_eui(
+            EUI(bytes_to_int(mac))), time=time, event=event, vid=vid)
+    if previous_mac is not None:
+        event['previous_mac'] = format_eui(EUI(bytes_to_int(previous_mac)))
+    return event
+
+
 def update_and_print_bindings(bindings, arp, out=sys.stdout):
     """Update the specified bindings dictionary with the given ARP packet.
 
@@ -295,6 +408,10 @@ def observe_arp_packets(
         verbose=False, bindings=False, input=sys.stdin.buffer,
         output=sys.stdout):
     """Read stdin and look for tcpdump binary ARP output.
+
+    Unless verbose, packets are decoded a block at a time with
+    `decode_arp_bindings`, and the events for each block are written together.
+
     :param verbose: Output text-based ARP packet details.
     :type verbose: bool
     :param bindings: Track (MAC, IP) bindings, and print new/update bindings.
@@ -314,6 +431,19 @@ def observe_arp_packets(
             # Not an Ethernet interface. Need to exit here, because our
             # assumptions about the link layer header won't be correct.
             return 4
+        if not verbose:
+            # Decode the capture a block at a time, and write the events
+            # found in each block all at once.
+            for block, packets in pcap.iter_blocks():
+                if bindings is None:
+                    continue
+                events = update_bindings_and_get_events(
+                    bindings, decode_arp_bindings(block, packets))
+                if len(events) != 0:
+                    output.write("".join(
+                        "%s\n" % json.dumps(event) for event in events))
+                    output.flush()
+            return None
         for header, packet in pcap:
             ethernet = Ethernet(packet, time=header.timestamp_seconds)
             if not ethernet.is_valid():
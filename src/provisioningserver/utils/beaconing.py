@@ -45,6 +45,7 @@ from provisioningserver.utils.network import format_eui
 from provisioningserver.utils.pcap import (
     PCAP,
     PCAPError,
+    PCAPPacketHeader,
 )
 from provisioningserver.utils.script import ActionScriptError
 from provisioningserver.utils.tcpip import (
@@ -287,9 +288,22 @@ def observe_beaconing_packets(input=sys.stdin.buffer, out=sys.stdout):
             # Not an Ethernet interface. Need to exit here, because our
             # assumptions about the link layer header won't be correct.
             return 4
-        for pcap_header, packet_bytes in pcap:
-            try:
-                packet = decode_ethernet_udp_packet(packet_bytes, pcap_header)
+        # Read the capture a block at a time, and write the beacons found in
+        # each block all at once.
+        for block, packets in pcap.iter_blocks():
+            lines = []
+            for header, offset in packets:
+                pcap_header = PCAPPacketHeader._make(header)
+                packet_bytes = block[
+                    offset:offset + pcap_header.bytes_captured]
+                try:
+                    packet = decode_ethernet_udp_packet(
+                        packet_bytes, pcap_header)
+                except PacketProcessingError as e:
+                    err.write(e.error)
+                    err.write("\n")
+                    err.flush()
+                    continue
                 beacon = BeaconingPacket(packet.payload)
                 if not beacon.valid:
                     continue
@@ -306,13 +320,11 @@ def observe_beaconing_packets(input=sys.stdin.buffer, out=sys.stdout):
                     output_json["vid"] = packet.l2.vid
                 if beacon.data is not None:
                     output_json.update(beacon_to_json(beacon.data))
-                out.write(json.dumps(output_json))
-                out.write('\n')
+                lines.append(json.dumps(output_json))
+                lines.append('\n')
+            if len(lines) != 0:
+                out.write("".join(lines))
                 out.flush()
-            except PacketProcessingError as e:
-                err.write(e.error)
-                err.write("\n")
-                err.flush()
     except EOFError:
         # Capture aborted before it could even begin. Note that this does not
         # occur if the end-of-stream occurs normally. (In that case, the
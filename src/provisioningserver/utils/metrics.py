@@ -0,0 +1,363 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Metrics for MAAS's hot paths, exposed in Prometheus's text format.
+
+Metrics are registered in `METRICS` -- the registry for this process -- by
+the modules that update them, usually at import time::
+
+  POWER_QUERY_SECONDS = METRICS.histogram(
+      "maas_power_query_seconds", "Time taken by power queries.",
+      labels=["driver"])
+
+  POWER_QUERY_SECONDS.labels("ipmi").observe(elapsed)
+
+Each regiond and rackd process has its own registry. `MetricsResource`
+serves a registry over HTTP, in the format documented at
+https://prometheus.io/docs/instrumenting/exposition_formats/.
+
+"""
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "METRICS",
+    "MetricsRegistry",
+    "MetricsResource",
+]
+
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from time import monotonic
+
+from twisted.web.resource import Resource
+
+
+# Bucket upper bounds, in seconds, suitable for most latencies.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+    1.0, 2.5, 5.0, 7.5, 10.0, 30.0, 60.0,
+)
+
+
+def format_value(value):
+    """Format `value` as a Prometheus sample value."""
+    if value == float("inf"):
+        return "+Inf"
+    elif value == float("-inf"):
+        return "-Inf"
+    elif isinstance(value, int):
+        return str(value)
+    else:
+        return repr(float(value))
+
+
+def format_labels(labels):
+    """Format `labels`, a sequence of name/value pairs.
+
+    :return: A string like ``{name="value",...}``, or the empty string when
+        there are no labels.
+    """
+    if len(labels) == 0:
+        return ""
+    else:
+        return "{%s}" % ",".join(
+            '%s="%s"' % (
+                name, str(value).replace("\\", "\\\\").replace(
+                    "\n", "\\n").replace('"', '\\"'))
+            for name, value in labels)
+
+
+class Timer:
+    """Observe elapsed time in a histogram.
+
+    Use as a context manager or as a function decorator.
+    """
+
+    def __init__(self, observe):
+        super(Timer, self).__init__()
+        self._observe = observe
+
+    def __enter__(self):
+        self._started = monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._observe(monotonic() - self._started)
+
+    def __call__(self, func):
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with Timer(self._observe):
+                return func(*args, **kwargs)
+        return timed
+
+
+class CounterValue:
+    """A counter for one combination of label values."""
+
+    def __init__(self):
+        super(CounterValue, self).__init__()
+        self._lock = Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name + "_total", labels, self.value
+
+
+class GaugeValue:
+    """A gauge for one combination of label values."""
+
+    def __init__(self):
+        super(GaugeValue, self).__init__()
+        self._lock = Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class HistogramValue:
+    """A histogram for one combination of label values."""
+
+    def __init__(self, buckets):
+        super(HistogramValue, self).__init__()
+        self._lock = Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Time something; see `Timer`."""
+        return Timer(self.observe)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        bounds = self.buckets + (float("inf"),)
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            yield (
+                name + "_bucket", labels + (("le", format_value(bound)),),
+                cumulative)
+        yield name + "_sum", labels, total
+        yield name + "_count", labels, cumulative
+
+
+class Metric:
+    """A named metric, optionally partitioned by labels.
+
+    A metric without labels can be updated directly. Otherwise call `labels`
+    to get the value for one combination of label values and update that.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        super(Metric, self).__init__()
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = OrderedDict()
+        self._lock = Lock()
+
+    def _make_value(self):
+        raise NotImplementedError()
+
+    def labels(self, *values, **kwvalues):
+        """Return the value for the given label values.
+
+        Pass values positionally, in the order the labels were declared, or
+        by keyword, but not both.
+        """
+        if len(kwvalues) != 0:
+            if len(values) != 0:
+                raise ValueError(
+                    "Pass label values positionally or by keyword, not both.")
+            if set(kwvalues) != set(self.label_names):
+                values = None
+            else:
+                values = tuple(kwvalues[name] for name in self.label_names)
+        if values is None or len(values) != len(self.label_names):
+            raise ValueError("%s has labels: %s." % (
+                self.name, ", ".join(self.label_names)))
+        values = tuple(str(value) for value in values)
+        try:
+            return self._values[values]
+        except KeyError:
+            with self._lock:
+                return self._values.setdefault(values, self._make_value())
+
+    def _unlabelled(self):
+        if len(self.label_names) != 0:
+            raise ValueError(
+                "%s has labels; call labels() first." % self.name)
+        return self.labels()
+
+    def samples(self):
+        """Generate ``(name, labels, value)`` tuples for this metric."""
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            labels = tuple(zip(self.label_names, label_values))
+            yield from value.samples(self.name, labels)
+
+    def render(self):
+        """Generate lines of the text exposition format for this metric."""
+        yield "# HELP %s %s" % (
+            self.name, self.documentation.replace(
+                "\\", "\\\\").replace("\n", "\\n"))
+        yield "# TYPE %s %s" % (self.name, self.type)
+        for name, labels, value in self.samples():
+            yield "%s%s %s" % (
+                name, format_labels(labels), format_value(value))
+
+
+class Counter(Metric):
+    """A count that only goes up, e.g. of retried transactions."""
+
+    type = "counter"
+
+    def _make_value(self):
+        return CounterValue()
+
+    def inc(self, amount=1):
+        self._unlabelled().inc(amount)
+
+
+class Gauge(Metric):
+    """A value that goes up and down, e.g. the length of a queue."""
+
+    type = "gauge"
+
+    def _make_value(self):
+        return GaugeValue()
+
+    def inc(self, amount=1):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount=1):
+        self._unlabelled().dec(amount)
+
+    def set(self, value):
+        self._unlabelled().set(value)
+
+
+class Histogram(Metric):
+    """A distribution of observations, e.g. of latencies, in buckets."""
+
+    type = "histogram"
+
+    def __init__(
+            self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _make_value(self):
+        return HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+
+class MetricsRegistry:
+    """A collection of metrics, rendered together."""
+
+    def __init__(self):
+        super(MetricsRegistry, self).__init__()
+        self._metrics = OrderedDict()
+        self._lock = Lock()
+
+    def register(self, metric):
+        """Register `metric`.
+
+        If a metric of the same name, type, and labels is already registered
+        then that is returned instead, so modules can be reloaded safely.
+
+        :return: The registered metric.
+        """
+        with self._lock:
+            existing = self._metrics.setdefault(metric.name, metric)
+        if existing is not metric and (
+                type(existing) is not type(metric) or
+                existing.label_names != metric.label_names):
+            raise ValueError(
+                "A different metric named %s is already registered." % (
+                    metric.name))
+        return existing
+
+    def counter(self, name, documentation, labels=()):
+        """Register and return a new `Counter`."""
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        """Register and return a new `Gauge`."""
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+            self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """Register and return a new `Histogram`."""
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name):
+        """Return the metric registered as `name`, or `None`."""
+        return self._metrics.get(name)
+
+    def render(self):
+        """Render all metrics in Prometheus's text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.append("")
+        return "\n".join(lines)
+
+
+# The metrics for this process.
+METRICS = MetricsRegistry()
+
+
+class MetricsResource(Resource):
+    """Serve a `MetricsRegistry` in Prometheus's text exposition format."""
+
+    isLeaf = True
+
+    def __init__(self, registry=METRICS):
+        super(MetricsResource, self).__init__()
+        self.registry = registry
+
+    def render_GET(self, request):
+        request.setHeader(
+            b"Content-Type", b"text/plain; version=0.0.4; charset=utf-8")
+        return self.registry.render().encode("utf-8")
@@ -9,6 +9,7 @@ __all__ = [
     'find_mac_via_arp',
     'get_all_addresses_for_interface',
     'get_all_interface_addresses',
+    'get_interfaces_hash',
     'is_loopback_address',
     'make_network',
     'reverseResolve',
@@ -17,10 +18,15 @@ __all__ = [
     'resolves_to_loopback_address',
     'intersect_iprange',
     'ip_range_within_network',
+    'split_network',
 ]
 
+from bisect import bisect_right
 import codecs
 from collections import namedtuple
+import hashlib
+from heapq import merge
+import json
 from operator import attrgetter
 import re
 import socket
@@ -136,6 +142,15 @@ class MAASIPRange(IPRange):
             purpose = {purpose}
         self.purpose = purpose
 
+    def __getstate__(self):
+        # IPRange pickles only its bounds; keep the flags and purpose too.
+        return super(MAASIPRange, self).__getstate__() + (
+            self.flags, self.purpose)
+
+    def __setstate__(self, state):
+        super(MAASIPRange, self).__setstate__(state[:3])
+        self.flags, self.purpose = state[3:]
+
     def __str__(self):
         range_str = str(IPAddress(self.first))
         if not self.first == self.last:
@@ -180,18 +195,19 @@ def _combine_overlapping_maasipranges(
     previous_min = None
     previous_max = None
     for item in ranges:
+        item_first, item_last = item.first, item.last
         if previous_min is not None and previous_max is not None:
             # Check for an overlapping range.
-            min_overlaps = previous_min <= item.first <= previous_max
-            max_overlaps = previous_min <= item.last <= previous_max
+            min_overlaps = previous_min <= item_first <= previous_max
+            max_overlaps = previous_min <= item_last <= previous_max
             if min_overlaps or max_overlaps:
                 previous = new_ranges.pop()
+                item_first = min(item_first, previous_min)
+                item_last = max(item_last, previous_max)
                 item = make_iprange(
-                    min(item.first, previous_min),
-                    max(item.last, previous_max),
-                    previous.purpose | item.purpose)
-        previous_min = item.first
-        previous_max = item.last
+                    item_first, item_last, previous.purpose | item.purpose)
+        previous_min = item_first
+        previous_max = item_last
         new_ranges.append(item)
     return new_ranges
 
@@ -209,16 +225,18 @@ def _coalesce_adjacent_purposes(
     previous_last = None
     previous_purpose = None
     for item in ranges:
+        item_first, item_last = item.first, item.last
         if previous_purpose is not None and previous_last is not None:
             adjacent_and_identical = (
-                item.first == (previous_last + 1) and
+                item_first == (previous_last + 1) and
                 item.purpose == previous_purpose
             )
             if adjacent_and_identical:
                 new_ranges.pop()
-                item = make_iprange(previous_first, item.last, item.purpose)
-        previous_first = item.first
-        previous_last = item.last
+                item_first = previous_first
+                item = make_iprange(item_first, item_last, item.purpose)
+        previous_first = item_first
+        previous_last = item_last
         previous_purpose = item.purpose
         new_ranges.append(item)
     return new_ranges
@@ -234,7 +252,8 @@ def _normalize_ipranges(ranges: Iterable) -> List[MAASIPRange]:
         if not isinstance(item, MAASIPRange):
             item = MAASIPRange(item)
         new_ranges.append(item)
-    return sorted(new_ranges)
+    # Compute each range's sort key once, rather than twice per comparison.
+    return sorted(new_ranges, key=IPRange.sort_key)
 
 
 class IPRangeStatistics:
@@ -258,17 +277,26 @@ class IPRangeStatistics:
         self.largest_available = 0
         self.suggested_gateway = None
         self.suggested_dynamic_range = None
-        for range in full_maasipset.ranges:
-            if IPRANGE_TYPE.UNUSED in range.purpose:
-                self.num_available += range.num_addresses
-                if range.num_addresses > self.largest_available:
-                    self.largest_available = range.num_addresses
+        # Tally the addresses, and look for the purposes that suggestions
+        # depend on, in one pass over the set's bounds.
+        has_gateway = has_dynamic = False
+        for range, first, last in zip(
+                full_maasipset.ranges, full_maasipset.firsts,
+                full_maasipset.lasts):
+            purpose = range.purpose
+            num_addresses = last - first + 1
+            if IPRANGE_TYPE.UNUSED in purpose:
+                self.num_available += num_addresses
+                if num_addresses > self.largest_available:
+                    self.largest_available = num_addresses
             else:
-                self.num_unavailable += range.num_addresses
+                self.num_unavailable += num_addresses
+            has_gateway = has_gateway or IPRANGE_TYPE.GATEWAY_IP in purpose
+            has_dynamic = has_dynamic or IPRANGE_TYPE.DYNAMIC in purpose
         self.total_addresses = self.num_available + self.num_unavailable
-        if not self.ranges.includes_purpose(IPRANGE_TYPE.GATEWAY_IP):
+        if not has_gateway:
             self.suggested_gateway = self.get_recommended_gateway()
-        if not self.ranges.includes_purpose(IPRANGE_TYPE.DYNAMIC):
+        if not has_dynamic:
             self.suggested_dynamic_range = self.get_recommended_dynamic_range()
 
     def get_recommended_gateway(self):
@@ -404,6 +432,13 @@ class IPRangeStatistics:
 
 
 class MAASIPSet(set):
+    """A set of non-overlapping `MAASIPRange`s.
+
+    The ranges are kept in order in the `ranges` list, alongside lists of
+    the integer bounds of each range, `firsts` and `lasts`. Addresses and
+    ranges are found by bisecting `firsts`, so lookups take logarithmic
+    time, and `netaddr` objects are not consulted for each comparison.
+    """
 
     def __init__(self, ranges, cidr=None):
         self.cidr = cidr
@@ -411,26 +446,63 @@ class MAASIPSet(set):
         self._condense()
         super().__init__(set(self.ranges))
 
-    def _condense(self):
+    @classmethod
+    def _from_condensed(cls, ranges, cidr):
+        """Return a `MAASIPSet` of `ranges` that are already condensed."""
+        ipset = cls.__new__(cls)
+        ipset.cidr = cidr
+        ipset.ranges = ranges
+        ipset.firsts = [item.first for item in ranges]
+        ipset.lasts = [item.last for item in ranges]
+        set.__init__(ipset, ranges)
+        return ipset
+
+    def __reduce__(self):
+        # Don't condense the ranges again when unpickling.
+        return self._from_condensed, (self.ranges, self.cidr)
+
+    def _condense(self, presorted=False):
         """Condenses the `ranges` ivar in this `MAASIPSet` by:
 
         (1) Ensuring range set is is sorted list of MAASIPRange objects.
         (2) De-duplicate set by combining overlapping IP ranges.
         (3) Combining adjacent ranges with an identical purpose.
+
+        Then records the bounds of each range in `firsts` and `lasts`.
+
+        :param presorted: The ranges are already a sorted list of
+            `MAASIPRange` objects.
         """
-        self.ranges = _normalize_ipranges(self.ranges)
+        if not presorted:
+            self.ranges = _normalize_ipranges(self.ranges)
         self.ranges = _combine_overlapping_maasipranges(self.ranges)
         self.ranges = _coalesce_adjacent_purposes(self.ranges)
+        self.firsts = [item.first for item in self.ranges]
+        self.lasts = [item.last for item in self.ranges]
 
     def __ior__(self, other):
         """Return self |= other."""
-        self.ranges.extend(list(other.ranges))
-        self._condense()
+        if isinstance(other, MAASIPSet):
+            # Both sets of ranges are already sorted; merge rather than sort.
+            self.ranges = list(merge(
+                self.ranges, other.ranges, key=IPRange.sort_key))
+            self._condense(presorted=True)
+        else:
+            self.ranges.extend(list(other.ranges))
+            self._condense()
         # Replace the underlying set with the new ranges.
         super().clear()
         super().__ior__(set(self.ranges))
         return self
 
+    def _find_index(self, first, last) -> Optional[int]:
+        """Returns the index of the range containing the addresses from
+        `first` to `last` (inclusive), or None if there isn't one."""
+        index = bisect_right(self.firsts, first) - 1
+        if index >= 0 and last <= self.lasts[index]:
+            return index
+        return None
+
     def find(self, search) -> Optional[MAASIPRange]:
         """Searches the list of IPRange objects until it finds the specified
         search parameter, and returns the range it belongs to if found.
@@ -439,23 +511,19 @@ class MAASIPSet(set):
         within that range.)
         """
         if isinstance(search, IPRange):
-            for item in self.ranges:
-                if (item.first <= search.first <= item.last and
-                        item.first <= search.last <= item.last):
-                    return item
+            first, last = search.first, search.last
         else:
-            addr = IPAddress(search)
-            addr = int(addr)
-            for item in self.ranges:
-                if item.first <= addr <= item.last:
-                    return item
-        return None
+            first = last = int(IPAddress(search))
+        index = self._find_index(first, last)
+        if index is None:
+            return None
+        return self.ranges[index]
 
     @property
     def first(self) -> Optional[MAASIPRange]:
         """Returns the first IP address in this set."""
         if len(self.ranges) > 0:
-            return self.ranges[0].first
+            return self.firsts[0]
         else:
             return None
 
@@ -463,7 +531,7 @@ class MAASIPSet(set):
     def last(self) -> Optional[MAASIPRange]:
         """Returns the last IP address in this set."""
         if len(self.ranges) > 0:
-            return self.ranges[-1].last
+            return self.lasts[-1]
         else:
             return None
 
@@ -500,9 +568,9 @@ class MAASIPSet(set):
     def get_first_unused_ip(self) -> int:
         """Returns the integer value of the first unused IP address in the set.
         """
-        for item in self.ranges:
+        for item, first in zip(self.ranges, self.firsts):
             if IPRANGE_TYPE.UNUSED in item.purpose:
-                return item.first
+                return first
         return None
 
     def get_largest_unused_block(self) -> Optional[MAASIPRange]:
@@ -571,15 +639,15 @@ class MAASIPSet(set):
         candidate_start = start
         # Note: by now, self.ranges is sorted from lowest
         # to highest IP address.
-        for used_range in self.ranges:
-            candidate_end = used_range.first - 1
+        for used_first, used_last in zip(self.firsts, self.lasts):
+            candidate_end = used_first - 1
             # Check if there is a gap between the start of the current
             # candidate range, and the address just before the next used
             # range.
             if candidate_end - candidate_start >= 0:
                 unused_ranges.append(
                     make_iprange(candidate_start, candidate_end, purpose))
-            candidate_start = used_range.last + 1
+            candidate_start = used_last + 1
         # Skip the broadcast address, if this is an IPv4 network
         if type(outer_range) == IPNetwork:
             prefixlen = outer_range.prefixlen
@@ -640,14 +708,14 @@ def make_iprange(first, second=None, purpose="unknown") -> MAASIPRange:
     :param purpose: If supplied, stores a comment in the range object to
         indicate the purpose of this range.
     """
-    if isinstance(first, int):
-        first = IPAddress(first)
+    first = IPAddress(first)
     if second is None:
         second = first
     else:
-        if isinstance(second, int):
-            second = IPAddress(second)
-    iprange = MAASIPRange(inet_ntop(first), inet_ntop(second), purpose=purpose)
+        second = IPAddress(second)
+    # Pass the addresses as they are; formatting them and parsing them again
+    # dominated the cost of condensing a `MAASIPSet`.
+    iprange = MAASIPRange(first, second, purpose=purpose)
     return iprange
 
 
@@ -855,6 +923,25 @@ def ip_range_within_network(ip_range, network):
         intersect_iprange(cidr, network) for cidr in ip_range.cidrs()])
 
 
+def split_network(network: IPNetwork, count: int) -> list:
+    """Split `network` into `count` contiguous parts of (almost) equal size.
+
+    :return: A list of `count` lists of `IPNetwork`s. Parts are empty if
+        there are fewer addresses in `network` than `count`.
+    """
+    parts = []
+    for index in range(count):
+        first = network.first + network.size * index // count
+        last = network.first + network.size * (index + 1) // count - 1
+        if last < first:
+            parts.append([])
+        else:
+            parts.append(IPRange(
+                IPAddress(first, network.version),
+                IPAddress(last, network.version)).cidrs())
+    return parts
+
+
 def inet_ntop(value):
     """Convert IPv4 and IPv6 addresses from integer to text form.
     (See also inet_ntop(3), the C function with the same name and function.)"""
@@ -1210,6 +1297,26 @@ def get_all_interfaces_definition(annotate_with_monitored: bool=True) -> dict:
     return interfaces
 
 
+def get_interfaces_hash(interfaces: dict, hints: list=None) -> str:
+    """Return a hash summarising an interfaces definition and topology hints.
+
+    The region records the hash of the definition it last applied for each
+    controller, so a controller can check whether the region already knows
+    about its interfaces before sending the full definition.
+
+    :param interfaces: An interfaces definition, as returned by
+        `get_all_interfaces_definition`.
+    :param hints: Topology hints, as a list of dictionaries, or `None`.
+    :return: The hex SHA-256 of a canonical form of the arguments.
+    """
+    if hints is not None:
+        # Hints are gathered from a set so their order isn't meaningful.
+        hints = sorted(json.dumps(hint, sort_keys=True) for hint in hints)
+    canonical = json.dumps(
+        {"interfaces": interfaces, "hints": hints}, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 def get_all_interface_subnets():
     """Returns all subnets that this machine has access to.
 
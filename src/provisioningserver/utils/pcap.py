@@ -20,6 +20,10 @@ import sys
 PCAP_NATIVE_BYTE_ORDER_MAGIC_NUMBER = 0xa1b2c3d4
 PCAP_HEADER_SIZE = 24
 PCAP_PACKET_HEADER_SIZE = 16
+PCAP_PACKET_HEADER = struct.Struct('IIII')
+
+# The most to read from the stream at once, when reading blocks of packets.
+PCAP_BLOCK_SIZE = 2 ** 16
 
 PCAPHeader = namedtuple('PCAPHeader', (
     'magic_number',
@@ -64,6 +68,7 @@ class PCAP:
        """
         super().__init__()
         self.stream = stream
+        self.pending = b''
         global_header_bytes = stream.read(PCAP_HEADER_SIZE)
         if len(global_header_bytes) == 0:
             raise EOFError("No PCAP output found.")
@@ -123,6 +128,66 @@ class PCAP:
             except EOFError:
                 break
 
+    def read_block(self, size=PCAP_BLOCK_SIZE):
+        """Reads the packets in the next block of the PCAP stream.
+
+        Reads whatever the stream has available, up to `size` bytes at a
+        time, until at least one complete packet has been read. A partial
+        packet at the end of the block is kept for the next call. Packets
+        are not copied out of the block, nor are their headers made into
+        `PCAPPacketHeader`s, so that busy captures can be decoded in bulk;
+        see `provisioningserver.utils.arp.decode_arp_bindings`.
+
+        Don't mix calls to `read` and `read_block` on the same stream.
+
+        :returns: a tuple of the format (block, packets), where block is of
+            type `bytes` and packets is a list of tuples of the format
+            (pcap_packet_header, offset), where pcap_packet_header is a plain
+            tuple with the same fields as `PCAPPacketHeader`, and the packet
+            is the bytes_captured bytes at offset in block.
+        :raise EOFError: If this is an attempt to read beyond the last packet.
+        :raise PCAPError: If the PCAP stream was invalid.
+        """
+        # Don't wait for `size` bytes when fewer are available.
+        read = getattr(self.stream, "read1", self.stream.read)
+        unpack_from = PCAP_PACKET_HEADER.unpack_from
+        while True:
+            data = read(size)
+            if len(data) == 0:
+                if len(self.pending) == 0:
+                    raise EOFError("End of PCAP stream.")
+                elif len(self.pending) < PCAP_PACKET_HEADER_SIZE:
+                    raise PCAPError(
+                        "Unexpected end of PCAP stream: invalid packet "
+                        "header.")
+                else:
+                    raise PCAPError(
+                        "Unexpected end of PCAP stream: invalid packet.")
+            block = self.pending + data
+            packets = []
+            start = 0
+            while start + PCAP_PACKET_HEADER_SIZE <= len(block):
+                header = unpack_from(block, start)
+                offset = start + PCAP_PACKET_HEADER_SIZE
+                end = offset + header[2]
+                if end > len(block):
+                    break
+                packets.append((header, offset))
+                start = end
+            self.pending = block[start:]
+            if len(packets) != 0:
+                return block, packets
+
+    def iter_blocks(self, size=PCAP_BLOCK_SIZE):
+        """Iterate this PCAP stream a block at a time; see `read_block`.
+
+        Stops when EOF is encountered."""
+        while True:
+            try:
+                yield self.read_block(size)
+            except EOFError:
+                break
+
 
 def main():
     """Debug function for printing packets output by tcpdump on stdin.
@@ -8,21 +8,35 @@ __all__ = [
     "run"
 ]
 
+from argparse import ArgumentTypeError
 from collections import namedtuple
+from contextlib import (
+    closing,
+    ExitStack,
+)
+import heapq
 import json
 from multiprocessing import cpu_count
 from multiprocessing.pool import ThreadPool
 import os
+import socket
+import struct
 import subprocess
 import sys
 from textwrap import dedent
 import time
 
 from netaddr import (
+    IPAddress,
     IPNetwork,
     IPSet,
 )
 from netaddr.core import AddrFormatError
+from provisioningserver.utils.arp import (
+    ARP_OPERATION,
+    ARP_PACKET,
+)
+from provisioningserver.utils.ethernet import ETHERTYPE
 from provisioningserver.utils.network import get_all_interfaces_definition
 from provisioningserver.utils.script import ActionScriptError
 from provisioningserver.utils.shell import (
@@ -37,6 +51,26 @@ PingParameters = namedtuple('PingParameters', ('interface', 'ip'))
 NmapParameters = namedtuple('NmapParameters', ('interface', 'cidr', 'slow'))
 
 
+# The default number of ARP requests per second to send on each interface
+# during a scan. This scans a /16 in about eleven minutes.
+DEFAULT_SCAN_RATE = 100
+
+# The number of ARP requests per second to send on each interface during a
+# slow scan. (This matches the rate of a slow `nmap` scan.)
+SLOW_SCAN_RATE = 9
+
+# Ethernet protocol number for ARP, for use with `socket`.
+ETH_P_ARP = 0x0806
+
+
+def positive_int(value):
+    """Parse `value` as an integer greater than zero, for `argparse`."""
+    number = int(value)
+    if number <= 0:
+        raise ArgumentTypeError("must be greater than zero: %s" % value)
+    return number
+
+
 def add_arguments(parser):
     """Add this command's options to the `ArgumentParser`.
 
@@ -53,23 +87,37 @@ def add_arguments(parser):
         If no arguments are provided, checks all IPv4 addresses on all
         configured CIDRs on each interface.
 
-        If nmap is not installed, this command could take a very long time if
-        there are a large amount of hosts connected directly to any attached
-        networks.
+        By default this sends an ARP request for each address, from a single
+        process, at a limited rate on each interface (interfaces are scanned
+        concurrently). Alternatively nmap or ping can be used; with ping this
+        command could take a very long time if there are a large amount of
+        hosts connected directly to any attached networks.
 
         This command only considers IPv4 CIDRs. (IPv6 CIDRs are excluded.)
         """)
     parser.add_argument(
         '-s', '--slow', action='store_true', required=False,
-        help='Scan slower. Only applies to nmap scans; ping is slow already.')
+        help='Scan slower. Sends %d packets per second on each interface, '
+             'unless --rate is also given. Does not apply to ping scans; '
+             'ping is slow already.' % SLOW_SCAN_RATE)
+    parser.add_argument(
+        '-r', '--rate', required=False, type=positive_int,
+        help='Maximum number of ARP requests to send per second on each '
+             'interface. Default is %d. Only applies to ARP scans.' % (
+                 DEFAULT_SCAN_RATE))
     parser.add_argument(
         '-t', '--threads', required=False, type=int,
         help='Number of concurrent threads to spawn during a scan. '
              'Default is to spawn four times the number of CPUs when using '
-             'ping, or one times the number of CPUs when using nmap.')
+             'ping, or one times the number of CPUs when using nmap. Does '
+             'not apply to ARP scans, which use a single thread.')
     parser.add_argument(
         '-p', '--ping', action='store_true', required=False,
-        help='Scan using ping. (Default is to scan with nmap, if installed.)')
+        help='Scan using ping. (Default is to scan with ARP requests.)')
+    parser.add_argument(
+        '-n', '--nmap', action='store_true', required=False,
+        help='Scan using nmap, if installed. (Default is to scan with ARP '
+             'requests.)')
     parser.add_argument(
         'interface', type=str, nargs='?',
         help="Ethernet interface to ping from. Optional if all interfaces are "
@@ -331,6 +379,140 @@ def ping_scan(to_scan: dict, threads=None, threads_per_cpu=4):
             yield from pool.imap(run_ping, jobs)
 
 
+def make_arp_socket(interface: str):
+    """Returns a raw socket for sending ARP packets on `interface`."""
+    sock = socket.socket(
+        socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+    try:
+        sock.bind((interface, ETH_P_ARP))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def make_arp_request(
+        src_mac: bytes, src_ip: IPAddress, target_ip: IPAddress) -> bytes:
+    """Returns an Ethernet frame broadcasting an ARP request for `target_ip`.
+
+    :param src_mac: The MAC address of the sending interface.
+    :param src_ip: The IPv4 address of the sending interface on the target's
+        network, or 0.0.0.0 (which makes the request an ARP probe).
+    """
+    arp = struct.pack(
+        ARP_PACKET, 1, 0x0800, 6, 4, ARP_OPERATION.REQUEST,
+        src_mac, int(src_ip), b'\0' * 6, int(target_ip))
+    return b'\xff' * 6 + src_mac + ETHERTYPE.ARP + arp
+
+
+def get_arp_source_address(
+        network: IPNetwork, ifname: str, interfaces: dict) -> IPAddress:
+    """Returns the address on `ifname` to send ARP requests for `network` from.
+
+    This is an address configured on `ifname` on a network containing
+    `network`, or 0.0.0.0 if there isn't one.
+    """
+    if ifname in interfaces:
+        for address in yield_ipv4_networks_on_link(ifname, interfaces):
+            link = IPNetwork(address)
+            if network in link:
+                return link.ip
+    return IPAddress("0.0.0.0")
+
+
+def yield_arp_requests(
+        ifname: str, cidrs, src_mac: bytes, interfaces: dict, clock):
+    """Yields an ARP request for each IPv4 address in `cidrs` on `ifname`.
+
+    An event dict is yielded after all the requests for each CIDR.
+    """
+    for cidr in cidrs:
+        network = IPNetwork(cidr)
+        if network.version != 4:
+            continue
+        started = clock()
+        src_ip = get_arp_source_address(network, ifname, interfaces)
+        count = 0
+        for ip in network:
+            if ip != src_ip:
+                yield make_arp_request(src_mac, src_ip, ip)
+                count += 1
+        yield {
+            "scan_type": "arp",
+            "interface": ifname,
+            "cidr": str(network.cidr),
+            "packets": count,
+            "seconds": int(clock() - started),
+        }
+
+
+def arp_scan(
+        to_scan: dict, interfaces: dict, rate=DEFAULT_SCAN_RATE,
+        clock=time.monotonic, sleep=time.sleep):
+    """Scans the specified networks by broadcasting ARP requests.
+
+    The `to_scan` dictionary must be in the format:
+
+        {<interface_name>: <iterable-of-cidr-strings>, ...}
+
+    Requests are sent from a raw socket on each interface; no subprocesses
+    are spawned. Interfaces are scanned concurrently, sending at most `rate`
+    requests per second on each. Replies are not awaited: the purpose of the
+    scan is for network discovery to observe them.
+
+    Yields an event dict for each CIDR scanned, and for each interface that
+    could not be scanned. An interface on which a request cannot be sent is
+    not scanned any further.
+    """
+    if rate <= 0:
+        raise ValueError("Scan rate must be greater than zero: %r" % (rate,))
+    interval = 1.0 / rate
+    with ExitStack() as stack:
+        # A heap of (<time-to-send-next>, <index>, <interface>, <socket>,
+        # <generator>).
+        jobs = []
+        for index, ifname in enumerate(to_scan):
+            try:
+                sock = stack.enter_context(closing(make_arp_socket(ifname)))
+            except OSError as e:
+                yield {
+                    "scan_type": "arp",
+                    "interface": ifname,
+                    "error": str(e),
+                }
+                continue
+            # For a packet socket, the address includes the interface's MAC.
+            src_mac = sock.getsockname()[4]
+            requests = yield_arp_requests(
+                ifname, to_scan[ifname], src_mac, interfaces, clock)
+            heapq.heappush(jobs, (clock(), index, ifname, sock, requests))
+        while len(jobs) > 0:
+            when, index, ifname, sock, requests = heapq.heappop(jobs)
+            delay = when - clock()
+            if delay > 0:
+                sleep(delay)
+            request = next(requests, None)
+            if request is None:
+                # This interface has been scanned.
+                continue
+            elif isinstance(request, dict):
+                yield request
+            else:
+                try:
+                    sock.send(request)
+                except OSError as e:
+                    # E.g. the interface went down; scan the others.
+                    yield {
+                        "scan_type": "arp",
+                        "interface": ifname,
+                        "error": str(e),
+                    }
+                    continue
+                # Never send faster than the rate to catch up.
+                when = max(when, clock()) + interval
+            heapq.heappush(jobs, (when, index, ifname, sock, requests))
+
+
 def write_event(event, output=sys.stdout):
     """Writes an event dictionary to the specified stream in JSON format.
 
@@ -389,18 +571,45 @@ def adjust_scanning_parameters(
     return ifname_to_scan
 
 
-def scan_networks(args, to_scan, stderr, stdout):
+def scan_networks(args, to_scan, stderr, stdout, interfaces):
     """Interprets the specified `args` and `to_scan` dict to perform the scan.
 
     Uses the specified `stdout` and `stderr` for output.
+
+    :param interfaces: the output of `get_all_interfaces_definition()`.
     """
     # Start the clock. (We want to measure how long the scan takes.)
     clock = time.monotonic()
-    # The user must explicitly opt out of using `nmap` by selecting --ping,
-    # unless `nmap` is not installed.
-    use_nmap = has_command_available('nmap')
+    # The user must explicitly opt in to using `nmap` or `ping`; `nmap` is
+    # only used if it is installed.
+    use_nmap = args.nmap and has_command_available('nmap')
     use_ping = args.ping
-    if use_nmap and not use_ping:
+    if not use_nmap and not use_ping:
+        tool = 'arp'
+        if args.rate is not None:
+            rate = args.rate
+        elif args.slow:
+            rate = SLOW_SCAN_RATE
+        else:
+            rate = DEFAULT_SCAN_RATE
+        count = 0
+        packets = 0
+        for event in arp_scan(to_scan, interfaces, rate=rate):
+            if 'error' in event:
+                stderr.write("Unable to scan on %s: %s\n" % (
+                    event['interface'], event['error']))
+                stderr.flush()
+            else:
+                count += 1
+                packets += event['packets']
+            write_event(event, stdout)
+        clock_diff = time.monotonic() - clock
+        if count > 0:
+            stderr.write(
+                "Sent %d ARP request(s) to %d network(s) in %d second(s).\n"
+                % (packets, count, clock_diff))
+            stderr.flush()
+    elif use_nmap and not use_ping:
         tool = 'nmap'
         scanner = nmap_scan(to_scan, slow=args.slow, threads=args.threads)
         count = 0
@@ -466,7 +675,7 @@ def run(args, stdout=sys.stdout, stderr=sys.stderr):
         # user if they requested to scan a CIDR that doesn't exist.
         warn_about_missing_cidrs(ifname_to_scan, cidrs, interfaces, stderr)
 
-    result = scan_networks(args, to_scan, stderr, stdout)
+    result = scan_networks(args, to_scan, stderr, stdout, interfaces)
     if result['count'] == 0:
         stderr.write("Requested network(s) not available to scan: %s\n" % (
             ", ".join(cidrs) if len(cidrs) > 0 else ifname_to_scan))
@@ -99,8 +99,13 @@ class JSONPerLineProtocol(ProcessProtocol):
 
     def outReceived(self, data):
         lines, self._outbuf = self.splitLines(self._outbuf + data)
+        objs = []
         for line in lines:
-            self.outLineReceived(line)
+            obj = self.outLineReceived(line)
+            if obj is not None:
+                objs.append(obj)
+        if len(objs) != 0:
+            self.objectsReceived(objs)
 
     def errReceived(self, data):
         lines, self._errbuf = self.splitLines(self._errbuf + data)
@@ -122,16 +127,22 @@ class JSONPerLineProtocol(ProcessProtocol):
         return lines, remaining
 
     def outLineReceived(self, line):
+        """Parse `line`, returning the object, or None if it's not JSON."""
         line = line.decode("utf-8")
         try:
-            obj = json.loads(line)
+            return json.loads(line)
         except JSONDecodeError:
             log.msg("Failed to parse JSON: %r" % line)
-        else:
-            self.objectReceived(obj)
+            return None
+
+    def objectsReceived(self, objs):
+        """Pass the objects parsed from a chunk of output to the callback.
 
-    def objectReceived(self, obj):
-        self._callback([obj])
+        All the complete lines received at once are passed in a single call,
+        so a process writing many lines at a time doesn't cost a callback
+        (and, typically, an RPC call) per line.
+        """
+        self._callback(objs)
 
     def errLineReceived(self, line):
         line = line.decode("utf-8")
@@ -160,9 +171,10 @@ class ProtocolForObserveARP(JSONPerLineProtocol):
         super().__init__(*args, **kwargs)
         self.interface = interface
 
-    def objectReceived(self, obj):
-        obj['interface'] = self.interface
-        super().objectReceived(obj)
+    def objectsReceived(self, objs):
+        for obj in objs:
+            obj['interface'] = self.interface
+        super().objectsReceived(objs)
 
     def errLineReceived(self, line):
         line = line.decode("utf-8").rstrip()
@@ -182,9 +194,10 @@ class ProtocolForObserveBeacons(JSONPerLineProtocol):
         super().__init__(*args, **kwargs)
         self.interface = interface
 
-    def objectReceived(self, obj):
-        obj['interface'] = self.interface
-        super().objectReceived(obj)
+    def objectsReceived(self, objs):
+        for obj in objs:
+            obj['interface'] = self.interface
+        super().objectsReceived(objs)
 
     def errLineReceived(self, line):
         line = line.decode("utf-8").rstrip()
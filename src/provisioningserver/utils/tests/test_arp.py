@@ -9,6 +9,7 @@ from argparse import ArgumentParser
 from datetime import datetime
 import io
 import json
+import struct
 import subprocess
 from tempfile import NamedTemporaryFile
 from textwrap import dedent
@@ -27,16 +28,20 @@ from provisioningserver.utils.arp import (
     add_arguments,
     ARP,
     ARP_OPERATION,
+    decode_arp_bindings,
+    observe_arp_packets,
     run,
     SEEN_AGAIN_THRESHOLD,
     update_and_print_bindings,
     update_bindings_and_get_event,
+    update_bindings_and_get_events,
 )
 from provisioningserver.utils.network import (
     format_eui,
     hex_str_to_bytes,
     ipv4_to_bytes,
 )
+from provisioningserver.utils.pcap import PCAP
 from provisioningserver.utils.script import ActionScriptError
 from testtools.matchers import (
     Equals,
@@ -405,6 +410,131 @@ class TestUpdateAndPrintBindings(MAASTestCase):
             "vid": None
         }))
 
+
+def make_ethernet_frame(payload, vid=None, ethertype='0806'):
+    frame = b'\xff' * 6 + hex_str_to_bytes('00:24:a5:af:24:85')
+    if vid is not None:
+        frame += hex_str_to_bytes('8100') + struct.pack('!H', vid)
+    return frame + hex_str_to_bytes(ethertype) + payload
+
+
+def make_pcap_block(*frames, time=0):
+    """Return a block of PCAP output, as from `PCAP.read_block`."""
+    packets = []
+    block = b''
+    for frame in frames:
+        header = (time, 0, len(frame), len(frame))
+        block += struct.pack('IIII', *header)
+        packets.append((header, len(block)))
+        block += frame
+    return block, packets
+
+
+class TestDecodeARPBindings(MAASTestCase):
+
+    def test__decodes_bindings(self):
+        block, packets = make_pcap_block(
+            make_ethernet_frame(make_arp_packet(
+                '192.168.0.1', '00:01:02:03:04:05', '192.168.0.2')),
+            make_ethernet_frame(make_arp_packet(
+                '192.168.0.2', '02:03:04:05:06:07', '192.168.0.1',
+                target_mac='00:01:02:03:04:05', op=ARP_OPERATION.REPLY),
+                vid=4095),
+            time=37)
+        self.assertThat(list(decode_arp_bindings(block, packets)), Equals([
+            (None, ipv4_to_bytes('192.168.0.1'),
+             hex_str_to_bytes('00:01:02:03:04:05'), 37),
+            (4095, ipv4_to_bytes('192.168.0.2'),
+             hex_str_to_bytes('02:03:04:05:06:07'), 37),
+            (4095, ipv4_to_bytes('192.168.0.1'),
+             hex_str_to_bytes('00:01:02:03:04:05'), 37),
+        ]))
+
+    def test__decodes_same_bindings_as_ARP(self):
+        pcap = PCAP(io.BytesIO(test_input))
+        block, packets = pcap.read_block()
+        expected = [
+            (None, ip.packed, bytes.fromhex('%012x' % int(mac)), 1470159914)
+            for header, packet in PCAP(io.BytesIO(test_input))
+            for ip, mac in ARP(packet[14:]).bindings()
+        ]
+        self.assertThat(
+            list(decode_arp_bindings(block, packets)), Equals(expected))
+
+    def test__skips_invalid_packets(self):
+        arp = make_arp_packet(
+            '192.168.0.1', '00:01:02:03:04:05', '192.168.0.2')
+        block, packets = make_pcap_block(
+            make_ethernet_frame(arp)[:-1],
+            make_ethernet_frame(arp, vid=1)[:-1],
+            make_ethernet_frame(arp, ethertype='0800'),
+            make_ethernet_frame(make_arp_packet(
+                '192.168.0.1', '00:01:02:03:04:05', '192.168.0.2',
+                hardware_type='0x0002')),
+            make_ethernet_frame(make_arp_packet(
+                '192.168.0.1', '00:01:02:03:04:05', '192.168.0.2', op=3)))
+        self.assertThat(list(decode_arp_bindings(block, packets)), Equals([]))
+
+    def test__skips_null_addresses(self):
+        block, packets = make_pcap_block(
+            make_ethernet_frame(make_arp_packet(
+                '0.0.0.0', '00:01:02:03:04:05', '192.168.0.2')),
+            make_ethernet_frame(make_arp_packet(
+                '192.168.0.1', '00:00:00:00:00:00', '192.168.0.2',
+                op=ARP_OPERATION.REPLY)))
+        self.assertThat(list(decode_arp_bindings(block, packets)), Equals([]))
+
+
+class TestUpdateBindingsAndGetEvents(MAASTestCase):
+
+    def test__returns_events(self):
+        bindings = {}
+        ip = ipv4_to_bytes("192.168.0.1")
+        mac1 = hex_str_to_bytes("00:01:02:03:04:05")
+        mac2 = hex_str_to_bytes("02:03:04:05:06:07")
+        events = update_bindings_and_get_events(bindings, [
+            (None, ip, mac1, 0),
+            (None, ip, mac1, 1),
+            (None, ip, mac2, 2),
+            (None, ip, mac2, 2 + SEEN_AGAIN_THRESHOLD),
+        ])
+        self.assertThat(bindings, Equals({
+            (None, ip): {"mac": mac2, "time": 2 + SEEN_AGAIN_THRESHOLD},
+        }))
+        self.assertThat(events, Equals([
+            dict(
+                event="NEW", ip="192.168.0.1", mac="00:01:02:03:04:05",
+                time=0, vid=None),
+            dict(
+                event="REFRESHED", ip="192.168.0.1",
+                mac="02:03:04:05:06:07", time=2 + SEEN_AGAIN_THRESHOLD,
+                vid=None),
+        ]))
+
+    def test__returns_latest_event_for_each_binding(self):
+        bindings = {}
+        ip = ipv4_to_bytes("192.168.0.1")
+        mac1 = hex_str_to_bytes("00:01:02:03:04:05")
+        mac2 = hex_str_to_bytes("02:03:04:05:06:07")
+        events = update_bindings_and_get_events(bindings, [
+            (10, ip, mac1, 0),
+            (10, ip, mac2, 1),
+            (10, ip, mac1, 2),
+        ])
+        self.assertThat(events, Equals([
+            dict(
+                event="MOVED", ip="192.168.0.1", mac="02:03:04:05:06:07",
+                previous_mac="00:01:02:03:04:05", time=1, vid=10),
+            dict(
+                event="MOVED", ip="192.168.0.1", mac="00:01:02:03:04:05",
+                previous_mac="02:03:04:05:06:07", time=2, vid=10),
+        ]))
+        events = update_bindings_and_get_events(bindings, [
+            (10, ip, mac1, 3),
+        ])
+        self.assertThat(events, Equals([]))
+
+
 # Test data expected from an input PCAP file.
 test_input = (
     b'\xd4\xc3\xb2\xa1\x02\x00\x04\x00\x00\x00\x00\x00\x00\x00\x00\x00'
@@ -419,6 +549,24 @@ test_input = (
 )
 
 
+class TestObserveARPPackets(MAASTestCase):
+
+    def test__prints_bindings_in_json_format(self):
+        output = io.StringIO()
+        observe_arp_packets(
+            bindings=True, input=io.BytesIO(test_input), output=output)
+        self.assertThat(
+            [json.loads(line) for line in output.getvalue().splitlines()],
+            Equals([
+                dict(
+                    event="NEW", ip="172.16.42.1", mac="00:24:a5:af:24:85",
+                    time=1470159914, vid=None),
+                dict(
+                    event="NEW", ip="172.16.42.109",
+                    mac="80:fa:5b:0c:46:4e", time=1470159914, vid=None),
+            ]))
+
+
 class TestObserveARPCommand(MAASTestCase):
     """Tests for `maas-rack observe-arp`."""
 
@@ -0,0 +1,143 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `provisioningserver.utils.metrics`."""
+
+__all__ = []
+
+from textwrap import dedent
+
+from maastesting.testcase import MAASTestCase
+from provisioningserver.utils import metrics
+from provisioningserver.utils.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    MetricsResource,
+)
+from testtools.matchers import (
+    Equals,
+    Is,
+)
+from twisted.web.test.requesthelper import DummyRequest
+
+
+class TestCounter(MAASTestCase):
+
+    def test_renders_total(self):
+        counter = Counter("things", "Number of things.")
+        counter.inc()
+        counter.inc(2)
+        self.assertThat("\n".join(counter.render()), Equals(dedent("""\
+            # HELP things Number of things.
+            # TYPE things counter
+            things_total 3""")))
+
+    def test_cannot_decrease(self):
+        counter = Counter("things", "Number of things.")
+        self.assertRaises(ValueError, counter.inc, -1)
+
+    def test_renders_labels(self):
+        counter = Counter("things", "Number of things.", labels=["kind"])
+        counter.labels("big").inc()
+        counter.labels(kind='sm"all').inc(2)
+        self.assertThat(list(counter.render())[2:], Equals([
+            'things_total{kind="big"} 1',
+            'things_total{kind="sm\\"all"} 2',
+        ]))
+
+    def test_requires_labels_when_labelled(self):
+        counter = Counter("things", "Number of things.", labels=["kind"])
+        self.assertRaises(ValueError, counter.inc)
+        self.assertRaises(ValueError, counter.labels)
+        self.assertRaises(ValueError, counter.labels, "big", "red")
+        self.assertRaises(ValueError, counter.labels, colour="red")
+
+
+class TestGauge(MAASTestCase):
+
+    def test_goes_up_and_down(self):
+        gauge = Gauge("queue", "Length of the queue.")
+        gauge.inc(5)
+        gauge.dec(2)
+        self.assertThat(list(gauge.render())[2:], Equals(["queue 3"]))
+        gauge.set(1.5)
+        self.assertThat(list(gauge.render())[2:], Equals(["queue 1.5"]))
+
+
+class TestHistogram(MAASTestCase):
+
+    def test_renders_cumulative_buckets(self):
+        histogram = Histogram(
+            "latency_seconds", "Latency.", buckets=[1.0, 0.1])
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+        self.assertThat(list(histogram.render())[1:], Equals([
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1.0"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            'latency_seconds_sum 2.65',
+            'latency_seconds_count 4',
+        ]))
+
+    def test_time_observes_elapsed_time(self):
+        histogram = Histogram("latency_seconds", "Latency.")
+        self.patch(metrics, "monotonic").side_effect = [1.0, 3.5, 4.0, 4.25]
+        with histogram.time():
+            pass
+
+        @histogram.time()
+        def timed(arg):
+            return arg
+
+        self.assertThat(timed(self), Is(self))
+        self.assertThat(histogram.labels().sum, Equals(2.75))
+        self.assertThat(histogram.labels().counts[-1], Equals(0))
+
+
+class TestMetricsRegistry(MAASTestCase):
+
+    def test_renders_all_metrics(self):
+        registry = MetricsRegistry()
+        registry.counter("a", "Metric a.").inc()
+        registry.gauge("b", "Metric b.").set(2)
+        self.assertThat(registry.render(), Equals(dedent("""\
+            # HELP a Metric a.
+            # TYPE a counter
+            a_total 1
+            # HELP b Metric b.
+            # TYPE b gauge
+            b 2
+            """)))
+
+    def test_returns_existing_metric_of_same_kind(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("a", "Metric a.", labels=["x"])
+        self.assertThat(
+            registry.counter("a", "Metric a.", labels=["x"]), Is(counter))
+        self.assertThat(registry.get("a"), Is(counter))
+
+    def test_rejects_different_metric_with_same_name(self):
+        registry = MetricsRegistry()
+        registry.counter("a", "Metric a.")
+        self.assertRaises(ValueError, registry.gauge, "a", "Metric a.")
+        self.assertRaises(
+            ValueError, registry.counter, "a", "Metric a.", labels=["x"])
+
+
+class TestMetricsResource(MAASTestCase):
+
+    def test_renders_registry(self):
+        registry = MetricsRegistry()
+        registry.counter("a", "Metric a.").inc()
+        request = DummyRequest([])
+        output = MetricsResource(registry).render_GET(request)
+        self.assertThat(output, Equals(registry.render().encode("utf-8")))
+        self.assertThat(
+            request.responseHeaders.getRawHeaders(b"Content-Type"),
+            Equals([b"text/plain; version=0.0.4; charset=utf-8"]))
+
+    def test_uses_global_registry_by_default(self):
+        self.assertThat(MetricsResource().registry, Is(metrics.METRICS))
@@ -5,6 +5,7 @@
 
 __all__ = []
 
+import pickle
 import random
 import socket
 from socket import (
@@ -32,6 +33,7 @@ from netaddr import (
     IPAddress,
     IPNetwork,
     IPRange,
+    IPSet,
 )
 import netifaces
 from netifaces import (
@@ -61,6 +63,7 @@ from provisioningserver.utils.network import (
     get_eui_organization,
     get_ifname_ifdata_for_destination,
     get_interface_children,
+    get_interfaces_hash,
     get_mac_organization,
     get_source_address,
     has_ipv4_address,
@@ -82,6 +85,7 @@ from provisioningserver.utils.network import (
     resolve_hostname,
     resolves_to_loopback_address,
     reverseResolve,
+    split_network,
 )
 from provisioningserver.utils.shell import get_env_with_locale
 from testtools import ExpectedException
@@ -593,6 +597,38 @@ class TestResolveHostToAddrs(MAASTestCase):
                 hostname, 0, family=AF_INET, proto=IPPROTO_TCP))
 
 
+class TestSplitNetwork(MAASTestCase):
+    """Tests for `split_network()`."""
+
+    def test_splits_into_contiguous_parts(self):
+        self.assertThat(
+            split_network(IPNetwork("10.0.0.0/24"), 4), Equals([
+                [IPNetwork("10.0.0.0/26")],
+                [IPNetwork("10.0.0.64/26")],
+                [IPNetwork("10.0.0.128/26")],
+                [IPNetwork("10.0.0.192/26")],
+            ]))
+
+    def test_splits_into_parts_of_almost_equal_size(self):
+        parts = split_network(IPNetwork("10.0.0.0/24"), 3)
+        self.assertThat(
+            [sum(cidr.size for cidr in part) for part in parts],
+            Equals([85, 85, 86]))
+        self.assertThat(
+            IPSet(cidr for part in parts for cidr in part),
+            Equals(IPSet(["10.0.0.0/24"])))
+
+    def test_returns_whole_network_for_one_part(self):
+        self.assertThat(
+            split_network(IPNetwork("2001:db8::/64"), 1),
+            Equals([[IPNetwork("2001:db8::/64")]]))
+
+    def test_returns_empty_parts_for_small_network(self):
+        self.assertThat(
+            split_network(IPNetwork("10.0.0.1/32"), 2),
+            Equals([[], [IPNetwork("10.0.0.1/32")]]))
+
+
 class TestIntersectIPRange(MAASTestCase):
     """Tests for `intersect_iprange()`."""
 
@@ -879,6 +915,59 @@ class TestMAASIPSet(MAASTestCase):
         self.assertThat(str(IPAddress(s1.first)), Equals("10.0.0.1"))
         self.assertThat(str(IPAddress(s1.last)), Equals("10.0.0.8"))
 
+    def test__ior_merges_overlapping_ranges(self):
+        s1 = MAASIPSet([
+            make_iprange('10.0.0.1', '10.0.0.10', purpose="foo"),
+            make_iprange('10.0.0.30', '10.0.0.40', purpose="foo")])
+        s2 = MAASIPSet([
+            make_iprange('10.0.0.5', '10.0.0.20', purpose="bar"),
+            make_iprange('10.0.0.50', purpose="bar")])
+        s1 |= s2
+        self.assertThat(s1.ranges, Equals([
+            IPRange('10.0.0.1', '10.0.0.20'),
+            IPRange('10.0.0.30', '10.0.0.40'),
+            IPRange('10.0.0.50', '10.0.0.50'),
+        ]))
+        self.assertThat(s1.ranges[0].purpose, Equals({"foo", "bar"}))
+        self.assertThat(s1, Equals(set(s1.ranges)))
+        self.assertThat(
+            s1.find('10.0.0.15'), Equals(IPRange('10.0.0.1', '10.0.0.20')))
+        self.assertThat(s1.find('10.0.0.25'), Is(None))
+
+    def test__find_searches_thousands_of_ranges(self):
+        s = MAASIPSet(
+            make_iprange(address, purpose="assigned-ip")
+            for address in IPNetwork('10.0.0.0/16')[2:-1:2])
+        self.assertThat(s.ranges, HasLength(32767))
+        self.assertThat(s.firsts, Equals(sorted(s.firsts)))
+        self.assertThat(
+            s.find('10.0.128.0'), Equals(IPRange('10.0.128.0', '10.0.128.0')))
+        self.assertThat(s.find('10.0.128.1'), Is(None))
+        self.assertThat(s.find('10.0.0.1'), Is(None))
+        self.assertThat(s.find('10.0.255.255'), Is(None))
+        self.assertThat(s.find(IPRange('10.0.0.2', '10.0.0.4')), Is(None))
+
+    def test__pickles_with_purposes(self):
+        s = MAASIPSet([
+            make_iprange('10.0.0.1', '10.0.0.100', purpose='dynamic'),
+            make_iprange('10.0.0.200', purpose='gateway-ip'),
+        ], cidr=IPNetwork('10.0.0.0/24'))
+        s2 = pickle.loads(pickle.dumps(s))
+        self.assertThat(s2, Equals(s))
+        self.assertThat(s2.cidr, Equals(s.cidr))
+        self.assertThat(s2.firsts, Equals(s.firsts))
+        self.assertThat(s2.lasts, Equals(s.lasts))
+        self.assertThat(
+            [item.purpose for item in s2.ranges],
+            Equals([{'dynamic'}, {'gateway-ip'}]))
+
+    def test__does_not_condense_again_when_unpickled(self):
+        s = MAASIPSet([make_iprange('10.0.0.1', '10.0.0.100')])
+        data = pickle.dumps(s)
+        _condense = self.patch(MAASIPSet, "_condense")
+        self.assertThat(pickle.loads(data), Equals(s))
+        self.assertThat(_condense, MockNotCalled())
+
 
 class TestIPRangeStatistics(MAASTestCase):
 
@@ -1557,6 +1646,52 @@ class TestGetAllInterfacesDefinition(MAASTestCase):
         self.assertInterfacesResult(ip_addr, iproute_info, {}, expected_result)
 
 
+class TestGetInterfacesHash(MAASTestCase):
+    """Tests for `get_interfaces_hash`."""
+
+    def make_interfaces(self):
+        return {
+            factory.make_name("eth"): {
+                "type": "physical",
+                "mac_address": factory.make_mac_address(),
+                "parents": [],
+                "links": [],
+                "enabled": True,
+            }
+            for _ in range(3)
+        }
+
+    def test__is_stable(self):
+        interfaces = self.make_interfaces()
+        reordered = dict(reversed(list(interfaces.items())))
+        self.assertThat(
+            get_interfaces_hash(reordered),
+            Equals(get_interfaces_hash(interfaces)))
+
+    def test__differs_when_interfaces_differ(self):
+        interfaces = self.make_interfaces()
+        changed = self.make_interfaces()
+        self.assertThat(
+            get_interfaces_hash(changed),
+            Not(Equals(get_interfaces_hash(interfaces))))
+
+    def test__ignores_order_of_hints(self):
+        interfaces = self.make_interfaces()
+        hints = [
+            {"hint": "on_remote_network", "ifname": name}
+            for name in interfaces
+        ]
+        self.assertThat(
+            get_interfaces_hash(interfaces, list(reversed(hints))),
+            Equals(get_interfaces_hash(interfaces, hints)))
+
+    def test__differs_when_hints_differ(self):
+        interfaces = self.make_interfaces()
+        self.assertThat(
+            get_interfaces_hash(interfaces, []),
+            Not(Equals(get_interfaces_hash(interfaces))))
+
+
 class TestGetAllInterfacesSubnets(MAASTestCase):
     """Tests for `get_all_interface_subnets()`."""
 
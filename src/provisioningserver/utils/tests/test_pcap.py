@@ -121,3 +121,67 @@ class TestPCAP(MAASTestCase):
                 PCAPError,
                 "Unexpected end of PCAP stream: invalid packet."):
             pcap.read()
+
+
+class TrickleStream(io.BytesIO):
+    """A stream that returns at most `size` bytes from each read."""
+
+    def __init__(self, data, size):
+        super().__init__(data)
+        self.size = size
+
+    def read1(self, size=-1):
+        return super().read1(min(size, self.size))
+
+
+class TestPCAPReadBlock(MAASTestCase):
+
+    def test__reads_all_available_packets(self):
+        stream = io.BytesIO(TESTDATA)
+        pcap = PCAP(stream)
+        block, packets = pcap.read_block()
+        self.assertThat(packets, Equals([
+            ((1467058714, 931534, 60, 60), 16),
+            ((1467058715, 380619, 60, 60), 92),
+        ]))
+        self.assertThat(block[16:76], Equals(TESTDATA[40:100]))
+        self.assertThat(block[92:152], Equals(TESTDATA[116:176]))
+
+    def test__keeps_partial_packets_for_next_block(self):
+        stream = TrickleStream(TESTDATA, 50)
+        pcap = PCAP(stream)
+        block, packets = pcap.read_block()
+        self.assertThat(packets, Equals([((1467058714, 931534, 60, 60), 16)]))
+        self.assertThat(block[16:76], Equals(TESTDATA[40:100]))
+        block, packets = pcap.read_block()
+        self.assertThat(packets, Equals([((1467058715, 380619, 60, 60), 16)]))
+        self.assertThat(block[16:76], Equals(TESTDATA[116:176]))
+        with ExpectedException(EOFError, "End of PCAP stream."):
+            pcap.read_block()
+
+    def test__iter_blocks(self):
+        stream = TrickleStream(TESTDATA, 7)
+        pcap = PCAP(stream)
+        packets = [
+            block[offset:offset + header[2]]
+            for block, packets in pcap.iter_blocks(size=100)
+            for header, offset in packets
+        ]
+        self.assertThat(packets, Equals(
+            [packet for _, packet in PCAP(io.BytesIO(TESTDATA))]))
+
+    def test__raises_PCAPError_for_invalid_packet_header(self):
+        stream = io.BytesIO(TESTDATA_INVALID_PACKET_HEADER)
+        pcap = PCAP(stream)
+        with ExpectedException(
+                PCAPError,
+                "Unexpected end of PCAP stream: invalid packet header."):
+            pcap.read_block()
+
+    def test__raises_PCAPError_for_invalid_packet(self):
+        stream = io.BytesIO(TESTDATA_INVALID_PACKET)
+        pcap = PCAP(stream)
+        with ExpectedException(
+                PCAPError,
+                "Unexpected end of PCAP stream: invalid packet."):
+            pcap.read_block()
@@ -6,6 +6,7 @@
 __all__ = []
 
 from argparse import ArgumentParser
+from contextlib import redirect_stderr
 import io
 import os
 import random
@@ -20,12 +21,23 @@ from maastesting.matchers import (
     DocTestMatches,
     Matches,
     MockCalledOnceWith,
+    MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
-from netaddr import IPNetwork
+from netaddr import (
+    EUI,
+    IPAddress,
+    IPNetwork,
+)
 from provisioningserver.utils import scan_network as scan_network_module
+from provisioningserver.utils.arp import ARP
+from provisioningserver.utils.ethernet import Ethernet
 from provisioningserver.utils.scan_network import (
     add_arguments,
+    arp_scan,
+    ETH_P_ARP,
+    get_arp_source_address,
+    make_arp_request,
     get_nmap_arguments,
     get_ping_arguments,
     NmapParameters,
@@ -93,13 +105,14 @@ class TestScanNetworkCommand(MAASTestCase):
         self.run_command('--ping', '--threads', '37', '--slow')
         self.assertThat(self.scan_networks_mock, MockCalledOnceWith(
             ArgumentsMatching(threads=37, slow=True, ping=True),
-            ANY, ANY, ANY))
+            ANY, ANY, ANY, ANY))
 
     def test__default_arguments(self):
         self.run_command()
         self.assertThat(self.scan_networks_mock, MockCalledOnceWith(
-            ArgumentsMatching(threads=None, slow=False, ping=False),
-            ANY, ANY, ANY))
+            ArgumentsMatching(
+                threads=None, slow=False, ping=False, nmap=False, rate=None),
+            ANY, ANY, ANY, ANY))
 
     def test__scans_all_interface_cidrs_when_zero_parameters_passed(self):
         self.run_command()
@@ -108,14 +121,14 @@ class TestScanNetworkCommand(MAASTestCase):
                 'eth0': MatchesCIDRs(),
                 'eth1': MatchesCIDRs('192.168.0.0/24'),
                 'eth2': MatchesCIDRs('192.168.2.0/24', '192.168.3.0/24')
-            }, ANY, ANY))
+            }, ANY, ANY, ANY))
 
     def test__scans_all_cidrs_on_single_interface_when_ifname_passed(self):
         self.run_command('eth2')
         self.assertThat(self.scan_networks_mock, MockCalledOnceWith(
             ANY, {
                 'eth2': MatchesCIDRs('192.168.2.0/24', '192.168.3.0/24')
-            }, ANY, ANY))
+            }, ANY, ANY, ANY))
 
     def test__finds_correct_interface_if_passed_in_cidr_matches(self):
         self.run_command('192.168.2.0/24')
@@ -124,14 +137,14 @@ class TestScanNetworkCommand(MAASTestCase):
                 'eth0': MatchesCIDRs(),
                 'eth1': MatchesCIDRs(),
                 'eth2': MatchesCIDRs('192.168.2.0/24')
-            }, ANY, ANY))
+            }, ANY, ANY, ANY))
 
     def test__scans_specific_interface_cidr(self):
         self.run_command('eth2', '192.168.3.0/24')
         self.assertThat(self.scan_networks_mock, MockCalledOnceWith(
             ANY, {
                 'eth2': MatchesCIDRs('192.168.3.0/24')
-            }, ANY, ANY))
+            }, ANY, ANY, ANY))
 
     def test__scans_cidr_subset(self):
         self.run_command('192.168.3.0/28')
@@ -140,7 +153,16 @@ class TestScanNetworkCommand(MAASTestCase):
                 'eth0': MatchesCIDRs(),
                 'eth1': MatchesCIDRs(),
                 'eth2': MatchesCIDRs('192.168.3.0/28')
-            }, ANY, ANY))
+            }, ANY, ANY, ANY))
+
+    def test__rejects_rate_that_is_not_positive(self):
+        with redirect_stderr(self.error_output):
+            with ExpectedException(SystemExit):
+                self.run_command('--rate', '0')
+        self.assertThat(
+            self.error_output.getvalue(),
+            DocTestMatches("...must be greater than zero: 0..."))
+        self.assertThat(self.scan_networks_mock, MockNotCalled())
 
     def test__rejects_ipv6_cidr(self):
         expected_error = ".*Not a valid IPv4 CIDR:.*"
@@ -168,6 +190,10 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
         self.popen.return_value.poll = Mock()
         self.popen.return_value.poll.return_value = None
         self.popen.return_value.returncode = 0
+        self.make_arp_socket = self.patch(
+            scan_network_module, 'make_arp_socket')
+        self.make_arp_socket.return_value.getsockname.return_value = (
+            'eth1', ETH_P_ARP, 0, 1, b'\x00\x11\x22\x33\x44\x55')
         self.parser = ArgumentParser()
         add_arguments(self.parser)
 
@@ -175,6 +201,31 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
         parsed_args = self.parser.parse_args([*args])
         return run(parsed_args, stdout=self.output, stderr=self.error_output)
 
+    def test__runs_arp_scan_by_default(self):
+        # Even if `nmap` is installed.
+        self.has_command_available_mock.return_value = True
+        self.run_command('192.168.0.0/30')
+        sock = self.make_arp_socket.return_value
+        # The interface's own address is not scanned.
+        self.assertThat(
+            [ARP(call[0][0][14:]).target_ip
+             for call in sock.send.call_args_list],
+            Equals([
+                IPAddress("192.168.0.0"),
+                IPAddress("192.168.0.2"),
+                IPAddress("192.168.0.3"),
+            ]))
+        self.assertThat(self.popen.call_count, Equals(0))
+        self.assertThat(self.error_output.getvalue(), DocTestMatches(
+            "Sent 3 ARP request(s) to 1 network(s) in ... second(s)."))
+
+    def test__runs_arp_scan_reports_interfaces_not_scanned(self):
+        self.make_arp_socket.side_effect = OSError("No such device")
+        self.run_command('eth1')
+        self.assertThat(self.error_output.getvalue(), DocTestMatches(
+            "Unable to scan on eth1: No such device\n"
+            "Requested network(s) not available to scan: eth1"))
+
     def test__runs_ping_single_threaded(self):
         ip = factory.make_ip_address(ipv6=False)
         # Force the use of `ping` even if `nmap` is installed.
@@ -215,7 +266,7 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
         self.has_command_available_mock.return_value = True
         cidr = '%s/32' % ip
         slow = random.choice([True, False])
-        args = ['--threads', '1', 'eth0', cidr]
+        args = ['--nmap', '--threads', '1', 'eth0', cidr]
         if slow is True:
             args.append('--slow')
         self.run_command(*args)
@@ -233,7 +284,7 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
         self.has_command_available_mock.return_value = True
         cidr = '%s/32' % ip
         slow = random.choice([True, False])
-        args = ['eth0', cidr]
+        args = ['--nmap', 'eth0', cidr]
         if slow is True:
             args.append('--slow')
         self.run_command(*args)
@@ -251,7 +302,7 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
         self.has_command_available_mock.return_value = True
         cidr = '%s/32' % ip
         slow = random.choice([True, False])
-        args = ['eth0', cidr]
+        args = ['--nmap', 'eth0', cidr]
         if slow is True:
             args.append('--slow')
         self.run_command(*args)
@@ -335,3 +386,149 @@ class TestYieldPingParameters(MAASTestCase):
             PingParameters(interface='eth0', ip='192.168.0.1'),
             PingParameters(interface='eth0', ip='192.168.0.2'),
         }))
+
+
+class TestMakeARPRequest(MAASTestCase):
+
+    def test__makes_broadcast_arp_request(self):
+        mac = b'\x00\x11\x22\x33\x44\x55'
+        frame = make_arp_request(
+            mac, IPAddress("192.168.0.1"), IPAddress("192.168.0.7"))
+        ethernet = Ethernet(frame)
+        self.assertTrue(ethernet.is_valid())
+        self.assertThat(ethernet.dst_mac, Equals(b"\xff" * 6))
+        arp = ARP(ethernet.payload)
+        self.assertTrue(arp.is_valid())
+        self.assertThat(
+            (arp.operation, arp.source_eui, arp.source_ip, arp.target_ip),
+            Equals((
+                1, EUI("00:11:22:33:44:55"), IPAddress("192.168.0.1"),
+                IPAddress("192.168.0.7"))))
+
+
+class TestGetARPSourceAddress(MAASTestCase):
+
+    def test__returns_address_on_containing_network(self):
+        self.assertThat(
+            get_arp_source_address(
+                IPNetwork("192.168.3.128/25"), "eth2", TEST_INTERFACES),
+            Equals(IPAddress("192.168.3.1")))
+
+    def test__returns_unspecified_address_otherwise(self):
+        self.assertThat(
+            get_arp_source_address(
+                IPNetwork("172.16.0.0/24"), "eth2", TEST_INTERFACES),
+            Equals(IPAddress("0.0.0.0")))
+        self.assertThat(
+            get_arp_source_address(
+                IPNetwork("192.168.3.0/24"), "eth9", TEST_INTERFACES),
+            Equals(IPAddress("0.0.0.0")))
+
+
+class FakeClock:
+    """A clock for `arp_scan`, which advances only when it sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestARPScan(MAASTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+        self.sent = []
+        self.make_arp_socket = self.patch(
+            scan_network_module, 'make_arp_socket')
+        self.make_arp_socket.side_effect = self.make_socket
+
+    def make_socket(self, ifname):
+        sock = Mock()
+        sock.getsockname.return_value = (
+            ifname, ETH_P_ARP, 0, 1, b'\x00\x11\x22\x33\x44\x55')
+        sock.send.side_effect = lambda frame: self.sent.append(
+            (self.clock.now, ifname, ARP(frame[14:]).target_ip))
+        return sock
+
+    def scan(self, to_scan, rate):
+        return list(arp_scan(
+            to_scan, TEST_INTERFACES, rate=rate, clock=self.clock,
+            sleep=self.clock.sleep))
+
+    def test__scans_interfaces_concurrently_at_rate(self):
+        events = self.scan({
+            'eth1': ['192.168.0.0/31'],
+            'eth2': ['192.168.2.4/31', '2001:db8::/64'],
+        }, rate=10)
+        self.assertThat([
+            (round(when, 3), ifname, str(ip))
+            for when, ifname, ip in self.sent
+        ], Equals([
+            (0.0, 'eth1', '192.168.0.0'),
+            (0.0, 'eth2', '192.168.2.4'),
+            (0.1, 'eth2', '192.168.2.5'),
+        ]))
+        self.assertThat(events, Equals([
+            {
+                "scan_type": "arp", "interface": "eth1",
+                "cidr": "192.168.0.0/31", "packets": 1, "seconds": 0,
+            },
+            {
+                "scan_type": "arp", "interface": "eth2",
+                "cidr": "192.168.2.4/31", "packets": 2, "seconds": 0,
+            },
+        ]))
+
+    def test__rejects_rate_that_is_not_positive(self):
+        with ExpectedException(ValueError, ".*greater than zero: 0"):
+            self.scan({'eth1': ['192.168.0.0/30']}, rate=0)
+
+    def test__closes_sockets(self):
+        socks = []
+        make_socket = self.make_socket
+        self.make_arp_socket.side_effect = (
+            lambda ifname: socks.append(make_socket(ifname)) or socks[-1])
+        self.scan({'eth1': ['192.168.0.0/30']}, rate=100)
+        self.assertThat(socks[0].close.call_count, Equals(1))
+
+    def test__reports_interfaces_that_cannot_be_scanned(self):
+        self.make_arp_socket.side_effect = OSError("Operation not permitted")
+        events = self.scan({'eth1': ['192.168.0.0/30']}, rate=100)
+        self.assertThat(events, Equals([{
+            "scan_type": "arp", "interface": "eth1",
+            "error": "Operation not permitted",
+        }]))
+
+    def test__reports_interfaces_that_fail_to_send_and_scans_others(self):
+        make_socket = self.make_socket
+
+        def make_failing_socket(ifname):
+            sock = make_socket(ifname)
+            if ifname == 'eth1':
+                sock.send.side_effect = OSError("Network is down")
+            return sock
+
+        self.make_arp_socket.side_effect = make_failing_socket
+        events = self.scan({
+            'eth1': ['192.168.0.0/30'],
+            'eth2': ['192.168.2.4/31'],
+        }, rate=100)
+        self.assertThat(
+            [(ifname, str(ip)) for _, ifname, ip in self.sent],
+            Equals([('eth2', '192.168.2.4'), ('eth2', '192.168.2.5')]))
+        self.assertThat(events, Equals([
+            {
+                "scan_type": "arp", "interface": "eth1",
+                "error": "Network is down",
+            },
+            {
+                "scan_type": "arp", "interface": "eth2",
+                "cidr": "192.168.2.4/31", "packets": 2, "seconds": 0,
+            },
+        ]))
@@ -346,6 +346,19 @@ class TestJSONPerLineProtocol(MAASTestCase):
         proto.outReceived(b"{}\n")
         self.expectThat(callback, MockCallsMatch(call([{}]), call([{}])))
 
+    def test__passes_lines_received_together_in_one_call(self):
+        callback = Mock()
+        proto = JSONPerLineProtocol(callback=callback)
+        proto.connectionMade()
+        with TwistedLoggerFixture():
+            proto.outReceived(b'{"a": 1}\n{\n{"b": 2}\n{"c"')
+        self.expectThat(
+            callback, MockCallsMatch(call([{"a": 1}, {"b": 2}])))
+        proto.outReceived(b': 3}\n')
+        self.expectThat(
+            callback, MockCallsMatch(
+                call([{"a": 1}, {"b": 2}]), call([{"c": 3}])))
+
     def test__logs_non_json_output(self):
         callback = Mock()
         proto = JSONPerLineProtocol(callback=callback)